@@ -0,0 +1,62 @@
+"""
+Minimal in-process ASGI driver used by the benchmarks
+
+Calls an ASGI application directly, without sockets or an HTTP client
+library, so measurements reflect the application's own cost.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+async def asgi_request(
+    app,
+    method: str,
+    path: str,
+    headers: Optional[Dict[str, str]] = None,
+    body: bytes = b"",
+) -> Tuple[int, Dict[str, str], bytes]:
+    """Send one HTTP request to `app`; returns (status, headers, body)"""
+    path, _, query = path.partition("?")
+    raw_headers: List[Tuple[bytes, bytes]] = [(b"host", b"bench")]
+    for name, value in (headers or {}).items():
+        raw_headers.append((name.lower().encode(), value.encode()))
+    if body:
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    response = {"status": 0, "headers": {}, "body": []}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {
+                k.decode(): v.decode() for k, v in message.get("headers", [])
+            }
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], b"".join(response["body"])
@@ -0,0 +1,132 @@
+"""
+Benchmark for audio playback with Range requests (services/audio_playback.py)
+
+Uploads a 1-hour session of 20-second 16 kHz mono WAV chunks (~115 MB)
+and drives the playback routes in-process (asgi_client.py), reporting:
+- the first request for the joined session, which reads every chunk
+  header to build its layout, and the later ones that reuse it
+- µs per 64 KB range at random positions (a player scrubbing), for the
+  joined session and for one chunk
+- throughput of a full download of the joined session
+- for comparison, the time to write the joined file first
+  (AudioStorage.consolidate()), which the joined route avoids
+
+Usage:
+    python benchmarks/bench_audio_playback.py [--minutes 60] [--seeks 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_audio_playback_")
+os.environ["AUDIO_STORAGE_PATH"] = WORK_DIR
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi import FastAPI  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from mock_audio import wav_header  # noqa: E402
+from routes import audio, sessions  # noqa: E402
+from services.audio_storage import AUDIO_STORAGE  # noqa: E402
+from services.session_store import SESSION_STORE  # noqa: E402
+
+CHUNK_SECONDS = 20
+BYTE_RATE = 16000 * 2
+RANGE_BYTES = 64 * 1024
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(sessions.router, prefix="/v1")
+    app.include_router(audio.router, prefix="/v1")
+    return app
+
+
+async def upload_session(app, chunks: int) -> str:
+    _, _, body = await asgi_request(
+        app, "POST", "/v1/sessions", {"Content-Type": "application/json"},
+        json.dumps({"templates": ["soap"], "model": "pro", "upload_type": "chunked",
+                    "communication_protocol": "http"}).encode(),
+    )
+    session_id = json.loads(body)["session_id"]
+    data_size = BYTE_RATE * CHUNK_SECONDS
+    chunk = wav_header(data_size, BYTE_RATE) + os.urandom(data_size)
+    for sequence in range(chunks):
+        status, _, body = await asgi_request(
+            app, "POST", f"/v1/sessions/{session_id}/audio/audio_{sequence}.wav", {"Content-Type": "audio/wav"}, chunk)
+        assert status == 200, body
+    return session_id
+
+
+async def seek_us(app, path: str, size: int, seeks: int) -> float:
+    """µs per request for RANGE_BYTES at random positions"""
+    positions = [random.randrange(0, size - RANGE_BYTES) for _ in range(seeks)]
+    start = time.perf_counter()
+    for position in positions:
+        status, _, body = await asgi_request(app, "GET", path, {"Range": f"bytes={position}-{position + RANGE_BYTES - 1}"})
+        assert status == 206 and len(body) == RANGE_BYTES, status
+    return (time.perf_counter() - start) / seeks * 1e6
+
+
+async def run(args) -> None:
+    app = build_app()
+    chunks = args.minutes * 60 // CHUNK_SECONDS
+    session_id = await upload_session(app, chunks)
+    path = f"/v1/sessions/{session_id}/audio"
+
+    start = time.perf_counter()
+    status, headers, _ = await asgi_request(app, "GET", path, {"Range": "bytes=0-1"})
+    first_ms = (time.perf_counter() - start) * 1000
+    assert status == 206, status
+    size = int(headers["content-range"].rsplit("/", 1)[1])
+    start = time.perf_counter()
+    await asgi_request(app, "GET", path, {"Range": "bytes=0-1"})
+    cached_ms = (time.perf_counter() - start) * 1000
+
+    print(f"  session: {chunks} chunks, {size / 1e6:.0f} MB")
+    print(f"  first request (reads {chunks} chunk headers): {first_ms:8.2f} ms")
+    print(f"  later requests (layout cached):          {cached_ms:8.2f} ms")
+
+    joined = await seek_us(app, path, size, args.seeks)
+    single = await seek_us(app, f"{path}/audio_{chunks // 2}.wav", BYTE_RATE * CHUNK_SECONDS, args.seeks)
+    print(f"  64 KB range, joined session: {joined:8.1f} µs")
+    print(f"  64 KB range, one chunk:      {single:8.1f} µs")
+
+    start = time.perf_counter()
+    status, _, body = await asgi_request(app, "GET", path)
+    elapsed = time.perf_counter() - start
+    assert status == 200 and len(body) == size
+    print(f"  full download: {size / elapsed / 1e9:.2f} GB/s ({elapsed * 1000:.0f} ms)")
+
+    filenames = list(SESSION_STORE.get(session_id)["audio_chunks"].filenames())
+    start = time.perf_counter()
+    AUDIO_STORAGE.consolidate(session_id, filenames)
+    print(f"  writing the joined file instead: {(time.perf_counter() - start) * 1000:.0f} ms before the first byte")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=60, help="Session length")
+    parser.add_argument("--seeks", type=int, default=2000, help="Range requests per case")
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print("Audio playback with Range requests")
+    print("=" * 64)
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
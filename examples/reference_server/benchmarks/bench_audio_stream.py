@@ -0,0 +1,144 @@
+"""
+Benchmark: chunked POST uploads vs. one WebSocket audio stream
+
+Starts the server on a local port (real sockets, uvicorn) and uploads the
+same amount of audio four ways:
+- one POST per 20 s chunk, new connection each time
+- one POST per 20 s chunk over a keep-alive connection
+- one POST per small frame over a keep-alive connection
+- one WebSocket stream of small frames (upload_type "stream")
+
+With live capture, audio reaches the server at most one chunk (or frame)
+late, so 20 s chunks delay everything downstream by up to 20 s. Small
+frames cut that delay; the benchmark shows what each frame costs over
+HTTP requests compared with WebSocket messages. Audio is sent as WAV
+(mock_audio.py): every POST is a WAV file, and the stream one WAV header
+followed by frames of samples.
+
+Usage:
+    python benchmarks/bench_audio_stream.py [--audio-seconds 300] [--bytes-per-second 4000]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Keep benchmark audio out of the working tree
+os.environ.setdefault("AUDIO_STORAGE_PATH", tempfile.mkdtemp(prefix="bench_audio_"))
+# Measure transport cost, not the upload rate limit
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import requests  # noqa: E402
+import uvicorn  # noqa: E402
+from websockets.sync.client import connect  # noqa: E402
+
+from mock_audio import WAV_UNKNOWN_SIZE, mock_wav, wav_header  # noqa: E402
+
+from main import app  # noqa: E402
+from routes import sessions  # noqa: E402
+
+CHUNK_SECONDS = 20
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def create_session(base_url: str, upload_type: str) -> str:
+    response = requests.post(f"{base_url}/v1/sessions", json={
+        "templates": ["soap"],
+        "model": "pro",
+        "upload_type": upload_type,
+        "communication_protocol": "http",
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["session_id"]
+
+
+def post_upload(base_url: str, chunks: int, chunk: bytes, keep_alive: bool) -> float:
+    session_id = create_session(base_url, "chunked")
+    http = requests.Session() if keep_alive else requests
+    start = time.perf_counter()
+    for i in range(chunks):
+        response = http.post(
+            f"{base_url}/v1/sessions/{session_id}/audio/audio_{i}.wav",
+            headers={"Content-Type": "audio/wav"},
+            data=chunk,
+        )
+        assert response.status_code == 200, response.text
+    return time.perf_counter() - start
+
+
+def stream_upload(base_url: str, frames: int, frame: bytes, byte_rate: int) -> float:
+    session_id = create_session(base_url, "stream")
+    url = base_url.replace("http", "ws", 1) + f"/v1/sessions/{session_id}/audio/stream?content_type=audio/wav"
+    start = time.perf_counter()
+    with connect(url) as ws:
+        ws.send(wav_header(WAV_UNKNOWN_SIZE, byte_rate))
+        for _ in range(frames):
+            ws.send(frame)
+        ws.send('{"type": "end"}')
+        while '"stored"' not in ws.recv():
+            pass
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio-seconds", type=int, default=300)
+    parser.add_argument("--bytes-per-second", type=int, default=4000, help="4000 = 32 kbit/s Opus")
+    parser.add_argument("--frame-ms", type=int, default=100, help="Audio per WebSocket message")
+    args = parser.parse_args()
+
+    # Token IDs with '-' or '_' fail the session ID pattern; avoid flaky runs
+    sessions.generate_session_id = lambda: "ses_" + os.urandom(16).hex()
+
+    port = free_port()
+    server = start_server(port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    chunks = args.audio_seconds // CHUNK_SECONDS
+    chunk = mock_wav(args.bytes_per_second * CHUNK_SECONDS, CHUNK_SECONDS)
+    frames = args.audio_seconds * 1000 // args.frame_ms
+    frame = b"\0" * (args.bytes_per_second * args.frame_ms // 1000)
+    frame_file = mock_wav(len(frame), args.frame_ms / 1000)
+
+    print("=" * 70)
+    print(f"Audio upload benchmark: {args.audio_seconds}s of audio, {args.bytes_per_second} B/s")
+    print("=" * 70)
+    frame_seconds = args.frame_ms / 1000
+    results = [
+        ("POST per 20s chunk, new connection", CHUNK_SECONDS, chunks,
+         post_upload(base_url, chunks, chunk, keep_alive=False)),
+        ("POST per 20s chunk, keep-alive", CHUNK_SECONDS, chunks,
+         post_upload(base_url, chunks, chunk, keep_alive=True)),
+        (f"POST per {args.frame_ms}ms frame, keep-alive", frame_seconds, frames,
+         post_upload(base_url, frames, frame_file, keep_alive=True)),
+        (f"WebSocket, {args.frame_ms}ms frames", frame_seconds, frames,
+         stream_upload(base_url, frames, frame, args.bytes_per_second)),
+    ]
+    print(f"{'':<36}{'audio delay':>12}{'messages':>10}{'total ms':>10}{'µs/message':>12}")
+    for name, delay, messages, seconds in results:
+        print(f"{name:<36}{delay:>11g}s{messages:>10}{seconds * 1000:>10.0f}{seconds / messages * 1e6:>12.0f}")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
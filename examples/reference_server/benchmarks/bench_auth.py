@@ -0,0 +1,164 @@
+"""
+Benchmark: cost of authentication (services/auth.py) on the upload path
+
+Drives status polls and 64 KB chunk uploads in-process (asgi_client.py)
+with:
+- auth off
+- an API key, looked up by SHA-256 digest
+- an RS256 bearer token, with its claims cached
+- an RS256 bearer token verified on every request (claims cache off)
+interleaving the cases so machine noise hits all alike, and reports µs per
+request and the overhead against auth off. Uploads vary by tens of µs
+between rounds with the disk write, more than a cached lookup costs; the
+status polls show the overhead more clearly. Tokens are signed by the
+local stand-in issuer (oidc_issuer.py), whose JWKS is read from a file.
+
+Also reports the cost of each lookup on its own: API key by SHA-256
+digest, and token by claims cache vs. full RS256 verification.
+
+Usage:
+    python benchmarks/bench_auth.py [--requests 2000] [--rounds 5] [--bits 2048]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_auth_")
+JWKS_FILE = os.path.join(WORK_DIR, "jwks.json")
+API_KEY = "sk_test_bench_0123456789abcdef"
+os.environ["AUDIO_STORAGE_PATH"] = os.path.join(WORK_DIR, "audio")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["AUTH_MODE"] = "optional"
+os.environ["AUTH_API_KEYS"] = f"{API_KEY}:tenant_bench"
+os.environ["AUTH_JWKS_FILE"] = JWKS_FILE
+
+from fastapi import Depends, FastAPI  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from mock_audio import mock_wav  # noqa: E402
+from oidc_issuer import OIDCIssuer  # noqa: E402
+from routes import audio, sessions  # noqa: E402
+from services.auth import AUTHENTICATOR, AuthenticationError, authenticate, authentication_error_handler  # noqa: E402
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.add_exception_handler(AuthenticationError, authentication_error_handler)
+    app.include_router(sessions.router, prefix="/v1", dependencies=[Depends(authenticate)])
+    app.include_router(audio.router, prefix="/v1", dependencies=[Depends(authenticate)])
+    return app
+
+
+async def per_request(app, method: str, path: str, headers, body: bytes, requests: int) -> float:
+    """µs per request"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        status, _, _ = await asgi_request(app, method, path, headers, body)
+    assert 200 <= status < 300, status
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def per_call(call, calls: int) -> float:
+    """µs per call"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        await call()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def run(args, issuer: OIDCIssuer) -> None:
+    app = build_app()
+    await AUTHENTICATOR.start()
+    token = issuer.issue("user_bench", "tenant_bench")
+    # A token of its own for the uncached cases, never cached for longer than 0 s
+    uncached_token = issuer.issue("user_bench_uncached", "tenant_bench")
+
+    status, _, body = await asgi_request(
+        app, "POST", "/v1/sessions", {"Content-Type": "application/json", "X-API-Key": API_KEY},
+        b'{"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}',
+    )
+    assert status == 201, body
+    session_id = body.split(b'"session_id":"', 1)[1].split(b'"', 1)[0].decode()
+    paths = [
+        ("status poll", "GET", f"/v1/sessions/{session_id}", {}, b""),
+        ("64 KB upload", "POST", f"/v1/sessions/{session_id}/audio/audio_0.wav",
+         {"Content-Type": "audio/wav"}, mock_wav(64 * 1024)),
+    ]
+    # (label, mode, credential headers, token cache seconds)
+    cases = [
+        ("auth off", "off", {}, 60),
+        ("API key", "optional", {"X-API-Key": API_KEY}, 60),
+        ("RS256 (cached)", "optional", {"Authorization": f"Bearer {token}"}, 60),
+        ("RS256 (uncached)", "optional", {"Authorization": f"Bearer {uncached_token}"}, 0),
+    ]
+
+    print(f"  {args.bits}-bit RSA key")
+    for path_label, method, path, headers, body in paths:
+        async def measure(mode, credentials, cache_seconds, requests):
+            AUTHENTICATOR.mode = mode
+            AUTHENTICATOR.token_cache_seconds = cache_seconds
+            return await per_request(app, method, path, {**headers, **credentials}, body, requests)
+
+        results = {label: [] for label, *_ in cases}
+        for _, mode, credentials, cache_seconds in cases:
+            await measure(mode, credentials, cache_seconds, 50)  # warm up
+        for _ in range(args.rounds):
+            for label, mode, credentials, cache_seconds in cases:
+                results[label].append(await measure(mode, credentials, cache_seconds, args.requests))
+
+        # Best round of each, the least disturbed by other processes
+        baseline = min(results["auth off"])
+        print(f"\n  {path_label:<20}{'µs/request':>12}{'overhead µs':>14}")
+        for label, *_ in cases:
+            best = min(results[label])
+            print(f"  {label:<20}{best:>12.1f}{best - baseline:>14.1f}")
+
+    AUTHENTICATOR.mode = "optional"
+    print("\n  Lookup alone")
+    api_keys = AUTHENTICATOR.api_keys
+
+    async def key_digest():
+        api_keys.lookup(API_KEY)
+
+    async def token_cached():
+        await AUTHENTICATOR.verify_token(token)
+
+    async def token_verify():
+        await AUTHENTICATOR.verify_token(uncached_token)
+
+    calls = args.requests * 20
+    print(f"  {'API key, SHA-256 digest':<28}{await per_call(key_digest, calls):>8.2f} µs")
+    AUTHENTICATOR.token_cache_seconds = 60
+    print(f"  {'RS256 token, claims cache':<28}{await per_call(token_cached, calls):>8.2f} µs")
+    AUTHENTICATOR.token_cache_seconds = 0
+    print(f"  {'RS256 token, verified':<28}{await per_call(token_verify, args.requests):>8.2f} µs")
+    await AUTHENTICATOR.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per case and round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--bits", type=int, default=2048, help="RSA key size of the issuer")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Authentication overhead")
+    print("=" * 60)
+    try:
+        issuer = OIDCIssuer(bits=args.bits)
+        issuer.write_jwks(JWKS_FILE)
+        asyncio.run(run(args, issuer))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: cost of chunk uploads vs. retries of stored chunks
+
+Drives the audio upload route in-process (asgi_client.py) and reports µs
+per request for:
+- a first upload: hashed with SHA-256 while it is written to disk
+- a retry without Content-Digest: hashed and compared, not written
+- a retry with Content-Digest: compared by header, body only drained
+for each chunk size, plus the SHA-256 throughput the first two pay for.
+
+Usage:
+    python benchmarks/bench_chunk_retries.py [--sizes 64,1024] [--requests 300]
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_chunk_retries_")
+os.environ["AUDIO_STORAGE_PATH"] = WORK_DIR
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi import FastAPI  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from mock_audio import mock_wav  # noqa: E402
+from routes import audio, sessions  # noqa: E402
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(sessions.router, prefix="/v1")
+    app.include_router(audio.router, prefix="/v1")
+    return app
+
+
+async def create_session(app) -> str:
+    _, _, body = await asgi_request(
+        app, "POST", "/v1/sessions", {"Content-Type": "application/json"},
+        json.dumps({"templates": ["soap"], "model": "pro", "upload_type": "chunked",
+                    "communication_protocol": "http"}).encode(),
+    )
+    return json.loads(body)["session_id"]
+
+
+async def run(args) -> None:
+    app = build_app()
+    print(f"  {'chunk':<10}{'first upload µs':>18}{'retry µs':>12}{'retry + digest µs':>20}")
+    for kb in (int(size) for size in args.sizes.split(",")):
+        chunk = mock_wav(kb * 1024)
+        headers = {"Content-Type": "audio/wav"}
+        with_digest = {**headers, "Content-Digest": f"sha-256=:{base64.b64encode(hashlib.sha256(chunk).digest()).decode()}:"}
+
+        # First uploads: a new sequence number each time
+        session_id = await create_session(app)
+        start = time.perf_counter()
+        for sequence in range(args.requests):
+            status, _, body = await asgi_request(
+                app, "POST", f"/v1/sessions/{session_id}/audio/audio_{sequence}.wav", headers, chunk)
+            assert status == 200, body
+        first_us = (time.perf_counter() - start) / args.requests * 1e6
+
+        retry_us = []
+        for retry_headers in (headers, with_digest):
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                status, _, body = await asgi_request(
+                    app, "POST", f"/v1/sessions/{session_id}/audio/audio_0.wav", retry_headers, chunk)
+            assert json.loads(body)["duplicate"], body
+            retry_us.append((time.perf_counter() - start) / args.requests * 1e6)
+
+        print(f"  {f'{kb} KB':<10}{first_us:>18.1f}{retry_us[0]:>12.1f}{retry_us[1]:>20.1f}")
+
+    data = os.urandom(16 * 1024 * 1024)
+    start = time.perf_counter()
+    hashlib.sha256(data).digest()
+    print(f"\n  SHA-256: {len(data) / (time.perf_counter() - start) / 1e6:,.0f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="64,1024", help="Comma-separated chunk sizes in KB")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per case")
+    args = parser.parse_args()
+
+    print("=" * 64)
+    print("Chunk uploads vs. retries")
+    print("=" * 64)
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Benchmark: MedScribeClient vs. AsyncMedScribeClient (example_client.py)
+
+Starts the server in a separate process (uvicorn, real sockets) and runs
+the same workload with each client: create a session, upload its chunks
+from disk, end it. Reports sessions/s and per-session latency for:
+- MedScribeClient as shipped: one connection per request, chunks one at
+  a time with a 100 ms pause in between
+- MedScribeClient without the pause
+- AsyncMedScribeClient with 1, 10 and 100 sessions in flight over one
+  pooled client, chunks of a session uploaded in parallel
+
+Requests go through a local proxy that delays traffic by --rtt-ms per
+round trip (and per new connection), since connection reuse and parallel
+uploads pay off by hiding network round trips; --rtt-ms 0 connects to
+the server directly.
+
+Usage:
+    python benchmarks/bench_client.py [--sessions 200] [--chunks 5] [--chunk-kb 64] [--rtt-ms 20]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from example_client import AsyncMedScribeClient, MedScribeClient  # noqa: E402
+from mock_audio import mock_wav  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, audio_dir: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, "AUDIO_STORAGE_PATH": audio_dir, "RATE_LIMIT_ENABLED": "false"},
+    )
+    for _ in range(200):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+def run_proxy(listen_port: int, target_port: int, rtt: float) -> None:
+    """Forward TCP connections to target_port, delaying each direction by rtt / 2"""
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while data := await reader.read(65536):
+                loop.call_later(rtt / 2, writer.write, data)
+        except ConnectionError:
+            pass
+        loop.call_later(rtt / 2, writer.close)
+
+    async def handle(client_reader, client_writer) -> None:
+        # TCP handshake
+        await asyncio.sleep(rtt)
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", target_port)
+        await asyncio.gather(pipe(client_reader, server_writer), pipe(server_reader, client_writer))
+
+    async def serve() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", listen_port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def report(label: str, sessions: int, elapsed: float, latencies) -> None:
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"  {label:<34} {sessions / elapsed:>8,.1f} sessions/s   p50 {p50:>7.1f} ms   p99 {p99:>7.1f} ms")
+
+
+def run_sync(base_url: str, files, sessions: int, pause: bool) -> None:
+    latencies = []
+    start = time.perf_counter()
+    # The synchronous client narrates every step
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(sessions):
+            t0 = time.perf_counter()
+            client = MedScribeClient(base_url)
+            client.create_session(["soap"])
+            if pause:
+                client.upload_audio_chunks(files)
+            else:
+                for sequence, path in enumerate(files):
+                    client.upload_audio_file(path, sequence)
+            client.end_session(len(files))
+            latencies.append(time.perf_counter() - t0)
+    label = "sync, as shipped" if pause else "sync, no pause"
+    report(label, sessions, time.perf_counter() - start, latencies)
+
+
+async def run_async(base_url: str, files, sessions: int, in_flight: int) -> None:
+    latencies = []
+    slots = asyncio.Semaphore(in_flight)
+
+    async def one_session(client: AsyncMedScribeClient) -> None:
+        async with slots:
+            t0 = time.perf_counter()
+            session = await client.create_session(["soap"])
+            await client.upload_audio_chunks(session["session_id"], files)
+            await client.end_session(session["session_id"], len(files))
+            latencies.append(time.perf_counter() - t0)
+
+    async with AsyncMedScribeClient(base_url) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one_session(client) for _ in range(sessions)))
+        elapsed = time.perf_counter() - start
+    report(f"async, {in_flight} sessions in flight", sessions, elapsed, latencies)
+
+
+async def discovery_cost(base_url: str, calls: int) -> float:
+    """µs per discover() once the document is cached"""
+    async with AsyncMedScribeClient(base_url) as client:
+        await client.discover()
+        start = time.perf_counter()
+        for _ in range(calls):
+            await client.discover()
+        return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--sync-sessions", type=int, default=20, help="Sessions for the synchronous runs")
+    parser.add_argument("--chunks", type=int, default=5)
+    parser.add_argument("--chunk-kb", type=int, default=64, help="Size of each chunk file")
+    parser.add_argument("--rtt-ms", type=float, default=20, help="Simulated network round trip")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_client_")
+    files = []
+    for i in range(args.chunks):
+        path = os.path.join(work_dir, f"chunk_{i}.wav")
+        with open(path, "wb") as f:
+            f.write(mock_wav(args.chunk_kb * 1024))
+        files.append(path)
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port, os.path.join(work_dir, "audio"))
+    proxy = None
+    if args.rtt_ms:
+        proxy_port = free_port()
+        proxy = multiprocessing.Process(target=run_proxy, args=(proxy_port, port, args.rtt_ms / 1000), daemon=True)
+        proxy.start()
+        base_url = f"http://127.0.0.1:{proxy_port}"
+        start_server_wait = time.perf_counter() + 10
+        while time.perf_counter() < start_server_wait:
+            try:
+                requests.get(f"{base_url}/health", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.05)
+    try:
+        print("=" * 70)
+        print(f"Client benchmark ({args.chunks} chunks of {args.chunk_kb} KB per session, "
+              f"{args.rtt_ms:g} ms round trip)")
+        print("=" * 70)
+        run_sync(base_url, files, args.sync_sessions, pause=True)
+        run_sync(base_url, files, args.sync_sessions, pause=False)
+        for in_flight in (1, 10, 100):
+            asyncio.run(run_async(base_url, files, args.sessions, in_flight))
+        print(f"\n  cached discover(): {asyncio.run(discovery_cost(base_url, 10000)):.2f} µs/call")
+    finally:
+        if proxy is not None:
+            proxy.terminate()
+        server.terminate()
+        server.wait()
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
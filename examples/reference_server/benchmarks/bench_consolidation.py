@@ -0,0 +1,113 @@
+"""
+Benchmark for consolidating a session's chunks into one file
+(services/consolidation.py)
+
+Stores a 1-hour session as 20-second WAV chunks and reports GB/s and
+wall time for joining them with kernel-side copies (what end_session
+triggers) vs. a read/write loop through Python buffers, for:
+- 16 kHz mono 16-bit audio (speech recognition input, ~115 MB)
+- 48 kHz stereo 16-bit audio (~690 MB)
+
+Files are in the page cache, so this measures the copy, not the disk.
+Filesystems with reflinks (XFS, Btrfs) share blocks instead of copying,
+and report much higher rates.
+
+Usage:
+    python benchmarks/bench_consolidation.py [--minutes 60] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_audio import WAV_HEADER_SIZE, wav_header  # noqa: E402
+from services.audio_storage import AudioStorage  # noqa: E402
+
+CHUNK_SECONDS = 20
+
+# (name, bytes of audio per second)
+PROFILES = [
+    ("16 kHz mono", 16000 * 2),
+    ("48 kHz stereo", 48000 * 2 * 2),
+]
+
+
+def store_session(storage: AudioStorage, session_id: str, chunks: int, byte_rate: int) -> list:
+    """Write `chunks` WAV chunks of CHUNK_SECONDS each; returns their filenames"""
+    os.makedirs(storage.session_dir(session_id), exist_ok=True)
+    data_size = byte_rate * CHUNK_SECONDS
+    data = os.urandom(data_size)
+    filenames = []
+    for sequence in range(chunks):
+        filename = f"{sequence}.wav"
+        with open(storage.path(session_id, filename), "wb") as f:
+            f.write(wav_header(data_size, byte_rate) + data)
+        filenames.append(filename)
+    return filenames
+
+
+def python_copy(storage: AudioStorage, session_id: str, filenames: list) -> None:
+    """The same join through Python buffers, for comparison"""
+    with open(os.path.join(storage.session_dir(session_id), "python.wav"), "wb") as out:
+        for index, filename in enumerate(filenames):
+            with open(storage.path(session_id, filename), "rb") as f:
+                if index:
+                    f.seek(WAV_HEADER_SIZE)
+                shutil.copyfileobj(f, out, 1024 * 1024)
+
+
+def best_of(rounds: int, output: str, function, *args) -> float:
+    """Fastest of `rounds` runs, each writing `output` afresh as end_session does"""
+    elapsed = []
+    for _ in range(rounds):
+        # Write back earlier rounds so their dirty pages don't throttle this one
+        os.sync()
+        start = time.perf_counter()
+        function(*args)
+        elapsed.append(time.perf_counter() - start)
+        # Freeing the blocks of a replaced file isn't part of the copy
+        os.unlink(output)
+    return min(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, default=60, help="Session length")
+    parser.add_argument("--rounds", type=int, default=3, help="Runs per case; the fastest is reported")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_consolidation_")
+    storage = AudioStorage(work_dir)
+    chunks = args.minutes * 60 // CHUNK_SECONDS
+
+    print("=" * 72)
+    print(f"Consolidating a {args.minutes}-minute session ({chunks} chunks of {CHUNK_SECONDS}s)")
+    print("=" * 72)
+    print(f"  {'audio':<16}{'size MB':>9}{'kernel GB/s':>13}{'ms':>8}{'python GB/s':>13}{'ms':>8}")
+    try:
+        for name, byte_rate in PROFILES:
+            session_id = f"ses_{byte_rate}"
+            filenames = store_session(storage, session_id, chunks, byte_rate)
+            # Warm the page cache
+            python_copy(storage, session_id, filenames)
+
+            session_dir = storage.session_dir(session_id)
+            size = os.path.getsize(os.path.join(session_dir, "python.wav"))
+            python = best_of(args.rounds, os.path.join(session_dir, "python.wav"), python_copy, storage, session_id, filenames)
+            kernel = best_of(args.rounds, os.path.join(session_dir, "session.wav"), storage.consolidate, session_id, filenames)
+            print(
+                f"  {name:<16}{size / 1e6:>9.0f}{size / kernel / 1e9:>13.2f}{kernel * 1000:>8.0f}"
+                f"{size / python / 1e9:>13.2f}{python * 1000:>8.0f}"
+            )
+            storage.delete_session(session_id)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
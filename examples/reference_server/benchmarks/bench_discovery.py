@@ -0,0 +1,95 @@
+"""
+Benchmark for the discovery endpoint
+
+Compares the previous implementation (rebuild the DiscoveryResponse tree
+and JSON-encode it on every request) with the prepared-bytes endpoint,
+for plain, gzip, brotli and conditional (If-None-Match -> 304) requests.
+Requests are driven in-process through the ASGI interface.
+
+Usage:
+    python benchmarks/bench_discovery.py [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi import FastAPI, status  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from routes import discovery  # noqa: E402
+
+
+def legacy_app() -> FastAPI:
+    """The endpoint as it was: build, model_dump() and JSONResponse per request"""
+    app = FastAPI()
+
+    @app.get("/.well-known/medscribealliance")
+    async def get_discovery_document():
+        document = discovery.build_discovery_document()
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=document.model_dump(),
+            headers={"Cache-Control": "max-age=10800"},
+        )
+
+    return app
+
+
+def current_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(discovery.router)
+    return app
+
+
+async def measure(app, requests: int, headers=None):
+    path = "/.well-known/medscribealliance"
+    status_code, response_headers, body = await asgi_request(app, "GET", path, headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await asgi_request(app, "GET", path, headers)
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, elapsed / requests * 1e6, status_code, len(body)
+
+
+async def run(requests: int):
+    legacy = legacy_app()
+    current = current_app()
+    etag = discovery.get_prepared_document().variants[None][1]
+
+    cases = [
+        ("before: rebuild + JSONResponse", legacy, None),
+        ("after: identity", current, None),
+        ("after: gzip", current, {"Accept-Encoding": "gzip"}),
+    ]
+    if discovery.brotli is not None:
+        cases.append(("after: br", current, {"Accept-Encoding": "gzip, br"}))
+    cases.append(("after: If-None-Match -> 304", current, {"If-None-Match": etag}))
+
+    print(f"{'case':<34}{'req/s':>10}{'µs/req':>10}{'status':>8}{'bytes':>8}")
+    for name, app, headers in cases:
+        rate, latency, status_code, size = await measure(app, requests, headers)
+        print(f"{name:<34}{rate:>10,.0f}{latency:>10.1f}{status_code:>8}{size:>8}")
+
+    if discovery.brotli is None:
+        print("\n(brotli not installed; br variant skipped)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Discovery endpoint benchmark (in-process ASGI)")
+    print("=" * 70)
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark: overhead of MetricsMiddleware on the upload and poll paths
+
+Drives the session and audio routes in-process (asgi_client.py), without
+and with the middleware, interleaving the two so machine noise hits both
+alike. Reports µs per request for status polls and for 64 KB chunk
+uploads (re-uploading one chunk, so the disk write is the same each
+time), and the cost of rendering /metrics.
+
+Full requests vary by several µs between runs, more than the middleware
+costs, so the middleware is also timed around a minimal ASGI app that
+only answers, which isolates its own cost.
+
+Usage:
+    python benchmarks/bench_metrics.py [--requests 5000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_metrics_")
+os.environ["AUDIO_STORAGE_PATH"] = WORK_DIR
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+from fastapi import FastAPI  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from mock_audio import mock_wav  # noqa: E402
+from routes import audio, sessions  # noqa: E402
+from services.metrics import Metrics, MetricsMiddleware  # noqa: E402
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(sessions.router, prefix="/v1")
+    app.include_router(audio.router, prefix="/v1")
+    return app
+
+
+async def per_request(app, method: str, path: str, headers, body: bytes, requests: int) -> float:
+    """µs per request"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        await asgi_request(app, method, path, headers, body)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def minimal_app(scope, receive, send) -> None:
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def run(args) -> None:
+    plain = build_app()
+    metrics = Metrics()
+    instrumented = MetricsMiddleware(build_app(), metrics)
+
+    status, _, body = await asgi_request(
+        plain, "POST", "/v1/sessions", {"Content-Type": "application/json"},
+        json.dumps({"templates": ["soap"], "model": "pro", "upload_type": "chunked",
+                    "communication_protocol": "http"}).encode(),
+    )
+    session_id = json.loads(body)["session_id"]
+    chunk = mock_wav(64 * 1024)
+    cases = [
+        ("status poll", "GET", f"/v1/sessions/{session_id}", {}, b""),
+        ("64 KB upload", "POST", f"/v1/sessions/{session_id}/audio/audio_0.wav", {"Content-Type": "audio/wav"}, chunk),
+    ]
+
+    print(f"  {'':<16}{'plain µs':>12}{'metrics µs':>12}{'overhead µs':>14}")
+    for label, method, path, headers, body in cases:
+        # Warm up both
+        await per_request(plain, method, path, headers, body, 100)
+        await per_request(instrumented, method, path, headers, body, 100)
+        plain_us, instrumented_us = [], []
+        for _ in range(args.rounds):
+            plain_us.append(await per_request(plain, method, path, headers, body, args.requests))
+            instrumented_us.append(await per_request(instrumented, method, path, headers, body, args.requests))
+        # Best round of each, the least disturbed by other processes
+        best_plain, best_instrumented = min(plain_us), min(instrumented_us)
+        print(f"  {label:<16}{best_plain:>12.1f}{best_instrumented:>12.1f}{best_instrumented - best_plain:>14.1f}")
+
+    wrapped = MetricsMiddleware(minimal_app, Metrics())
+    bare_us, wrapped_us = [], []
+    for _ in range(args.rounds):
+        bare_us.append(await per_request(minimal_app, "GET", "/", {}, b"", args.requests * 4))
+        wrapped_us.append(await per_request(wrapped, "GET", "/", {}, b"", args.requests * 4))
+    print(f"\n  middleware alone: {min(wrapped_us) - min(bare_us):.1f} µs per request")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        text = metrics.render()
+    render_ms = (time.perf_counter() - start) / 100 * 1000
+    print(f"  render /metrics: {render_ms:.3f} ms ({len(text):,} bytes, {len(metrics.routes)} routes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Metrics middleware overhead")
+    print("=" * 60)
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
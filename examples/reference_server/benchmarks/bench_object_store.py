@@ -0,0 +1,179 @@
+"""
+Benchmark for uploads through signed URLs (object_store.py)
+
+Uploads 20-second 16 kHz mono WAV chunks (640 KB) of chunked sessions and
+reports what each chunk costs the API process when it:
+- receives the chunk itself (POST /v1/sessions/{id}/audio/{file})
+- only registers a chunk the object store received
+  (POST /internal/object-events)
+and, for the object store, µs per PUT and the time until every chunk is
+registered, with notifications sent to the API over loopback. Checking an
+upload URL is also timed on its own: it is all the object store does
+before taking the body.
+
+Usage:
+    python benchmarks/bench_object_store.py [--chunks 500]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+WORK_DIR = tempfile.mkdtemp(prefix="bench_object_store_")
+API_PORT = 9401
+os.environ["AUDIO_STORAGE_PATH"] = os.path.join(WORK_DIR, "audio")
+os.environ["OBJECT_STORE_PATH"] = os.path.join(WORK_DIR, "objects")
+os.environ["OBJECT_STORE_SECRET"] = secrets.token_hex(16)
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from mock_audio import wav_header  # noqa: E402
+from object_store import ObjectStore  # noqa: E402
+from routes import audio, sessions  # noqa: E402
+from services.object_store import SIGNED_UPLOADS  # noqa: E402
+from services.session_store import SESSION_STORE  # noqa: E402
+
+CHUNK_SECONDS = 20
+BYTE_RATE = 16000 * 2
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(sessions.router, prefix="/v1")
+    app.include_router(audio.router, prefix="/v1")
+    app.include_router(audio.internal_router)
+    return app
+
+
+async def create_session(app) -> str:
+    _, _, body = await asgi_request(
+        app, "POST", "/v1/sessions", {"Content-Type": "application/json"},
+        json.dumps({"templates": ["soap"], "model": "pro", "upload_type": "chunked",
+                    "communication_protocol": "http"}).encode(),
+    )
+    return json.loads(body)["session_id"]
+
+
+def sessions_for(chunks: int) -> int:
+    """Chunks are spread over sessions of up to an hour of audio"""
+    per_session = 3600 // CHUNK_SECONDS
+    return (chunks + per_session - 1) // per_session
+
+
+async def direct_upload_us(app, chunk: bytes, chunks: int) -> float:
+    session_ids = [await create_session(app) for _ in range(sessions_for(chunks))]
+    start = time.perf_counter()
+    for index in range(chunks):
+        session_id = session_ids[index % len(session_ids)]
+        sequence = index // len(session_ids)
+        status, _, body = await asgi_request(
+            app, "POST", f"/v1/sessions/{session_id}/audio/audio_{sequence}.wav", {"Content-Type": "audio/wav"}, chunk)
+        assert status == 200, body
+    return (time.perf_counter() - start) / chunks * 1e6
+
+
+async def registration_us(app, chunk: bytes, chunks: int) -> float:
+    """Notifications for objects already in the object store's directory"""
+    session_ids = [await create_session(app) for _ in range(sessions_for(chunks))]
+    sha256 = hashlib.sha256(chunk).hexdigest()
+    requests = []
+    for index in range(chunks):
+        session_id = session_ids[index % len(session_ids)]
+        file_name = f"audio_{index // len(session_ids)}.wav"
+        key = f"{secrets.token_hex(8)}-{file_name}"
+        path = SIGNED_UPLOADS.object_path(session_id, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(chunk)
+        body = json.dumps({
+            "event": "object.created", "session_id": session_id, "key": key, "file_name": file_name,
+            "content_type": "audio/wav", "size_bytes": len(chunk), "sha256": sha256,
+            "duration_seconds": CHUNK_SECONDS,
+        }).encode()
+        requests.append(body)
+    start = time.perf_counter()
+    for body in requests:
+        headers = {"Content-Type": "application/json", "X-MSA-Signature": SIGNED_UPLOADS.sign_event(body)}
+        status, _, response = await asgi_request(app, "POST", "/internal/object-events", headers, body)
+        assert status == 200, response
+    return (time.perf_counter() - start) / chunks * 1e6
+
+
+async def object_store_us(app, chunk: bytes, chunks: int):
+    """µs per PUT, and ms from the first PUT until every chunk is registered"""
+    session_ids = [await create_session(app) for _ in range(sessions_for(chunks))]
+    urls = {session_id: SIGNED_UPLOADS.upload_url(session_id).url.split("/", 3)[3] for session_id in session_ids}
+    store = ObjectStore(notify_url=f"http://127.0.0.1:{API_PORT}/internal/object-events")
+    start = time.perf_counter()
+    for index in range(chunks):
+        session_id = session_ids[index % len(session_ids)]
+        status, _, body = await asgi_request(
+            store, "PUT", f"/{urls[session_id]}/audio_{index // len(session_ids)}.wav", {"Content-Type": "audio/wav"}, chunk)
+        assert status == 200, body
+    put_us = (time.perf_counter() - start) / chunks * 1e6
+    await store.join()
+    registered_ms = (time.perf_counter() - start) * 1000
+    assert store.notified == chunks, store.stats()
+    assert sum(len(SESSION_STORE.get(s)["audio_chunks"]) for s in session_ids) == chunks
+    return put_us, registered_ms
+
+
+def verify_us(rounds: int = 100000) -> float:
+    expires_at = str(int(time.time()) + 900)
+    signature = SIGNED_UPLOADS.signature("ses_bench", int(expires_at))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        SIGNED_UPLOADS.verify("ses_bench", expires_at, signature)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=500, help="Chunks uploaded per case")
+    args = parser.parse_args()
+
+    app = build_app()
+    # The API as the object store reaches it, in this process
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=API_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+
+    data_size = BYTE_RATE * CHUNK_SECONDS
+    chunk = wav_header(data_size, BYTE_RATE) + os.urandom(data_size)
+    megabytes = len(chunk) * args.chunks / 1e6
+
+    print("=" * 64)
+    print(f"Signed uploads: {args.chunks} chunks of {len(chunk) // 1024} KB ({megabytes:.0f} MB)")
+    print("=" * 64)
+    try:
+        direct = asyncio.run(direct_upload_us(app, chunk, args.chunks))
+        registration = asyncio.run(registration_us(app, chunk, args.chunks))
+        put_us, registered_ms = asyncio.run(object_store_us(app, chunk, args.chunks))
+        print("  API process, per chunk:")
+        print(f"    upload through the API:       {direct:8.1f} µs ({len(chunk) / direct:.0f} MB/s)")
+        print(f"    registration of a stored one: {registration:8.1f} µs (no audio bytes)")
+        print("  object store:")
+        print(f"    URL check:                    {verify_us():8.2f} µs")
+        print(f"    PUT:                          {put_us:8.1f} µs ({len(chunk) / put_us:.0f} MB/s)")
+        print(f"    all chunks registered after:  {registered_ms:8.0f} ms")
+    finally:
+        server.should_exit = True
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
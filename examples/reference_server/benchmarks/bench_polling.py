@@ -0,0 +1,135 @@
+"""
+Benchmark: status poll traffic with fixed vs. adaptive polling
+
+Starts the server in a separate process (uvicorn, real sockets), ends a
+burst of sessions at once so they queue up behind the processing workers,
+and polls each one until its results are in, either:
+- every --interval seconds (the client's behaviour before Retry-After), or
+- with AsyncMedScribeClient.poll_for_results(), which follows the
+  server's Retry-After with capped exponential backoff and jitter
+
+Reports status polls per session and the time from `end` until the
+results were seen. A burst of 1 shows the idle case, where adaptive
+polling should not deliver results later than fixed polling.
+
+Usage:
+    python benchmarks/bench_polling.py [--sessions 1,100] [--workers 4] [--delay 2] [--interval 2]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from example_client import TERMINAL_STATUSES, AsyncMedScribeClient  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, audio_dir: str, workers: int, delay: float) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={
+            **os.environ,
+            "AUDIO_STORAGE_PATH": audio_dir,
+            "PROCESSING_WORKERS": str(workers),
+            "PROCESSING_STUB_DELAY_SECONDS": str(delay),
+            "RATE_LIMIT_ENABLED": "false",
+        },
+    )
+    for _ in range(200):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/health", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def run_burst(base_url: str, sessions: int, adaptive: bool, interval: float) -> None:
+    polls = 0
+    latencies = []
+
+    async with AsyncMedScribeClient(base_url, max_connections=10) as client:
+        status_response = client._status_response
+
+        async def counted(*args, **kwargs):
+            nonlocal polls
+            polls += 1
+            return await status_response(*args, **kwargs)
+
+        client._status_response = counted
+
+        session_ids = []
+        for _ in range(sessions):
+            session = await client.create_session(["soap"])
+            await client.upload_audio(session["session_id"], b"MOCK_AUDIO_DATA", 0)
+            session_ids.append(session["session_id"])
+
+        async def one_session(session_id: str) -> None:
+            t0 = time.perf_counter()
+            await client.end_session(session_id, 1)
+            if adaptive:
+                status = await client.poll_for_results(session_id, max_attempts=10000)
+            else:
+                while True:
+                    status = await client.get_session_status(session_id)
+                    if status["status"] in TERMINAL_STATUSES:
+                        break
+                    await asyncio.sleep(interval)
+            assert status["status"] in TERMINAL_STATUSES, status["status"]
+            latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(one_session(session_id) for session_id in session_ids))
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    label = "adaptive (Retry-After)" if adaptive else f"fixed {interval:g}s interval"
+    print(f"  {label:<24} {polls / sessions:>7.1f} polls/session   "
+          f"results after p50 {p50:>6.1f} s   p95 {p95:>6.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,100", help="Comma-separated burst sizes")
+    parser.add_argument("--workers", type=int, default=4, help="PROCESSING_WORKERS of the server")
+    parser.add_argument("--delay", type=float, default=2, help="PROCESSING_STUB_DELAY_SECONDS of the server")
+    parser.add_argument("--interval", type=float, default=2, help="Interval of the fixed polling run")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_polling_")
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(port, os.path.join(work_dir, "audio"), args.workers, args.delay)
+    try:
+        print("=" * 70)
+        print(f"Poll traffic ({args.workers} workers, {args.delay:g} s per job)")
+        print("=" * 70)
+        for sessions in (int(n) for n in args.sessions.split(",")):
+            print(f"\n{sessions} session(s) ended at once:")
+            asyncio.run(run_burst(base_url, sessions, adaptive=False, interval=args.interval))
+            asyncio.run(run_burst(base_url, sessions, adaptive=True, interval=args.interval))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark for the processing pipeline (services/processing.py)
+
+Pushes ended sessions through ProcessingQueue with the stub processor and
+reports jobs/s for:
+- I/O-bound jobs (simulated backend latency) at several worker counts
+- CPU-bound jobs on the thread pool vs. a process pool
+- a burst larger than the queue depth, counting 503-style rejections
+  and the Retry-After the queue suggests
+
+Usage:
+    python benchmarks/bench_processing.py [--jobs 2000] [--delay-ms 20] [--cpu-ms 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models import SessionStatus  # noqa: E402
+from services.chunk_map import ChunkMap  # noqa: E402
+from services.processing import ProcessingQueue, QueueFull, StubProcessor  # noqa: E402
+from services.session_store import InMemorySessionStore  # noqa: E402
+
+
+def ended_session(session_id: str) -> dict:
+    created_at = datetime.utcnow()
+    return {
+        "session_id": session_id,
+        "status": SessionStatus.PROCESSING,
+        "created_at": created_at,
+        "expires_at": created_at + timedelta(hours=1),
+        "templates": ["soap", "medications"],
+        "model": "pro",
+        "upload_type": "chunked",
+        "communication_protocol": "http",
+        "additional_data": {},
+        "audio_chunks": ChunkMap([(0, "0.webm"), (1, "1.webm")]),
+        "audio_files_sent": 2,
+    }
+
+
+async def throughput(processor, workers: int, jobs: int) -> float:
+    """Jobs per second for `jobs` sessions queued at once"""
+    store = InMemorySessionStore()
+    queue = ProcessingQueue(store, processor, workers=workers, max_depth=jobs)
+    queue.start()
+    start = time.perf_counter()
+    for i in range(jobs):
+        session_id = f"ses_bench{i}"
+        store.create(ended_session(session_id))
+        queue.submit(session_id)
+    await queue.join()
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+    assert queue.completed == jobs, queue.stats()
+    return jobs / elapsed
+
+
+async def burst(processor, workers: int, max_depth: int, jobs: int) -> None:
+    store = InMemorySessionStore()
+    queue = ProcessingQueue(store, processor, workers=workers, max_depth=max_depth)
+    queue.start()
+    # Warm up the job duration estimate
+    store.create(ended_session("ses_warmup"))
+    queue.submit("ses_warmup")
+    await queue.join()
+
+    retry_after = []
+    for i in range(jobs):
+        session_id = f"ses_burst{i}"
+        store.create(ended_session(session_id))
+        try:
+            queue.submit(session_id)
+        except QueueFull as e:
+            retry_after.append(e.retry_after)
+    await queue.join()
+    await queue.stop()
+    accepted = jobs - len(retry_after)
+    print(f"\nBurst of {jobs} jobs, queue depth {max_depth}, {workers} workers")
+    print(f"  accepted {accepted}, rejected {len(retry_after)} (503)")
+    if retry_after:
+        print(f"  Retry-After suggested: {min(retry_after)}-{max(retry_after)} s")
+
+
+async def run(args) -> None:
+    delay = args.delay_ms / 1000
+    cpu = args.cpu_ms / 1000
+
+    print(f"\nI/O-bound jobs ({args.delay_ms} ms backend latency, {args.jobs} jobs)")
+    for workers in (1, 4, 16, 64, 256):
+        rate = await throughput(StubProcessor(delay=delay), workers, args.jobs)
+        print(f"  {workers:>4} workers: {rate:>9,.0f} jobs/s")
+
+    cpu_jobs = max(1, args.jobs // 20)
+    processes = os.cpu_count() or 1
+    print(f"\nCPU-bound jobs ({args.cpu_ms} ms CPU each, {cpu_jobs} jobs, {processes} CPUs)")
+    rate = await throughput(StubProcessor(cpu_seconds=cpu), processes, cpu_jobs)
+    print(f"  thread pool:  {rate:>9,.0f} jobs/s")
+    with ProcessPoolExecutor(processes) as executor:
+        rate = await throughput(StubProcessor(cpu_seconds=cpu, executor=executor), processes, cpu_jobs)
+    print(f"  process pool: {rate:>9,.0f} jobs/s")
+
+    await burst(StubProcessor(delay=delay), workers=4, max_depth=100, jobs=500)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=20)
+    parser.add_argument("--cpu-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Processing pipeline benchmark")
+    print("=" * 70)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: cost of the rate limit checks (services/rate_limit.py)
+
+Reports µs per check for each limiter as the routes call it: session
+creation and status polls (1 token, API key and tenant buckets) and
+uploads (Content-Length bytes), plus caller identification. Checks run
+against a populated memory backend (--keys callers), cycling through
+the callers so buckets are refilled rather than freshly created. With
+--redis-url, the same checks run against Redis (pip install redis),
+where the cost is dominated by the round trip.
+
+Usage:
+    python benchmarks/bench_rate_limit.py [--checks 200000] [--keys 10000] [--redis-url redis://localhost:6379/0]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from starlette.requests import Request  # noqa: E402
+
+from services.rate_limit import (  # noqa: E402
+    Limit,
+    MemoryBuckets,
+    RateLimiter,
+    RedisBuckets,
+    client_key,
+)
+
+
+def limiters(backend):
+    # High limits: measure the check, not rejections
+    return [
+        ("session create", RateLimiter(Limit("sessions", 1e9, 1e9), Limit("sessions_tenant", 1e9, 1e9), backend), 1),
+        ("64 KB upload", RateLimiter(Limit("upload_bytes", 1e15, 1e15), Limit("upload_bytes_tenant", 1e15, 1e15), backend), 65536),
+        ("status poll", RateLimiter(Limit("polls", 1e9, 1e9), Limit("polls_tenant", 1e9, 1e9), backend), 1),
+    ]
+
+
+async def per_check(limiter: RateLimiter, cost: int, keys, tenants, checks: int) -> float:
+    """µs per check"""
+    start = time.perf_counter()
+    for i in range(checks):
+        await limiter.check(keys[i % len(keys)], tenants[i % len(tenants)], cost)
+    return (time.perf_counter() - start) / checks * 1e6
+
+
+async def run(args) -> None:
+    keys = [f"key:sk_live_{i:08d}" for i in range(args.keys)]
+    tenants = [f"tenant_{i}" for i in range(max(1, args.keys // 100))]
+
+    request = Request({
+        "type": "http",
+        "headers": [(b"x-api-key", b"sk_live_abc123def456ghi789")],
+        "client": ("203.0.113.7", 50000),
+    })
+    start = time.perf_counter()
+    for _ in range(args.checks):
+        client_key(request)
+    print(f"  {'client_key()':<22}{(time.perf_counter() - start) / args.checks * 1e6:>8.2f} µs")
+
+    backend = MemoryBuckets()
+    print("\nMemory backend:")
+    for label, limiter, cost in limiters(backend):
+        await per_check(limiter, cost, keys, tenants, args.keys)  # populate
+        print(f"  {label:<22}{await per_check(limiter, cost, keys, tenants, args.checks):>8.2f} µs")
+
+    if args.redis_url:
+        backend = RedisBuckets(args.redis_url)
+        checks = min(args.checks, 20000)
+        print(f"\nRedis backend ({args.redis_url}):")
+        for label, limiter, cost in limiters(backend):
+            print(f"  {label:<22}{await per_check(limiter, cost, keys, tenants, checks):>8.2f} µs")
+        if backend.errors:
+            print(f"  ({backend.errors} failed checks; is Redis running?)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=10000, help="Distinct API keys")
+    parser.add_argument("--redis-url", help="Also benchmark the Redis backend")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Rate limit check cost")
+    print("=" * 60)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark for the session event push channel
+
+Runs N idle SSE streams (the same generator the endpoint serves, without
+sockets) and reports:
+- memory held per idle subscriber (tracemalloc)
+- time to publish one event to every subscriber and have it consumed
+- isolation: one subscriber that never reads does not slow the others,
+  and its queue stays bounded
+
+Usage:
+    python benchmarks/bench_session_events.py [--subscribers 20000] [--sessions 2000]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from routes.events import _sse_stream  # noqa: E402
+from services.session_events import SessionEvents  # noqa: E402
+import routes.events  # noqa: E402
+
+
+async def consume(stream, received: list, target: int, done: asyncio.Event) -> None:
+    async for _ in stream:
+        received[0] += 1
+        if received[0] == target:
+            done.set()
+
+
+async def run(subscribers: int, sessions: int) -> None:
+    bus = SessionEvents(max_events=64)
+    routes.events.SESSION_EVENTS = bus
+    session_ids = [f"ses_bench{i}" for i in range(sessions)]
+
+    received = [0]
+    done = asyncio.Event()
+    snapshot = {"event": "session.status", "status": "created"}
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = []
+    for i in range(subscribers):
+        subscription = bus.subscribe(session_ids[i % sessions])
+        stream = _sse_stream(subscription, dict(snapshot, session_id=subscription.session_id))
+        tasks.append(asyncio.create_task(consume(stream, received, subscribers, done)))
+    await done.wait()  # every stream sent its snapshot and is now idle
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f"\nIdle subscribers: {subscribers} across {sessions} sessions")
+    print(f"  memory per idle subscriber: {held / subscribers:,.0f} bytes (excluding socket buffers)")
+
+    # Fan-out: one event to every session, wait until all streams consumed it
+    received[0] = 0
+    done.clear()
+    gc.collect()
+    start = time.perf_counter()
+    for session_id in session_ids:
+        bus.publish_event(session_id, "session.transcript", {"transcript": "..."})
+    publish_seconds = time.perf_counter() - start
+    await done.wait()
+    total_seconds = time.perf_counter() - start
+    print(f"  publish to all sessions:    {publish_seconds * 1000:.1f} ms "
+          f"({publish_seconds / subscribers * 1e6:.2f} µs/subscriber)")
+    print(f"  delivered to all streams:   {total_seconds * 1000:.1f} ms")
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert bus.subscribers() == 0, "cancelled streams must unsubscribe"
+
+    # Isolation: a stalled subscriber next to an active one
+    events = 10000
+    stalled = bus.subscribe("ses_slow")
+    active = bus.subscribe("ses_slow")
+    start = time.perf_counter()
+    for _ in range(events):
+        bus.publish_event("ses_slow", "session.transcript", {"transcript": "..."})
+        await active.get()
+    elapsed = time.perf_counter() - start
+    print(f"\nSlow consumer ({events} events, one subscriber never reads)")
+    print(f"  active subscriber: {elapsed / events * 1e6:.2f} µs/event, all {events} received")
+    print(f"  stalled subscriber: {len(stalled._events)} queued (bound {bus.max_events}), {stalled.dropped} dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=2000)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Session event push channel benchmark")
+    print("=" * 70)
+    asyncio.run(run(args.subscribers, args.sessions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark for GET /v1/sessions/{session_id} (status polling)
+
+Compares the previous implementation (build a Session*Response model,
+model_dump(mode="json"), re-encode with JSONResponse) with the fast path
+(plain dict encoded once by FastJSONResponse). Reports per-poll latency
+for the response construction alone and through the full ASGI stack, and
+memory allocated per poll (tracemalloc). Also checks that both produce
+the same JSON.
+
+Usage:
+    python benchmarks/bench_session_status.py [--polls 20000] [--audio-files 90]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Polls far beyond the per-key limit
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi import FastAPI, Request, status  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from asgi_client import asgi_request  # noqa: E402
+from models import (  # noqa: E402
+    ModelType,
+    SessionCompletedResponse,
+    SessionProcessingResponse,
+    SessionStatus,
+)
+from routes import sessions  # noqa: E402
+from services.chunk_map import ChunkMap  # noqa: E402
+from services.session_store import SESSION_STORE  # noqa: E402
+
+
+def legacy_response(session_id: str, session: dict) -> JSONResponse:
+    """The response construction get_session_status used before the fast path"""
+    if session["status"] == SessionStatus.PROCESSING:
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=SessionProcessingResponse(
+                session_id=session_id,
+                status=SessionStatus.PROCESSING,
+                created_at=session["created_at"],
+                expires_at=session["expires_at"],
+                audio_files_received=len(session["audio_chunks"]),
+                audio_files=session["audio_chunks"].filenames(),
+                additional_data=session["additional_data"],
+                transcript=sessions.MOCK_PROCESSING_TRANSCRIPT,
+            ).model_dump(mode="json"),
+        )
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=SessionCompletedResponse(
+            session_id=session_id,
+            status=SessionStatus.COMPLETED,
+            created_at=session["created_at"],
+            completed_at=datetime(2025, 1, 19, 10, 45),
+            model_used=session["model"],
+            language_detected="en",
+            audio_files_received=len(session["audio_chunks"]),
+            audio_files=session["audio_chunks"].filenames(),
+            additional_data=session["additional_data"],
+            templates=sessions.MOCK_COMPLETED_TEMPLATES,
+            transcript=sessions.MOCK_COMPLETED_TRANSCRIPT,
+        ).model_dump(mode="json"),
+    )
+
+
+def legacy_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/v1/sessions/{session_id}")
+    async def get_session_status(session_id: str):
+        return legacy_response(session_id, SESSION_STORE.get(session_id))
+
+    return app
+
+
+def current_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(sessions.router, prefix="/v1")
+    return app
+
+
+def make_session(session_id: str, session_status: SessionStatus, audio_files: int) -> dict:
+    created_at = datetime.utcnow()
+    return {
+        "session_id": session_id,
+        "status": session_status,
+        "created_at": created_at,
+        "expires_at": created_at + timedelta(hours=1),
+        "templates": ["soap", "medications"],
+        "model": ModelType.PRO,
+        "upload_type": "chunked",
+        "communication_protocol": "http",
+        "additional_data": {"emr_encounter_id": "enc_12345", "patient_id": "pat_67890"},
+        "audio_chunks": ChunkMap((i, f"{i}.webm") for i in range(audio_files)),
+    }
+
+
+def per_call(fn, iterations: int) -> float:
+    """µs per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def per_request(app, path: str, iterations: int) -> float:
+    await asgi_request(app, "GET", path)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await asgi_request(app, "GET", path)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def allocated_per_call(fn, iterations: int = 1000) -> float:
+    """Total bytes allocated per call, counting memory that was freed again"""
+    tracemalloc.start()
+    total = 0
+    for _ in range(iterations):
+        snapshot_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        total += tracemalloc.get_traced_memory()[1] - snapshot_before
+    tracemalloc.stop()
+    return total / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=20000)
+    parser.add_argument("--audio-files", type=int, default=90, help="Chunks per session (90 = 30 min of 20s chunks)")
+    args = parser.parse_args()
+
+    print("=" * 78)
+    print(f"Session status polling benchmark ({args.audio_files} audio files per session)")
+    print("=" * 78)
+
+    legacy = legacy_app()
+    current = current_app()
+
+    for session_status in (SessionStatus.PROCESSING, SessionStatus.COMPLETED):
+        session_id = f"ses_bench{session_status.value}"
+        session = make_session(session_id, session_status, args.audio_files)
+        SESSION_STORE.create(session)
+
+        loop = asyncio.new_event_loop()
+        request = Request({"type": "http", "query_string": b"", "headers": []})
+        fast_handler = lambda: loop.run_until_complete(sessions.get_session_status(request, session_id))  # noqa: E731
+        old_build = lambda: legacy_response(session_id, session)  # noqa: E731
+
+        # Same JSON apart from completed_at, which is the request time
+        old_body = json.loads(old_build().body)
+        new_body = json.loads(fast_handler().body)
+        old_body.pop("completed_at", None)
+        new_body.pop("completed_at", None)
+        assert old_body == new_body, "fast path output differs from the Pydantic models"
+
+        old_us = per_call(old_build, args.polls)
+        new_us = per_call(fast_handler, args.polls)
+        old_alloc = allocated_per_call(old_build)
+        new_alloc = allocated_per_call(fast_handler)
+
+        path = f"/v1/sessions/{session_id}"
+        old_req = loop.run_until_complete(per_request(legacy, path, args.polls))
+        new_req = loop.run_until_complete(per_request(current, path, args.polls))
+        loop.close()
+
+        print(f"\nstatus={session_status.value}")
+        print(f"  {'':<28}{'before':>12}{'after':>12}{'speedup':>10}")
+        print(f"  {'response build (µs/poll)':<28}{old_us:>12.1f}{new_us:>12.1f}{old_us / new_us:>9.1f}x")
+        print(f"  {'full ASGI request (µs/poll)':<28}{old_req:>12.1f}{new_req:>12.1f}{old_req / new_req:>9.1f}x")
+        print(f"  {'peak bytes allocated/poll':<28}{old_alloc:>12,.0f}{new_alloc:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark for session storage backends
+
+Drives each backend through the same write pattern the routes produce
+(create, one append + status update per uploaded chunk, end) and reports
+per-call latency, write throughput and, for the WAL backend, crash
+recovery time with and without a compacted snapshot. The shared SQLite
+backend is also timed for status reads of an unchanged session (cached)
+and of one another process wrote since (reloaded), and for updates while
+another process holds the write lock (queued for the writer thread).
+
+Usage:
+    python benchmarks/bench_session_store.py [--sessions 20000] [--chunks 10]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models import ModelType, SessionStatus, UploadType, CommunicationProtocol  # noqa: E402
+from services.chunk_map import ChunkMap  # noqa: E402
+from services.session_store import InMemorySessionStore, SQLiteSessionStore, WALSessionStore  # noqa: E402
+
+
+def make_session(index: int) -> dict:
+    created_at = datetime.utcnow()
+    return {
+        "session_id": f"ses_bench{index:08d}",
+        "status": SessionStatus.CREATED,
+        "created_at": created_at,
+        "expires_at": created_at + timedelta(hours=1),
+        "templates": ["soap", "medications"],
+        "model": ModelType.PRO,
+        "upload_type": UploadType.CHUNKED,
+        "communication_protocol": CommunicationProtocol.HTTP,
+        "additional_data": {"emr_encounter_id": f"enc_{index}"},
+        "audio_chunks": ChunkMap(),
+    }
+
+
+async def run_workload(store, sessions: int, chunks: int) -> dict:
+    """Apply the route write pattern and collect per-call latencies (µs)"""
+    latencies = {"create": [], "upload": [], "end": []}
+    clock = time.perf_counter
+
+    start = clock()
+    for i in range(sessions):
+        session = make_session(i)
+        session_id = session["session_id"]
+
+        t0 = clock()
+        store.create(session)
+        latencies["create"].append((clock() - t0) * 1e6)
+
+        for seq in range(chunks):
+            t0 = clock()
+            await store.add_chunk(session_id, seq, f"{seq}.webm")
+            store.update(session_id, status="recording")
+            latencies["upload"].append((clock() - t0) * 1e6)
+
+        t0 = clock()
+        store.update(session_id, status=SessionStatus.PROCESSING)
+        latencies["end"].append((clock() - t0) * 1e6)
+    elapsed = clock() - start
+
+    writes = sessions * (2 + 2 * chunks)
+    return {"elapsed": elapsed, "writes": writes, "latencies": latencies}
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(name: str, result: dict) -> None:
+    print(f"\n{name}")
+    print(f"  {result['writes']} writes in {result['elapsed']:.2f}s "
+          f"({result['writes'] / result['elapsed']:,.0f} writes/sec)")
+    for op, values in result["latencies"].items():
+        print(f"  {op:<7} p50={statistics.median(values):7.1f}µs  "
+              f"p99={percentile(values, 99):7.1f}µs  max={max(values):8.1f}µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--chunks", type=int, default=10)
+    parser.add_argument("--fsync-interval-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Session store benchmark")
+    print(f"{args.sessions} sessions x {args.chunks} chunks")
+    print("=" * 70)
+
+    report("InMemorySessionStore", asyncio.run(run_workload(InMemorySessionStore(), args.sessions, args.chunks)))
+
+    directory = tempfile.mkdtemp(prefix="session-wal-")
+    try:
+        # Snapshots disabled so recovery below replays the full log
+        store = WALSessionStore(
+            directory,
+            fsync_interval=args.fsync_interval_ms / 1000,
+            snapshot_records=10 ** 12,
+        )
+        result = asyncio.run(run_workload(store, args.sessions, args.chunks))
+        store.close()
+        report(f"WALSessionStore (group commit every {args.fsync_interval_ms}ms)", result)
+
+        log_bytes = sum(os.path.getsize(os.path.join(directory, n)) for n in os.listdir(directory))
+        t0 = time.perf_counter()
+        store = WALSessionStore(directory, snapshot_records=10 ** 12)
+        replay = time.perf_counter() - t0
+        assert len(store) == args.sessions
+        print(f"\n  Recovery from WAL only:  {replay * 1000:8.1f}ms "
+              f"({result['writes'] / replay:,.0f} records/sec, {log_bytes / 1e6:.1f} MB)")
+
+        store.snapshot()
+        store.close()
+        t0 = time.perf_counter()
+        store = WALSessionStore(directory, snapshot_records=10 ** 12)
+        restore = time.perf_counter() - t0
+        assert len(store) == args.sessions
+        store.close()
+        print(f"  Recovery from snapshot:  {restore * 1000:8.1f}ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    directory = tempfile.mkdtemp(prefix="session-sqlite-")
+    try:
+        path = os.path.join(directory, "sessions.db")
+        store = SQLiteSessionStore(path, shard=0)
+        report("SQLiteSessionStore (shared by worker processes)", asyncio.run(run_workload(store, args.sessions, args.chunks)))
+
+        # A second store on the same file stands in for another worker
+        other = SQLiteSessionStore(path, shard=1)
+        session_ids = [make_session(i)["session_id"] for i in range(min(args.sessions, 10000))]
+        for session_id in session_ids:
+            store.get(session_id)
+        t0 = time.perf_counter()
+        for session_id in session_ids:
+            store.get(session_id)
+        cached = (time.perf_counter() - t0) / len(session_ids) * 1e6
+        for session_id in session_ids:
+            other.update(session_id, status=SessionStatus.COMPLETED)
+        t0 = time.perf_counter()
+        for session_id in session_ids:
+            store.get(session_id)
+        reloaded = (time.perf_counter() - t0) / len(session_ids) * 1e6
+        other.close()
+
+        # Another process holding the write lock, e.g. through a checkpoint
+        # on a slow disk: updates are queued rather than waited for
+        blocker = sqlite3.connect(path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+        t0 = time.perf_counter()
+        for session_id in session_ids:
+            store.update(session_id, status=SessionStatus.PROCESSING)
+        queued = (time.perf_counter() - t0) / len(session_ids) * 1e6
+        blocker.execute("COMMIT")
+        blocker.close()
+        t0 = time.perf_counter()
+        store.flush()
+        drained = time.perf_counter() - t0
+        store.close()
+        print(f"\n  get(), unchanged:          {cached:8.1f}µs")
+        print(f"  get(), written elsewhere:  {reloaded:8.1f}µs")
+        print(f"  update(), lock held elsewhere: {queued:8.1f}µs "
+              f"({len(session_ids)} committed {drained * 1000:.0f}ms after its release)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Benchmark suite: request latency and throughput of the main endpoints
+
+Drives main.app with its lifespan (processing workers, expiry scheduler)
+either in-process through the ASGI interface (asgi_client.py, no sockets
+or HTTP parsing, so the application's own cost) or over a real socket
+against a uvicorn subprocess (httpx; adds HTTP parsing and the network
+stack). For each scenario it reports p50/p95/p99 latency, req/s and
+error responses (the median over --repeat runs):
+- discovery: GET /.well-known/medscribealliance
+- templates: GET /v1/templates
+- create: POST /v1/sessions
+- upload_<n>kb: POST /v1/sessions/{id}/audio/audio_{seq}.wav, one per
+  --upload-kb size (fewer requests for large bodies, see --upload-mb);
+  1 s WAV files of random samples (mock_audio.py)
+- end: POST /v1/sessions/{id}/end on a session with one chunk
+- status: GET /v1/sessions/{id} on a completed session
+In-process runs also report memory per live session (tracemalloc, a
+created session with one uploaded chunk).
+
+Results are written as JSON to --output. They are then compared with
+the baselines in benchmarks/baselines.json (--baseline). The run exits
+with status 1 when a scenario's p50 or p95 latency grew, or its req/s
+dropped, by more than --tolerance, or when memory per session grew by
+more. p99 is reported but not gated, since it is too noisy over short
+runs. Baselines depend on the machine: after an intended change, or on
+a new reference machine, regenerate them with --update-baseline.
+
+The processing stub runs without its simulated delay and the queue is
+unbounded, so `end` measures the endpoint, not backlog. Rate limits are
+checked but raised so they never reject. Audio is stored in a temporary
+directory.
+
+Usage:
+    python benchmarks/bench_suite.py [--transport asgi,socket] [--requests 1000] [--concurrency 1]
+                                     [--upload-kb 1,64,1024] [--output bench_results.json]
+                                     [--baseline benchmarks/baselines.json] [--tolerance 1.0]
+                                     [--update-baseline]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCH_DIR, "..")
+sys.path.insert(0, ROOT)
+
+try:
+    import httpx
+except ImportError:
+    httpx = None  # Optional: pip install httpx (needed for --transport socket)
+
+# Set before main is imported: configuration is read at import time
+WORK_DIR = tempfile.mkdtemp(prefix="bench_suite_")
+SERVER_ENV = {
+    "AUDIO_STORAGE_PATH": os.path.join(WORK_DIR, "audio"),
+    "PROCESSING_STUB_DELAY_SECONDS": "0",
+    "PROCESSING_QUEUE_SIZE": "1000000",
+    # Limits are checked, but high enough never to reject the benchmark
+    "RATE_LIMIT_SESSIONS": "1e9/1e9",
+    "RATE_LIMIT_SESSIONS_TENANT": "1e9/1e9",
+    "RATE_LIMIT_UPLOAD_BYTES": "1e12/1e12",
+    "RATE_LIMIT_UPLOAD_BYTES_TENANT": "1e12/1e12",
+    "RATE_LIMIT_POLLS": "1e9/1e9",
+    "RATE_LIMIT_POLLS_TENANT": "1e9/1e9",
+}
+os.environ.update(SERVER_ENV)
+
+from asgi_client import asgi_request  # noqa: E402
+from mock_audio import mock_wav  # noqa: E402
+
+# (method, path, headers, body) -> (status, body)
+Send = Callable[[str, str, Dict[str, str], bytes], Awaitable[Tuple[int, bytes]]]
+Request = Tuple[str, str, Dict[str, str], bytes]
+
+SESSION_BODY = json.dumps({
+    "templates": ["soap"],
+    "model": "pro",
+    "upload_type": "chunked",
+    "communication_protocol": "http",
+}).encode()
+JSON_HEADERS = {"Content-Type": "application/json"}
+AUDIO_HEADERS = {"Content-Type": "audio/wav"}
+SMALL_CHUNK = mock_wav(64)
+CHUNKS_PER_SESSION = 1000
+
+# Metrics compared with the baseline: name -> True if higher is better
+GATED_METRICS = {"p50_ms": False, "p95_ms": False, "rps": True}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def create_session(send: Send, chunks: int = 0) -> str:
+    status, body = await send("POST", "/v1/sessions", JSON_HEADERS, SESSION_BODY)
+    if status != 201:
+        raise RuntimeError(f"create session returned {status}: {body[:200]!r}")
+    session_id = json.loads(body)["session_id"]
+    for sequence in range(chunks):
+        await send("POST", f"/v1/sessions/{session_id}/audio/audio_{sequence}.wav", AUDIO_HEADERS, SMALL_CHUNK)
+    return session_id
+
+
+async def prepare_uploads(send: Send, count: int, size_kb: int) -> List[Request]:
+    data = mock_wav(size_kb * 1024)
+    prepared = []
+    session_id = None
+    for i in range(count):
+        if i % CHUNKS_PER_SESSION == 0:
+            session_id = await create_session(send)
+        path = f"/v1/sessions/{session_id}/audio/audio_{i % CHUNKS_PER_SESSION}.wav"
+        prepared.append(("POST", path, AUDIO_HEADERS, data))
+    return prepared
+
+
+async def prepare_ends(send: Send, count: int) -> List[Request]:
+    body = json.dumps({"audio_files_sent": 1}).encode()
+    prepared = []
+    for _ in range(count):
+        session_id = await create_session(send, chunks=1)
+        prepared.append(("POST", f"/v1/sessions/{session_id}/end", JSON_HEADERS, body))
+    return prepared
+
+
+async def prepare_status(send: Send, count: int) -> List[Request]:
+    session_id = await create_session(send, chunks=1)
+    await send("POST", f"/v1/sessions/{session_id}/end", JSON_HEADERS, b'{"audio_files_sent": 1}')
+    status, _ = await send("GET", f"/v1/sessions/{session_id}?wait=30&since_status=processing", {}, b"")
+    if status != 200:
+        raise RuntimeError(f"session did not complete (status {status})")
+    return [("GET", f"/v1/sessions/{session_id}", {}, b"")] * count
+
+
+async def measure(send: Send, prepared: List[Request], concurrency: int) -> Dict[str, float]:
+    """Send the prepared requests from `concurrency` workers; latency percentiles and req/s"""
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(prepared)
+
+    async def worker() -> None:
+        nonlocal errors
+        for method, path, headers, body in pending:
+            t0 = time.perf_counter()
+            status, _ = await send(method, path, headers, body)
+            latencies.append(time.perf_counter() - t0)
+            if status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(0.50), 4),
+        "p95_ms": round(percentile(0.95), 4),
+        "p99_ms": round(percentile(0.99), 4),
+        "rps": round(len(latencies) / elapsed, 1),
+        "errors": errors,
+    }
+
+
+async def run_scenarios(send: Send, args) -> Dict[str, Dict[str, float]]:
+    count = args.requests
+    scenarios = [
+        ("discovery", lambda: [("GET", "/.well-known/medscribealliance", {}, b"")] * count),
+        ("templates", lambda: [("GET", "/v1/templates", {}, b"")] * count),
+        ("create", lambda: [("POST", "/v1/sessions", JSON_HEADERS, SESSION_BODY)] * count),
+    ]
+    for size_kb in args.upload_kb:
+        # Bound the audio written per size
+        uploads = min(count, max(50, args.upload_mb * 1024 // size_kb))
+        scenarios.append((f"upload_{size_kb}kb", lambda u=uploads, s=size_kb: prepare_uploads(send, u, s)))
+    scenarios.append(("end", lambda: prepare_ends(send, count)))
+    scenarios.append(("status", lambda: prepare_status(send, count)))
+
+    results = {}
+    for name, prepare in scenarios:
+        runs = []
+        for _ in range(args.repeat):
+            prepared = prepare()
+            if asyncio.iscoroutine(prepared):
+                prepared = await prepared
+            # Warm up with the requests that can be repeated
+            if prepared[0][0] == "GET":
+                for method, path, headers, body in prepared[:50]:
+                    await send(method, path, headers, body)
+            runs.append(await measure(send, prepared, args.concurrency))
+        # Median of each metric over the runs, which damps one-off stalls
+        results[name] = {metric: sorted(run[metric] for run in runs)[len(runs) // 2] for metric in runs[0]}
+        print(f"  {name:<14} p50 {results[name]['p50_ms']:>8.3f} ms   p95 {results[name]['p95_ms']:>8.3f} ms   "
+              f"p99 {results[name]['p99_ms']:>8.3f} ms   {results[name]['rps']:>9,.1f} req/s"
+              + (f"   {results[name]['errors']} errors" if results[name]["errors"] else ""))
+    return results
+
+
+async def memory_per_session(send: Send, sessions: int) -> float:
+    """Bytes retained per live session (created, one chunk uploaded)"""
+    await create_session(send, chunks=1)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    session_ids = [await create_session(send, chunks=1) for _ in range(sessions)]
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    assert len(session_ids) == sessions
+    return retained / sessions
+
+
+async def run_asgi(args) -> Tuple[Dict[str, Dict[str, float]], Dict[str, float]]:
+    from main import app
+
+    async def send(method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes]:
+        status, _, response_body = await asgi_request(app, method, path, headers, body)
+        return status, response_body
+
+    async with app.router.lifespan_context(app):
+        results = await run_scenarios(send, args)
+        memory = {"bytes_per_session": round(await memory_per_session(send, args.memory_sessions))}
+        print(f"  {'memory':<14} {memory['bytes_per_session']:,} bytes per live session")
+    return results, memory
+
+
+async def run_socket(args) -> Dict[str, Dict[str, float]]:
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, **SERVER_ENV},
+    )
+    try:
+        for _ in range(200):
+            try:
+                requests.get(f"http://127.0.0.1:{port}/health", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.05)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+
+            async def send(method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes]:
+                response = await client.request(method, path, headers=headers, content=body or None)
+                return response.status_code, response.content
+
+            return await run_scenarios(send, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of `results` against `baseline`, as printable lines"""
+    regressions = []
+    for transport, scenarios in results["scenarios"].items():
+        for name, metrics in scenarios.items():
+            base = baseline.get("scenarios", {}).get(transport, {}).get(name)
+            if base is None:
+                continue
+            for metric, higher_is_better in GATED_METRICS.items():
+                if higher_is_better:
+                    regressed = metrics[metric] < base[metric] / (1 + tolerance)
+                else:
+                    regressed = metrics[metric] > base[metric] * (1 + tolerance)
+                if regressed:
+                    regressions.append(f"{transport}/{name} {metric}: {base[metric]} -> {metrics[metric]}")
+    memory = results.get("memory", {}).get("bytes_per_session")
+    base_memory = baseline.get("memory", {}).get("bytes_per_session")
+    if memory is not None and base_memory is not None and memory > base_memory * (1 + tolerance):
+        regressions.append(f"memory bytes_per_session: {base_memory} -> {memory}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", default="asgi", help="Comma-separated: asgi, socket")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--upload-kb", default="1,64,1024", help="Comma-separated upload body sizes")
+    parser.add_argument("--upload-mb", type=int, default=64, help="Audio written per upload size, at most")
+    parser.add_argument("--memory-sessions", type=int, default=1000, help="Sessions created to measure memory")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baselines.json"))
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed regression (1.0: twice as slow)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args()
+    args.upload_kb = [int(size) for size in args.upload_kb.split(",")]
+    transports = args.transport.split(",")
+    if "socket" in transports and httpx is None:
+        parser.error("--transport socket requires httpx (pip install httpx)")
+
+    results = {
+        "meta": {
+            "date": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+        },
+        "scenarios": {},
+    }
+    try:
+        for transport in transports:
+            print("=" * 78)
+            print(f"Benchmark suite: {transport} ({args.repeat} x {args.requests} requests per scenario, "
+                  f"{args.concurrency} in flight)")
+            print("=" * 78)
+            if transport == "asgi":
+                results["scenarios"]["asgi"], results["memory"] = asyncio.run(run_asgi(args))
+            elif transport == "socket":
+                results["scenarios"]["socket"] = asyncio.run(run_socket(args))
+            else:
+                parser.error(f"unknown transport {transport!r}")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Baseline updated: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRegressions beyond {args.tolerance:.0%} of {args.baseline}:")
+        for line in regressions:
+            print(f"  ✗ {line}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark for webhook delivery (services/webhooks.py)
+
+Reports:
+- publish cost on the request path: fan-out index lookup plus outbox
+  write, with many tenants and webhooks registered (memory and WAL outbox)
+- delivery throughput to a local receiver (webhook_receiver.py in a
+  separate process, real sockets, signed requests) over pooled
+  keep-alive connections
+- isolation: deliveries to a fast endpoint while another endpoint takes
+  seconds to answer
+
+Usage:
+    python benchmarks/bench_webhooks.py [--events 5000] [--endpoints 10]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from services.webhooks import WALWebhookStore, WebhookDispatcher, WebhookStore  # noqa: E402
+
+RECEIVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "webhook_receiver.py")
+EVENTS = ["session.started", "session.ended", "session.completed"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_receiver(port: int, *args: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, RECEIVER, "--port", str(port), *args],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            requests.get(f"http://127.0.0.1:{port}/received", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.05)
+    raise RuntimeError("webhook receiver did not start")
+
+
+def publish_cost(store: WebhookStore, tenants: int, events: int) -> float:
+    """µs per publish() with one webhook per tenant; nothing is sent"""
+    dispatcher = WebhookDispatcher(store)
+    for i in range(tenants):
+        dispatcher.register(f"tenant{i}", f"https://emr{i}.example.com/hook", EVENTS)
+    start = time.perf_counter()
+    for i in range(events):
+        dispatcher.publish(f"tenant{i % tenants}", f"ses_bench{i}", "session.completed")
+    return (time.perf_counter() - start) / events * 1e6
+
+
+async def deliver(dispatcher: WebhookDispatcher, urls, events: int) -> float:
+    """Events/s from publish to the last 2xx"""
+    for i, url in enumerate(urls):
+        dispatcher.register(f"tenant{i}", url, EVENTS, secret="whsec_bench")
+    dispatcher.start()
+    start = time.perf_counter()
+    for i in range(events):
+        dispatcher.publish(f"tenant{i % len(urls)}", f"ses_bench{i}", "session.completed")
+    await dispatcher.join()
+    elapsed = time.perf_counter() - start
+    await dispatcher.stop()
+    assert dispatcher.delivered == events, dispatcher.stats()
+    return events / elapsed
+
+
+async def isolation(fast_url: str, slow_url: str, events: int, concurrency: int) -> None:
+    dispatcher = WebhookDispatcher(WebhookStore(), endpoint_concurrency=concurrency)
+    dispatcher.register("fast", fast_url, EVENTS, secret="whsec_bench")
+    dispatcher.register("slow", slow_url, EVENTS)
+    dispatcher.start()
+    start = time.perf_counter()
+    for i in range(events):
+        dispatcher.publish("slow", f"ses_slow{i}", "session.completed")
+        dispatcher.publish("fast", f"ses_fast{i}", "session.completed")
+    while dispatcher.delivered < events:
+        await asyncio.sleep(0.001)
+    fast_seconds = time.perf_counter() - start
+    in_flight = len(dispatcher._tasks)
+    await dispatcher.stop()
+    print(f"\nIsolation ({events} events each to a fast and a slow endpoint, cap {concurrency})")
+    print(f"  fast endpoint: all delivered in {fast_seconds * 1000:.0f} ms ({events / fast_seconds:,.0f} events/s)")
+    print(f"  slow endpoint: {in_flight} requests in flight, "
+          f"{len(dispatcher.store.deliveries) - in_flight} waiting in its backlog")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--endpoints", type=int, default=10)
+    parser.add_argument("--tenants", type=int, default=10000)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("Webhook delivery benchmark")
+    print("=" * 70)
+
+    print(f"\nPublish cost on the request path ({args.tenants} tenants, {args.events * 4} events)")
+    print(f"  memory outbox: {publish_cost(WebhookStore(), args.tenants, args.events * 4):6.1f} µs/event")
+    directory = tempfile.mkdtemp(prefix="bench_webhooks_")
+    store = WALWebhookStore(directory)
+    print(f"  WAL outbox:    {publish_cost(store, args.tenants, args.events * 4):6.1f} µs/event")
+    store.close()
+    shutil.rmtree(directory)
+
+    port = free_port()
+    receiver = start_receiver(port, "--secret", "whsec_bench")
+    slow_port = free_port()
+    slow_receiver = start_receiver(slow_port, "--delay-ms", "2000")
+    try:
+        urls = [f"http://127.0.0.1:{port}/hook{i}" for i in range(args.endpoints)]
+        print(f"\nDelivery to a local receiver ({args.events} signed events, {args.endpoints} endpoints)")
+        for concurrency in (1, 8, 32):
+            dispatcher = WebhookDispatcher(WebhookStore(), endpoint_concurrency=concurrency)
+            rate = asyncio.run(deliver(dispatcher, urls, args.events))
+            print(f"  {concurrency:>3} per endpoint: {rate:>8,.0f} events/s")
+
+        asyncio.run(isolation(
+            f"http://127.0.0.1:{port}/fast",
+            f"http://127.0.0.1:{slow_port}/slow",
+            min(args.events, 1000),
+            concurrency=8,
+        ))
+    finally:
+        receiver.terminate()
+        slow_receiver.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Benchmark for running the server as several worker processes
+(SESSION_STORE=sqlite, services/session_store.py)
+
+Starts N uvicorn processes on ports BASE..BASE+N-1, each with its own
+SESSION_SHARD and the same session database and audio directory, as a
+proxy would see them. Client processes then repeat a session's worth of
+requests for --seconds:
+    POST /v1/sessions, 4 x POST .../audio/audio_{seq}.wav (1 KB),
+    4 x GET /v1/sessions/{id}, POST .../end
+spreading sessions over the workers, and routing the rest of a session's
+requests:
+- affinity: to the worker whose shard is in the session ID (shard_of()),
+  as the nginx map in the README does
+- round-robin: to the next worker, whichever created the session
+
+For each case it reports requests/s, sessions/s and error responses, and
+the speedup over one worker. It also runs the per-process memory store
+round-robin over the workers: most requests then get session_not_found,
+which is what `uvicorn main:app --workers N` does without a shared store.
+
+Scaling is bounded by the cores the workers and the clients share
+(printed first); on one core, more workers only add switching.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1,2,4] [--clients 8] [--seconds 5]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from mock_audio import mock_wav  # noqa: E402
+from services.session_store import shard_of  # noqa: E402
+
+BASE_PORT = 9410
+CHUNKS = 4
+POLLS = 4
+SESSION_BODY = json.dumps({
+    "templates": ["soap"],
+    "model": "pro",
+    "upload_type": "chunked",
+    "communication_protocol": "http",
+}).encode()
+END_BODY = json.dumps({"audio_files_sent": CHUNKS}).encode()
+
+
+def start_workers(count: int, store: str, work_dir: str) -> List[subprocess.Popen]:
+    env = {
+        **os.environ,
+        "SESSION_STORE": store,
+        "SESSION_STORE_PATH": os.path.join(work_dir, "sessions"),
+        "AUDIO_STORAGE_PATH": os.path.join(work_dir, "audio"),
+        "PROCESSING_STUB_DELAY_SECONDS": "0",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    workers = []
+    for shard in range(count):
+        workers.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(BASE_PORT + shard), "--log-level", "warning"],
+            cwd=ROOT,
+            env={**env, "SESSION_SHARD": str(shard)},
+        ))
+    for shard in range(count):
+        for _ in range(200):
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", BASE_PORT + shard, timeout=1)
+                connection.request("GET", "/health")
+                connection.getresponse().read()
+                break
+            except OSError:
+                time.sleep(0.05)
+    return workers
+
+
+def stop_workers(workers: List[subprocess.Popen]) -> None:
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.wait()
+
+
+def client(args: Tuple[int, int, str, float]) -> Dict[str, int]:
+    """Run sessions until the deadline; counts of requests, sessions, errors"""
+    index, workers, routing, deadline = args
+    connections = [http.client.HTTPConnection("127.0.0.1", BASE_PORT + shard) for shard in range(workers)]
+    chunk = mock_wav(1024)
+    counts = {"requests": 0, "sessions": 0, "errors": 0}
+    turn = index
+
+    def send(shard: int, method: str, path: str, content_type: str = "", body: bytes = b"") -> Tuple[int, bytes]:
+        connection = connections[shard]
+        headers = {"Content-Type": content_type} if content_type else {}
+        connection.request(method, path, body=body or None, headers=headers)
+        response = connection.getresponse()
+        data = response.read()
+        counts["requests"] += 1
+        if response.status >= 400:
+            counts["errors"] += 1
+        return response.status, data
+
+    while time.time() < deadline:
+        turn += 1
+        status, body = send(turn % workers, "POST", "/v1/sessions", "application/json", SESSION_BODY)
+        if status != 201:
+            continue
+        session_id = json.loads(body)["session_id"]
+        steps = [("POST", f"/v1/sessions/{session_id}/audio/audio_{seq}.wav", "audio/wav", chunk) for seq in range(CHUNKS)]
+        steps += [("GET", f"/v1/sessions/{session_id}", "", b"")] * POLLS
+        steps.append(("POST", f"/v1/sessions/{session_id}/end", "application/json", END_BODY))
+        for method, path, content_type, body in steps:
+            if routing == "affinity":
+                shard = shard_of(session_id) or 0
+            else:
+                turn += 1
+                shard = turn % workers
+            send(shard, method, path, content_type, body)
+        counts["sessions"] += 1
+    for connection in connections:
+        connection.close()
+    return counts
+
+
+def run_case(store: str, workers: int, routing: str, clients: int, seconds: float) -> Dict[str, float]:
+    work_dir = tempfile.mkdtemp(prefix="bench_workers_")
+    processes = start_workers(workers, store, work_dir)
+    try:
+        start = time.time()
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(client, [(index, workers, routing, start + seconds) for index in range(clients)])
+        elapsed = time.time() - start
+    finally:
+        stop_workers(processes)
+        shutil.rmtree(work_dir, ignore_errors=True)
+    totals = {key: sum(result[key] for result in results) for key in results[0]}
+    return {
+        "rps": totals["requests"] / elapsed,
+        "sessions_per_s": totals["sessions"] / elapsed,
+        "errors": totals["errors"],
+        "requests": totals["requests"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=8, help="Client processes")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each case")
+    args = parser.parse_args()
+    counts = [int(count) for count in args.workers.split(",")]
+
+    print("=" * 72)
+    print(f"Worker scaling: {args.clients} clients, {args.seconds:g} s per case, {os.cpu_count()} CPU(s)")
+    print(f"  session = create, {CHUNKS} chunks, {POLLS} status polls, end")
+    print("=" * 72)
+    print(f"  {'case':<34} {'req/s':>9} {'sessions/s':>11} {'errors':>8} {'speedup':>8}")
+
+    def report(name: str, result: Dict[str, float], reference: float) -> None:
+        print(f"  {name:<34} {result['rps']:9.0f} {result['sessions_per_s']:11.1f} "
+              f"{result['errors']:8d} {result['rps'] / reference:7.2f}x")
+
+    single = run_case("memory", 1, "affinity", args.clients, args.seconds)
+    report("memory, 1 worker", single, single["rps"])
+    for workers in counts:
+        for routing in ("affinity", "round-robin"):
+            if workers == 1 and routing == "round-robin":
+                continue
+            result = run_case("sqlite", workers, routing, args.clients, args.seconds)
+            report(f"sqlite, {workers} worker(s), {routing}", result, single["rps"])
+    workers = max(counts)
+    if workers > 1:
+        result = run_case("memory", workers, "round-robin", args.clients, args.seconds)
+        report(f"memory, {workers} workers, round-robin", result, single["rps"])
+        print(f"    {result['errors'] / max(1, result['requests']):.0%} of requests failed: "
+              "each worker only knows its own sessions")
+
+
+if __name__ == "__main__":
+    main()
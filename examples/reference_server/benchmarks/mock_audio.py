@@ -0,0 +1,33 @@
+"""
+Mock audio bodies for the benchmarks
+
+Uploads must be audio in a supported container, and their durations count
+against the limits in discovery (services/audio_format.py). These are
+8-bit mono WAV files of random samples, with the sample rate chosen so a
+body of any size has the duration asked for.
+"""
+
+import math
+import os
+import struct
+
+WAV_HEADER_SIZE = 44
+
+# Data size of a WAV file written while recording
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+def wav_header(data_size: int, byte_rate: int) -> bytes:
+    """Header of an 8-bit mono PCM WAV file"""
+    riff_size = min(WAV_UNKNOWN_SIZE, data_size + WAV_HEADER_SIZE - 8)
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, byte_rate, byte_rate, 1, 8)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def mock_wav(size: int, seconds: float = 1.0) -> bytes:
+    """WAV file of `size` bytes holding at most `seconds` of audio"""
+    data_size = max(1, size - WAV_HEADER_SIZE)
+    return wav_header(data_size, math.ceil(data_size / seconds)) + os.urandom(data_size)
@@ -0,0 +1,328 @@
+"""
+Bulk ingestion of recorded encounters through the MedScribe Alliance Protocol
+
+Pushes a backlog of recordings through the regular session workflow
+(create session, upload chunks, end session, collect results) with many
+sessions in flight, using AsyncMedScribeClient from example_client.py.
+
+Recordings are read from a directory or a manifest:
+- Directory: every audio file directly in it is one recording (uploaded
+  as a single file); every subdirectory holding audio files is one
+  recording whose files are its chunks, ordered by the number at the end
+  of their names (chunk_2.webm before chunk_10.webm)
+- Manifest (.jsonl): one recording per line, e.g.
+  {"id": "enc_123", "files": ["a/0.webm", "a/1.webm"], "templates": ["soap"],
+   "additional_data": {"emr_encounter_id": "enc_123"}}
+  Relative paths are resolved against the manifest's directory.
+
+Progress is recorded in a state file (JSON lines, one per finished
+recording, flushed as it is written). A rerun with the same state file
+skips recordings already done, so an interrupted run resumes where it
+stopped; recordings that failed on the client side are retried. A
+recording interrupted mid-upload starts over with a new session.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python bulk_ingest.py recordings/ --concurrency 50 --state ingest_state.jsonl
+    python bulk_ingest.py manifest.jsonl --results-dir results/ --templates soap medications
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Set
+
+from example_client import CONTENT_TYPES, TERMINAL_STATUSES, AsyncMedScribeClient, httpx
+
+
+AUDIO_EXTENSIONS = set(CONTENT_TYPES)
+
+# Responses worth retrying: rate limited, processing queue full, server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+MAX_BACKOFF_SECONDS = 30
+
+# Final state of a recording whose results were not collected (--no-wait)
+ENDED = "ended"
+
+# Client-side failure: retried on the next run
+ERROR = "error"
+
+
+def _sequence_key(path: str):
+    """Order chunk files by the number at the end of their name, then by name"""
+    match = re.search(r"(\d+)\.[^.]+$", path)
+    return (int(match.group(1)) if match else -1, path)
+
+
+def _is_audio(name: str) -> bool:
+    return name.rsplit(".", 1)[-1].lower() in AUDIO_EXTENSIONS
+
+
+def scan_directory(root: str) -> Iterator[Dict[str, Any]]:
+    """Recordings in a directory, in name order"""
+    with os.scandir(root) as entries:
+        entries = sorted(entries, key=lambda e: e.name)
+    for entry in entries:
+        if entry.is_file() and _is_audio(entry.name):
+            yield {"id": entry.name, "files": [entry.path]}
+        elif entry.is_dir():
+            chunks = [
+                os.path.join(entry.path, name)
+                for name in os.listdir(entry.path)
+                if _is_audio(name)
+            ]
+            if chunks:
+                yield {"id": entry.name, "files": sorted(chunks, key=_sequence_key)}
+
+
+def read_manifest(path: str) -> Iterator[Dict[str, Any]]:
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            recording = json.loads(line)
+            if not recording.get("files"):
+                raise ValueError(f"{path}:{line_number}: recording has no files")
+            recording["files"] = [os.path.join(base, file) for file in recording["files"]]
+            recording.setdefault("id", recording["files"][0])
+            yield recording
+
+
+def load_state(path: str) -> Set[str]:
+    """IDs of recordings already done; a torn last line (crash) is ignored"""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record["status"] == ERROR:
+                done.discard(record["id"])
+            else:
+                done.add(record["id"])
+    return done
+
+
+class Progress:
+    """Counters for the progress line and the final summary"""
+
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.finished = 0
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+        self.files = 0
+        self.bytes = 0
+        self.latencies: List[float] = []
+        self.started = time.monotonic()
+
+    def record(self, status: str, files: int, size: int, seconds: float) -> None:
+        self.finished += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == ERROR:
+            self.errors += 1
+        else:
+            self.files += files
+            self.bytes += size
+            self.latencies.append(seconds)
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.started
+        rate = self.finished / elapsed if elapsed else 0.0
+        remaining = self.total - self.skipped - self.finished
+        eta = f"{remaining / rate / 60:.1f} min" if rate else "-"
+        return (
+            f"{self.skipped + self.finished}/{self.total} recordings "
+            f"({self.errors} errors)  {rate:.1f} sessions/s  "
+            f"{self.bytes / elapsed / 1e6 if elapsed else 0:.1f} MB/s  ETA {eta}"
+        )
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started
+        lines = [
+            f"Recordings: {self.total} total, {self.skipped} already done, {self.finished} processed",
+            "Statuses:   " + ", ".join(f"{k} {v}" for k, v in sorted(self.statuses.items())),
+            f"Uploaded:   {self.files} files, {self.bytes / 1e6:.1f} MB in {elapsed:.1f} s",
+        ]
+        if elapsed and self.finished:
+            lines.append(
+                f"Throughput: {self.finished / elapsed:.2f} sessions/s, {self.bytes / elapsed / 1e6:.2f} MB/s"
+            )
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            p50 = ordered[len(ordered) // 2]
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            lines.append(f"Per session: p50 {p50:.2f} s, p95 {p95:.2f} s")
+        return "\n".join(lines)
+
+
+class BulkIngester:
+    """Runs recordings through the protocol with `concurrency` sessions in flight"""
+
+    def __init__(self, client: AsyncMedScribeClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self._state = open(args.state, "a")
+
+    def close(self) -> None:
+        self._state.close()
+
+    async def run(self, recordings: List[Dict[str, Any]], progress: Progress) -> None:
+        pending = iter(recordings)
+
+        async def worker() -> None:
+            # Workers pull from one iterator: no task per recording up front
+            for recording in pending:
+                await self.ingest(recording, progress)
+
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+
+    async def ingest(self, recording: Dict[str, Any], progress: Progress) -> None:
+        started = time.monotonic()
+        files = recording["files"]
+        record: Dict[str, Any] = {"id": recording["id"], "session_id": None}
+        try:
+            size = sum(os.path.getsize(path) for path in files)
+            session = await self._retry(lambda: self.client.create_session(
+                templates=recording.get("templates") or self.args.templates,
+                model=recording.get("model") or self.args.model,
+                upload_type="chunked" if len(files) > 1 else "single",
+                additional_data=recording.get("additional_data"),
+            ))
+            session_id = record["session_id"] = session["session_id"]
+            await self._retry(lambda: self.client.upload_audio_chunks(session_id, files))
+            await self._retry(lambda: self.client.end_session(session_id, len(files)))
+            status = ENDED
+            if not self.args.no_wait:
+                result = await self._wait_for_result(session_id)
+                status = result["status"]
+                if self.args.results_dir:
+                    self._save_result(recording["id"], result)
+        except (httpx.HTTPError, OSError, ValueError) as e:
+            status, size = ERROR, 0
+            record["error"] = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+
+        seconds = time.monotonic() - started
+        record.update(status=status, files=len(files), bytes=size, seconds=round(seconds, 3))
+        self._state.write(json.dumps(record) + "\n")
+        self._state.flush()
+        progress.record(status, len(files), size, seconds)
+
+    async def _wait_for_result(self, session_id: str) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.args.result_timeout
+        status = None
+        while time.monotonic() < deadline:
+            status = await self._retry(lambda: self.client.get_session_status(
+                session_id,
+                wait=20,
+                since_status=status["status"] if status else None,
+            ))
+            if status["status"] in TERMINAL_STATUSES:
+                return status
+        raise ValueError(f"No result within {self.args.result_timeout:g} s (last status {status['status'] if status else None})")
+
+    async def _retry(self, call):
+        """Retry transient failures with exponential backoff, never sooner than Retry-After"""
+        for attempt in range(self.args.retries + 1):
+            delay = min(MAX_BACKOFF_SECONDS, 2 ** attempt)
+            try:
+                return await call()
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in RETRY_STATUSES or attempt == self.args.retries:
+                    raise
+                retry_after = e.response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            except httpx.TransportError:
+                if attempt == self.args.retries:
+                    raise
+            # Jitter spreads out sessions that were rejected together
+            await asyncio.sleep(delay * random.uniform(1, 1.5))
+
+    def _save_result(self, recording_id: str, result: Dict[str, Any]) -> None:
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", recording_id) + ".json"
+        with open(os.path.join(self.args.results_dir, name), "w") as f:
+            json.dump(result, f, indent=2)
+
+
+async def report_progress(progress: Progress, interactive: bool) -> None:
+    # Redraw one line on a terminal; print a line every 10 s into logs
+    interval = 0.5 if interactive else 10
+    while True:
+        await asyncio.sleep(interval)
+        if interactive:
+            print("\r" + progress.line(), end="", file=sys.stderr, flush=True)
+        else:
+            print(progress.line(), file=sys.stderr, flush=True)
+
+
+async def ingest_all(args: argparse.Namespace) -> Progress:
+    source = read_manifest(args.source) if os.path.isfile(args.source) else scan_directory(args.source)
+    recordings = list(source)
+    done = load_state(args.state)
+    todo = [r for r in recordings if r["id"] not in done]
+    progress = Progress(total=len(recordings), skipped=len(recordings) - len(todo))
+    if args.results_dir:
+        os.makedirs(args.results_dir, exist_ok=True)
+
+    async with AsyncMedScribeClient(
+        args.url,
+        max_connections=args.max_connections,
+        chunk_concurrency=args.chunk_concurrency,
+    ) as client:
+        # Fail fast on a wrong URL before starting thousands of sessions
+        await client.discover()
+        ingester = BulkIngester(client, args)
+        reporter = asyncio.ensure_future(report_progress(progress, sys.stderr.isatty()))
+        try:
+            await ingester.run(todo, progress)
+        finally:
+            reporter.cancel()
+            ingester.close()
+            if sys.stderr.isatty():
+                print("\r" + progress.line(), file=sys.stderr)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory of recordings or .jsonl manifest")
+    parser.add_argument("--url", default="http://localhost:8000", help="Scribe service base URL")
+    parser.add_argument("--templates", nargs="+", default=["soap"], help="Templates when the manifest gives none")
+    parser.add_argument("--model", default="lite")
+    parser.add_argument("--concurrency", type=int, default=20, help="Sessions in flight")
+    parser.add_argument("--chunk-concurrency", type=int, default=4, help="Parallel chunk uploads per session")
+    parser.add_argument("--max-connections", type=int, default=10, help="Connection pool size")
+    parser.add_argument("--state", default="ingest_state.jsonl", help="Resumable state file")
+    parser.add_argument("--results-dir", help="Write each session's final result here as JSON")
+    parser.add_argument("--no-wait", action="store_true", help="End sessions without collecting results")
+    parser.add_argument("--result-timeout", type=float, default=600, help="Seconds to wait for each result")
+    parser.add_argument("--retries", type=int, default=8, help="Retries of transient failures per request")
+    args = parser.parse_args()
+
+    if httpx is None:
+        parser.error("bulk_ingest.py requires the httpx package (pip install httpx)")
+
+    try:
+        progress = asyncio.run(ingest_all(args))
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; rerun with --state {args.state} to resume", file=sys.stderr)
+        sys.exit(130)
+    print(progress.summary())
+    sys.exit(1 if progress.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
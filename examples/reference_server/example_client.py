@@ -9,14 +9,112 @@ This script shows a complete workflow:
 5. End the session
 6. Poll for results
 
+MedScribeClient is a simple synchronous client for one session at a time.
+AsyncMedScribeClient is meant for EMR backends that drive many sessions
+concurrently: it shares one connection pool and uploads chunks in parallel.
+
 Usage:
     python example_client.py
 """
 
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import random
+import re
 import requests
 import time
 import os
-from typing import Optional
+import wave
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:  # Optional: pip install websockets (needed for stream_audio)
+    ws_connect = None
+
+try:
+    import httpx
+except ImportError:  # Optional: pip install httpx (needed for AsyncMedScribeClient)
+    httpx = None
+
+
+CONTENT_TYPES = {
+    'webm': 'audio/webm;codecs=opus',
+    'mp3': 'audio/mp3',
+    'wav': 'audio/wav',
+    'ogg': 'audio/ogg',
+    'm4a': 'audio/m4a',
+    'mp4': 'audio/mp4',
+}
+
+TERMINAL_STATUSES = ('completed', 'partial', 'failed', 'expired')
+
+# Upper bound of the pause between status polls
+MAX_POLL_INTERVAL_SECONDS = 30.0
+
+# First step of the backoff applied under the server's Retry-After hint;
+# it only matters once the hint keeps turning out too short
+HINTED_BACKOFF_SECONDS = 0.5
+
+
+def content_digest(data: bytes) -> str:
+    """Content-Digest header value (RFC 9530) of a body; lets the server skip re-storing retries"""
+    return f"sha-256=:{base64.b64encode(hashlib.sha256(data).digest()).decode()}:"
+
+
+def mock_wav(seconds: float = 1.0, rate: int = 8000) -> bytes:
+    """Silent 16-bit mono WAV; the server only accepts bodies that are audio"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def file_content_digest(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """content_digest() of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return f"sha-256=:{base64.b64encode(digest.digest()).decode()}:"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds (the HTTP-date form is not used by the server)"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def next_poll_delay(attempt: int, retry_after: Optional[float], interval: float) -> float:
+    """
+    Seconds to wait before status poll number `attempt + 1`.
+    
+    With a Retry-After hint the client never polls sooner than the server
+    suggests, which is when results are expected given its backlog. Without
+    one it falls back to capped exponential backoff from `interval`. Either
+    way the delay grows exponentially while the session stays in
+    processing, and random jitter keeps clients that ended their sessions
+    together from polling in lockstep.
+    """
+    if retry_after is not None:
+        delay = max(retry_after, min(MAX_POLL_INTERVAL_SECONDS, HINTED_BACKOFF_SECONDS * 2 ** attempt))
+    else:
+        delay = min(MAX_POLL_INTERVAL_SECONDS, interval * 2 ** attempt)
+    return delay * random.uniform(1.0, 1.2)
+
+
+# Below the idle timeout of common servers (uvicorn: 5 s), so a pooled
+# connection is not reused just as the server closes it
+KEEPALIVE_EXPIRY_SECONDS = 4.0
 
 
 class MedScribeClient:
@@ -93,14 +191,7 @@ class MedScribeClient:
         
         # Determine content type from file extension
         extension = file_path.split('.')[-1].lower()
-        content_types = {
-            'webm': 'audio/webm;codecs=opus',
-            'mp3': 'audio/mp3',
-            'wav': 'audio/wav',
-            'ogg': 'audio/ogg',
-            'm4a': 'audio/m4a',
-        }
-        content_type = content_types.get(extension, 'audio/webm')
+        content_type = CONTENT_TYPES.get(extension, 'audio/webm')
         
         # Read file or create mock data if file doesn't exist
         if os.path.exists(file_path):
@@ -108,13 +199,14 @@ class MedScribeClient:
                 audio_data = f.read()
         else:
             print(f"  ℹ️  File not found, using mock data")
-            audio_data = b"MOCK_AUDIO_DATA_" * 1000  # ~16KB mock data
+            audio_data = mock_wav()  # ~16KB of silence
+            extension, content_type = 'wav', CONTENT_TYPES['wav']
         
         filename = f"audio_{sequence}.{extension}"
         
         response = requests.post(
             f"{self.base_url}/v1/sessions/{self.session_id}/audio/{filename}",
-            headers={"Content-Type": content_type},
+            headers={"Content-Type": content_type, "Content-Digest": content_digest(audio_data)},
             data=audio_data
         )
         response.raise_for_status()
@@ -134,6 +226,51 @@ class MedScribeClient:
         
         print(f"✓ All {len(file_paths)} chunks uploaded")
     
+    def stream_audio(
+        self,
+        frames: Iterable[bytes],
+        content_type: str = "audio/webm;codecs=opus",
+        max_unacked: int = 1024 * 1024,
+    ):
+        """
+        Stream audio frames over a WebSocket (sessions with upload_type "stream").
+        
+        `frames` can be any iterable of bytes, e.g. encoder output as it is
+        produced. At most `max_unacked` bytes are sent ahead of the server's
+        last acknowledgement.
+        """
+        if not self.session_id:
+            raise ValueError("No active session. Create a session first.")
+        if ws_connect is None:
+            raise RuntimeError("stream_audio requires the websockets package (pip install websockets)")
+        
+        url = (
+            self.base_url.replace("http", "ws", 1)
+            + f"/v1/sessions/{self.session_id}/audio/stream?content_type={quote(content_type)}"
+        )
+        print(f"\n📡 Streaming audio ({content_type})...")
+        
+        sent = 0
+        acked = 0
+        with ws_connect(url) as ws:
+            for frame in frames:
+                ws.send(frame)
+                sent += len(frame)
+                # Flow control: wait for acks once too far ahead of the server
+                while sent - acked > max_unacked:
+                    message = json.loads(ws.recv())
+                    if message["type"] == "ack":
+                        acked = message["bytes_received"]
+            ws.send(json.dumps({"type": "end"}))
+            while True:
+                result = json.loads(ws.recv())
+                if result["type"] == "stored":
+                    break
+        
+        print(f"✓ Streamed: {result['filename']} ({result['size_bytes']} bytes)")
+        
+        return result
+    
     def end_session(self, audio_files_sent: int):
         """End the session and trigger processing"""
         if not self.session_id:
@@ -155,30 +292,71 @@ class MedScribeClient:
         
         return result
     
-    def get_session_status(self):
-        """Get current session status"""
+    def get_session_status(self, wait: Optional[float] = None, since_status: Optional[str] = None):
+        """
+        Get current session status.
+        
+        With `wait`, the server holds the request until the status differs
+        from `since_status` (or `wait` seconds pass) - a long-poll.
+        """
+        return self._status_response(wait, since_status).json()
+    
+    def _status_response(self, wait: Optional[float] = None, since_status: Optional[str] = None):
         if not self.session_id:
             raise ValueError("No active session. Create a session first.")
         
-        response = requests.get(f"{self.base_url}/v1/sessions/{self.session_id}")
+        params = {}
+        timeout = None
+        if wait:
+            params["wait"] = wait
+            if since_status:
+                params["since_status"] = since_status
+            # Leave headroom over the server-side wait
+            timeout = wait + 10
+        
+        response = requests.get(
+            f"{self.base_url}/v1/sessions/{self.session_id}",
+            params=params,
+            timeout=timeout,
+        )
         response.raise_for_status()
         
-        return response.json()
+        return response
     
-    def poll_for_results(self, max_attempts: int = 10, interval: int = 2):
-        """Poll for session results"""
+    def poll_for_results(self, max_attempts: int = 10, interval: float = 2, wait: Optional[float] = None):
+        """
+        Poll for session results.
+        
+        Between polls the client waits as long as the server's Retry-After
+        suggests, backing off exponentially (from `interval` when there is
+        no hint) with jitter; see next_poll_delay().
+        
+        If `wait` is given, long-poll instead: each request is held by the
+        server until the status changes, so no sleep is needed in between.
+        """
         if not self.session_id:
             raise ValueError("No active session. Create a session first.")
         
-        print(f"\n⏳ Polling for results (max {max_attempts} attempts, {interval}s interval)...")
+        if wait:
+            print(f"\n⏳ Long-polling for results (max {max_attempts} attempts, {wait}s wait)...")
+        else:
+            print(f"\n⏳ Polling for results (max {max_attempts} attempts)...")
         
+        status = None
         for attempt in range(max_attempts):
-            status = self.get_session_status()
+            if wait:
+                response = self._status_response(
+                    wait=wait,
+                    since_status=status['status'] if status else None,
+                )
+            else:
+                response = self._status_response()
+            status = response.json()
             
             print(f"  Attempt {attempt + 1}/{max_attempts}: {status['status']}")
             
             # Check if processing is complete
-            if status['status'] in ['completed', 'partial', 'failed', 'expired']:
+            if status['status'] in TERMINAL_STATUSES:
                 print(f"\n✓ Processing complete!")
                 print(f"  Status: {status['status']}")
                 
@@ -190,12 +368,270 @@ class MedScribeClient:
                 
                 return status
             
-            time.sleep(interval)
+            if not wait:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                time.sleep(next_poll_delay(attempt, retry_after, interval))
         
         print("\n⚠️  Max polling attempts reached. Session may still be processing.")
         return status
 
 
+class AsyncMedScribeClient:
+    """
+    Asynchronous client for EMR backends managing many sessions at once.
+    
+    - One keep-alive connection pool (at most `max_connections`) is shared
+      by every session and request; HTTP/2 can be enabled with `http2=True`
+      (pip install httpx[http2]; the reference server speaks HTTP/1.1).
+      httpx checks every pooled connection on each request, so more
+      connections cost client CPU; raise the limit for slow links only
+    - A session's chunks are uploaded in parallel, at most
+      `chunk_concurrency` at a time; the server orders them by sequence
+      number, so completion order does not matter
+    - Audio files are streamed from disk instead of read into memory
+    - The discovery document is cached for its Cache-Control max-age and
+      then revalidated with its ETag
+    
+    Unlike MedScribeClient it prints nothing and keeps no current session;
+    methods take the session ID and raise httpx.HTTPStatusError on errors.
+    
+    Example:
+        async with AsyncMedScribeClient("http://localhost:8000") as client:
+            session = await client.create_session(["soap"])
+            await client.upload_audio_chunks(session["session_id"], ["a_0.webm", "a_1.webm"])
+            await client.end_session(session["session_id"], audio_files_sent=2)
+            result = await client.poll_for_results(session["session_id"], wait=20)
+    """
+    
+    # Bytes read from disk per block of a streamed upload
+    FILE_BLOCK_SIZE = 256 * 1024
+    
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        max_connections: int = 10,
+        chunk_concurrency: int = 4,
+        timeout: float = 30.0,
+        http2: bool = False,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        if httpx is None:
+            raise RuntimeError("AsyncMedScribeClient requires the httpx package (pip install httpx)")
+        self.base_url = base_url
+        self.chunk_concurrency = chunk_concurrency
+        self.timeout = timeout
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+        # Requests wait here rather than in httpx's pool, whose cost per
+        # request grows with the number of requests queued in it
+        self._slots = asyncio.Semaphore(max_connections)
+        self._discovery: Optional[Dict[str, Any]] = None
+        self._discovery_etag: Optional[str] = None
+        self._discovery_expires = 0.0
+        self._discovery_lock = asyncio.Lock()
+    
+    async def __aenter__(self) -> "AsyncMedScribeClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+    
+    async def aclose(self) -> None:
+        """Close pooled connections"""
+        await self.http.aclose()
+    
+    async def _request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        async with self._slots:
+            return await self.http.request(method, url, **kwargs)
+    
+    async def discover(self, refresh: bool = False) -> Dict[str, Any]:
+        """Service discovery document, from cache while it is fresh"""
+        if not refresh and self._discovery is not None and time.monotonic() < self._discovery_expires:
+            return self._discovery
+        # Concurrent callers wait for one request instead of each sending their own
+        async with self._discovery_lock:
+            if not refresh and self._discovery is not None and time.monotonic() < self._discovery_expires:
+                return self._discovery
+            headers = {}
+            if self._discovery is not None and self._discovery_etag:
+                headers["If-None-Match"] = self._discovery_etag
+            response = await self._request("GET", "/.well-known/medscribealliance", headers=headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+                self._discovery = response.json()
+                self._discovery_etag = response.headers.get("ETag")
+            max_age = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+            self._discovery_expires = time.monotonic() + (int(max_age.group(1)) if max_age else 0)
+            return self._discovery
+    
+    async def list_templates(self) -> Dict[str, Any]:
+        """List available templates"""
+        response = await self._request("GET", "/v1/templates")
+        response.raise_for_status()
+        return response.json()
+    
+    async def create_session(
+        self,
+        templates: list,
+        model: str = "lite",
+        upload_type: str = "chunked",
+        additional_data: dict = None,
+    ) -> Dict[str, Any]:
+        """Create a new session"""
+        response = await self._request("POST", "/v1/sessions", json={
+            "templates": templates,
+            "model": model,
+            "upload_type": upload_type,
+            "communication_protocol": "http",
+            "additional_data": additional_data or {},
+        })
+        response.raise_for_status()
+        return response.json()
+    
+    async def upload_audio(
+        self,
+        session_id: str,
+        data: bytes,
+        sequence: int = 0,
+        extension: str = "webm",
+    ) -> Dict[str, Any]:
+        """Upload audio that is already in memory, e.g. encoder output"""
+        response = await self._request("POST", 
+            f"/v1/sessions/{session_id}/audio/audio_{sequence}.{extension}",
+            headers={
+                "Content-Type": CONTENT_TYPES.get(extension, "audio/webm"),
+                "Content-Digest": content_digest(data),
+            },
+            content=data,
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def upload_audio_file(self, session_id: str, file_path: str, sequence: int = 0) -> Dict[str, Any]:
+        """Upload one audio file, streaming it from disk"""
+        extension = file_path.split('.')[-1].lower()
+        digest = await asyncio.get_running_loop().run_in_executor(None, file_content_digest, file_path)
+        response = await self._request("POST", 
+            f"/v1/sessions/{session_id}/audio/audio_{sequence}.{extension}",
+            headers={
+                "Content-Type": CONTENT_TYPES.get(extension, "audio/webm"),
+                # Lets the server reject oversized files before they are sent
+                "Content-Length": str(os.path.getsize(file_path)),
+                # Lets the server recognize a retry of a stored chunk
+                "Content-Digest": digest,
+            },
+            content=self._read_file(file_path),
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def _read_file(self, file_path: str) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        with open(file_path, "rb") as f:
+            while True:
+                block = await loop.run_in_executor(None, f.read, self.FILE_BLOCK_SIZE)
+                if not block:
+                    return
+                yield block
+    
+    async def upload_audio_chunks(
+        self,
+        session_id: str,
+        file_paths: List[str],
+        concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Upload a session's chunks in parallel; file_paths[i] becomes sequence i.
+        
+        Returns the upload results in sequence order. If one upload fails the
+        others are cancelled and the error is raised.
+        """
+        slots = asyncio.Semaphore(concurrency or self.chunk_concurrency)
+        
+        async def upload(sequence: int, file_path: str) -> Dict[str, Any]:
+            async with slots:
+                return await self.upload_audio_file(session_id, file_path, sequence)
+        
+        tasks = [asyncio.ensure_future(upload(i, path)) for i, path in enumerate(file_paths)]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+    
+    async def end_session(self, session_id: str, audio_files_sent: int) -> Dict[str, Any]:
+        """End the session and trigger processing"""
+        response = await self._request("POST", 
+            f"/v1/sessions/{session_id}/end",
+            json={"audio_files_sent": audio_files_sent},
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def get_session_status(
+        self,
+        session_id: str,
+        wait: Optional[float] = None,
+        since_status: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Get current session status; with `wait`, long-poll (see MedScribeClient)"""
+        return (await self._status_response(session_id, wait, since_status)).json()
+    
+    async def _status_response(
+        self,
+        session_id: str,
+        wait: Optional[float] = None,
+        since_status: Optional[str] = None,
+    ) -> "httpx.Response":
+        params = {}
+        timeout = self.timeout
+        if wait:
+            params["wait"] = wait
+            if since_status:
+                params["since_status"] = since_status
+            # Leave headroom over the server-side wait
+            timeout = wait + 10
+        response = await self._request("GET", f"/v1/sessions/{session_id}", params=params, timeout=timeout)
+        response.raise_for_status()
+        return response
+    
+    async def poll_for_results(
+        self,
+        session_id: str,
+        max_attempts: int = 10,
+        interval: float = 2,
+        wait: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Poll (or long-poll with `wait`) until the session reaches a final
+        status, pausing between polls as MedScribeClient.poll_for_results does.
+        """
+        status = None
+        for attempt in range(max_attempts):
+            response = await self._status_response(
+                session_id,
+                wait=wait,
+                since_status=status['status'] if status and wait else None,
+            )
+            status = response.json()
+            if status['status'] in TERMINAL_STATUSES:
+                return status
+            if not wait:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                await asyncio.sleep(next_poll_delay(attempt, retry_after, interval))
+        return status
+
+
 def main():
     """Run example workflow"""
     print("=" * 70)
@@ -238,7 +674,7 @@ def main():
         client.end_session(audio_files_sent=len(audio_files))
         
         # 6. Poll for results
-        final_status = client.poll_for_results(max_attempts=5, interval=1)
+        final_status = client.poll_for_results(max_attempts=5, wait=2)
         
         # Display results
         print("\n" + "=" * 70)
@@ -13,10 +13,56 @@ Visit documentation at:
     http://localhost:8000/docs
 """
 
-from fastapi import FastAPI
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+
+from models import SessionStatus
+from routes import discovery, sessions, audio, events, templates, webhooks
+from services.audio_storage import AUDIO_STORAGE
+from services.auth import AUTHENTICATOR, AuthenticationError, authenticate, authentication_error_handler
+from services.expiry import EXPIRY_SCHEDULER
+from services.metrics import (
+    METRICS,
+    METRICS_ENABLED,
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    counter,
+    gauge,
+)
+from services.object_store import SIGNED_UPLOADS
+from services.processing import PROCESSING_QUEUE
+from services.rate_limit import POLL_LIMITER, SESSION_LIMITER, UPLOAD_LIMITER
+from services.session_events import SESSION_EVENTS
+from services.session_store import SESSION_STORE
+from services.webhooks import WEBHOOK_DISPATCHER, WEBHOOK_STORE
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks for background services"""
+    # Sessions recovered from a durable store need their deadlines back
+    EXPIRY_SCHEDULER.load()
+    # Loads the issuer's JWKS before the first request
+    await AUTHENTICATOR.start()
+    expiry_task = asyncio.create_task(EXPIRY_SCHEDULER.run())
+    # Also re-queues sessions that were still processing at shutdown
+    PROCESSING_QUEUE.start()
+    # Resumes deliveries left in the outbox
+    WEBHOOK_DISPATCHER.start()
+    yield
+    await PROCESSING_QUEUE.stop()
+    await WEBHOOK_DISPATCHER.stop()
+    await AUTHENTICATOR.stop()
+    expiry_task.cancel()
+    # Flush pending write-ahead log records before the process exits
+    SESSION_STORE.close()
+    WEBHOOK_STORE.close()
 
-from routes import discovery, sessions, audio, templates
 
 # Create FastAPI application
 app = FastAPI(
@@ -25,6 +71,7 @@ app = FastAPI(
     description="Mock implementation of MedScribe Alliance Protocol for testing and development",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware for development
@@ -36,11 +83,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
+# Added last so it is outermost and times the whole stack
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, metrics=METRICS)
+
+app.add_exception_handler(AuthenticationError, authentication_error_handler)
+
+# Include routers; discovery stays public, everything under /v1 is authenticated
+authenticated = [Depends(authenticate)]
 app.include_router(discovery.router, tags=["discovery"])
-app.include_router(sessions.router, prefix="/v1", tags=["sessions"])
-app.include_router(audio.router, prefix="/v1", tags=["audio"])
-app.include_router(templates.router, prefix="/v1", tags=["templates"])
+app.include_router(sessions.router, prefix="/v1", tags=["sessions"], dependencies=authenticated)
+app.include_router(audio.router, prefix="/v1", tags=["audio"], dependencies=authenticated)
+app.include_router(events.router, prefix="/v1", tags=["events"], dependencies=authenticated)
+app.include_router(templates.router, prefix="/v1", tags=["templates"], dependencies=authenticated)
+app.include_router(webhooks.router, prefix="/v1", tags=["webhooks"], dependencies=authenticated)
+# Notifications from the object store carry their own signature
+app.include_router(audio.internal_router, tags=["internal"])
 
 
 @app.get("/", tags=["root"])
@@ -61,9 +119,86 @@ async def health_check():
     return {
         "status": "healthy",
         "version": "0.1",
+        "session_shard": SESSION_STORE.shard,
+        "expiry": EXPIRY_SCHEDULER.stats(),
+        "events": SESSION_EVENTS.stats(),
+        "processing": PROCESSING_QUEUE.stats(),
+        "webhooks": WEBHOOK_DISPATCHER.stats(),
+        "auth": AUTHENTICATOR.stats(),
+        "signed_uploads": SIGNED_UPLOADS.stats(),
+        "rate_limits": {
+            "sessions": SESSION_LIMITER.stats(),
+            "uploads": UPLOAD_LIMITER.stats(),
+            "polls": POLL_LIMITER.stats(),
+        },
     }
 
 
+def service_metrics():
+    """Gauges and counters of the background services, read on each scrape"""
+    # O(sessions), but only once per scrape; with a shared store, each
+    # process counts its own shard, so the sum over workers is the total
+    by_status = Counter()
+    for session_id in SESSION_STORE.owned():
+        session = SESSION_STORE.get(session_id)
+        if session is not None:
+            by_status[getattr(session["status"], "value", session["status"])] += 1
+    yield (
+        "medscribe_sessions", "gauge", "Sessions by status",
+        [({"status": s.value}, by_status.get(s.value, 0)) for s in SessionStatus],
+    )
+
+    processing = PROCESSING_QUEUE.stats()
+    yield gauge("medscribe_processing_queue_depth", "Sessions waiting for a processing worker", processing["queued"])
+    yield gauge("medscribe_processing_running", "Sessions being processed", processing["running"])
+    yield (
+        "medscribe_processing_jobs_total", "counter", "Processing jobs by outcome",
+        [({"outcome": outcome}, processing[outcome])
+         for outcome in ("submitted", "rejected", "completed", "partial", "failed", "timed_out")],
+    )
+    yield counter("medscribe_audio_consolidated_bytes_total", "Bytes of session audio joined into one file", processing["consolidated_bytes"])
+
+    yield gauge("medscribe_audio_stored_bytes", "Bytes of stored audio", AUDIO_STORAGE.stored_bytes())
+    yield gauge("medscribe_audio_spool_bytes", "Bytes of uploads still being received", AUDIO_STORAGE.spool_bytes)
+    yield gauge("medscribe_audio_disk_free_bytes", "Free space on the audio volume", AUDIO_STORAGE.disk_free_bytes())
+    yield counter("medscribe_audio_received_bytes_total", "Audio bytes received", AUDIO_STORAGE.bytes_received)
+
+    events = SESSION_EVENTS.stats()
+    yield gauge("medscribe_event_subscribers", "Open SSE and WebSocket event streams", events["subscribers"])
+    yield gauge("medscribe_long_polls", "Status requests waiting for a change", events["long_polls"])
+
+    webhook_stats = WEBHOOK_DISPATCHER.stats()
+    yield gauge("medscribe_webhook_deliveries_pending", "Webhook deliveries in the outbox", webhook_stats["pending"])
+    yield counter("medscribe_webhook_dead_lettered_total", "Webhook deliveries given up on", webhook_stats["dead_lettered"])
+
+    yield (
+        "medscribe_rate_limited_total", "counter", "Requests rejected by rate limits",
+        [({"limit": name}, limiter.rejected)
+         for name, limiter in (("sessions", SESSION_LIMITER), ("uploads", UPLOAD_LIMITER), ("polls", POLL_LIMITER))],
+    )
+
+    auth = AUTHENTICATOR.stats()
+    yield counter("medscribe_auth_rejected_total", "Requests rejected by authentication", auth["rejected"])
+    yield (
+        "medscribe_auth_cache_lookups_total", "counter", "Token lookups by cache result",
+        [({"credential": "token", "result": "hit"}, auth["token_cache_hits"]),
+         ({"credential": "token", "result": "miss"}, auth["token_cache_misses"])],
+    )
+
+    yield gauge("medscribe_expiry_scheduled", "Sessions scheduled to expire", EXPIRY_SCHEDULER.stats()["scheduled"])
+
+
+METRICS.add_collector(service_metrics)
+
+
+@app.get("/metrics", tags=["health"], include_in_schema=METRICS_ENABLED)
+async def metrics():
+    """Prometheus metrics of this worker"""
+    if not METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(METRICS.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
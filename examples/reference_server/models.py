@@ -154,7 +154,13 @@ class EndSessionResponse(BaseModel):
     status: SessionStatus = Field(..., description="Session status after ending")
     message: str = Field(..., description="Human-readable status message")
     audio_files_received: int = Field(..., ge=0)
-    audio_files: List[str] = Field(..., description="List of audio file names received")
+    audio_files: List[str] = Field(..., description="List of audio file names received, in sequence order")
+    missing_chunks: Optional[List[int]] = Field(
+        None, description="Sequence numbers not received: gaps, or fewer chunks than audio_files_sent"
+    )
+    estimated_completion: Optional[datetime] = Field(
+        None, description="When results are expected; poll no earlier (see also Retry-After)"
+    )
 
 
 class SessionProcessingResponse(BaseModel):
@@ -167,6 +173,9 @@ class SessionProcessingResponse(BaseModel):
     audio_files: List[str]
     additional_data: Dict[str, Any] = Field(default_factory=dict)
     transcript: Optional[str] = None
+    estimated_completion: Optional[datetime] = Field(
+        None, description="When results are expected, from the processing backlog and audio length"
+    )
 
 
 class SessionCompletedResponse(BaseModel):
@@ -229,6 +238,7 @@ class TemplateInfo(BaseModel):
 class TemplatesListResponse(BaseModel):
     """Response model for templates listing"""
     templates: List[TemplateInfo] = Field(..., description="List of available templates")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, if there is one")
 
 
 # ============================================================================
@@ -241,6 +251,73 @@ class AudioUploadResponse(BaseModel):
     filename: str = Field(..., description="Simplified filename stored by server")
     original_filename: str = Field(..., description="Original filename from client")
     size_bytes: int = Field(..., description="Size of uploaded file in bytes")
+    sha256: Optional[str] = Field(None, description="Hex SHA-256 of the stored file")
+    duration_seconds: Optional[float] = Field(None, description="Audio duration from the container metadata, if it records one")
+    duplicate: bool = Field(False, description="The same content was already stored for this chunk; it was not stored again")
+
+
+class UploadCredentialsResponse(BaseModel):
+    """Response model for signed upload credentials"""
+    session_id: str = Field(..., pattern=r"^ses_[a-zA-Z0-9]+$")
+    upload_url: str = Field(..., description="Signed URL; PUT each file to {upload_url}/{file_name}")
+    method: str = Field("PUT", description="HTTP method for uploads to upload_url")
+    expires_at: datetime = Field(..., description="ISO 8601 time after which upload_url is rejected")
+
+
+# ============================================================================
+# Webhook Models
+# ============================================================================
+
+class WebhookEvent(str, Enum):
+    """Webhook event types (spec/10 §10.4)"""
+    SESSION_STARTED = "session.started"
+    SESSION_ENDED = "session.ended"
+    SESSION_COMPLETED = "session.completed"
+    SESSION_PARTIAL = "session.partial"
+    SESSION_FAILED = "session.failed"
+    SESSION_EXPIRED = "session.expired"
+
+
+class CreateWebhookRequest(BaseModel):
+    """Request model for registering a webhook"""
+    url: str = Field(..., description="HTTPS webhook endpoint URL")
+    events: List[WebhookEvent] = Field(..., min_length=1, description="Events to subscribe to")
+    secret: Optional[str] = Field(None, description="Secret for optional signature verification")
+
+
+class WebhookResponse(BaseModel):
+    """Registered webhook"""
+    webhook_id: str = Field(..., pattern=r"^wh_[a-zA-Z0-9]+$")
+    url: str
+    events: List[WebhookEvent]
+    status: str = Field(default="active")
+    created_at: datetime
+
+
+class WebhooksListResponse(BaseModel):
+    """Response model for webhooks listing"""
+    webhooks: List[WebhookResponse]
+
+
+class DeadLetter(BaseModel):
+    """Delivery that failed after all retries"""
+    delivery_id: str
+    event: WebhookEvent
+    session_id: str
+    attempts: int
+    last_error: Optional[str] = None
+    failed_at: datetime
+
+
+class DeadLettersResponse(BaseModel):
+    """Response model for a webhook's dead-letter queue"""
+    dead_letters: List[DeadLetter]
+
+
+class ReplayDeadLettersResponse(BaseModel):
+    """Response model for replaying a webhook's dead letters"""
+    webhook_id: str = Field(..., pattern=r"^wh_[a-zA-Z0-9]+$")
+    replayed: int = Field(..., ge=0, description="Deliveries queued again")
 
 
 # ============================================================================
@@ -0,0 +1,288 @@
+"""
+Local stand-in for the object store behind signed upload URLs
+
+Accepts audio PUT to the signed upload URLs the reference server issues
+(services/object_store.py) and stores it below OBJECT_STORE_PATH, so the
+direct-to-storage upload of spec/07 can be run without S3:
+- A URL is checked against its HMAC signature and expiry only. Session
+  state is never read, so any number of object stores can run apart from
+  the API, e.g. on other hosts sharing the storage volume.
+- Bodies are streamed to disk and hashed as they arrive, checked against
+  Content-Digest or Content-MD5, and inspected for their container and
+  duration (services/audio_format.py).
+- Each stored file is announced to the API with a signed notification,
+  sent in the background and retried with backoff; the PUT is answered
+  without waiting for it. The API checks the file against its session and
+  moves it into audio storage, or deletes it.
+
+Errors are S3-style XML: spec/07 §7.8 has clients handle the storage
+provider's native errors.
+
+Endpoints:
+- PUT /upload/{session_id}/{expires_at}/{signature}/{file_name} - Store a file
+- GET /stats - Counters, as JSON
+
+Run with the same OBJECT_STORE_SECRET and OBJECT_STORE_PATH as the server:
+    OBJECT_STORE_SECRET=dev python object_store.py --port 9400
+    OBJECT_STORE_SECRET=dev uvicorn main:app
+
+then upload to the URL from POST /sessions:
+    curl -X PUT "$UPLOAD_URL/audio_0.wav" -H 'Content-Type: audio/wav' --data-binary @audio_0.wav
+
+Used in-process by test_server.py and benchmarks/bench_object_store.py.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+from xml.sax.saxutils import escape
+
+import uvicorn
+
+from services.audio_format import CONTAINERS, AudioInspector, InvalidAudio
+from services.audio_storage import (
+    DEFAULT_MAX_FILE_SIZE,
+    AudioStorage,
+    DigestMismatch,
+    FileTooLarge,
+    parse_digest_headers,
+)
+from services.http_pool import ConnectionPool, HTTPError
+from services.object_store import NOTIFY_URL, SIGNED_UPLOADS, SignedUploads
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "MedScribeAlliance-ObjectStore/0.1"
+
+# Content type of uploads sent without one
+EXTENSION_TYPES = {
+    "webm": "audio/webm",
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "mp3": "audio/mp3",
+    "m4a": "audio/m4a",
+    "mp4": "audio/mp4",
+}
+
+
+class _Disconnected(Exception):
+    """The client went away before sending the whole body"""
+
+
+class ObjectStore:
+    """
+    ASGI object store for signed uploads.
+
+    - uploads: checks upload URLs and signs notifications
+    - notify_url: API route that registers stored files
+    - notify_attempts: notifications answered with 5xx, or not at all, are
+      retried this many times in total, waiting retry_base * 2^n seconds
+    """
+
+    def __init__(
+        self,
+        uploads: SignedUploads = SIGNED_UPLOADS,
+        notify_url: str = NOTIFY_URL,
+        max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+        notify_attempts: int = 5,
+        retry_base: float = 0.5,
+    ):
+        self.uploads = uploads
+        self.notify_url = notify_url
+        self.storage = AudioStorage(uploads.root, max_file_size)
+        self.notify_attempts = notify_attempts
+        self.retry_base = retry_base
+        self.stored = 0
+        self.rejected = 0
+        self.notified = 0
+        self.notify_rejected = 0
+        self.notify_failed = 0
+        # Created on the serving event loop
+        self._pool: Optional[ConnectionPool] = None
+        self._notifications: Set[asyncio.Task] = set()
+        self._server: Optional[uvicorn.Server] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.shutdown":
+                    await self.join()
+                    if self._pool is not None:
+                        self._pool.close()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+        if scope["method"] == "GET" and scope["path"] == "/stats":
+            await self._respond(send, 200, json.dumps(self.stats()).encode(), "application/json")
+            return
+
+        parts = scope["path"].split("/")
+        if len(parts) != 6 or parts[1] != "upload":
+            await self._error(send, 404, "NoSuchKey", "The specified key does not exist.")
+            return
+        if scope["method"] != "PUT":
+            await self._error(send, 405, "MethodNotAllowed", "Uploads must use PUT.")
+            return
+        _, _, session_id, expires_at, signature, file_name = parts
+        invalid = self.uploads.verify(session_id, expires_at, signature)
+        if invalid == "expired":
+            await self._error(send, 403, "AccessDenied", "Request has expired")
+            return
+        if invalid is not None:
+            await self._error(send, 403, "SignatureDoesNotMatch", "The request signature does not match.")
+            return
+        if not file_name or file_name in (".", "..") or os.path.basename(file_name) != file_name:
+            await self._error(send, 400, "InvalidArgument", f"Invalid file name '{file_name}'")
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        extension = file_name.rsplit(".", 1)[-1].lower()
+        content_type = headers.get("content-type") or EXTENSION_TYPES.get(extension)
+        container = CONTAINERS.get(content_type or "")
+        if container is None:
+            await self._error(send, 400, "InvalidArgument", f"Audio format '{content_type or extension}' is not supported")
+            return
+        content_length = headers.get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.storage.max_file_size:
+            await self._error(send, 400, "EntityTooLarge", "Your proposed upload exceeds the maximum allowed size")
+            return
+        try:
+            expected = parse_digest_headers(headers.get("content-digest"), headers.get("content-md5"))
+        except ValueError as e:
+            await self._error(send, 400, "InvalidDigest", str(e))
+            return
+
+        # Unique per PUT, so a retry never replaces a file being registered
+        key = f"{secrets.token_hex(8)}-{file_name}"
+        inspector = AudioInspector(container)
+        try:
+            stored = await self.storage.save_stream(
+                session_id, key, inspector.inspect(self._body(receive)), expected=expected,
+            )
+        except _Disconnected:
+            return
+        except FileTooLarge:
+            await self._error(send, 400, "EntityTooLarge", "Your proposed upload exceeds the maximum allowed size")
+            return
+        except DigestMismatch as e:
+            await self._error(send, 400, "BadDigest", f"The {e.algorithm} you specified did not match what we received.")
+            return
+        except InvalidAudio as e:
+            await self._error(send, 400, "InvalidArgument", e.message)
+            return
+
+        self.stored += 1
+        event = {
+            "event": "object.created",
+            "session_id": session_id,
+            "key": key,
+            "file_name": file_name,
+            "content_type": content_type,
+            "size_bytes": stored.size,
+            "sha256": stored.sha256,
+            "duration_seconds": inspector.duration,
+        }
+        task = asyncio.create_task(self._notify(json.dumps(event).encode()))
+        self._notifications.add(task)
+        task.add_done_callback(self._notifications.discard)
+        await self._respond(send, 200, b"", headers=[(b"etag", f'"{stored.sha256}"'.encode())])
+
+    @staticmethod
+    async def _body(receive):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise _Disconnected()
+            if message.get("body"):
+                yield message["body"]
+            if not message.get("more_body", False):
+                return
+
+    async def _notify(self, body: bytes) -> None:
+        if self._pool is None:
+            self._pool = ConnectionPool(user_agent=USER_AGENT)
+        for attempt in range(self.notify_attempts):
+            if attempt:
+                await asyncio.sleep(self.retry_base * 2 ** (attempt - 1))
+            # Signed per attempt; the API rejects old timestamps
+            headers = {"Content-Type": "application/json", "X-MSA-Signature": self.uploads.sign_event(body)}
+            try:
+                status_code = await self._pool.post(self.notify_url, body, headers)
+            except (HTTPError, OSError):
+                continue
+            if 200 <= status_code < 300:
+                self.notified += 1
+                return
+            if status_code < 500 and status_code != 429:
+                # Rejected; the API deleted the file
+                self.notify_rejected += 1
+                return
+        self.notify_failed += 1
+        logger.warning("Notification to %s failed %d times; file left unregistered", self.notify_url, self.notify_attempts)
+
+    async def join(self) -> None:
+        """Wait for notifications still being sent"""
+        if self._notifications:
+            await asyncio.gather(*self._notifications, return_exceptions=True)
+
+    async def _error(self, send, status_code: int, code: str, message: str) -> None:
+        self.rejected += 1
+        body = f"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>"
+        await self._respond(send, status_code, body.encode(), "application/xml")
+
+    @staticmethod
+    async def _respond(send, status_code: int, body: bytes, content_type: Optional[str] = None, headers=()) -> None:
+        raw_headers = [(b"content-length", str(len(body)).encode()), *headers]
+        if content_type is not None:
+            raw_headers.append((b"content-type", content_type.encode()))
+        await send({"type": "http.response.start", "status": status_code, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stored": self.stored,
+            "rejected": self.rejected,
+            "bytes_received": self.storage.bytes_received,
+            "notified": self.notified,
+            "notify_rejected": self.notify_rejected,
+            "notify_failed": self.notify_failed,
+            "notify_pending": len(self._notifications),
+        }
+
+    def start(self, host: str = "127.0.0.1", port: int = 9400) -> None:
+        """Serve in a background thread until stop()"""
+        self._server = uvicorn.Server(uvicorn.Config(self, host=host, port=port, log_level="warning"))
+        threading.Thread(target=self._server.run, daemon=True).start()
+        while not self._server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9400)
+    parser.add_argument("--notify-url", default=NOTIFY_URL, help="API route that registers stored files")
+    args = parser.parse_args()
+
+    if not SIGNED_UPLOADS.enabled:
+        parser.error("OBJECT_STORE_SECRET must be set, to the same value as for the server")
+    store = ObjectStore(
+        notify_url=args.notify_url,
+        max_file_size=int(os.getenv("MAX_AUDIO_FILE_SIZE", str(DEFAULT_MAX_FILE_SIZE))),
+    )
+    uvicorn.run(store, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Local stand-in for the OIDC issuer of bearer tokens
+
+Generates an RSA signing key at startup and publishes it as a JWKS, so the
+reference server can verify RS256 tokens without a real identity provider.
+Tokens are minted for whatever subject and tenant are asked for; this is
+for development only.
+
+Endpoints:
+- GET /.well-known/openid-configuration - Issuer metadata
+- GET /jwks.json - Public signing keys
+- POST /token - Mint a token: {"sub": "...", "tenant_id": "...", "expires_in": 3600}
+
+Run with:
+    python oidc_issuer.py --port 9300 --jwks-file /tmp/jwks.json
+
+then start the server with AUTH_MODE=optional and either
+AUTH_JWKS_URL=http://localhost:9300/jwks.json or AUTH_JWKS_FILE=/tmp/jwks.json,
+and get a token:
+    curl -X POST localhost:9300/token -d '{"sub": "user_1", "tenant_id": "clinic_1"}'
+
+Used in-process by benchmarks/bench_auth.py.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import uvicorn
+
+from services.auth import SHA256_DIGEST_INFO
+
+SMALL_PRIMES = [p for p in range(3, 2000) if all(p % q for q in range(2, int(p ** 0.5) + 1))]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _is_probable_prime(n: int, rounds: int = 40) -> bool:
+    """Miller-Rabin"""
+    if any(n % p == 0 for p in SMALL_PRIMES):
+        return n in SMALL_PRIMES
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for _ in range(rounds):
+        x = pow(secrets.randbelow(n - 3) + 2, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _random_prime(bits: int) -> int:
+    while True:
+        # Top two bits set, so p * q has exactly 2 * bits bits
+        candidate = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+        if _is_probable_prime(candidate):
+            return candidate
+
+
+def generate_rsa_key(bits: int = 2048, e: int = 65537) -> Dict[str, int]:
+    """RSA private key as {n, e, d}"""
+    while True:
+        p, q = _random_prime(bits // 2), _random_prime(bits // 2)
+        phi = (p - 1) * (q - 1)
+        if p != q and phi % e:
+            return {"n": p * q, "e": e, "d": pow(e, -1, phi)}
+
+
+class OIDCIssuer:
+    """Minimal ASGI issuer signing RS256 tokens with one generated key"""
+
+    def __init__(self, issuer: str = "http://127.0.0.1:9300", bits: int = 2048):
+        self.issuer = issuer
+        self.key = generate_rsa_key(bits)
+        self.kid = _b64encode(hashlib.sha256(str(self.key["n"]).encode()).digest()[:8])
+        self._server: Optional[uvicorn.Server] = None
+
+    def jwks(self) -> Dict[str, Any]:
+        n, e = self.key["n"], self.key["e"]
+        return {"keys": [{
+            "kty": "RSA",
+            "use": "sig",
+            "alg": "RS256",
+            "kid": self.kid,
+            "n": _b64encode(n.to_bytes((n.bit_length() + 7) // 8, "big")),
+            "e": _b64encode(e.to_bytes((e.bit_length() + 7) // 8, "big")),
+        }]}
+
+    def write_jwks(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.jwks(), f)
+
+    def issue(
+        self,
+        subject: str,
+        tenant_id: Optional[str] = None,
+        expires_in: int = 3600,
+        audience: Optional[str] = None,
+        **claims: Any,
+    ) -> str:
+        """Signed RS256 token"""
+        now = int(time.time())
+        payload = {"iss": self.issuer, "sub": subject, "iat": now, "exp": now + expires_in, **claims}
+        if tenant_id is not None:
+            payload["tenant_id"] = tenant_id
+        if audience is not None:
+            payload["aud"] = audience
+        header = {"alg": "RS256", "typ": "JWT", "kid": self.kid}
+        signing_input = (
+            _b64encode(json.dumps(header, separators=(",", ":")).encode()) + "."
+            + _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        )
+
+        n = self.key["n"]
+        k = (n.bit_length() + 7) // 8
+        digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input.encode()).digest()
+        encoded = b"\x00\x01" + b"\xff" * (k - len(digest_info) - 3) + b"\x00" + digest_info
+        signature = pow(int.from_bytes(encoded, "big"), self.key["d"], n).to_bytes(k, "big")
+        return f"{signing_input}.{_b64encode(signature)}"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        path = scope["path"]
+        if scope["method"] == "GET" and path == "/.well-known/openid-configuration":
+            await self._respond(send, 200, {
+                "issuer": self.issuer,
+                "jwks_uri": f"{self.issuer}/jwks.json",
+                "token_endpoint": f"{self.issuer}/token",
+                "id_token_signing_alg_values_supported": ["RS256"],
+            })
+        elif scope["method"] == "GET" and path == "/jwks.json":
+            await self._respond(send, 200, self.jwks())
+        elif scope["method"] == "POST" and path == "/token":
+            try:
+                request = json.loads(body or b"{}")
+                token = self.issue(
+                    request["sub"],
+                    request.get("tenant_id"),
+                    int(request.get("expires_in", 3600)),
+                    request.get("aud"),
+                )
+            except (ValueError, KeyError, TypeError):
+                await self._respond(send, 400, {"error": "invalid_request"})
+                return
+            await self._respond(send, 200, {
+                "access_token": token,
+                "token_type": "Bearer",
+                "expires_in": int(request.get("expires_in", 3600)),
+            })
+        else:
+            await self._respond(send, 404, {"error": "not_found"})
+
+    @staticmethod
+    async def _respond(send, status_code: int, content: Dict[str, Any]) -> None:
+        body = json.dumps(content).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def start(self, host: str = "127.0.0.1", port: int = 9300) -> None:
+        """Serve in a background thread until stop()"""
+        self._server = uvicorn.Server(uvicorn.Config(self, host=host, port=port, log_level="warning"))
+        threading.Thread(target=self._server.run, daemon=True).start()
+        while not self._server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--jwks-file", help="Also write the JWKS to this file (for AUTH_JWKS_FILE)")
+    parser.add_argument("--bits", type=int, default=2048, help="RSA key size")
+    args = parser.parse_args()
+
+    issuer = OIDCIssuer(f"http://{args.host}:{args.port}", args.bits)
+    if args.jwks_file:
+        issuer.write_jwks(args.jwks_file)
+    print(f"Issuer {issuer.issuer}, key {issuer.kid}")
+    uvicorn.run(issuer, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,49 @@ Audio upload endpoints for MedScribe Alliance Protocol
 
 Endpoints:
 - POST /sessions/{session_id}/audio/{file_name} - Upload audio file
+- WS   /sessions/{session_id}/audio/stream - Stream audio frames (upload_type "stream")
+- GET  /sessions/{session_id}/audio - Play back the session's audio, joined in sequence order
+- GET  /sessions/{session_id}/audio/{file_name} - Play back one stored file
+- GET  /sessions/{session_id}/audio/credentials - Signed URL for uploads to the object store
+- POST /internal/object-events - Register a file stored by the object store (not under /v1)
+
+Environment variables:
+- AUDIO_STREAM_ACK_BYTES: Bytes between flow-control acks on audio streams
+  (default: 262144)
 """
 
-from fastapi import APIRouter, Path, Request, Header, status
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from fastapi import APIRouter, Path, Query, Request, Header, WebSocket, status
 from fastapi.responses import JSONResponse
-from typing import Optional
+from starlette.websockets import WebSocketDisconnect, WebSocketState
+from typing import Any, Dict, Optional, Set
 
-from models import AudioUploadResponse, ErrorResponse
+from models import AudioUploadResponse, ErrorResponse, SessionStatus, UploadCredentialsResponse, UploadType
 
 router = APIRouter()
 
-# Import sessions storage from sessions module
-from routes.sessions import SESSIONS_DB
+# Called by the object store, not clients; authenticated by signature
+internal_router = APIRouter()
+
+from services.audio_format import (
+    CONTAINERS,
+    MAX_CHUNK_DURATION_SECONDS,
+    MAX_SESSION_DURATION_SECONDS,
+    AudioInspector,
+    DurationExceeded,
+    InvalidAudio,
+)
+from services.audio_playback import AudioResponse, RangeNotSatisfiable, file_layout, requested_range
+from services.audio_storage import AUDIO_STORAGE, DigestMismatch, FileTooLarge, StoredAudio, parse_digest_headers
+from services.chunk_map import MAX_CHUNKS, ChunkMap, parse_chunk_filename
+from services.consolidation import CannotConsolidate, Layout
+from services.expiry import EXPIRABLE_STATUSES, EXPIRY_SCHEDULER
+from services.object_store import SIGNED_UPLOADS
+from services.rate_limit import UPLOAD_LIMITER, client_key, rate_limit_response, tenant_key
+from services.session_store import SESSION_STORE
 
 
 SUPPORTED_AUDIO_FORMATS = [
@@ -28,6 +59,161 @@ SUPPORTED_AUDIO_FORMATS = [
     "audio/mp3",
 ]
 
+# File extension stored for each streamed content type
+STREAM_EXTENSIONS = {
+    "audio/webm": "webm",
+    "audio/webm;codecs=opus": "webm",
+    "audio/wav": "wav",
+    "audio/ogg": "ogg",
+    "audio/ogg;codecs=opus": "ogg",
+    "audio/mp4": "mp4",
+    "audio/m4a": "m4a",
+    "audio/mp3": "mp3",
+}
+
+# WebSocket close codes: 4000 + status code of the equivalent HTTP error
+WS_INVALID_REQUEST = 4400
+WS_SESSION_NOT_FOUND = 4404
+WS_STREAM_CONFLICT = 4409
+WS_SESSION_EXPIRED = 4410
+WS_FILE_TOO_LARGE = 4413
+
+STREAM_ACK_BYTES = int(os.getenv("AUDIO_STREAM_ACK_BYTES", str(256 * 1024)))
+
+# Frames are coalesced into writes of this size
+STREAM_WRITE_BUFFER = 64 * 1024
+
+# Sessions with an open audio stream (one at a time per session)
+_active_streams: Set[str] = set()
+
+
+def _file_too_large(file_size: int, max_file_size: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={
+            "error": {
+                "code": "file_too_large",
+                "message": f"File size {file_size} bytes exceeds maximum {max_file_size} bytes",
+            }
+        }
+    )
+
+
+def _digest_mismatch(algorithm: str, file_name: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={
+            "error": {
+                "code": "invalid_request",
+                "message": f"Audio body does not match its {algorithm} digest",
+                "details": {"file_name": file_name, "algorithm": algorithm},
+            }
+        }
+    )
+
+
+def _chunk_conflict(sequence: int, file_name: str, stored: StoredAudio) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={
+            "error": {
+                "code": "chunk_conflict",
+                "message": f"Sequence number {sequence} was already uploaded with different content",
+                "details": {"file_name": file_name, "size_bytes": stored.size, "sha256": stored.sha256},
+            }
+        }
+    )
+
+
+def _audio_not_recognized(e: InvalidAudio, content_type: str, file_name: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={
+            "error": {
+                "code": "invalid_audio_format",
+                "message": e.message,
+                "details": {
+                    "file_name": file_name,
+                    "provided_format": content_type,
+                    "detected_format": e.detected,
+                },
+            }
+        }
+    )
+
+
+def _duration_exceeded(e: DurationExceeded, session: Dict[str, Any], chunked: bool) -> JSONResponse:
+    if chunked and e.seconds > MAX_CHUNK_DURATION_SECONDS:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": {
+                    "code": "chunk_too_large",
+                    "message": f"Audio chunk exceeds maximum duration of {MAX_CHUNK_DURATION_SECONDS} seconds",
+                    "details": {
+                        "chunk_duration_seconds": round(e.seconds, 1),
+                        "max_duration_seconds": MAX_CHUNK_DURATION_SECONDS,
+                    },
+                }
+            }
+        )
+    model = getattr(session["model"], "value", session["model"])
+    max_seconds = MAX_SESSION_DURATION_SECONDS[model]
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={
+            "error": {
+                "code": "session_duration_exceeded",
+                "message": f"Session audio would exceed maximum duration of {max_seconds} seconds for model '{model}'",
+                "details": {
+                    "session_duration_seconds": round(session["audio_chunks"].seconds, 1),
+                    "chunk_duration_seconds": round(e.seconds, 1),
+                    "max_duration_seconds": max_seconds,
+                },
+            }
+        }
+    )
+
+
+def _max_seconds(session: Dict[str, Any], chunked: bool) -> Optional[float]:
+    """Longest audio the next chunk of a session may hold"""
+    max_seconds = MAX_SESSION_DURATION_SECONDS.get(session.get("model"))
+    if max_seconds is not None:
+        max_seconds -= session["audio_chunks"].seconds
+    if chunked:
+        max_seconds = MAX_CHUNK_DURATION_SECONDS if max_seconds is None else min(max_seconds, MAX_CHUNK_DURATION_SECONDS)
+    return max_seconds
+
+
+def _session_ended() -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={
+            "error": {
+                "code": "session_ended",
+                "message": "Session has ended, cannot upload audio",
+            }
+        }
+    )
+
+
+def _timestamp(value: datetime) -> float:
+    """Unix time of a naive UTC datetime, as sessions store them"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _invalid_chunk(message: str, file_name: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={
+            "error": {
+                "code": "invalid_request",
+                "message": message,
+                "details": {"file_name": file_name},
+            }
+        }
+    )
+
 
 @router.post(
     "/sessions/{session_id}/audio/{file_name}",
@@ -41,6 +227,9 @@ async def upload_audio(
     session_id: str = Path(..., pattern=r"^ses_[a-zA-Z0-9]+$"),
     file_name: str = Path(..., description="Audio filename with extension (e.g., audio_0.webm)"),
     content_type: Optional[str] = Header(None, alias="Content-Type"),
+    content_length: Optional[int] = Header(None, alias="Content-Length"),
+    content_digest: Optional[str] = Header(None, alias="Content-Digest"),
+    content_md5: Optional[str] = Header(None, alias="Content-MD5"),
 ):
     """
     Upload raw audio data to a session.
@@ -57,27 +246,41 @@ async def upload_audio(
     File naming for chunked uploads:
     - Format: <base>_<number>.<ext>
     - Example: audio_0.webm, audio_1.webm, audio_2.webm
+    - Zero-based, no zero padding (audio_01.webm is rejected)
+    - Chunks may arrive in any order or be retried; they are listed and
+      processed in sequence order
     
+    Format and duration:
+    - The first bytes must be audio in the container of the content type
+      (WAV, Ogg, WebM, MP3 or MP4), else 400 invalid_audio_format before
+      the rest of the body is read
+    - WAV, Ogg and WebM durations are read from the container while the
+      body streams in. Chunks over max_chunk_duration_seconds are rejected
+      with 400 chunk_too_large, and audio past the model's
+      max_session_duration_seconds with 400 session_duration_exceeded
+    
+    Integrity and retries:
+    - The body is hashed with SHA-256 as it is received and checked against
+      Content-Digest (sha-256 / sha-512) or Content-MD5 when given; a
+      mismatch is rejected with 400 and nothing is stored
+    - A re-upload of a stored chunk with the same content is answered with
+      duplicate: true without writing it again; with a Content-Digest the
+      body is not even hashed. Different content for a stored sequence
+      number is rejected with 409 chunk_conflict
+
     TODO: Production implementation should:
     - Validate authentication and session ownership
-    - Check session status (not ended, not expired)
-    - Validate audio format against supported formats
-    - Validate file size limits
-    - Upload to storage (S3, GCS, etc.) with presigned URLs
-    - Update session metadata with uploaded files
-    - Generate simplified filename (0.webm, 1.mp3, etc.)
-    - Handle concurrent uploads properly
-    - Implement chunked transfer encoding
-    - Add checksum validation
+    - Check session status (not ended)
+    - Upload to object storage (S3, GCS, etc.) with presigned URLs
+    - Store chunk metadata in a database shared by all instances
     - Trigger real-time transcription if enabled
-    - Handle upload failures with retries
     """
     
-    # TODO: Add authentication validation
     # TODO: Verify session ownership
     
     # Check if session exists
-    if session_id not in SESSIONS_DB:
+    session = SESSION_STORE.get(session_id)
+    if session is None:
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={
@@ -88,22 +291,23 @@ async def upload_audio(
             }
         )
     
-    session = SESSIONS_DB[session_id]
-    
-    # TODO: Check if session has ended
-    if session["status"] == "processing" or session["status"] == "completed":
+    if EXPIRY_SCHEDULER.check_expired(session):
         return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
+            status_code=status.HTTP_410_GONE,
             content={
                 "error": {
-                    "code": "session_ended",
-                    "message": "Session has ended, cannot upload audio",
+                    "code": "session_expired",
+                    "message": f"Session '{session_id}' has expired",
+                    "details": {
+                        "session_id": session_id,
+                        "expired_at": session["expires_at"].isoformat() + "Z",
+                    }
                 }
             }
         )
     
-    # Read raw binary data from request body
-    content = await request.body()
+    if session["status"] not in EXPIRABLE_STATUSES:
+        return _session_ended()
     
     # Get content type from header or infer from filename
     if not content_type:
@@ -120,7 +324,6 @@ async def upload_audio(
     else:
         file_content_type = content_type
     
-    # TODO: Validate audio format
     if file_content_type not in SUPPORTED_AUDIO_FORMATS:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -136,41 +339,146 @@ async def upload_audio(
             }
         )
     
-    # TODO: Validate file size
-    file_size = len(content)
-    max_file_size = 100 * 1024 * 1024  # 100MB
-    if file_size > max_file_size:
+    # Reject declared oversized bodies before reading any of them
+    max_file_size = AUDIO_STORAGE.max_file_size
+    if content_length is not None and content_length > max_file_size:
+        return _file_too_large(content_length, max_file_size)
+    
+    # Generate simplified filename (e.g., "audio_0.webm" -> "0.webm")
+    parsed = parse_chunk_filename(file_name)
+    if parsed is not None:
+        sequence, extension = parsed
+        simple_filename = f"{sequence}.{extension}"
+    elif session["upload_type"] == UploadType.CHUNKED:
+        return _invalid_chunk(
+            f"Chunk '{file_name}' must be named {{base_name}}_{{sequence_number}}.{{extension}}",
+            file_name,
+        )
+    else:
+        # A single upload is the whole recording, whatever its name
+        sequence, simple_filename = 0, file_name
+    
+    if sequence >= MAX_CHUNKS:
+        return _invalid_chunk(f"Sequence number {sequence} exceeds the maximum of {MAX_CHUNKS - 1}", file_name)
+    try:
+        expected = parse_digest_headers(content_digest, content_md5)
+    except ValueError as e:
+        return _invalid_chunk(str(e), file_name)
+    # Retries of a chunk are accepted; a different file for a taken sequence is not
+    chunks = session["audio_chunks"]
+    existing = chunks.get(sequence)
+    if existing is not None and existing != simple_filename:
+        return _invalid_chunk(f"Sequence number {sequence} was already uploaded as '{existing}'", file_name)
+    
+    # Upload bandwidth per API key and tenant. Without a Content-Length
+    # only debt is checked here, and the body is charged once received
+    caller, tenant = client_key(request), tenant_key(request)
+    limited = await UPLOAD_LIMITER.check(caller, tenant, content_length or 0)
+    if limited is not None and not limited.allowed:
+        return rate_limit_response(limited)
+    
+    # A retry of a stored chunk is compared by content instead of stored again
+    stored = await AUDIO_STORAGE.stored_file(session_id, simple_filename) if existing is not None else None
+    if stored is not None:
+        try:
+            if "sha256" in expected:
+                # The client told us what it sends; no need to hash it
+                size = await AUDIO_STORAGE.drain(request.stream())
+                received = StoredAudio(size, expected["sha256"].hex())
+            else:
+                received = await AUDIO_STORAGE.hash_stream(request.stream(), expected)
+        except FileTooLarge as e:
+            return _file_too_large(e.received, e.limit)
+        except DigestMismatch as e:
+            return _digest_mismatch(e.algorithm, file_name)
+        if content_length is None:
+            await UPLOAD_LIMITER.charge(caller, tenant, received.size)
+        if received != stored:
+            return _chunk_conflict(sequence, file_name, stored)
+        return AudioUploadResponse(
+            success=True,
+            filename=simple_filename,
+            original_filename=file_name,
+            size_bytes=stored.size,
+            sha256=stored.sha256,
+            duration_seconds=chunks.duration(sequence),
+            duplicate=True,
+        )
+    
+    # Stream the body to a spool file of its own; the size and duration
+    # limits are enforced per chunk so an oversized upload is rejected as
+    # soon as it crosses them
+    # TODO: Upload to object storage (S3, GCS, etc.)
+    chunked = session["upload_type"] == UploadType.CHUNKED
+    inspector = AudioInspector(CONTAINERS[file_content_type], _max_seconds(session, chunked))
+    try:
+        AUDIO_STORAGE.path(session_id, simple_filename)
+    except ValueError:
         return JSONResponse(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            status_code=status.HTTP_400_BAD_REQUEST,
             content={
                 "error": {
-                    "code": "file_too_large",
-                    "message": f"File size {file_size} bytes exceeds maximum {max_file_size} bytes",
+                    "code": "invalid_request",
+                    "message": f"Invalid audio filename '{file_name}'",
                 }
             }
         )
-    
-    # Generate simplified filename (e.g., "0.webm", "1.mp3")
-    # TODO: Implement proper sequence number extraction and validation
     try:
-        # Extract sequence number from filename (e.g., "audio_0.webm" -> 0)
-        parts = file_name.split('_')
-        if len(parts) >= 2:
-            seq_num = parts[-1].split('.')[0]
-            extension = file_name.split('.')[-1]
-            simple_filename = f"{seq_num}.{extension}"
-        else:
-            simple_filename = file_name
-    except:
-        simple_filename = file_name
-    
-    # TODO: Upload to storage (S3, GCS, etc.)
+        spooled = await AUDIO_STORAGE.spool_stream(
+            session_id, inspector.inspect(request.stream()), expected=expected,
+        )
+    except FileTooLarge as e:
+        return _file_too_large(e.received, e.limit)
+    except DigestMismatch as e:
+        return _digest_mismatch(e.algorithm, file_name)
+    except InvalidAudio as e:
+        return _audio_not_recognized(e, file_content_type, file_name)
+    except DurationExceeded as e:
+        return _duration_exceeded(e, session, chunked)
+    stored = spooled.stored
+    
+    if content_length is None:
+        await UPLOAD_LIMITER.charge(caller, tenant, stored.size)
+    
     # TODO: Store file metadata in database
     
-    # Update session with uploaded file
-    if simple_filename not in session["audio_files"]:
-        session["audio_files"].append(simple_filename)
-        session["status"] = "recording"
+    # The session may have ended or expired while the body was received;
+    # recording the chunk now would reopen it
+    session = SESSION_STORE.get(session_id)
+    if session is None or EXPIRY_SCHEDULER.check_expired(session) or session["status"] not in EXPIRABLE_STATUSES:
+        AUDIO_STORAGE.discard(spooled)
+        return _session_ended()
+    chunks = session["audio_chunks"]
+    
+    # Concurrent uploads were each checked against the session total
+    # before the others were added to it
+    duration = inspector.duration
+    max_seconds = _max_seconds(session, chunked)
+    if sequence not in chunks and duration is not None and max_seconds is not None and duration > max_seconds:
+        AUDIO_STORAGE.discard(spooled)
+        return _duration_exceeded(DurationExceeded(duration, max_seconds), session, chunked)
+    
+    # Concurrent uploads of the same sequence all get here; the first one
+    # recorded is moved into place, with nothing awaited in between, and
+    # the others are compared with it
+    duplicate = False
+    if await SESSION_STORE.add_chunk(session_id, sequence, simple_filename, duration):
+        AUDIO_STORAGE.adopt(session_id, simple_filename, spooled.path, stored)
+        # Only record actual transitions; subscribers are notified of each one
+        if session["status"] != SessionStatus.RECORDING:
+            SESSION_STORE.update(session_id, status=SessionStatus.RECORDING)
+    else:
+        AUDIO_STORAGE.discard(spooled)
+        chunks = session["audio_chunks"]
+        if chunks.get(sequence) != simple_filename:
+            return _invalid_chunk(
+                f"Sequence number {sequence} was already uploaded as '{chunks.get(sequence)}'", file_name
+            )
+        current = await AUDIO_STORAGE.stored_file(session_id, simple_filename)
+        if current is not None and current.sha256 != stored.sha256:
+            return _chunk_conflict(sequence, file_name, current)
+        duration = chunks.duration(sequence)
+        duplicate = True
     
     # TODO: Trigger real-time transcription if model supports it
     # TODO: Send webhook notification for audio.uploaded event
@@ -179,39 +487,530 @@ async def upload_audio(
         success=True,
         filename=simple_filename,
         original_filename=file_name,
-        size_bytes=file_size,
+        size_bytes=stored.size,
+        sha256=stored.sha256,
+        duration_seconds=duration,
+        duplicate=duplicate,
     )
 
 
+async def _close(websocket: WebSocket, code: int, reason: str) -> None:
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.close(code=code, reason=reason)
+
+
+@router.websocket("/sessions/{session_id}/audio/stream")
+async def stream_audio(
+    websocket: WebSocket,
+    session_id: str,
+    content_type: str = Query("audio/webm;codecs=opus", description="Format of the streamed audio"),
+):
+    """
+    Stream continuous audio for a session created with upload_type "stream".
+    
+    Protocol:
+    - Client sends audio as binary messages, in order, of any size
+    - Server sends {"type": "ack", "bytes_received": n} every
+      AUDIO_STREAM_ACK_BYTES; clients should bound the data they send
+      ahead of the last ack
+    - Client sends {"type": "end"} (or just closes) to finish
+    - Server replies {"type": "stored", "filename": ..., "size_bytes": ...,
+      "sha256": ..., "duration_seconds": ...} and closes with code 1000
+    
+    Each connection is stored as one file named by its sequence number
+    (0.webm, 1.webm, ...), so a client that reconnects continues the
+    sequence. Frames are written as they arrive; the server only reads the
+    next frame once the previous one is buffered, so a slow disk pushes
+    back on the client through TCP instead of growing memory.
+    
+    Frames count against the upload rate limit of the caller's API key
+    and tenant; past the limit, the server pauses before reading the next
+    frame, which throttles the client through TCP.
+    
+    The first frames must be audio in the container of `content_type`
+    (invalid_audio_format otherwise), and the audio counts against the
+    model's max_session_duration_seconds (session_duration_exceeded once
+    over it), as for uploads.
+    
+    Errors close the connection with 4000 + the equivalent HTTP status
+    (4400, 4404, 4409, 4410, 4413) and the error code as the reason.
+    
+    TODO: Production implementation should:
+    - Validate authentication and session ownership
+    - Roll over to a new file every 20 seconds of audio
+    - Feed frames to real-time transcription
+    """
+    
+    # Accept first: closing during the handshake only yields an HTTP 403
+    await websocket.accept()
+    
+    session = SESSION_STORE.get(session_id)
+    if session is None:
+        await _close(websocket, WS_SESSION_NOT_FOUND, "session_not_found")
+        return
+    if EXPIRY_SCHEDULER.check_expired(session):
+        await _close(websocket, WS_SESSION_EXPIRED, "session_expired")
+        return
+    if session["status"] not in EXPIRABLE_STATUSES:
+        await _close(websocket, WS_INVALID_REQUEST, "session_ended")
+        return
+    if session["upload_type"] != UploadType.STREAM:
+        await _close(websocket, WS_INVALID_REQUEST, "invalid_upload_type")
+        return
+    extension = STREAM_EXTENSIONS.get(content_type)
+    if extension is None:
+        await _close(websocket, WS_INVALID_REQUEST, "invalid_audio_format")
+        return
+    if session_id in _active_streams:
+        await _close(websocket, WS_STREAM_CONFLICT, "stream_already_open")
+        return
+    
+    _active_streams.add(session_id)
+    sequence = session["audio_chunks"].next_sequence()
+    simple_filename = f"{sequence}.{extension}"
+    connected = True
+    caller, tenant = client_key(websocket), tenant_key(websocket)
+    inspector = AudioInspector(CONTAINERS[content_type], _max_seconds(session, chunked=False))
+    
+    async def frames():
+        nonlocal connected
+        received = 0
+        next_ack = STREAM_ACK_BYTES
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                return
+            data = message.get("bytes")
+            if data is None:
+                try:
+                    control = json.loads(message.get("text") or "null")
+                except ValueError:
+                    control = None
+                if isinstance(control, dict) and control.get("type") == "end":
+                    return
+                continue
+            if received == 0 and session["status"] in (SessionStatus.CREATED, SessionStatus.INITIALIZED):
+                SESSION_STORE.update(session_id, status=SessionStatus.RECORDING)
+            received += len(data)
+            yield data
+            charged = await UPLOAD_LIMITER.charge(caller, tenant, len(data))
+            if charged is not None and charged.retry_after > 0:
+                await asyncio.sleep(charged.retry_after)
+            if received >= next_ack:
+                next_ack = received + STREAM_ACK_BYTES
+                try:
+                    await websocket.send_text(json.dumps({"type": "ack", "bytes_received": received}))
+                except (WebSocketDisconnect, RuntimeError):
+                    # Keep the audio received so far
+                    connected = False
+                    return
+    
+    try:
+        # TODO: Upload to object storage (S3, GCS, etc.)
+        spooled = await AUDIO_STORAGE.spool_stream(
+            session_id, inspector.inspect(frames()), buffer_size=STREAM_WRITE_BUFFER,
+        )
+    except FileTooLarge:
+        await _close(websocket, WS_FILE_TOO_LARGE, "file_too_large")
+        return
+    except InvalidAudio:
+        await _close(websocket, WS_INVALID_REQUEST, "invalid_audio_format")
+        return
+    except DurationExceeded:
+        await _close(websocket, WS_INVALID_REQUEST, "session_duration_exceeded")
+        return
+    finally:
+        _active_streams.discard(session_id)
+    
+    stored = spooled.stored
+    session = SESSION_STORE.get(session_id)
+    if session is None or stored.size == 0:
+        AUDIO_STORAGE.discard(spooled)
+    elif EXPIRY_SCHEDULER.check_expired(session) or session["status"] not in EXPIRABLE_STATUSES:
+        # Ended or expired while the stream was open
+        AUDIO_STORAGE.discard(spooled)
+        await _close(websocket, WS_INVALID_REQUEST, "session_ended")
+        return
+    elif await SESSION_STORE.add_chunk(session_id, sequence, simple_filename, inspector.duration):
+        AUDIO_STORAGE.adopt(session_id, simple_filename, spooled.path, stored)
+    else:
+        # An HTTP upload took the sequence while the stream was open
+        AUDIO_STORAGE.discard(spooled)
+        await _close(websocket, WS_STREAM_CONFLICT, "chunk_conflict")
+        return
+    
+    # TODO: Send webhook notification for audio.uploaded event
+    
+    if connected:
+        await websocket.send_text(json.dumps({
+            "type": "stored",
+            "filename": simple_filename if stored.size else None,
+            "size_bytes": stored.size,
+            "sha256": stored.sha256 if stored.size else None,
+            "duration_seconds": inspector.duration if stored.size else None,
+        }))
+        await _close(websocket, 1000, "")
+
+
 @router.get(
     "/sessions/{session_id}/audio/credentials",
-    summary="Get S3 Credentials",
-    description="Get S3 credentials for streaming upload (optional endpoint)",
+    summary="Get Upload Credentials",
+    description="Get a signed URL for uploading audio straight to the object store (optional endpoint)",
+    response_model=UploadCredentialsResponse,
 )
 async def get_audio_credentials(
     session_id: str = Path(..., pattern=r"^ses_[a-zA-Z0-9]+$"),
 ):
     """
-    Get S3 presigned URLs or credentials for direct streaming upload.
-    
-    This is an optional endpoint for advanced streaming scenarios.
+    Get a fresh signed upload URL for a session, e.g. after the one from
+    POST /sessions expired. Files are PUT to {upload_url}/{file_name} on
+    the object store (object_store.py, services/object_store.py), which
+    registers them with the session once stored.
     
     TODO: Production implementation should:
     - Validate authentication and session ownership
-    - Generate S3 presigned URLs with limited time validity
-    - Return temporary AWS credentials if using assume role
-    - Include bucket name and key prefix
-    - Set appropriate CORS headers
-    - Implement rate limiting
+    - Generate S3 presigned URLs, or temporary credentials via assume role
+    - Set appropriate CORS headers on the bucket
     """
     
-    # TODO: Implement S3 credential generation
+    if not SIGNED_UPLOADS.enabled:
+        return JSONResponse(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            content={
+                "error": {
+                    "code": "not_implemented",
+                    "message": "Signed uploads are disabled; set OBJECT_STORE_SECRET to enable them",
+                }
+            }
+        )
+    
+    # TODO: Verify session ownership
+    session = _session_or_error(session_id)
+    if isinstance(session, JSONResponse):
+        return session
+    if session["status"] not in EXPIRABLE_STATUSES:
+        return _session_ended()
+    
+    signed = SIGNED_UPLOADS.upload_url(session_id, not_after=_timestamp(session["expires_at"]))
+    return UploadCredentialsResponse(
+        session_id=session_id,
+        upload_url=signed.url,
+        expires_at=datetime.utcfromtimestamp(signed.expires_at),
+    )
+
+
+def _session_or_error(session_id: str):
+    """The session, or the 404/410 error response for it"""
+    session = SESSION_STORE.get(session_id)
+    if session is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "error": {
+                    "code": "session_not_found",
+                    "message": f"Session '{session_id}' does not exist",
+                }
+            }
+        )
+    if EXPIRY_SCHEDULER.check_expired(session):
+        return JSONResponse(
+            status_code=status.HTTP_410_GONE,
+            content={
+                "error": {
+                    "code": "session_expired",
+                    "message": f"Session '{session_id}' has expired",
+                    "details": {
+                        "session_id": session_id,
+                        "expired_at": session["expires_at"].isoformat() + "Z",
+                    }
+                }
+            }
+        )
+    return session
+
+
+def _audio_not_found(message: str) -> JSONResponse:
     return JSONResponse(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        status_code=status.HTTP_404_NOT_FOUND,
         content={
             "error": {
-                "code": "not_implemented",
-                "message": "S3 credentials endpoint not yet implemented in mock server",
+                "code": "audio_not_found",
+                "message": message,
             }
         }
     )
+
+
+def _stored_filename(chunks: ChunkMap, file_name: str) -> Optional[str]:
+    """
+    Stored file for a name as uploaded (audio_0.webm), as listed in
+    audio_files (0.webm), or of a single upload; None if there is none
+    """
+    parsed = parse_chunk_filename(file_name)
+    if parsed is not None:
+        sequence, stored = parsed[0], f"{parsed[0]}.{parsed[1]}"
+    else:
+        stem = file_name.split(".", 1)[0]
+        sequence, stored = (int(stem) if stem.isdigit() else 0), file_name
+    return stored if chunks.get(sequence) == stored else None
+
+
+def _audio_response(request: Request, audio: Layout) -> Any:
+    try:
+        byte_range = requested_range(audio, request.headers.get("range"), request.headers.get("if-range"))
+    except RangeNotSatisfiable as e:
+        return JSONResponse(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{e.size}"},
+            content={
+                "error": {
+                    "code": "range_not_satisfiable",
+                    "message": f"Range is outside the {e.size} bytes of audio",
+                }
+            }
+        )
+    return AudioResponse(audio, byte_range)
+
+
+@router.api_route(
+    "/sessions/{session_id}/audio",
+    methods=["GET", "HEAD"],
+    summary="Play Back Session Audio",
+    description="The session's audio joined in sequence order, with HTTP Range support",
+    responses={
+        206: {"description": "Partial content for a Range request"},
+        404: {"model": ErrorResponse},
+        409: {"model": ErrorResponse},
+        410: {"model": ErrorResponse},
+        416: {"model": ErrorResponse},
+    },
+)
+async def get_session_audio(
+    request: Request,
+    session_id: str = Path(..., pattern=r"^ses_[a-zA-Z0-9]+$"),
+):
+    """
+    Play back or download the whole recorded encounter.
+    
+    The chunks are served as one file in sequence order, as the
+    consolidated file would be (a single WAV header with the total size,
+    or the chunks back to back for Ogg, MP3 and WebM), but nothing is
+    written: byte ranges are read straight from the stored chunks. Range
+    requests get 206, so a browser player can seek anywhere in the
+    session for the cost of one binary search. Sessions whose chunks
+    can't be joined (MP4, mixed containers) get 409; play their files one
+    by one instead.
+    
+    TODO: Production implementation should:
+    - Validate authentication and session ownership
+    - Redirect to signed object storage URLs instead of serving bytes
+    """
+    
+    # TODO: Verify session ownership
+    session = _session_or_error(session_id)
+    if isinstance(session, JSONResponse):
+        return session
+    
+    chunks = session["audio_chunks"]
+    if not chunks:
+        return _audio_not_found(f"No audio has been uploaded to session '{session_id}'")
+    
+    # Reading chunk headers blocks; the layout is cached until a chunk is added
+    audio = AUDIO_STORAGE.cached_layout(session_id, len(chunks))
+    if audio is None:
+        try:
+            audio = await asyncio.get_running_loop().run_in_executor(
+                None, AUDIO_STORAGE.session_layout, session_id, list(chunks.filenames()))
+        except CannotConsolidate as e:
+            return JSONResponse(
+                status_code=status.HTTP_409_CONFLICT,
+                content={
+                    "error": {
+                        "code": "audio_not_combinable",
+                        "message": f"Audio files of session '{session_id}' can't be played as one: {e}",
+                        "details": {"audio_files": chunks.filenames()},
+                    }
+                }
+            )
+        except FileNotFoundError:
+            return _audio_not_found(f"Audio of session '{session_id}' is no longer stored")
+    return _audio_response(request, audio)
+
+
+@router.api_route(
+    "/sessions/{session_id}/audio/{file_name}",
+    methods=["GET", "HEAD"],
+    summary="Play Back Audio File",
+    description="One stored audio file, with HTTP Range support",
+    responses={
+        206: {"description": "Partial content for a Range request"},
+        404: {"model": ErrorResponse},
+        410: {"model": ErrorResponse},
+        416: {"model": ErrorResponse},
+    },
+)
+async def get_audio_file(
+    request: Request,
+    session_id: str = Path(..., pattern=r"^ses_[a-zA-Z0-9]+$"),
+    file_name: str = Path(..., description="Filename as uploaded (audio_0.webm) or as listed in audio_files (0.webm)"),
+):
+    """
+    Play back or download one stored audio file, with Range support.
+    
+    TODO: Production implementation should:
+    - Validate authentication and session ownership
+    - Redirect to signed object storage URLs instead of serving bytes
+    """
+    
+    # TODO: Verify session ownership
+    session = _session_or_error(session_id)
+    if isinstance(session, JSONResponse):
+        return session
+    
+    stored = _stored_filename(session["audio_chunks"], file_name)
+    if stored is None:
+        return _audio_not_found(f"Audio file '{file_name}' not found in session '{session_id}'")
+    try:
+        audio = file_layout(AUDIO_STORAGE.path(session_id, stored))
+    except FileNotFoundError:
+        return _audio_not_found(f"Audio file '{file_name}' is no longer stored")
+    return _audio_response(request, audio)
+
+
+def _discard_object(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def _register_object(session_id: str, file_name: str, path: str, stored: StoredAudio, duration: Optional[float]):
+    """
+    Add a file from the object store to its session, with the checks of a
+    direct upload; returns the error response if it is rejected
+    """
+    session = _session_or_error(session_id)
+    if isinstance(session, JSONResponse):
+        return session
+    if session["status"] not in EXPIRABLE_STATUSES:
+        return _session_ended()
+
+    chunked = session["upload_type"] == UploadType.CHUNKED
+    parsed = parse_chunk_filename(file_name)
+    if parsed is not None:
+        sequence, extension = parsed
+        simple_filename = f"{sequence}.{extension}"
+    elif chunked:
+        return _invalid_chunk(
+            f"Chunk '{file_name}' must be named {{base_name}}_{{sequence_number}}.{{extension}}",
+            file_name,
+        )
+    else:
+        sequence, simple_filename = 0, file_name
+    if sequence >= MAX_CHUNKS:
+        return _invalid_chunk(f"Sequence number {sequence} exceeds the maximum of {MAX_CHUNKS - 1}", file_name)
+
+    chunks = session["audio_chunks"]
+    existing = chunks.get(sequence)
+    if existing is not None:
+        if existing != simple_filename:
+            return _invalid_chunk(f"Sequence number {sequence} was already uploaded as '{existing}'", file_name)
+        current = await AUDIO_STORAGE.stored_file(session_id, simple_filename)
+        if current is not None and current.sha256 != stored.sha256:
+            return _chunk_conflict(sequence, file_name, current)
+        # A retried PUT of a registered chunk
+        _discard_object(path)
+        SIGNED_UPLOADS.duplicates += 1
+        return AudioUploadResponse(
+            success=True,
+            filename=simple_filename,
+            original_filename=file_name,
+            size_bytes=stored.size,
+            sha256=stored.sha256,
+            duration_seconds=chunks.duration(sequence),
+            duplicate=True,
+        )
+
+    # The object store measured the duration; the limits depend on the session
+    max_seconds = _max_seconds(session, chunked)
+    if duration is not None and max_seconds is not None and duration > max_seconds:
+        return _duration_exceeded(DurationExceeded(duration, max_seconds), session, chunked)
+
+    # A concurrent notification for the same sequence may be recorded
+    # first; the file is only moved into place by the one that is
+    if not await SESSION_STORE.add_chunk(session_id, sequence, simple_filename, duration):
+        _discard_object(path)
+        current = await AUDIO_STORAGE.stored_file(session_id, simple_filename)
+        if current is not None and current.sha256 != stored.sha256:
+            return _chunk_conflict(sequence, file_name, current)
+        SIGNED_UPLOADS.duplicates += 1
+        return AudioUploadResponse(
+            success=True,
+            filename=simple_filename,
+            original_filename=file_name,
+            size_bytes=stored.size,
+            sha256=stored.sha256,
+            duration_seconds=session["audio_chunks"].duration(sequence),
+            duplicate=True,
+        )
+    AUDIO_STORAGE.adopt(session_id, simple_filename, path, stored)
+    if session["status"] != SessionStatus.RECORDING:
+        SESSION_STORE.update(session_id, status=SessionStatus.RECORDING)
+    SIGNED_UPLOADS.registered += 1
+    return AudioUploadResponse(
+        success=True,
+        filename=simple_filename,
+        original_filename=file_name,
+        size_bytes=stored.size,
+        sha256=stored.sha256,
+        duration_seconds=duration,
+    )
+
+
+@internal_router.post(
+    "/internal/object-events",
+    summary="Object Store Notification",
+    description="Register a file stored through a signed upload URL with its session",
+    response_model=AudioUploadResponse,
+    include_in_schema=False,
+)
+async def object_created(request: Request):
+    """
+    Sent by the object store (object_store.py) after each PUT to a signed
+    upload URL, signed with OBJECT_STORE_SECRET. A rejected file is
+    deleted from the object store; only 5xx answers are retried.
+    """
+    body = await request.body()
+    if not SIGNED_UPLOADS.verify_event(body, request.headers.get("X-MSA-Signature")):
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content={
+                "error": {
+                    "code": "authentication_failed",
+                    "message": "Invalid notification signature",
+                }
+            }
+        )
+    try:
+        event = json.loads(body)
+        session_id, file_name = event["session_id"], event["file_name"]
+        path = SIGNED_UPLOADS.object_path(session_id, event["key"])
+        stored = StoredAudio(int(event["size_bytes"]), event["sha256"])
+        duration = event.get("duration_seconds")
+    except (ValueError, KeyError, TypeError):
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": {
+                    "code": "invalid_request",
+                    "message": "Malformed object notification",
+                }
+            }
+        )
+
+    response = await _register_object(session_id, file_name, path, stored, duration)
+    if isinstance(response, JSONResponse):
+        _discard_object(path)
+        SIGNED_UPLOADS.rejected += 1
+    return response
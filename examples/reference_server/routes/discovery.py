@@ -3,11 +3,24 @@ Discovery endpoint for MedScribe Alliance Protocol
 
 This endpoint returns the discovery document with service capabilities,
 authentication methods, supported models, and available features.
+
+The document only depends on configuration, so it is built once per
+configuration and kept as serialized bytes, together with gzip and (if the
+optional `brotli` package is installed) brotli encodings and strong ETags.
+Requests are answered from these bytes, or with 304 Not Modified when the
+client's If-None-Match matches.
 """
 
+import gzip
 import os
-from fastapi import APIRouter, status
-from fastapi.responses import JSONResponse
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, Request, Response, status
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install brotli
+    brotli = None
 
 from models import (
     DiscoveryResponse,
@@ -20,36 +33,29 @@ from models import (
     ModelFeatures,
     LanguageConfig,
 )
+from services.audio_format import MAX_CHUNK_DURATION_SECONDS, MAX_SESSION_DURATION_SECONDS
+from services.http_cache import etag_for, etag_matches, negotiate_encoding
 
 router = APIRouter()
 
 
-@router.get(
-    "/.well-known/medscribealliance",
-    response_model=DiscoveryResponse,
-    status_code=status.HTTP_200_OK,
-    summary="Discovery Document",
-    description="Returns service capabilities and configuration. MUST be publicly accessible without authentication.",
-)
-async def get_discovery_document():
-    """
-    Get the MedScribe Alliance protocol discovery document.
-    
-    This endpoint:
-    - MUST be publicly accessible without authentication
-    - Returns service capabilities, models, languages, and endpoints
-    - Can be cached for up to 3 hours (Cache-Control header)
-    
-    TODO: Production implementation should:
-    - Load configuration from environment variables or config file
-    - Support multiple environments (dev, staging, prod)
-    - Include actual OIDC configuration if supported
-    - List real models and their capabilities
-    - Specify actual supported audio formats and limits
-    """
+# Cache the discovery document for 3 hours
+CACHE_CONTROL = "max-age=10800"
+
+
+def discovery_config() -> Tuple[str, str]:
+    """Configuration values the discovery document is built from"""
+    return (
+        os.getenv("API_BASE_URL", "https://api.scribe.example.com"),
+        os.getenv("SUPPORT_EMAIL", "support@scribe.example.com"),
+    )
+
+
+def build_discovery_document() -> DiscoveryResponse:
+    """Build the discovery document from the current configuration"""
     
     # TODO: Replace with actual base URL from environment
-    base_url = os.getenv("API_BASE_URL", "https://api.scribe.example.com")
+    base_url, support_email = discovery_config()
     
     # TODO: Replace with actual OIDC configuration if supported
     oidc_config = OIDCConfig(
@@ -67,7 +73,7 @@ async def get_discovery_document():
         service=ServiceInfo(
             name="Mock Medical Scribe Service",
             documentation_url=f"{base_url}/docs",
-            support_email=os.getenv("SUPPORT_EMAIL", "support@scribe.example.com"),
+            support_email=support_email,
         ),
         
         endpoints=Endpoints(
@@ -91,7 +97,7 @@ async def get_discovery_document():
                 "audio/m4a",
                 "audio/mp3",
             ],
-            max_chunk_duration_seconds=20,
+            max_chunk_duration_seconds=MAX_CHUNK_DURATION_SECONDS,
             upload_methods=["chunked", "single", "stream"],
             webhook_delivery=True,
             client_sdk_delivery=True,
@@ -103,7 +109,7 @@ async def get_discovery_document():
                 id="lite",
                 display_name="Lite",
                 languages=["en", "hi"],
-                max_session_duration_seconds=600,
+                max_session_duration_seconds=MAX_SESSION_DURATION_SECONDS["lite"],
                 response_speed="fast",
                 features=ModelFeatures(
                     realtime_transcription=False,
@@ -115,7 +121,7 @@ async def get_discovery_document():
                 id="pro",
                 display_name="Professional",
                 languages=["en", "hi", "ta", "te", "bn", "mr", "gu", "kn", "ml", "pa"],
-                max_session_duration_seconds=3600,
+                max_session_duration_seconds=MAX_SESSION_DURATION_SECONDS["pro"],
                 response_speed="standard",
                 features=ModelFeatures(
                     realtime_transcription=True,
@@ -131,11 +137,86 @@ async def get_discovery_document():
         ),
     )
     
-    # Cache the discovery document for 3 hours
-    return JSONResponse(
-        status_code=status.HTTP_200_OK,
-        content=discovery.model_dump(),
-        headers={
-            "Cache-Control": "max-age=10800",
+    return discovery
+
+
+class PreparedDocument:
+    """Serialized discovery document with precompressed variants"""
+    
+    def __init__(self, document: DiscoveryResponse):
+        self.body = document.model_dump_json().encode()
+        
+        # Strong ETags must differ per content-coding
+        self.variants: Dict[Optional[str], Tuple[bytes, str]] = {
+            None: (self.body, etag_for(self.body)),
+            "gzip": (gzip.compress(self.body, compresslevel=9, mtime=0), etag_for(self.body, "-gzip")),
         }
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(self.body, quality=11), etag_for(self.body, "-br"))
+        self.etags = {etag for _, etag in self.variants.values()}
+
+
+_prepared: Optional[PreparedDocument] = None
+_prepared_config: Optional[Tuple[str, str]] = None
+
+
+def get_prepared_document() -> PreparedDocument:
+    """Return the prepared document, rebuilding it if configuration changed"""
+    global _prepared, _prepared_config
+    config = discovery_config()
+    if _prepared is None or config != _prepared_config:
+        _prepared = PreparedDocument(build_discovery_document())
+        _prepared_config = config
+    return _prepared
+
+
+@router.get(
+    "/.well-known/medscribealliance",
+    response_model=DiscoveryResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Discovery Document",
+    description="Returns service capabilities and configuration. MUST be publicly accessible without authentication.",
+)
+async def get_discovery_document(request: Request):
+    """
+    Get the MedScribe Alliance protocol discovery document.
+    
+    This endpoint:
+    - MUST be publicly accessible without authentication
+    - Returns service capabilities, models, languages, and endpoints
+    - Can be cached for up to 3 hours (Cache-Control header)
+    - Supports conditional requests (ETag / If-None-Match -> 304)
+    - Serves precompressed gzip/brotli bodies per Accept-Encoding
+    
+    TODO: Production implementation should:
+    - Load configuration from environment variables or config file
+    - Support multiple environments (dev, staging, prod)
+    - Include actual OIDC configuration if supported
+    - List real models and their capabilities
+    - Specify actual supported audio formats and limits
+    """
+    
+    # Headers are read directly: resolving Header() parameters costs more
+    # than serving the cached bytes
+    document = get_prepared_document()
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), document.variants)
+    body, etag = document.variants[encoding]
+    
+    headers = {
+        "Cache-Control": CACHE_CONTROL,
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+    }
+    
+    if etag_matches(request.headers.get("if-none-match"), document.etags):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    
+    return Response(
+        content=body,
+        status_code=status.HTTP_200_OK,
+        media_type="application/json",
+        headers=headers,
     )
@@ -0,0 +1,184 @@
+"""
+Session event push endpoints for MedScribe Alliance Protocol
+
+Endpoints:
+- GET /sessions/{session_id}/events - Server-Sent Events stream
+- WS  /sessions/{session_id}/events - WebSocket stream
+
+Both channels carry the same JSON events, for clients that cannot poll or
+run a webhook receiver (communication_protocol "websocket"):
+- session.status: sent first, with the session's current status
+- session.started / session.ended / session.completed / session.partial /
+  session.failed / session.expired: status transitions (spec/10 names)
+- any further event published by the processing backend, e.g. transcript
+  updates
+
+The stream ends after a terminal status (completed, partial, failed,
+expired). Events come from the in-process bus in services/session_events.py;
+each connection has its own bounded queue, so a slow client only loses its
+own oldest events and never delays anyone else.
+
+Environment variables:
+- SESSION_EVENTS_KEEPALIVE_SECONDS: Interval of SSE keep-alive comments on
+  idle streams (default: 15)
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import APIRouter, Path, WebSocket, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.websockets import WebSocketDisconnect
+
+from models import ErrorResponse, SessionStatus
+from services.expiry import EXPIRY_SCHEDULER
+from services.fast_json import dumps
+from services.session_events import SESSION_EVENTS, TERMINAL_STATUSES, Subscription
+from services.session_store import SESSION_STORE
+
+router = APIRouter()
+
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SESSION_EVENTS_KEEPALIVE_SECONDS", "15"))
+
+# WebSocket close code for an unknown session (4000-4999: application use)
+WS_SESSION_NOT_FOUND = 4404
+
+
+def _snapshot(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "event": "session.status",
+        "timestamp": datetime.utcnow(),
+        "session_id": session["session_id"],
+        "status": SessionStatus(session["status"]),
+        "audio_files_received": len(session["audio_chunks"]),
+    }
+
+
+def _is_terminal(event: Dict[str, Any]) -> bool:
+    return event.get("status") in TERMINAL_STATUSES
+
+
+def _sse_frame(event: Dict[str, Any]) -> bytes:
+    return b"event: " + event["event"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+
+
+async def _sse_stream(subscription: Subscription, first: Dict[str, Any]) -> AsyncIterator[bytes]:
+    # Cancelled by StreamingResponse when the client disconnects
+    try:
+        yield _sse_frame(first)
+        if _is_terminal(first):
+            return
+        while True:
+            event = await subscription.get(SSE_KEEPALIVE_SECONDS)
+            if event is None:
+                # Keeps proxies from closing idle streams
+                yield b": keepalive\n\n"
+                continue
+            yield _sse_frame(event)
+            if _is_terminal(event):
+                return
+    finally:
+        SESSION_EVENTS.unsubscribe(subscription)
+
+
+@router.get(
+    "/sessions/{session_id}/events",
+    summary="Session Events (SSE)",
+    description="Streams session status transitions and processing updates as Server-Sent Events",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        404: {"model": ErrorResponse},
+    },
+)
+async def session_events_sse(
+    session_id: str = Path(..., pattern=r"^ses_[a-zA-Z0-9]+$"),
+):
+    """
+    Subscribe to a session's events over Server-Sent Events.
+
+    TODO: Production implementation should:
+    - Validate authentication and session ownership
+    - Support Last-Event-ID resumption
+    """
+
+    # TODO: Verify session ownership
+
+    session = SESSION_STORE.get(session_id)
+    if session is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "error": {
+                    "code": "session_not_found",
+                    "message": f"Session '{session_id}' does not exist",
+                }
+            }
+        )
+    EXPIRY_SCHEDULER.check_expired(session)
+
+    # Subscribe before taking the snapshot so no transition falls in between
+    subscription = SESSION_EVENTS.subscribe(session_id)
+    return StreamingResponse(
+        _sse_stream(subscription, _snapshot(session)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Disable response buffering in nginx
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+async def _wait_for_disconnect(websocket: WebSocket, subscription: Subscription) -> None:
+    try:
+        while True:
+            # Client messages are not used; read them only to see the close
+            await websocket.receive_text()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        subscription.close()
+
+
+@router.websocket("/sessions/{session_id}/events")
+async def session_events_websocket(websocket: WebSocket, session_id: str):
+    """
+    Subscribe to a session's events over a WebSocket.
+
+    Each event is sent as one JSON text message. The server closes the
+    connection with code 1000 after a terminal status, or 4404 if the
+    session does not exist.
+
+    TODO: Validate session ownership
+    """
+    session = SESSION_STORE.get(session_id)
+    if session is None:
+        # Accept first: closing during the handshake only yields an HTTP 403
+        await websocket.accept()
+        await websocket.close(code=WS_SESSION_NOT_FOUND)
+        return
+    EXPIRY_SCHEDULER.check_expired(session)
+
+    subscription = SESSION_EVENTS.subscribe(session_id)
+    first = _snapshot(session)
+    await websocket.accept()
+    watcher = asyncio.create_task(_wait_for_disconnect(websocket, subscription))
+    try:
+        event = first
+        while True:
+            await websocket.send_text(dumps(event).decode())
+            if _is_terminal(event):
+                await websocket.close()
+                return
+            # Protocol-level pings are sent by the server (uvicorn --ws-ping-interval)
+            event = await subscription.get()
+            if event is None:
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        SESSION_EVENTS.unsubscribe(subscription)
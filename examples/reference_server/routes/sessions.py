@@ -7,10 +7,11 @@ Endpoints:
 - POST /sessions/{session_id}/end - End session
 """
 
+import asyncio
 import secrets
-from datetime import datetime, timedelta
-from typing import Union
-from fastapi import APIRouter, Path, Body, status
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple, Union
+from fastapi import APIRouter, Path, Body, Depends, Request, Response, status
 from fastapi.responses import JSONResponse
 
 from models import (
@@ -26,16 +27,71 @@ from models import (
     ErrorResponse,
 )
 
+from services.auth import caller_tenant_id
+from services.chunk_map import MAX_CHUNKS, ChunkMap
+from services.expiry import EXPIRABLE_STATUSES, EXPIRY_SCHEDULER
+from services.fast_json import FastJSONResponse
+from services.object_store import SIGNED_UPLOADS
+from services.processing import (
+    MOCK_COMPLETED_TEMPLATES,
+    MOCK_COMPLETED_TRANSCRIPT,
+    MOCK_PARTIAL_TEMPLATES,
+    MOCK_PROCESSING_TRANSCRIPT,
+    PROCESSING_QUEUE,
+    QueueFull,
+)
+from services.rate_limit import POLL_LIMITER, SESSION_LIMITER, client_key, rate_limit_response, tenant_key
+from services.session_events import SESSION_EVENTS
+from services.session_store import SESSION_STORE, SHARD_DIGITS
+from services.webhooks import WEBHOOK_DISPATCHER
+
 router = APIRouter()
 
-# Mock in-memory storage for sessions
-# TODO: Replace with actual database or cache storage
-SESSIONS_DB = {}
+# Upper bound for the long-poll `wait` parameter of get_session_status
+MAX_LONG_POLL_SECONDS = 60
+
+# Documented by hand: they are read from request.query_params, because
+# Query() dependency resolution roughly doubles the cost of every poll
+LONG_POLL_PARAMETERS = [
+    {
+        "name": "wait",
+        "in": "query",
+        "required": False,
+        "schema": {"type": "number", "minimum": 0, "maximum": MAX_LONG_POLL_SECONDS},
+        "description": "Long-poll: hold the request up to this many seconds until the status changes",
+    },
+    {
+        "name": "since_status",
+        "in": "query",
+        "required": False,
+        "schema": {"type": "string", "enum": [s.value for s in SessionStatus]},
+        "description": "Long-poll: status the client last saw (default: the current status)",
+    },
+]
+
+
+def parse_long_poll(request: Request) -> Tuple[Optional[float], Optional[SessionStatus]]:
+    """Read `wait` and `since_status`; raises ValueError if either is invalid"""
+    params = request.query_params
+    wait = params.get("wait")
+    since_status = params.get("since_status")
+    if wait is not None:
+        try:
+            wait = float(wait)
+        except ValueError:
+            raise ValueError("wait must be a number of seconds")
+        if not 0 <= wait <= MAX_LONG_POLL_SECONDS:
+            raise ValueError(f"wait must be between 0 and {MAX_LONG_POLL_SECONDS} seconds")
+    if since_status is not None:
+        since_status = SessionStatus(since_status)
+    return wait, since_status
 
 
 def generate_session_id() -> str:
-    """Generate a unique session ID with 'ses_' prefix"""
-    return f"ses_{secrets.token_urlsafe(16)}"
+    """Generate a unique session ID with 'ses_' prefix and this process's shard"""
+    # Hex keeps IDs within ^ses_[a-zA-Z0-9]+$ (token_urlsafe can emit '-' and '_');
+    # the shard lets a proxy route the session's requests here (shard_of())
+    return f"ses_{SESSION_STORE.shard:0{SHARD_DIGITS}x}{secrets.token_hex(16)}"
 
 
 @router.post(
@@ -45,7 +101,11 @@ def generate_session_id() -> str:
     summary="Create Session",
     description="Creates a new voice capture session",
 )
-async def create_session(request: CreateSessionRequest):
+async def create_session(
+    http_request: Request,
+    request: CreateSessionRequest,
+    tenant_id: Optional[str] = Depends(caller_tenant_id),
+):
     """
     Create a new session for voice capture and extraction.
     
@@ -55,18 +115,19 @@ async def create_session(request: CreateSessionRequest):
     3. Returns session details with upload URL
     
     TODO: Production implementation should:
-    - Validate authentication credentials (API key or OIDC token)
     - Validate template IDs against available templates for the user
     - Check user quotas and rate limits
     - Initialize backend storage (S3, database, etc.)
-    - Set up webhook subscriptions if configured
     - Store session metadata in database
     - Return proper error responses for validation failures
     """
     
-    # TODO: Add authentication validation
     # TODO: Validate template IDs
-    # TODO: Check rate limits and quotas
+    # TODO: Check quotas (e.g. sessions per billing period)
+    
+    limited = await SESSION_LIMITER.check(client_key(http_request), tenant_key(http_request))
+    if limited is not None and not limited.allowed:
+        return rate_limit_response(limited)
     
     session_id = generate_session_id()
     created_at = datetime.utcnow()
@@ -74,8 +135,8 @@ async def create_session(request: CreateSessionRequest):
     # TODO: Get expiry from model configuration
     expires_at = created_at + timedelta(hours=1)
     
-    # Store session in mock database
-    SESSIONS_DB[session_id] = {
+    # Store session (in-memory or write-ahead logged, see services/session_store.py)
+    SESSION_STORE.create({
         "session_id": session_id,
         "status": SessionStatus.CREATED,
         "created_at": created_at,
@@ -85,11 +146,24 @@ async def create_session(request: CreateSessionRequest):
         "upload_type": request.upload_type,
         "communication_protocol": request.communication_protocol,
         "additional_data": request.additional_data,
-        "audio_files": [],
-    }
+        # Sequence number -> stored filename (services/chunk_map.py)
+        "audio_chunks": ChunkMap(),
+        # From the caller's credentials when authenticated
+        "tenant_id": tenant_id,
+    })
+    EXPIRY_SCHEDULER.schedule(session_id, expires_at)
+    # Later transitions are published from the store's update() listener
+    WEBHOOK_DISPATCHER.publish(tenant_id, session_id, "session.started", request.additional_data)
     
-    # TODO: Replace with actual upload URL (e.g., S3 presigned URL or API endpoint)
-    upload_url = f"https://api.scribe.example.com/v1/sessions/{session_id}/audio"
+    # Signed URL of the object store when it is configured; files are PUT
+    # to {upload_url}/{file_name} there instead of through this API
+    # TODO: Replace the API endpoint with this server's public URL
+    if SIGNED_UPLOADS.enabled:
+        upload_url = SIGNED_UPLOADS.upload_url(
+            session_id, not_after=expires_at.replace(tzinfo=timezone.utc).timestamp()
+        ).url
+    else:
+        upload_url = f"https://api.scribe.example.com/v1/sessions/{session_id}/audio"
     
     return CreateSessionResponse(
         session_id=session_id,
@@ -100,12 +174,27 @@ async def create_session(request: CreateSessionRequest):
     )
 
 
+def _estimated_completion(estimate: Optional[float]) -> Optional[datetime]:
+    if estimate is None:
+        return None
+    return datetime.utcnow() + timedelta(seconds=estimate)
+
+
 @router.get(
     "/sessions/{session_id}",
     summary="Get Session Status",
     description="Retrieves session status and extraction results if complete",
+    responses={
+        200: {"model": SessionCompletedResponse},
+        202: {"model": SessionProcessingResponse},
+        206: {"model": SessionPartialResponse},
+        404: {"model": ErrorResponse},
+        410: {"model": ExpiredSessionResponse},
+    },
+    openapi_extra={"parameters": LONG_POLL_PARAMETERS},
 )
 async def get_session_status(
+    request: Request,
     session_id: str = Path(..., pattern=r"^ses_[a-zA-Z0-9]+$"),
 ):
     """
@@ -115,9 +204,15 @@ async def get_session_status(
     - 202 Accepted: Session is still processing
     - 200 OK: Session completed successfully
     - 206 Partial Content: Session completed with partial results
+    - 200 OK with status "failed": Processing failed, see processing_errors
     - 410 Gone: Session expired
     - 404 Not Found: Session doesn't exist
     
+    Long-polling: with `wait`, the request is held while the session is
+    still in `since_status` and answered as soon as the status changes.
+    If nothing changes within `wait` seconds the current status is
+    returned as usual (e.g. 202 while processing).
+    
     TODO: Production implementation should:
     - Validate authentication and session ownership
     - Query actual session status from database
@@ -127,11 +222,24 @@ async def get_session_status(
     - Support polling with proper cache headers
     """
     
-    # TODO: Add authentication validation
     # TODO: Verify session ownership
     
+    try:
+        wait, since_status = parse_long_poll(request)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": {
+                    "code": "invalid_request",
+                    "message": str(e),
+                }
+            }
+        )
+    
     # Check if session exists
-    if session_id not in SESSIONS_DB:
+    session = SESSION_STORE.get(session_id)
+    if session is None:
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={
@@ -142,133 +250,182 @@ async def get_session_status(
             }
         )
     
-    session = SESSIONS_DB[session_id]
+    # A long-poll counts as one poll however long it is held
+    limited = await POLL_LIMITER.check(client_key(request), tenant_key(request))
+    if limited is not None and not limited.allowed:
+        return rate_limit_response(limited)
+    
+    # Expire now if the deadline passed since the last sweep
+    EXPIRY_SCHEDULER.check_expired(session)
+    
+    if wait:
+        # Park on a change notification; no polling of the store
+        awaited = since_status or session["status"]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while session["status"] == awaited:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await SESSION_EVENTS.wait(session_id, remaining)
+            session = SESSION_STORE.get(session_id)
+            if session is None:
+                return JSONResponse(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    content={
+                        "error": {
+                            "code": "session_not_found",
+                            "message": f"Session '{session_id}' does not exist",
+                        }
+                    }
+                )
+    
     session_status = session["status"]
     
-    # TODO: Check if session has expired
     # TODO: Query actual processing status from backend
     
+    # Polling is the hottest endpoint: responses are built as plain dicts
+    # from trusted session data and encoded once, instead of validating
+    # the Session*Response models and re-encoding their model_dump().
+    # Field order and JSON output match those models.
+    audio_files = session["audio_chunks"].filenames()
+    
     # Return appropriate response based on status
     if session_status == SessionStatus.PROCESSING:
         # TODO: Return actual processing status with partial transcript if available
-        return JSONResponse(
+        # Tell the client when to poll again, from the backlog ahead of the
+        # session and its audio length
+        retry_after, estimate = PROCESSING_QUEUE.retry_after_for(session_id, session)
+        return FastJSONResponse(
             status_code=status.HTTP_202_ACCEPTED,
-            content=SessionProcessingResponse(
-                session_id=session_id,
-                status=SessionStatus.PROCESSING,
-                created_at=session["created_at"],
-                expires_at=session["expires_at"],
-                audio_files_received=len(session["audio_files"]),
-                audio_files=session["audio_files"],
-                additional_data=session["additional_data"],
-                transcript="Doctor: Good morning...\nPatient: I've been having...",
-            ).model_dump(mode="json"),
+            headers={"Retry-After": str(retry_after)},
+            content={
+                "session_id": session_id,
+                "status": SessionStatus.PROCESSING,
+                "created_at": session["created_at"],
+                "expires_at": session["expires_at"],
+                "audio_files_received": len(audio_files),
+                "audio_files": audio_files,
+                "additional_data": session["additional_data"],
+                "transcript": MOCK_PROCESSING_TRANSCRIPT,
+                "estimated_completion": _estimated_completion(estimate),
+            },
         )
     
     elif session_status == SessionStatus.COMPLETED:
-        # TODO: Return actual extraction results from backend
-        return JSONResponse(
+        # Results are written by the processing pipeline (services/processing.py)
+        results = session.get("results")
+        if results is None:
+            results = {
+                "completed_at": datetime.utcnow(),
+                "language_detected": "en",
+                "templates": MOCK_COMPLETED_TEMPLATES,
+                "transcript": MOCK_COMPLETED_TRANSCRIPT,
+            }
+        return FastJSONResponse(
             status_code=status.HTTP_200_OK,
-            content=SessionCompletedResponse(
-                session_id=session_id,
-                status=SessionStatus.COMPLETED,
-                created_at=session["created_at"],
-                completed_at=datetime.utcnow(),
-                model_used=session["model"],
-                language_detected="en",
-                audio_files_received=len(session["audio_files"]),
-                audio_files=session["audio_files"],
-                additional_data=session["additional_data"],
-                templates={
-                    "soap": {
-                        "status": "success",
-                        "data": {
-                            "subjective": "Patient reports headache for 3 days",
-                            "objective": "BP 120/80, Temp 98.6F",
-                            "assessment": "Tension headache",
-                            "plan": "Prescribed ibuprofen 400mg",
-                        }
-                    }
-                },
-                transcript="Doctor: Good morning, how are you feeling?\nPatient: I've been having headaches...",
-            ).model_dump(mode="json"),
+            content={
+                "session_id": session_id,
+                "status": SessionStatus.COMPLETED,
+                "created_at": session["created_at"],
+                "completed_at": results["completed_at"],
+                "model_used": session["model"],
+                "language_detected": results["language_detected"],
+                "audio_files_received": len(audio_files),
+                "audio_files": audio_files,
+                "additional_data": session["additional_data"],
+                "templates": results["templates"],
+                "transcript": results["transcript"],
+            },
         )
     
-    elif session_status == SessionStatus.PARTIAL:
-        # TODO: Return partial results with processing errors
-        return JSONResponse(
-            status_code=status.HTTP_206_PARTIAL_CONTENT,
-            content=SessionPartialResponse(
-                session_id=session_id,
-                status=SessionStatus.PARTIAL,
-                created_at=session["created_at"],
-                completed_at=datetime.utcnow(),
-                model_used=session["model"],
-                language_detected="en",
-                audio_files_received=len(session["audio_files"]),
-                audio_files_processed=len(session["audio_files"]) - 1,
-                audio_files=session["audio_files"],
-                additional_data=session["additional_data"],
-                templates={
-                    "soap": {
-                        "status": "success",
-                        "data": {"subjective": "...", "objective": "..."},
-                    }
-                },
-                transcript="Partial transcript...",
-                processing_errors=[
+    elif session_status == SessionStatus.PARTIAL or session_status == SessionStatus.FAILED:
+        # Failed sessions use the partial response shape: no usable
+        # results, with processing_errors saying why
+        results = session.get("results")
+        if results is None:
+            results = {
+                "completed_at": datetime.utcnow(),
+                "language_detected": "en",
+                "audio_files_processed": len(audio_files) - 1,
+                "templates": MOCK_PARTIAL_TEMPLATES,
+                "transcript": "Partial transcript...",
+                "processing_errors": [
                     {
                         "type": "audio_file_skipped",
                         "message": "Audio file skipped due to poor quality",
-                        "file": session["audio_files"][-1] if session["audio_files"] else None,
+                        "file": audio_files[-1] if audio_files else None,
                     }
                 ],
-            ).model_dump(mode="json"),
+            }
+        return FastJSONResponse(
+            status_code=status.HTTP_206_PARTIAL_CONTENT if session_status == SessionStatus.PARTIAL else status.HTTP_200_OK,
+            content={
+                "session_id": session_id,
+                "status": session_status,
+                "created_at": session["created_at"],
+                "completed_at": results["completed_at"],
+                "model_used": session["model"],
+                "language_detected": results["language_detected"],
+                "audio_files_received": len(audio_files),
+                "audio_files_processed": results["audio_files_processed"],
+                "audio_files": audio_files,
+                "additional_data": session["additional_data"],
+                "templates": results["templates"],
+                "transcript": results["transcript"],
+                "processing_errors": results["processing_errors"],
+            },
         )
     
     elif session_status == SessionStatus.EXPIRED:
-        # TODO: Return expired session response
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_410_GONE,
-            content=ExpiredSessionResponse(
-                session_id=session_id,
-                status=SessionStatus.EXPIRED,
-                created_at=session["created_at"],
-                expired_at=session["expires_at"],
-                message="Session expired before processing was initiated",
-                audio_files_received=len(session["audio_files"]),
-                audio_files=session["audio_files"],
-                additional_data=session["additional_data"],
-                templates={},
-                transcript=None,
-            ).model_dump(mode="json"),
+            content={
+                "session_id": session_id,
+                "status": SessionStatus.EXPIRED,
+                "created_at": session["created_at"],
+                "expired_at": session["expires_at"],
+                "message": "Session expired before processing was initiated",
+                "audio_files_received": len(audio_files),
+                "audio_files": audio_files,
+                "additional_data": session["additional_data"],
+                "templates": {},
+                "transcript": None,
+            },
         )
     
     else:
         # Default: return as processing
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_202_ACCEPTED,
-            content=SessionProcessingResponse(
-                session_id=session_id,
-                status=session_status,
-                created_at=session["created_at"],
-                expires_at=session["expires_at"],
-                audio_files_received=len(session["audio_files"]),
-                audio_files=session["audio_files"],
-                additional_data=session["additional_data"],
-                transcript=None,
-            ).model_dump(mode="json"),
+            content={
+                "session_id": session_id,
+                "status": session_status,
+                "created_at": session["created_at"],
+                "expires_at": session["expires_at"],
+                "audio_files_received": len(audio_files),
+                "audio_files": audio_files,
+                "additional_data": session["additional_data"],
+                "transcript": None,
+            },
         )
 
 
 @router.post(
     "/sessions/{session_id}/end",
     response_model=EndSessionResponse,
+    response_model_exclude_none=True,
     status_code=status.HTTP_202_ACCEPTED,
     summary="End Session",
     description="Explicitly ends a session and triggers processing",
+    responses={
+        404: {"model": ErrorResponse},
+        410: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
 )
 async def end_session(
+    response: Response,
     session_id: str = Path(..., pattern=r"^ses_[a-zA-Z0-9]+$"),
     request: EndSessionRequest = Body(...),
 ):
@@ -283,20 +440,29 @@ async def end_session(
     
     TODO: Production implementation should:
     - Validate authentication and session ownership
-    - Check if session is already ended or expired
-    - Verify audio_files_sent matches server count
-    - Mark session as partial if counts don't match
-    - Trigger asynchronous processing pipeline
     - Send to message queue (SQS, Kafka, etc.)
     - Update session status in database
-    - Send webhook notification for session.ended event
     """
     
-    # TODO: Add authentication validation
     # TODO: Verify session ownership
     
+    # Every missing sequence number is listed, so the count is bounded like
+    # the sequence numbers themselves
+    if request.audio_files_sent > MAX_CHUNKS:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": {
+                    "code": "invalid_request",
+                    "message": f"audio_files_sent exceeds the maximum of {MAX_CHUNKS}",
+                    "details": {"audio_files_sent": request.audio_files_sent, "max_chunks": MAX_CHUNKS},
+                }
+            }
+        )
+    
     # Check if session exists
-    if session_id not in SESSIONS_DB:
+    session = SESSION_STORE.get(session_id)
+    if session is None:
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={
@@ -307,25 +473,76 @@ async def end_session(
             }
         )
     
-    session = SESSIONS_DB[session_id]
+    if EXPIRY_SCHEDULER.check_expired(session):
+        return JSONResponse(
+            status_code=status.HTTP_410_GONE,
+            content={
+                "error": {
+                    "code": "session_expired",
+                    "message": f"Session '{session_id}' has expired",
+                    "details": {
+                        "session_id": session_id,
+                        "expired_at": session["expires_at"].isoformat() + "Z",
+                    }
+                }
+            }
+        )
+    
+    chunks = session["audio_chunks"]
     
-    # TODO: Check if session is already ended
-    # TODO: Check if session has expired
+    # Already ended: answer retries without queueing the session again
+    if session["status"] not in EXPIRABLE_STATUSES:
+        return EndSessionResponse(
+            session_id=session_id,
+            status=session["status"],
+            message="Session already ended.",
+            audio_files_received=len(chunks),
+            audio_files=chunks.filenames(),
+        )
     
-    # TODO: Validate audio_files_sent matches server count
-    audio_files_received = len(session["audio_files"])
+    # Queue for processing (services/processing.py); the queue is bounded,
+    # so a saturated pipeline pushes back instead of growing without limit
+    # TODO: Send to message queue (SQS, Kafka, etc.)
+    try:
+        PROCESSING_QUEUE.submit(session_id)
+    except QueueFull as e:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(e.retry_after)},
+            content={
+                "error": {
+                    "code": "service_unavailable",
+                    "message": "Processing queue is full, retry later",
+                    "details": {
+                        "session_id": session_id,
+                        "retry_after_seconds": e.retry_after,
+                    }
+                }
+            }
+        )
     
-    # Update session status to processing
-    session["status"] = SessionStatus.PROCESSING
+    # Gaps and chunks never received mark the session partial once processed
+    missing_chunks = chunks.missing(request.audio_files_sent)
+    SESSION_STORE.update(
+        session_id,
+        status=SessionStatus.PROCESSING,
+        audio_files_sent=request.audio_files_sent,
+    )
+    # session.ended is sent to webhooks and event subscribers by the update
     
-    # TODO: Trigger asynchronous processing
-    # TODO: Send to message queue
-    # TODO: Send webhook notification
+    # When to poll for results (see get_session_status)
+    retry_after, estimate = PROCESSING_QUEUE.retry_after_for(session_id, session)
+    response.headers["Retry-After"] = str(retry_after)
     
     return EndSessionResponse(
         session_id=session_id,
         status=SessionStatus.PROCESSING,
-        message="Session ended. Processing started.",
-        audio_files_received=audio_files_received,
-        audio_files=session["audio_files"],
+        message=(
+            f"Session ended. Processing started; {len(missing_chunks)} audio file(s) missing."
+            if missing_chunks else "Session ended. Processing started."
+        ),
+        audio_files_received=len(chunks),
+        audio_files=chunks.filenames(),
+        missing_chunks=missing_chunks or None,
+        estimated_completion=_estimated_completion(estimate),
     )
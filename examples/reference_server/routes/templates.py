@@ -5,10 +5,15 @@ Endpoints:
 - GET /templates - List available templates
 """
 
-from fastapi import APIRouter, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from fastapi.responses import JSONResponse
 
-from models import TemplatesListResponse, TemplateInfo, ErrorResponse
+from models import TemplatesListResponse, ErrorResponse
+from services.auth import caller_tenant_id
+from services.http_cache import etag_matches
+from services.template_registry import TEMPLATE_REGISTRY, InvalidCursor
 
 router = APIRouter()
 
@@ -20,12 +25,20 @@ router = APIRouter()
     summary="List Templates",
     description="Returns templates available to the authenticated user/EMR",
 )
-async def list_templates():
+async def list_templates(
+    request: Request,
+    category: Optional[str] = Query(None, description="Only return templates in this category"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of templates per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    tenant_id: Optional[str] = Depends(caller_tenant_id),
+):
     """
     List all available templates for the authenticated user/business.
     
     Returns:
-        List of templates with ID, name, and description
+        List of templates with ID, name, and description, sorted by ID.
+        When more templates are available, next_cursor is set; pass it back
+        as the cursor query parameter to fetch the next page.
     
     Note:
         The templates endpoint is behind authentication and returns only
@@ -34,75 +47,40 @@ async def list_templates():
         - Custom templates created by the EMR
         - User-specific templates (in B2C model)
     
+    Responses are served from the registry's per-tenant cache with a strong
+    ETag; a matching If-None-Match returns 304 Not Modified.
+    
     TODO: Production implementation should:
-    - Validate authentication (API key or OIDC token)
     - Query templates from database based on user/EMR permissions
-    - Filter templates by user's subscription tier
-    - Return custom templates created by the EMR
     - Include template version information
-    - Cache template list with appropriate TTL
-    - Support pagination for large template lists
     - Include template schema/structure information
-    - Support filtering by category or type
     """
     
-    # TODO: Add authentication validation
-    # TODO: Extract user ID or business ID from auth token
-    # TODO: Query available templates from database
-    # TODO: Filter by user permissions and subscription
+    try:
+        body, etag = TEMPLATE_REGISTRY.list_response(tenant_id, category, limit, cursor)
+    except InvalidCursor:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": {
+                    "code": "invalid_request",
+                    "message": f"Invalid pagination cursor '{cursor}'",
+                }
+            }
+        )
+    
+    # Template lists are per tenant and can change: clients revalidate
+    headers = {
+        "Cache-Control": "private, no-cache",
+        "ETag": etag,
+    }
     
-    # Mock template data
-    templates = [
-        TemplateInfo(
-            id="soap",
-            name="SOAP Note",
-            description="Standard Subjective, Objective, Assessment, Plan format for clinical documentation",
-        ),
-        TemplateInfo(
-            id="medications",
-            name="Medications List",
-            description="Structured list of prescribed medications with dosage, frequency, and duration",
-        ),
-        TemplateInfo(
-            id="discharge_summary",
-            name="Discharge Summary",
-            description="Comprehensive discharge documentation including admission details, hospital course, and follow-up",
-        ),
-        TemplateInfo(
-            id="progress_note",
-            name="Progress Note",
-            description="Daily progress notes documenting patient condition and treatment plan updates",
-        ),
-        TemplateInfo(
-            id="consultation_note",
-            name="Consultation Note",
-            description="Specialist consultation documentation with recommendations and findings",
-        ),
-        TemplateInfo(
-            id="operative_note",
-            name="Operative Note",
-            description="Surgical procedure documentation including pre-op, intra-op, and post-op details",
-        ),
-        TemplateInfo(
-            id="history_physical",
-            name="History & Physical",
-            description="Comprehensive patient history and physical examination findings",
-        ),
-        TemplateInfo(
-            id="lab_results",
-            name="Lab Results",
-            description="Structured laboratory test results with values and reference ranges",
-        ),
-        TemplateInfo(
-            id="radiology_report",
-            name="Radiology Report",
-            description="Imaging study findings and radiologist interpretations",
-        ),
-        TemplateInfo(
-            id="vitals",
-            name="Vital Signs",
-            description="Patient vital signs including blood pressure, heart rate, temperature, and oxygen saturation",
-        ),
-    ]
+    if etag_matches(request.headers.get("if-none-match"), (etag,)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return TemplatesListResponse(templates=templates)
+    return Response(
+        content=body,
+        status_code=status.HTTP_200_OK,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,164 @@
+"""
+Webhook management endpoints for MedScribe Alliance Protocol
+
+Endpoints:
+- POST /webhooks - Register a webhook
+- GET /webhooks - List registered webhooks
+- DELETE /webhooks/{webhook_id} - Delete a webhook
+- GET /webhooks/{webhook_id}/dead-letters - Deliveries that failed after all retries
+- POST /webhooks/{webhook_id}/dead-letters/replay - Queue dead letters for delivery again
+
+Deliveries are sent by services/webhooks.py.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Path, Response, status
+from fastapi.responses import JSONResponse
+
+from models import (
+    CreateWebhookRequest,
+    DeadLettersResponse,
+    ErrorResponse,
+    ReplayDeadLettersResponse,
+    WebhookResponse,
+    WebhooksListResponse,
+)
+from services.auth import caller_tenant_id
+from services.webhooks import WEBHOOK_DISPATCHER
+
+router = APIRouter()
+
+WEBHOOK_ID_PATTERN = r"^wh_[a-zA-Z0-9]+$"
+
+
+def _webhook_not_found(webhook_id: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={
+            "error": {
+                "code": "webhook_not_found",
+                "message": f"Webhook '{webhook_id}' does not exist",
+            }
+        }
+    )
+
+
+@router.post(
+    "/webhooks",
+    response_model=WebhookResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Register Webhook",
+    description="Registers a webhook endpoint to receive session event notifications",
+    responses={400: {"model": ErrorResponse}},
+)
+async def create_webhook(
+    request: CreateWebhookRequest,
+    tenant_id: Optional[str] = Depends(caller_tenant_id),
+):
+    """
+    Register a webhook for the tenant's session events.
+
+    TODO: Production implementation should:
+    - Reject URLs that resolve to private addresses
+    """
+
+    try:
+        webhook = WEBHOOK_DISPATCHER.register(
+            tenant_id,
+            request.url,
+            [event.value for event in request.events],
+            request.secret,
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": {
+                    "code": "invalid_request",
+                    "message": str(e),
+                    "details": {"url": request.url},
+                }
+            }
+        )
+
+    return WebhookResponse(**webhook)
+
+
+@router.get(
+    "/webhooks",
+    response_model=WebhooksListResponse,
+    summary="List Webhooks",
+    description="Returns the webhooks registered by the authenticated EMR",
+)
+async def list_webhooks(
+    tenant_id: Optional[str] = Depends(caller_tenant_id),
+):
+    """
+    List the tenant's webhooks. Secrets are never returned.
+    """
+    return WebhooksListResponse(
+        webhooks=[WebhookResponse(**webhook) for webhook in WEBHOOK_DISPATCHER.list_webhooks(tenant_id)]
+    )
+
+
+@router.delete(
+    "/webhooks/{webhook_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Delete Webhook",
+    description="Deletes a webhook; pending deliveries to it are dropped",
+    response_class=Response,
+    responses={404: {"model": ErrorResponse}},
+)
+async def delete_webhook(
+    webhook_id: str = Path(..., pattern=WEBHOOK_ID_PATTERN),
+    tenant_id: Optional[str] = Depends(caller_tenant_id),
+):
+    """
+    Delete a webhook owned by the tenant.
+    """
+    if not WEBHOOK_DISPATCHER.unregister(tenant_id, webhook_id):
+        return _webhook_not_found(webhook_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get(
+    "/webhooks/{webhook_id}/dead-letters",
+    response_model=DeadLettersResponse,
+    summary="List Dead Letters",
+    description="Returns deliveries to the webhook that failed after all retries",
+    responses={404: {"model": ErrorResponse}},
+)
+async def list_dead_letters(
+    webhook_id: str = Path(..., pattern=WEBHOOK_ID_PATTERN),
+    tenant_id: Optional[str] = Depends(caller_tenant_id),
+):
+    """
+    List the webhook's dead-lettered deliveries, oldest first.
+    """
+    if WEBHOOK_DISPATCHER.get(tenant_id, webhook_id) is None:
+        return _webhook_not_found(webhook_id)
+    return DeadLettersResponse(dead_letters=WEBHOOK_DISPATCHER.dead_letters(webhook_id))
+
+
+@router.post(
+    "/webhooks/{webhook_id}/dead-letters/replay",
+    response_model=ReplayDeadLettersResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Replay Dead Letters",
+    description="Queues the webhook's dead-lettered deliveries for delivery again",
+    responses={404: {"model": ErrorResponse}},
+)
+async def replay_dead_letters(
+    webhook_id: str = Path(..., pattern=WEBHOOK_ID_PATTERN),
+    tenant_id: Optional[str] = Depends(caller_tenant_id),
+):
+    """
+    Retry every dead letter of the webhook, e.g. after the receiver is fixed.
+    """
+    if WEBHOOK_DISPATCHER.get(tenant_id, webhook_id) is None:
+        return _webhook_not_found(webhook_id)
+    return ReplayDeadLettersResponse(
+        webhook_id=webhook_id,
+        replayed=WEBHOOK_DISPATCHER.replay(webhook_id),
+    )
@@ -0,0 +1 @@
+"""Services package for MedScribe Alliance Protocol Mock Server"""
@@ -0,0 +1,351 @@
+"""
+Container sniffing and duration indexing for uploaded audio
+
+Uploads are inspected as they stream in, without decoding any audio:
+- The container is recognized from its first bytes: WAV (RIFF/WAVE), Ogg,
+  WebM/Matroska (EBML), MP3 (ID3 tag or frame sync) or MP4/M4A (ftyp box).
+  A body that is none of these, or not the container its Content-Type
+  names, is rejected before anything else of it is read.
+- The duration is read from container metadata: the fmt and data chunk
+  headers of WAV, the granule position of the last Ogg page (Opus and
+  Vorbis), or the Segment Info Duration of WebM. MP3, MP4 and WebM written
+  without a Duration (e.g. by a live MediaRecorder) have no known duration.
+
+WAV and WebM durations are in their first bytes, so an upload that is too
+long is rejected before its body is read. Ogg durations grow page by page;
+only the page headers are parsed, skipping over the audio in between.
+
+The limits advertised in discovery (max_chunk_duration_seconds, and
+max_session_duration_seconds per model) are enforced with these
+durations. The session's ChunkMap keeps a running total of them
+(services/chunk_map.py), so checking a chunk against the session limit
+is O(1).
+"""
+
+import struct
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+
+# Advertised in the discovery document (routes/discovery.py)
+MAX_CHUNK_DURATION_SECONDS = 20
+MAX_SESSION_DURATION_SECONDS: Dict[str, int] = {"lite": 600, "pro": 3600}
+
+# Container of each supported content type
+CONTAINERS = {
+    "audio/webm": "webm",
+    "audio/webm;codecs=opus": "webm",
+    "audio/wav": "wav",
+    "audio/ogg": "ogg",
+    "audio/ogg;codecs=opus": "ogg",
+    "audio/mp4": "mp4",
+    "audio/m4a": "mp4",
+    "audio/mp3": "mp3",
+}
+
+# Enough to recognize every container below
+SNIFF_BYTES = 12
+
+# Header metadata (WAV chunks before data, WebM Segment Info) is only
+# looked for in this many bytes from the start
+HEAD_BYTES = 4096
+
+# EBML element IDs (with their length marker bits)
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_CLUSTER = 0x1F43B675
+EBML_TIMESTAMP_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+
+# Capture pattern, version, header type, granule position, serial number,
+# page sequence number, checksum, number of segments
+OGG_PAGE_HEADER = struct.Struct("<4sBBqIIIB")
+OGG_HEADER_SIZE = OGG_PAGE_HEADER.size
+# Opus granule positions count 48 kHz samples whatever the input rate
+OPUS_GRANULE_RATE = 48000
+OGG_NO_GRANULE = -1
+
+# WAV writers that stream leave the data size unset
+WAV_UNKNOWN_SIZES = (0, 0xFFFFFFFF)
+
+
+class InvalidAudio(Exception):
+    """The body is not audio in a supported container, or not in the declared one"""
+
+    def __init__(self, message: str, detected: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.detected = detected
+
+
+class DurationExceeded(Exception):
+    """The audio is longer than the limit given to the inspector"""
+
+    def __init__(self, seconds: float, limit: float):
+        super().__init__(f"Audio duration {seconds:.1f}s exceeds {limit:.1f}s")
+        self.seconds = seconds
+        self.limit = limit
+
+
+def sniff_container(head: bytes) -> Optional[str]:
+    """Container recognized from the first bytes of a file, or None"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    # ID3v2 tag, or an MPEG audio frame sync with a valid layer
+    if head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x06):
+        return "mp3"
+    return None
+
+
+class _Incomplete(ValueError):
+    """More of the header is needed"""
+
+
+def _vint(data: bytes, offset: int, keep_marker: bool = False):
+    """EBML variable-length integer at `offset`: (value, length)"""
+    if offset >= len(data):
+        raise _Incomplete
+    first = data[offset]
+    if first == 0:
+        raise InvalidAudio("Malformed EBML element")
+    length = 9 - first.bit_length()
+    if offset + length > len(data):
+        raise _Incomplete
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[offset + 1:offset + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def _webm_duration(head: bytes) -> Optional[float]:
+    """Seconds from the Segment Info of a WebM head, or None if it has none"""
+    element, length = _vint(head, 0, keep_marker=True)
+    size, size_length = _vint(head, length)
+    offset = length + size_length + size
+    element, length = _vint(head, offset, keep_marker=True)
+    if element != EBML_SEGMENT:
+        return None
+    _, size_length = _vint(head, offset + length)
+    offset += length + size_length
+
+    # Top-level elements of the segment, up to its Info
+    while True:
+        element, length = _vint(head, offset, keep_marker=True)
+        size, size_length = _vint(head, offset + length)
+        offset += length + size_length
+        if element == EBML_CLUSTER or size == (1 << (7 * size_length)) - 1:
+            return None
+        if element != EBML_INFO:
+            offset += size
+            continue
+        end = offset + size
+        if end > len(head):
+            raise _Incomplete
+        scale, duration = 1_000_000, None
+        while offset < end:
+            child, length = _vint(head, offset, keep_marker=True)
+            size, size_length = _vint(head, offset + length)
+            offset += length + size_length
+            value = head[offset:offset + size]
+            if child == EBML_TIMESTAMP_SCALE:
+                scale = int.from_bytes(value, "big")
+            elif child == EBML_DURATION and size in (4, 8):
+                duration = struct.unpack(">f" if size == 4 else ">d", value)[0]
+            offset += size
+        return duration * scale / 1e9 if duration is not None else None
+
+
+def wav_layout(head: bytes) -> Tuple[bytes, int, Optional[int]]:
+    """
+    (fmt chunk body, offset of the audio data, data size or None if unset)
+    of a WAV head; the fmt body is empty if it doesn't come before the
+    data. Raises ValueError if the data chunk header isn't in `head`.
+    """
+    offset, fmt = 12, b""
+    while True:
+        if offset + 8 > len(head):
+            raise _Incomplete
+        chunk_id = head[offset:offset + 4]
+        size = int.from_bytes(head[offset + 4:offset + 8], "little")
+        if chunk_id == b"fmt ":
+            if offset + 8 + size > len(head):
+                raise _Incomplete
+            fmt = head[offset + 8:offset + 8 + size]
+        elif chunk_id == b"data":
+            return fmt, offset + 8, None if size in WAV_UNKNOWN_SIZES else size
+        # Chunks are padded to an even size
+        offset += 8 + size + (size & 1)
+
+
+class AudioInspector:
+    """
+    Inspects one audio body as it streams in.
+
+    Wrap the body with inspect(); it raises InvalidAudio as soon as the
+    first bytes show a body is not audio in `container`, and
+    DurationExceeded as soon as the audio is known to be longer than
+    `max_seconds`. Afterwards, `duration` is the length of the audio in
+    seconds, or None if its container doesn't record it.
+    """
+
+    def __init__(self, container: str, max_seconds: Optional[float] = None):
+        self.container = container
+        self.max_seconds = max_seconds
+        self.detected: Optional[str] = None
+        self.received = 0
+        # Copy of the first bytes while header metadata is being read
+        self._head: Optional[bytes] = None
+        # WAV
+        self._byte_rate = 0
+        self._data_offset = 0
+        self._data_size: Optional[int] = None
+        # WebM
+        self._declared: Optional[float] = None
+        # Ogg: granule rate of the first stream, its serial, and the page walk
+        self._granule_rate = 0
+        self._pre_skip = 0
+        self._serial: Optional[int] = None
+        self._granule = 0
+        self._page_at = 0
+        self._carry = b""
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.container == "wav" and self._byte_rate:
+            audio = max(0, self.received - self._data_offset)
+            if self._data_size is not None:
+                audio = min(audio, self._data_size)
+            return audio / self._byte_rate
+        if self.container == "ogg" and self._granule_rate:
+            return max(0, self._granule - self._pre_skip) / self._granule_rate
+        return self._declared
+
+    async def inspect(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Pass the body through, inspecting each piece before it is passed on"""
+        pending = b""
+        async for chunk in chunks:
+            if self.detected is None and len(pending) + len(chunk) < SNIFF_BYTES:
+                pending += chunk
+                continue
+            if pending:
+                chunk, pending = pending + chunk, b""
+            self.feed(chunk)
+            yield chunk
+        if pending:
+            self.feed(pending)
+            yield pending
+        self.finish()
+
+    def feed(self, chunk: bytes) -> None:
+        start = self.received
+        self.received += len(chunk)
+        if self.detected is None:
+            self.detected = sniff_container(chunk)
+            if self.detected is None:
+                raise InvalidAudio("Audio body is not in a supported format")
+            if self.detected != self.container:
+                raise InvalidAudio(
+                    f"Audio body is {self.detected}, not {self.container} as declared", self.detected
+                )
+            self._head = b""
+        if self._head is not None:
+            self._head += chunk[:HEAD_BYTES - len(self._head)]
+            self._read_head()
+        if self.container == "ogg":
+            self._walk_pages(chunk, start)
+        self._check(final=False)
+
+    def finish(self) -> None:
+        """Check the complete body"""
+        self._check(final=True)
+
+    def _read_head(self) -> None:
+        head = self._head
+        try:
+            if self.container == "wav":
+                self._read_wav(head)
+            elif self.container == "webm":
+                self._declared = _webm_duration(head)
+            elif self.container == "ogg":
+                self._read_ogg(head)
+        except _Incomplete:
+            if len(head) < HEAD_BYTES:
+                return
+        except (IndexError, struct.error, ValueError):
+            pass
+        self._head = None
+
+    def _read_wav(self, head: bytes) -> None:
+        fmt, data_offset, data_size = wav_layout(head)
+        byte_rate = int.from_bytes(fmt[8:12], "little")
+        if byte_rate:
+            self._byte_rate = byte_rate
+            self._data_offset = data_offset
+            self._data_size = data_size
+
+    def _read_ogg(self, head: bytes) -> None:
+        if len(head) < OGG_HEADER_SIZE or len(head) < OGG_HEADER_SIZE + head[26]:
+            raise _Incomplete
+        # Identification header of the codec, at the start of the first page
+        packet = head[OGG_HEADER_SIZE + head[26]:]
+        if len(packet) < 16:
+            raise _Incomplete
+        if packet[:8] == b"OpusHead":
+            self._granule_rate = OPUS_GRANULE_RATE
+            self._pre_skip = int.from_bytes(packet[10:12], "little")
+        elif packet[:7] == b"\x01vorbis":
+            self._granule_rate = int.from_bytes(packet[12:16], "little")
+
+    def _walk_pages(self, chunk: bytes, start: int) -> None:
+        """Parse the Ogg page headers in a piece of the body starting at byte `start`"""
+        if self._carry:
+            # A page header split between pieces
+            header = self._carry + chunk[:OGG_HEADER_SIZE + 255]
+            length = self._page(header, 0)
+            if length is None:
+                self._carry = header
+                return
+            self._carry = b""
+            self._page_at += length
+        position = self._page_at - start
+        while 0 <= position < len(chunk):
+            length = self._page(chunk, position)
+            if length is None:
+                self._carry = chunk[position:]
+                self._page_at = start + position
+                return
+            self._page_at += length
+            position += length
+
+    def _page(self, data: bytes, position: int) -> Optional[int]:
+        """Length of the page whose header is at `position`, or None if the header is cut off"""
+        if len(data) - position < OGG_HEADER_SIZE:
+            return None
+        capture, _, _, granule, serial, _, _, segments = OGG_PAGE_HEADER.unpack_from(data, position)
+        if capture != b"OggS":
+            raise InvalidAudio("Malformed Ogg page", "ogg")
+        table = position + OGG_HEADER_SIZE
+        if len(data) < table + segments:
+            return None
+        if self._serial is None:
+            # Durations are of the first logical stream
+            self._serial = serial
+        if granule != OGG_NO_GRANULE and serial == self._serial:
+            self._granule = granule
+        return OGG_HEADER_SIZE + segments + sum(data[table:table + segments])
+
+    def _check(self, final: bool) -> None:
+        if self.max_seconds is None:
+            return
+        if not final and self.container == "wav" and self._data_size is not None:
+            # The header says how long the rest is
+            seconds = self._data_size / self._byte_rate
+        else:
+            seconds = self.duration
+        if seconds is not None and seconds > self.max_seconds:
+            raise DurationExceeded(seconds, self.max_seconds)
@@ -0,0 +1,187 @@
+"""
+Range-capable responses for playing back stored audio
+
+GET /sessions/{id}/audio and /sessions/{id}/audio/{file} serve stored
+audio with HTTP Range support (RFC 9110), so a browser <audio> element can
+seek through an hour-long encounter without downloading it:
+- One file is served as a single FileRange.
+- A whole session is served as the Layout of its chunks joined in
+  sequence order (services/consolidation.py): a rewritten WAV header, or
+  nothing, followed by byte ranges of the chunk files. Nothing is
+  materialized; a range request is mapped onto the parts it overlaps by
+  binary search over their end offsets, so seeking costs O(log chunks)
+  whatever the position.
+
+File bytes are read through mmap, so a range costs no read() calls and
+nothing beyond the blocks sent. When the server supports the ASGI
+zero-copy send extension, open files are handed to it instead and sent
+with sendfile.
+
+A single range is honoured ("bytes=a-b", "bytes=a-", "bytes=-n"); a
+request for several ranges gets the whole body, which RFC 9110 allows.
+"""
+
+import mmap
+import os
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from services.audio_format import SNIFF_BYTES, sniff_container
+from services.consolidation import FileRange, Layout, Part, part_length
+
+
+# Bytes sent per ASGI message
+SEND_BLOCK_SIZE = 256 * 1024
+
+# Media type of each container
+CONTAINER_MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "webm": "audio/webm",
+    "mp3": "audio/mpeg",
+    "mp4": "audio/mp4",
+}
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range starts past the end of the body"""
+
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for {size} bytes")
+        self.size = size
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) byte positions requested by a Range header, or None to
+    send the whole body (no header, several ranges, or a malformed one,
+    which RFC 9110 says to ignore). Raises RangeNotSatisfiable.
+    """
+    if not range_header:
+        return None
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not first:
+            # Suffix range: the last `last` bytes
+            length = int(last)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable(size)
+            return max(0, size - length), size - 1
+        first_byte = int(first)
+        last_byte = int(last) if last else None
+    except ValueError:
+        return None
+    if first_byte < 0 or (last_byte is not None and last_byte < first_byte):
+        return None
+    if first_byte >= size:
+        raise RangeNotSatisfiable(size)
+    return first_byte, size - 1 if last_byte is None else min(last_byte, size - 1)
+
+
+def file_layout(path: str) -> Layout:
+    """Layout of one stored file; raises FileNotFoundError"""
+    with open(path, "rb") as f:
+        container = sniff_container(f.read(SNIFF_BYTES))
+        size = os.fstat(f.fileno()).st_size
+    return Layout(container or "", [FileRange(path, 0, size)], [size], 1)
+
+
+def etag_for_layout(audio: Layout) -> str:
+    """
+    Strong ETag of served audio. Stored files are never rewritten (a
+    different re-upload is a 409), so size and chunk count identify it.
+    """
+    return f'"{audio.size:x}-{audio.chunks:x}"'
+
+
+def requested_range(audio: Layout, range_header: Optional[str], if_range: Optional[str]) -> Optional[Tuple[int, int]]:
+    """parse_range(), ignoring the Range if If-Range names another version"""
+    if if_range and if_range.strip() != etag_for_layout(audio):
+        return None
+    return parse_range(range_header, audio.size)
+
+
+class AudioResponse(Response):
+    """
+    Response with the bytes `first`..`last` of a Layout, read from the
+    stored files as they are sent. 206 with Content-Range for a range,
+    200 for the whole body.
+    """
+
+    def __init__(
+        self,
+        audio: Layout,
+        byte_range: Optional[Tuple[int, int]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(
+            status_code=206 if byte_range is not None else 200,
+            headers=headers,
+            media_type=CONTAINER_MEDIA_TYPES.get(audio.container, "application/octet-stream"),
+        )
+        self.audio = audio
+        self.first, self.last = byte_range if byte_range is not None else (0, audio.size - 1)
+        self.headers["Accept-Ranges"] = "bytes"
+        self.headers["ETag"] = etag_for_layout(audio)
+        self.headers["Content-Length"] = str(self.last - self.first + 1)
+        if byte_range is not None:
+            self.headers["Content-Range"] = f"bytes {self.first}-{self.last}/{audio.size}"
+
+    def _pieces(self) -> List[Tuple[Part, int, int]]:
+        """(part, start, end) offsets within each part overlapping the range"""
+        ends = self.audio.ends
+        position, end = self.first, self.last + 1
+        index = bisect_right(ends, position)
+        pieces = []
+        while position < end:
+            part = self.audio.parts[index]
+            part_start = ends[index] - part_length(part)
+            piece_end = min(end, ends[index])
+            if piece_end > position:
+                pieces.append((part, position - part_start, piece_end - part_start))
+            position = piece_end
+            index += 1
+        return pieces
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.audio.size == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        for part, start, end in self._pieces():
+            if not isinstance(part, FileRange):
+                await send({"type": "http.response.body", "body": part[start:end], "more_body": True})
+            elif zerocopy:
+                await self._send_file(send, part, start, end)
+            else:
+                await self._send_mapped(send, part, start, end)
+        await send({"type": "http.response.body", "body": b""})
+
+    @staticmethod
+    async def _send_mapped(send: Send, part: FileRange, start: int, end: int) -> None:
+        with open(part.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(part.offset + start, part.offset + end, SEND_BLOCK_SIZE):
+                block_end = min(offset + SEND_BLOCK_SIZE, part.offset + end)
+                await send({"type": "http.response.body", "body": mapped[offset:block_end], "more_body": True})
+
+    @staticmethod
+    async def _send_file(send: Send, part: FileRange, start: int, end: int) -> None:
+        with open(part.path, "rb") as f:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": f.fileno(),
+                "offset": part.offset + start,
+                "count": end - start,
+                "more_body": True,
+            })
@@ -0,0 +1,395 @@
+"""
+Local audio storage for MedScribe Alliance Protocol
+
+Uploaded audio is streamed straight to disk instead of being buffered in
+memory. Each upload is written to a spool file of its own next to its
+final location and atomically renamed into place once the body has been
+fully received, and for session uploads only once the chunk is recorded,
+so a failed, oversized or losing concurrent upload never leaves a partial
+file behind or overwrites another.
+
+Bytes stored and bytes being spooled are tracked as files are written and
+deleted, so reporting disk usage (GET /metrics) doesn't walk the tree;
+files left by an earlier run are counted once, on first use.
+
+Every upload is hashed with SHA-256 as it streams in, and checked against
+the digests the client sent (Content-Digest, RFC 9530, or Content-MD5)
+before it is moved into place. The size and SHA-256 of each stored file
+are kept, so a re-upload can be compared with what is stored without
+reading the file again; files stored by an earlier run are hashed once,
+on first comparison.
+
+When a session ends, its chunks are joined into one file in sequence
+order by kernel-side copies (consolidate(), services/consolidation.py);
+the chunk files are kept.
+
+Files uploaded through signed URLs are received by the object store
+(services/object_store.py) and moved in with adopt() once registered.
+
+Layout:
+    <AUDIO_STORAGE_PATH>/<session_id>/<simple_filename>
+    <AUDIO_STORAGE_PATH>/<session_id>/session.<extension> (consolidated)
+
+Environment variables:
+- AUDIO_STORAGE_PATH: Root directory for stored audio (default: ./data/audio)
+- MAX_AUDIO_FILE_SIZE: Maximum size of one uploaded file in bytes (default: 100MB)
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from typing import AsyncIterator, Dict, Iterable, List, NamedTuple, Optional
+
+from services.consolidation import CONTAINER_EXTENSIONS, ConsolidatedAudio, Layout, consolidate, layout
+
+
+DEFAULT_MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+
+# Content-Digest algorithms (RFC 9530) -> hashlib names
+DIGEST_ALGORITHMS = {"sha-256": "sha256", "sha-512": "sha512"}
+
+
+class FileTooLarge(Exception):
+    """Raised as soon as an upload crosses the size limit"""
+
+    def __init__(self, received: int, limit: int):
+        super().__init__(f"Upload exceeded {limit} bytes after {received} bytes")
+        self.received = received
+        self.limit = limit
+
+
+class DigestMismatch(Exception):
+    """Raised when a received body doesn't match a digest the client sent"""
+
+    def __init__(self, algorithm: str):
+        super().__init__(f"Body does not match its {algorithm} digest")
+        self.algorithm = algorithm
+
+
+class StoredAudio(NamedTuple):
+    """Size and hex SHA-256 of an upload"""
+    size: int
+    sha256: str
+
+
+class Spooled(NamedTuple):
+    """An upload received into a spool file, not yet stored"""
+    path: str
+    stored: StoredAudio
+
+
+def parse_digest_headers(content_digest: Optional[str], content_md5: Optional[str]) -> Dict[str, bytes]:
+    """
+    Expected digests by hashlib name, from Content-Digest (sha-256 and
+    sha-512; other algorithms are ignored) and Content-MD5.
+    Raises ValueError if a header is malformed.
+    """
+    expected: Dict[str, bytes] = {}
+    try:
+        for member in filter(None, (item.strip() for item in (content_digest or "").split(","))):
+            algorithm, _, value = member.partition("=")
+            name = DIGEST_ALGORITHMS.get(algorithm.strip().lower())
+            if name is None:
+                continue
+            value = value.strip()
+            if len(value) < 2 or value[0] != ":" or value[-1] != ":":
+                raise ValueError(f"Content-Digest value of {algorithm} must be :<base64>:")
+            expected[name] = base64.b64decode(value[1:-1], validate=True)
+        if content_md5:
+            expected["md5"] = base64.b64decode(content_md5.strip(), validate=True)
+    except binascii.Error:
+        raise ValueError("Digest values must be base64")
+    for name, digest in expected.items():
+        if len(digest) != hashlib.new(name).digest_size:
+            raise ValueError(f"Invalid {name} digest length")
+    return expected
+
+
+class _BodyHasher:
+    """SHA-256 of a body plus any digests the client sent, updated per chunk"""
+
+    __slots__ = ("size", "_sha256", "_expected", "_others")
+
+    def __init__(self, expected: Optional[Dict[str, bytes]]):
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._expected = expected or {}
+        self._others = [(name, hashlib.new(name)) for name in self._expected if name != "sha256"]
+
+    def update(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        self._sha256.update(chunk)
+        for _, hasher in self._others:
+            hasher.update(chunk)
+
+    def result(self) -> StoredAudio:
+        """Size and SHA-256; DigestMismatch if an expected digest differs"""
+        sha256 = self._sha256.digest()
+        if "sha256" in self._expected and self._expected["sha256"] != sha256:
+            raise DigestMismatch("sha-256")
+        for name, hasher in self._others:
+            if self._expected[name] != hasher.digest():
+                raise DigestMismatch(name)
+        return StoredAudio(self.size, sha256.hex())
+
+
+class AudioStorage:
+    """Stores session audio files below a root directory"""
+
+    def __init__(self, root: str, max_file_size: int = DEFAULT_MAX_FILE_SIZE):
+        self.root = root
+        self.max_file_size = max_file_size
+        self.bytes_received = 0
+        self.spool_bytes = 0
+        self._stored_bytes: Optional[int] = None
+        # session_id -> filename -> size and SHA-256 of the stored file
+        self._digests: Dict[str, Dict[str, StoredAudio]] = {}
+        # session_id -> layout of its joined chunks, for playback
+        self._layouts: Dict[str, Layout] = {}
+
+    @staticmethod
+    def _tree_size(path: str) -> int:
+        total = 0
+        for directory, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return total
+
+    def stored_bytes(self) -> int:
+        """Bytes of stored audio, excluding uploads still being spooled"""
+        if self._stored_bytes is None:
+            # .part files are counted too if an earlier run crashed mid-upload
+            self._stored_bytes = self._tree_size(self.root)
+        return self._stored_bytes
+
+    def disk_free_bytes(self) -> Optional[int]:
+        try:
+            return shutil.disk_usage(self.root).free
+        except OSError:
+            return None
+
+    def _add_stored(self, size: int) -> None:
+        if self._stored_bytes is not None:
+            self._stored_bytes += size
+
+    def session_dir(self, session_id: str) -> str:
+        return os.path.join(self.root, session_id)
+
+    def path(self, session_id: str, filename: str) -> str:
+        if not filename or filename in (".", "..") or os.path.basename(filename) != filename:
+            raise ValueError(f"Invalid audio filename '{filename}'")
+        return os.path.join(self.session_dir(session_id), filename)
+
+    async def spool_stream(
+        self,
+        session_id: str,
+        chunks: AsyncIterator[bytes],
+        buffer_size: int = io.DEFAULT_BUFFER_SIZE,
+        expected: Optional[Dict[str, bytes]] = None,
+    ) -> Spooled:
+        """
+        Write an async stream of body chunks to a spool file of its own in
+        the session's directory, and return it with its size and SHA-256.
+        The file is not stored until adopt() moves it into place, or
+        deleted with discard(); concurrent uploads of the same name never
+        touch each other's bytes.
+
+        Memory use is bounded by the size of one chunk plus `buffer_size`;
+        small chunks (e.g. streamed audio frames) are coalesced into writes
+        of up to `buffer_size` bytes. The size limit is checked as each chunk
+        arrives, raising FileTooLarge without reading the rest of the body.
+        A body not matching the `expected` digests (parse_digest_headers())
+        raises DigestMismatch and is not kept.
+        """
+        session_dir = self.session_dir(session_id)
+        os.makedirs(session_dir, exist_ok=True)
+
+        # Spool in the destination directory so the final rename is atomic
+        fd, spool_path = tempfile.mkstemp(dir=session_dir, suffix=".part")
+        hasher = _BodyHasher(expected)
+        size = 0
+        try:
+            with os.fdopen(fd, "wb", buffering=buffer_size) as spool:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    self.spool_bytes += len(chunk)
+                    if size > self.max_file_size:
+                        raise FileTooLarge(size, self.max_file_size)
+                    hasher.update(chunk)
+                    # Buffered writes land in the page cache; no fsync per chunk
+                    spool.write(chunk)
+            stored = hasher.result()
+        except BaseException:
+            os.unlink(spool_path)
+            raise
+        finally:
+            self.spool_bytes -= size
+            self.bytes_received += size
+        return Spooled(spool_path, stored)
+
+    async def save_stream(
+        self,
+        session_id: str,
+        filename: str,
+        chunks: AsyncIterator[bytes],
+        buffer_size: int = io.DEFAULT_BUFFER_SIZE,
+        expected: Optional[Dict[str, bytes]] = None,
+    ) -> StoredAudio:
+        """
+        spool_stream() and store the result as `filename`, replacing any
+        file of that name
+        """
+        self.path(session_id, filename)  # ValueError before reading the body
+        spooled = await self.spool_stream(session_id, chunks, buffer_size, expected)
+        self.adopt(session_id, filename, spooled.path, spooled.stored)
+        return spooled.stored
+
+    @staticmethod
+    def discard(spooled: Spooled) -> None:
+        """Delete a spool file that is not to be stored"""
+        try:
+            os.unlink(spooled.path)
+        except FileNotFoundError:
+            pass
+
+    async def drain(self, chunks: AsyncIterator[bytes]) -> int:
+        """Read a body without storing or hashing it; its size, within the size limit"""
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            self.bytes_received += len(chunk)
+            if size > self.max_file_size:
+                raise FileTooLarge(size, self.max_file_size)
+        return size
+
+    def adopt(self, session_id: str, filename: str, source: str, stored: StoredAudio) -> None:
+        """
+        Move a file received elsewhere (the object store) into storage as
+        `filename`. A rename on the same volume; copied across volumes.
+        """
+        destination = self.path(session_id, filename)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            replaced = os.path.getsize(destination)
+        except OSError:
+            replaced = 0
+        shutil.move(source, destination)
+        self._add_stored(stored.size - replaced)
+        self._digests.setdefault(session_id, {})[filename] = stored
+
+    async def hash_stream(self, chunks: AsyncIterator[bytes], expected: Optional[Dict[str, bytes]] = None) -> StoredAudio:
+        """
+        Size and SHA-256 of a body without storing it, e.g. to compare a
+        re-upload with the stored file. Same limit and checks as save_stream().
+        """
+        hasher = _BodyHasher(expected)
+        async for chunk in chunks:
+            hasher.update(chunk)
+            self.bytes_received += len(chunk)
+            if hasher.size > self.max_file_size:
+                raise FileTooLarge(hasher.size, self.max_file_size)
+        return hasher.result()
+
+    async def stored_file(self, session_id: str, filename: str) -> Optional[StoredAudio]:
+        """Size and SHA-256 of a stored file, or None if there is none"""
+        stored = self._digests.get(session_id, {}).get(filename)
+        if stored is not None:
+            return stored
+        path = self.path(session_id, filename)
+
+        def hash_file() -> Optional[StoredAudio]:
+            hasher = _BodyHasher(None)
+            try:
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        hasher.update(block)
+            except FileNotFoundError:
+                return None
+            return hasher.result()
+
+        # Stored by an earlier run; hashed once
+        stored = await asyncio.get_running_loop().run_in_executor(None, hash_file)
+        if stored is not None:
+            self._digests.setdefault(session_id, {})[filename] = stored
+        return stored
+
+    def consolidate(self, session_id: str, filenames: Iterable[str]) -> ConsolidatedAudio:
+        """
+        Join stored files, in the order given, into session.<extension> of
+        the session and return it; an earlier consolidated file is
+        replaced. Blocking: run it in a thread. Raises CannotConsolidate
+        if the files can't be joined.
+        """
+        session_dir = self.session_dir(session_id)
+        paths = [self.path(session_id, filename) for filename in filenames]
+        fd, spool_path = tempfile.mkstemp(dir=session_dir, suffix=".part")
+        os.close(fd)
+        try:
+            audio = consolidate(paths, spool_path)
+            destination = os.path.join(session_dir, f"session.{CONTAINER_EXTENSIONS[audio.container]}")
+            try:
+                replaced = os.path.getsize(destination)
+            except OSError:
+                replaced = 0
+            os.replace(spool_path, destination)
+        except BaseException:
+            os.unlink(spool_path)
+            raise
+        self._add_stored(audio.size - replaced)
+        return audio._replace(path=destination)
+
+    def cached_layout(self, session_id: str, chunks: int) -> Optional[Layout]:
+        """Layout from session_layout() if it is still current, without blocking"""
+        cached = self._layouts.get(session_id)
+        return cached if cached is not None and cached.chunks == chunks else None
+
+    def session_layout(self, session_id: str, filenames: List[str]) -> Layout:
+        """
+        Layout of stored files joined in the order given (layout()),
+        cached per session: chunks are never rewritten, so a layout stays
+        valid until a chunk is added. Blocking unless cached_layout() has
+        it: run it in a thread. Raises CannotConsolidate if the files
+        can't be joined.
+        """
+        cached = self.cached_layout(session_id, len(filenames))
+        if cached is not None:
+            return cached
+        joined = layout([self.path(session_id, filename) for filename in filenames])
+        self._layouts[session_id] = joined
+        return joined
+
+    def delete(self, session_id: str, filename: str) -> None:
+        path = self.path(session_id, filename)
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        finally:
+            self._digests.get(session_id, {}).pop(filename, None)
+            self._layouts.pop(session_id, None)
+        self._add_stored(-size)
+
+    def delete_session(self, session_id: str) -> None:
+        """Remove every stored file of a session"""
+        session_dir = self.session_dir(session_id)
+        self._digests.pop(session_id, None)
+        self._layouts.pop(session_id, None)
+        if self._stored_bytes is not None:
+            self._add_stored(-self._tree_size(session_dir))
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+# Shared storage used by all routes
+AUDIO_STORAGE = AudioStorage(
+    root=os.getenv("AUDIO_STORAGE_PATH", os.path.join("data", "audio")),
+    max_file_size=int(os.getenv("MAX_AUDIO_FILE_SIZE", str(DEFAULT_MAX_FILE_SIZE))),
+)
@@ -0,0 +1,492 @@
+"""
+Authentication of API keys and OIDC bearer tokens (spec/05)
+
+Every /v1 route depends on authenticate(), which resolves the caller to a
+Principal (key or subject ID, tenant) from either:
+- X-API-Key: looked up by SHA-256 digest in a table of issued keys, so the
+  server never holds the keys themselves. The digest is most of the cost
+  of a lookup (~1 µs), so there is nothing worth caching.
+- Authorization: Bearer <JWT>: an RS256 (or HS256) token of the OIDC
+  issuer, verified against the issuer's JWKS. Verified claims are cached
+  for AUTH_TOKEN_CACHE_SECONDS, never past the token's exp, so a repeat
+  request skips the signature check (~0.3 ms for RS256 in pure Python).
+
+The JWKS and the API key file are refreshed in the background every
+AUTH_REFRESH_SECONDS; a token signed with an unknown kid triggers an
+early JWKS refresh, at most once per JWKS_MIN_REFRESH_SECONDS. Revoked
+API keys stop working at the next refresh. Tokens whose key is dropped
+from the JWKS keep working until their cache entry expires.
+
+Modes:
+- off: credentials are not checked; callers are anonymous (the mock default)
+- optional: credentials are checked when given; requests without any
+  are anonymous
+- required: every /v1 request needs a valid API key or token
+
+Environment variables:
+- AUTH_MODE: "off" (default), "optional" or "required"
+- AUTH_API_KEYS: Comma-separated "<key>:<tenant_id>" pairs, for development
+- AUTH_API_KEYS_FILE: JSON list of {"key_id", "tenant_id", "sha256"} of
+  issued keys (sha256: hex digest of the key)
+- AUTH_JWKS_FILE: Local JWKS file of the OIDC issuer
+- AUTH_JWKS_URL: JWKS URL of the OIDC issuer (used when no file is given)
+- AUTH_OIDC_ISSUER: Required "iss" of tokens (default: not checked)
+- AUTH_OIDC_AUDIENCE: Required "aud" of tokens (default: not checked)
+- AUTH_TENANT_CLAIM: Token claim holding the tenant ID (default: tenant_id)
+- AUTH_REFRESH_SECONDS: Interval of the JWKS / key file refresh (default: 300)
+- AUTH_TOKEN_CACHE_SIZE: Verified tokens kept (default: 10000)
+- AUTH_TOKEN_CACHE_SECONDS: How long verified claims are reused (default: 60)
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.exceptions import WebSocketException
+from starlette.requests import HTTPConnection
+
+
+logger = logging.getLogger(__name__)
+
+AUTH_MODES = ("off", "optional", "required")
+
+# Clock skew allowed on exp / nbf
+LEEWAY_SECONDS = 30
+# Lower bound between JWKS refreshes triggered by unknown kids
+JWKS_MIN_REFRESH_SECONDS = 30
+
+# DER prefix of a SHA-256 DigestInfo (RFC 8017 §9.2)
+SHA256_DIGEST_INFO = bytes.fromhex("3031300d060960864801650304020105000420")
+
+WS_AUTHENTICATION_FAILED = 4401
+
+
+class AuthenticationError(Exception):
+    """Missing or invalid credentials; rendered as 401 authentication_failed"""
+
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class Principal:
+    """Authenticated caller"""
+
+    __slots__ = ("method", "subject", "tenant_id")
+
+    def __init__(self, method: str, subject: str, tenant_id: Optional[str]):
+        self.method = method  # "api_key" or "oidc"
+        self.subject = subject  # key ID or token subject
+        self.tenant_id = tenant_id
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _int_from_b64(segment: str) -> int:
+    return int.from_bytes(_b64decode(segment), "big")
+
+
+def verify_rs256(signing_input: bytes, signature: bytes, n: int, e: int) -> bool:
+    """RSASSA-PKCS1-v1_5 with SHA-256, comparing the full expected encoding"""
+    k = (n.bit_length() + 7) // 8
+    if len(signature) != k:
+        return False
+    s = int.from_bytes(signature, "big")
+    if s >= n:
+        return False
+    encoded = pow(s, e, n).to_bytes(k, "big")
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    expected = b"\x00\x01" + b"\xff" * (k - len(digest_info) - 3) + b"\x00" + digest_info
+    return hmac.compare_digest(encoded, expected)
+
+
+class LRU:
+    """Bounded mapping dropping the least recently used entries"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ApiKeyTable:
+    """SHA-256 digests of issued API keys"""
+
+    def __init__(self, path: Optional[str] = None, keys: str = ""):
+        self.path = path
+        self.dev_keys = keys
+        self._digests: Dict[bytes, Principal] = {}
+        self._mtime: Optional[float] = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """Re-read the key file if it changed; True if the table was rebuilt"""
+        mtime = None
+        if self.path:
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError as e:
+                logger.warning("API key file %s: %s", self.path, e)
+                return False
+            if mtime == self._mtime:
+                return False
+
+        digests: Dict[bytes, Principal] = {}
+        for pair in filter(None, (item.strip() for item in self.dev_keys.split(","))):
+            key, _, tenant_id = pair.partition(":")
+            digest = hashlib.sha256(key.encode()).digest()
+            digests[digest] = Principal("api_key", f"key_{digest.hex()[:12]}", tenant_id or None)
+        if self.path:
+            try:
+                with open(self.path) as f:
+                    for entry in json.load(f):
+                        digests[bytes.fromhex(entry["sha256"])] = Principal(
+                            "api_key", entry["key_id"], entry.get("tenant_id"))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning("API key file %s not loaded: %s", self.path, e)
+                return False
+
+        self._digests = digests
+        self._mtime = mtime
+        return True
+
+    def lookup(self, key: str) -> Optional[Principal]:
+        return self._digests.get(hashlib.sha256(key.encode()).digest())
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+class JWKSCache:
+    """Verification keys of the OIDC issuer by kid, from a file or URL"""
+
+    def __init__(self, path: Optional[str] = None, url: Optional[str] = None):
+        self.path = path
+        self.url = url
+        # kid -> (alg, key): (n, e) for RSA, bytes for oct
+        self.keys: Dict[str, Tuple[str, Any]] = {}
+        self.refreshed_at = 0.0
+        self.refreshes = 0
+        self._mtime: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.path or self.url)
+
+    def load(self, document: Dict[str, Any]) -> None:
+        keys = {}
+        for jwk in document.get("keys", []):
+            if jwk.get("use", "sig") != "sig":
+                continue
+            kid = jwk.get("kid", "")
+            try:
+                if jwk.get("kty") == "RSA":
+                    keys[kid] = ("RS256", (_int_from_b64(jwk["n"]), _int_from_b64(jwk["e"])))
+                elif jwk.get("kty") == "oct":
+                    keys[kid] = ("HS256", _b64decode(jwk["k"]))
+            except (KeyError, ValueError) as e:
+                logger.warning("Skipping JWK %r: %s", kid, e)
+        self.keys = keys
+
+    def _fetch(self) -> Optional[Dict[str, Any]]:
+        """Read the JWKS (blocking); None if unchanged or unavailable"""
+        if self.path:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return None
+            with open(self.path) as f:
+                document = json.load(f)
+            self._mtime = mtime
+            return document
+        with urllib.request.urlopen(self.url, timeout=10) as response:
+            return json.loads(response.read())
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            try:
+                document = await asyncio.get_running_loop().run_in_executor(None, self._fetch)
+            except (OSError, ValueError) as e:
+                # Keep verifying with the keys we have
+                logger.warning("JWKS refresh from %s failed: %s", self.path or self.url, e)
+                return
+            finally:
+                self.refreshed_at = time.monotonic()
+            if document is not None:
+                self.load(document)
+                self.refreshes += 1
+
+    async def get(self, kid: str) -> Optional[Tuple[str, Any]]:
+        key = self.keys.get(kid)
+        if key is None and self.configured and time.monotonic() - self.refreshed_at >= JWKS_MIN_REFRESH_SECONDS:
+            # Possibly a rotated key the issuer has published since
+            await self.refresh()
+            key = self.keys.get(kid)
+        return key
+
+
+class Authenticator:
+    """Resolves X-API-Key / bearer credentials to a Principal"""
+
+    def __init__(
+        self,
+        mode: str = "off",
+        api_keys: Optional[ApiKeyTable] = None,
+        jwks: Optional[JWKSCache] = None,
+        issuer: Optional[str] = None,
+        audience: Optional[str] = None,
+        tenant_claim: str = "tenant_id",
+        token_cache_size: int = 10000,
+        token_cache_seconds: float = 60,
+        refresh_seconds: float = 300,
+    ):
+        if mode not in AUTH_MODES:
+            raise ValueError(f"AUTH_MODE must be one of {', '.join(AUTH_MODES)}")
+        self.mode = mode
+        self.api_keys = api_keys or ApiKeyTable()
+        self.jwks = jwks or JWKSCache()
+        self.issuer = issuer
+        self.audience = audience
+        self.tenant_claim = tenant_claim
+        self.token_cache_seconds = token_cache_seconds
+        self.refresh_seconds = refresh_seconds
+        # token -> (principal, cached until as time.time())
+        self._tokens = LRU(token_cache_size)
+        self._task: Optional[asyncio.Task] = None
+        self.rejected = 0
+        self.token_hits = 0
+        self.token_misses = 0
+
+    async def start(self) -> None:
+        if self.mode == "off":
+            return
+        if self.jwks.configured:
+            await self.jwks.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            if self.api_keys.path:
+                await asyncio.get_running_loop().run_in_executor(None, self.api_keys.reload)
+            if self.jwks.configured:
+                await self.jwks.refresh()
+
+    async def authenticate(self, api_key: Optional[str], authorization: Optional[str]) -> Optional[Principal]:
+        """Principal of the credentials; None if anonymous, AuthenticationError if invalid"""
+        if self.mode == "off":
+            return None
+        if api_key:
+            principal = self.api_keys.lookup(api_key)
+            if principal is None:
+                self.rejected += 1
+                raise AuthenticationError("Invalid API key")
+            return principal
+        if authorization:
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                self.rejected += 1
+                raise AuthenticationError("Unsupported authorization scheme")
+            try:
+                return await self.verify_token(token.strip())
+            except AuthenticationError:
+                self.rejected += 1
+                raise
+        if self.mode == "required":
+            self.rejected += 1
+            raise AuthenticationError("API key is required")
+        return None
+
+    async def verify_token(self, token: str) -> Principal:
+        cached = self._tokens.get(token)
+        if cached is not None:
+            principal, cached_until = cached
+            if time.time() < cached_until:
+                self.token_hits += 1
+                return principal
+            self._tokens.pop(token)
+        self.token_misses += 1
+
+        claims = await self._verify_signature(token)
+        now = time.time()
+        try:
+            expires_at = float(claims["exp"])
+        except (KeyError, TypeError, ValueError):
+            raise AuthenticationError("Token has no valid exp")
+        if now > expires_at + LEEWAY_SECONDS:
+            raise AuthenticationError("Token has expired")
+        if isinstance(claims.get("nbf"), (int, float)) and now + LEEWAY_SECONDS < claims["nbf"]:
+            raise AuthenticationError("Token is not yet valid")
+        if self.issuer and claims.get("iss") != self.issuer:
+            raise AuthenticationError("Token issuer is not accepted")
+        if self.audience:
+            audience = claims.get("aud")
+            if self.audience not in (audience if isinstance(audience, list) else [audience]):
+                raise AuthenticationError("Token audience is not accepted")
+        subject = claims.get("sub")
+        if not isinstance(subject, str) or not subject:
+            raise AuthenticationError("Token has no subject")
+
+        tenant_id = claims.get(self.tenant_claim)
+        principal = Principal("oidc", subject, str(tenant_id) if tenant_id is not None else None)
+        self._tokens.put(token, (principal, min(now + self.token_cache_seconds, expires_at + LEEWAY_SECONDS)))
+        return principal
+
+    async def _verify_signature(self, token: str) -> Dict[str, Any]:
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = json.loads(_b64decode(header_segment))
+            signature = _b64decode(signature_segment)
+        except ValueError:
+            raise AuthenticationError("Malformed token")
+        if not isinstance(header, dict):
+            raise AuthenticationError("Malformed token")
+
+        kid = header.get("kid", "")
+        if not isinstance(kid, str):
+            raise AuthenticationError("Malformed token")
+        key = await self.jwks.get(kid)
+        # The key decides the algorithm, never the token header alone
+        if key is None or key[0] != header.get("alg"):
+            raise AuthenticationError("Token signing key is not recognized")
+        alg, material = key
+        signing_input = f"{header_segment}.{payload_segment}".encode()
+        if alg == "RS256":
+            valid = verify_rs256(signing_input, signature, *material)
+        else:
+            valid = hmac.compare_digest(hmac.new(material, signing_input, hashlib.sha256).digest(), signature)
+        if not valid:
+            raise AuthenticationError("Invalid token signature")
+
+        try:
+            claims = json.loads(_b64decode(payload_segment))
+        except ValueError:
+            raise AuthenticationError("Malformed token")
+        if not isinstance(claims, dict):
+            raise AuthenticationError("Malformed token")
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "api_keys": len(self.api_keys),
+            "jwks_keys": len(self.jwks.keys),
+            "jwks_refreshes": self.jwks.refreshes,
+            "token_cache_size": len(self._tokens),
+            "token_cache_hits": self.token_hits,
+            "token_cache_misses": self.token_misses,
+            "rejected": self.rejected,
+        }
+
+
+def auth_error_response(message: str) -> JSONResponse:
+    """401 authentication_failed (spec/05 §5.1)"""
+    return JSONResponse(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        headers={"WWW-Authenticate": "Bearer"},
+        content={
+            "error": {
+                "code": "authentication_failed",
+                "message": message,
+                "details": {},
+            }
+        },
+    )
+
+
+async def authentication_error_handler(request, exc: AuthenticationError) -> JSONResponse:
+    return auth_error_response(exc.message)
+
+
+async def authenticate(connection: HTTPConnection) -> Optional[Principal]:
+    """
+    Router dependency: authenticate the caller and keep the Principal on
+    connection.state.principal (None when anonymous).
+
+    Headers are read from the connection rather than declared as Header()
+    parameters, which FastAPI re-inspects on every request.
+
+    WebSocket handshakes are refused with close code 4401, as no HTTP
+    response can be sent on them.
+    """
+    headers = connection.headers
+    try:
+        principal = await AUTHENTICATOR.authenticate(headers.get("x-api-key"), headers.get("authorization"))
+    except AuthenticationError as e:
+        if connection.scope["type"] == "websocket":
+            raise WebSocketException(code=WS_AUTHENTICATION_FAILED, reason=e.message)
+        raise
+    connection.state.principal = principal
+    return principal
+
+
+async def caller_tenant_id(connection: HTTPConnection) -> Optional[str]:
+    """
+    Tenant of the caller: the one its credentials belong to, else X-Tenant-ID.
+    Relies on authenticate() having run as a router dependency.
+    """
+    principal = principal_of(connection)
+    if principal is not None and principal.tenant_id is not None:
+        return principal.tenant_id
+    return connection.headers.get("x-tenant-id")
+
+
+def principal_of(connection: HTTPConnection) -> Optional[Principal]:
+    """Principal stored by authenticate(), if any"""
+    return connection.scope.get("state", {}).get("principal")
+
+
+AUTHENTICATOR = Authenticator(
+    mode=os.getenv("AUTH_MODE", "off").lower(),
+    api_keys=ApiKeyTable(
+        path=os.getenv("AUTH_API_KEYS_FILE") or None,
+        keys=os.getenv("AUTH_API_KEYS", ""),
+    ),
+    jwks=JWKSCache(
+        path=os.getenv("AUTH_JWKS_FILE") or None,
+        url=os.getenv("AUTH_JWKS_URL") or None,
+    ),
+    issuer=os.getenv("AUTH_OIDC_ISSUER") or None,
+    audience=os.getenv("AUTH_OIDC_AUDIENCE") or None,
+    tenant_claim=os.getenv("AUTH_TENANT_CLAIM", "tenant_id"),
+    token_cache_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    token_cache_seconds=float(os.getenv("AUTH_TOKEN_CACHE_SECONDS", "60")),
+    refresh_seconds=float(os.getenv("AUTH_REFRESH_SECONDS", "300")),
+)
@@ -0,0 +1,160 @@
+"""
+Sequence-indexed map of the audio chunks received for a session
+
+Chunked uploads are named {base_name}_{sequence_number}.{extension}
+(spec/07) and may arrive out of order, concurrently or more than once
+(client retries). The map keeps:
+- a presence bitmap indexed by sequence number, for O(1) duplicate checks
+- the received sequence numbers and their stored filenames, sorted by
+  sequence, so processing and status responses list chunks in playback
+  order without sorting on every read
+- the duration of each chunk where its container records one
+  (services/audio_format.py), and a running total, so session duration
+  limits are checked in O(1)
+
+In-order arrival (the common case) appends in O(1); an out-of-order
+chunk is inserted with a binary search. Gaps are reported by walking
+the sorted sequence numbers, so reporting costs O(chunks + gaps).
+
+Environment variables:
+- AUDIO_MAX_CHUNKS: Highest sequence number accepted is this minus one
+  (default: 10000); bounds the bitmap at AUDIO_MAX_CHUNKS / 8 bytes
+"""
+
+import os
+import re
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+MAX_CHUNKS = int(os.getenv("AUDIO_MAX_CHUNKS", "10000"))
+
+# Zero-based, no zero padding: audio_0.webm, audio_12.webm (not audio_01.webm)
+CHUNK_FILENAME_PATTERN = re.compile(r"^(.+)_(0|[1-9][0-9]*)\.([A-Za-z0-9]+)$")
+
+
+def parse_chunk_filename(file_name: str) -> Optional[Tuple[int, str]]:
+    """Return (sequence_number, extension), or None if the name doesn't follow spec/07"""
+    match = CHUNK_FILENAME_PATTERN.match(file_name)
+    if match is None:
+        return None
+    return int(match.group(2)), match.group(3)
+
+
+class ChunkMap:
+    """Audio chunks of one session, keyed and ordered by sequence number"""
+
+    __slots__ = ("_bitmap", "_sequences", "_filenames", "_durations", "seconds", "timed")
+
+    def __init__(self, chunks: Iterable[Tuple] = ()):
+        self._bitmap = bytearray()
+        self._sequences: List[int] = []
+        self._filenames: List[str] = []
+        self._durations: List[Optional[float]] = []
+        # Total seconds of the chunks with a known duration, and their number
+        self.seconds = 0.0
+        self.timed = 0
+        for chunk in chunks:
+            self.add(*chunk)
+
+    def __contains__(self, sequence: int) -> bool:
+        index = sequence >> 3
+        return index < len(self._bitmap) and bool(self._bitmap[index] & (1 << (sequence & 7)))
+
+    def __len__(self) -> int:
+        return len(self._sequences)
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        return zip(self._sequences, self._filenames)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ChunkMap):
+            return NotImplemented
+        return (
+            self._sequences == other._sequences
+            and self._filenames == other._filenames
+            and self._durations == other._durations
+        )
+
+    def __repr__(self) -> str:
+        return f"ChunkMap({list(self)!r})"
+
+    def add(self, sequence: int, filename: str, seconds: Optional[float] = None) -> bool:
+        """Record a chunk; returns False if the sequence number was already present"""
+        if sequence < 0:
+            raise ValueError(f"Invalid sequence number {sequence}")
+        if sequence in self:
+            return False
+        index = sequence >> 3
+        if index >= len(self._bitmap):
+            self._bitmap.extend(bytes(index + 1 - len(self._bitmap)))
+        self._bitmap[index] |= 1 << (sequence & 7)
+
+        if not self._sequences or sequence > self._sequences[-1]:
+            self._sequences.append(sequence)
+            self._filenames.append(filename)
+            self._durations.append(seconds)
+        else:
+            position = bisect_left(self._sequences, sequence)
+            self._sequences.insert(position, sequence)
+            self._filenames.insert(position, filename)
+            self._durations.insert(position, seconds)
+        if seconds is not None:
+            self.seconds += seconds
+            self.timed += 1
+        return True
+
+    def get(self, sequence: int) -> Optional[str]:
+        """Filename stored for a sequence number, or None"""
+        if sequence not in self:
+            return None
+        return self._filenames[bisect_left(self._sequences, sequence)]
+
+    def duration(self, sequence: int) -> Optional[float]:
+        """Seconds of audio in a chunk, or None if not received or not known"""
+        if sequence not in self:
+            return None
+        return self._durations[bisect_left(self._sequences, sequence)]
+
+    def filenames(self) -> List[str]:
+        """Stored filenames in sequence order; the list is shared, do not modify it"""
+        return self._filenames
+
+    def next_sequence(self) -> int:
+        """Sequence number following the highest one received"""
+        return self._sequences[-1] + 1 if self._sequences else 0
+
+    def missing(self, expected: int = 0) -> List[int]:
+        """
+        Sequence numbers not received: gaps below the highest one received,
+        plus any up to `expected` chunks (the client's audio_files_sent).
+        """
+        missing: List[int] = []
+        previous = -1
+        for sequence in self._sequences:
+            if sequence > previous + 1:
+                missing.extend(range(previous + 1, sequence))
+            previous = sequence
+        missing.extend(range(previous + 1, expected))
+        return missing
+
+    def copy(self) -> "ChunkMap":
+        chunks = ChunkMap()
+        chunks._bitmap = bytearray(self._bitmap)
+        chunks._sequences = list(self._sequences)
+        chunks._filenames = list(self._filenames)
+        chunks._durations = list(self._durations)
+        chunks.seconds = self.seconds
+        chunks.timed = self.timed
+        return chunks
+
+    def to_list(self) -> List[List]:
+        """JSON-serializable [[sequence, filename], ...], with the seconds of chunks whose duration is known"""
+        return [
+            [sequence, filename] if seconds is None else [sequence, filename, seconds]
+            for sequence, filename, seconds in zip(self._sequences, self._filenames, self._durations)
+        ]
+
+    @classmethod
+    def from_list(cls, chunks: Iterable[List]) -> "ChunkMap":
+        return cls(chunks)
@@ -0,0 +1,195 @@
+"""
+Consolidation of a session's audio chunks into one file
+
+Chunks must be processed in sequence order (spec/07), and a processing
+backend wants one contiguous audio stream per session. When a session
+ends, its chunks are joined in sequence order into
+<AUDIO_STORAGE_PATH>/<session_id>/session.<extension>.
+
+The audio is copied file to file inside the kernel (copy_file_range, or
+sendfile where it isn't available), so audio bytes never pass through
+Python buffers; only the container headers are read and written:
+- WAV: the first chunk's header, with its RIFF and data sizes patched to
+  the total, followed by the data of every chunk. All chunks must share
+  the same fmt chunk.
+- Ogg, MP3 and WebM: chunks are concatenated as they are; the result is
+  a chained Ogg stream (RFC 3533), a run of MPEG frames, or an EBML
+  stream of one document per chunk (RFC 8794).
+- MP4: each chunk has its own sample index (moov), so joining them means
+  remuxing; sessions in MP4 are not consolidated.
+
+layout() describes the joined file as header bytes and byte ranges of
+the chunk files without writing it, so it can also be served directly
+(GET /sessions/{id}/audio, services/audio_playback.py).
+"""
+
+import errno
+import os
+from itertools import accumulate
+from typing import List, NamedTuple, Tuple, Union
+
+from services.audio_format import HEAD_BYTES, SNIFF_BYTES, sniff_container, wav_layout
+
+
+# Containers whose files are joined byte for byte
+CONCATENATED_CONTAINERS = ("ogg", "mp3", "webm")
+
+# Extension of the consolidated file of each container
+CONTAINER_EXTENSIONS = {"wav": "wav", "ogg": "ogg", "mp3": "mp3", "webm": "webm"}
+
+# Largest RIFF size field; longer WAV files keep the "unknown size" marker
+WAV_MAX_SIZE = 0xFFFFFFFF
+
+# Bytes handed to the kernel per copy call
+COPY_BLOCK_SIZE = 64 * 1024 * 1024
+
+
+class CannotConsolidate(Exception):
+    """The chunks of a session can't be joined into one file"""
+
+
+class ConsolidatedAudio(NamedTuple):
+    """A session's audio joined into one file"""
+    path: str
+    container: str
+    size: int
+    chunks: int
+
+
+class FileRange(NamedTuple):
+    """Byte range of a stored file"""
+    path: str
+    offset: int
+    length: int
+
+
+# Piece of joined audio: literal bytes (e.g. a rewritten header) or a file range
+Part = Union[bytes, FileRange]
+
+
+def part_length(part: Part) -> int:
+    return part.length if isinstance(part, FileRange) else len(part)
+
+
+class Layout(NamedTuple):
+    """
+    Joined audio as a list of parts, each bytes or a FileRange, with the
+    offset in the joined file where each part ends
+    """
+    container: str
+    parts: List[Part]
+    ends: List[int]
+    chunks: int
+
+    @property
+    def size(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+
+# Checked once: copy_file_range is missing on non-Linux platforms and
+# before Python 3.8, and unsupported on some filesystems
+_copy_file_range = getattr(os, "copy_file_range", None)
+_sendfile = getattr(os, "sendfile", None)
+
+
+def copy_range(source_fd: int, destination_fd: int, offset: int, count: int) -> None:
+    """Copy `count` bytes at `offset` of one file to the current position of another"""
+    global _copy_file_range
+    end = offset + count
+    while offset < end:
+        size = min(end - offset, COPY_BLOCK_SIZE)
+        if _copy_file_range is not None:
+            try:
+                copied = _copy_file_range(source_fd, destination_fd, size, offset)
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+                    raise
+                _copy_file_range = None
+                continue
+        elif _sendfile is not None:
+            copied = _sendfile(destination_fd, source_fd, offset, size)
+        else:
+            # No kernel copy on this platform
+            os.write(destination_fd, os.pread(source_fd, size, offset))
+            copied = size
+        if copied == 0:
+            raise CannotConsolidate("Chunk file shrank while being consolidated")
+        offset += copied
+
+
+def _wav_parts(paths: List[str], heads: List[bytes]) -> List[Part]:
+    """Header with patched sizes, the data of every chunk, and a pad byte if needed"""
+    sources = []
+    header, fmt = b"", None
+    for path, head in zip(paths, heads):
+        try:
+            chunk_fmt, data_offset, data_size = wav_layout(head)
+        except ValueError:
+            raise CannotConsolidate(f"No data chunk in the first {HEAD_BYTES} bytes of {os.path.basename(path)}")
+        if len(chunk_fmt) < 16:
+            raise CannotConsolidate(f"No fmt chunk before the data of {os.path.basename(path)}")
+        if fmt is None:
+            fmt, header = chunk_fmt, bytearray(head[:data_offset])
+        elif chunk_fmt != fmt:
+            raise CannotConsolidate(f"{os.path.basename(path)} has a different WAV format from the first chunk")
+        available = os.path.getsize(path) - data_offset
+        sources.append(FileRange(path, data_offset, min(available, data_size) if data_size is not None else available))
+
+    data_size = sum(source.length for source in sources)
+    # The data chunk is padded to an even size, and the pad counts in RIFF
+    riff_size = len(header) - 8 + data_size + (data_size & 1)
+    header[4:8] = min(riff_size, WAV_MAX_SIZE).to_bytes(4, "little")
+    header[-4:] = (data_size if riff_size <= WAV_MAX_SIZE else WAV_MAX_SIZE).to_bytes(4, "little")
+    return [bytes(header), *sources] + ([b"\0"] if data_size & 1 else [])
+
+
+def layout(paths: List[str]) -> Layout:
+    """
+    Layout of chunk files joined in the order given; only their headers
+    are read. Raises CannotConsolidate if the chunks are in different
+    containers or one that can't be joined.
+    """
+    if not paths:
+        raise CannotConsolidate("Session has no audio")
+    heads = []
+    for path in paths:
+        with open(path, "rb") as f:
+            heads.append(f.read(HEAD_BYTES))
+    containers = {sniff_container(head[:SNIFF_BYTES]) for head in heads}
+    if len(containers) != 1:
+        raise CannotConsolidate("Chunks are in different containers")
+    container = containers.pop()
+
+    if container == "wav":
+        parts = _wav_parts(paths, heads)
+    elif container in CONCATENATED_CONTAINERS:
+        parts = [FileRange(path, 0, os.path.getsize(path)) for path in paths]
+    else:
+        raise CannotConsolidate(f"Chunks in {container or 'an unknown container'} can't be joined without remuxing")
+    return Layout(container, parts, list(accumulate(map(part_length, parts))), len(paths))
+
+
+def consolidate(paths: List[str], destination: str) -> ConsolidatedAudio:
+    """
+    Join chunk files, in the order given, into `destination` (which is
+    overwritten). Raises CannotConsolidate as layout() does.
+    """
+    joined = layout(paths)
+    # Not O_TRUNC: ext4 flushes a file truncated to zero when it is closed
+    # (auto_da_alloc), which would write the whole result back synchronously
+    fd = os.open(destination, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        for part in joined.parts:
+            if not isinstance(part, FileRange):
+                os.write(fd, part)
+                continue
+            source_fd = os.open(part.path, os.O_RDONLY)
+            try:
+                copy_range(source_fd, fd, part.offset, part.length)
+            finally:
+                os.close(source_fd)
+        if joined.size < os.fstat(fd).st_size:
+            os.ftruncate(fd, joined.size)
+    finally:
+        os.close(fd)
+    return ConsolidatedAudio(destination, joined.container, joined.size, joined.chunks)
@@ -0,0 +1,183 @@
+"""
+Session expiry scheduler for MedScribe Alliance Protocol
+
+Sessions that are not ended before `expires_at` MUST move to `expired`
+(spec/06 §6.5). Deadlines are kept in a min-heap so each sweep only pops
+the sessions that are actually due: O(log n) per expired session, with no
+scan of the session store however many sessions are live.
+
+Entries are removed lazily: when a session is ended, its heap entry stays
+put and is discarded when it surfaces, after re-checking the session.
+
+Expiring a session:
+1. Sets status to `expired`
+2. Deletes its stored audio
+3. Notifies listeners registered with add_listener()
+4. Schedules the session record itself for removal after a retention period
+
+Environment variables:
+- EXPIRY_SWEEP_INTERVAL_SECONDS: Maximum time between sweeps (default: 1)
+- EXPIRED_SESSION_RETENTION_SECONDS: How long expired sessions stay
+  readable (410 Gone) before they are purged (default: 86400)
+"""
+
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models import SessionStatus
+from services.audio_storage import AUDIO_STORAGE, AudioStorage
+from services.session_store import SESSION_STORE, SessionStore
+
+
+# Sessions in these states are still waiting for audio and can expire
+EXPIRABLE_STATUSES = (SessionStatus.CREATED, SessionStatus.INITIALIZED, SessionStatus.RECORDING)
+
+_EXPIRE = 0
+_PURGE = 1
+
+
+def _timestamp(value: datetime) -> float:
+    """Session datetimes are naive UTC"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class ExpiryScheduler:
+    """Min-heap of session deadlines swept by a background task"""
+
+    def __init__(
+        self,
+        store: SessionStore,
+        storage: AudioStorage,
+        sweep_interval: float = 1.0,
+        retention_seconds: float = 86400,
+        max_batch: int = 1000,
+    ):
+        self.store = store
+        self.storage = storage
+        self.sweep_interval = sweep_interval
+        self.retention_seconds = retention_seconds
+        self.max_batch = max_batch
+
+        self._heap: List[Tuple[float, str, int]] = []
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+        self.sweeps = 0
+        self.total_expired = 0
+        self.total_purged = 0
+        self.last_sweep_expired = 0
+        self.last_sweep_seconds = 0.0
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Register a callback invoked with each session as it expires"""
+        self._listeners.append(callback)
+
+    def schedule(self, session_id: str, expires_at: datetime) -> None:
+        heapq.heappush(self._heap, (_timestamp(expires_at), session_id, _EXPIRE))
+
+    def load(self) -> None:
+        """Schedule every session of this process already in the store (used once at startup)"""
+        for session_id in self.store.owned():
+            session = self.store.get(session_id)
+            if session is None:
+                continue
+            if session["status"] in EXPIRABLE_STATUSES:
+                self._heap.append((_timestamp(session["expires_at"]), session_id, _EXPIRE))
+            elif session["status"] == SessionStatus.EXPIRED:
+                deadline = _timestamp(session["expires_at"]) + self.retention_seconds
+                self._heap.append((deadline, session_id, _PURGE))
+        heapq.heapify(self._heap)
+
+    def expire(self, session_id: str, now: Optional[float] = None) -> bool:
+        """
+        Expire one session if it is still waiting for audio.
+
+        Safe to call from request handlers that notice a session is past its
+        deadline before the next sweep reaches it. Returns True if the
+        session was expired by this call.
+        """
+        session = self.store.get(session_id)
+        if session is None or session["status"] not in EXPIRABLE_STATUSES:
+            return False
+
+        self.store.update(session_id, status=SessionStatus.EXPIRED)
+        self.storage.delete_session(session_id)
+        self.total_expired += 1
+
+        now = time.time() if now is None else now
+        heapq.heappush(self._heap, (now + self.retention_seconds, session_id, _PURGE))
+
+        for listener in self._listeners:
+            listener(session)
+        return True
+
+    def check_expired(self, session: Dict[str, Any]) -> bool:
+        """Expire the session now if its deadline has passed; O(1)"""
+        if session["status"] in EXPIRABLE_STATUSES and datetime.utcnow() >= session["expires_at"]:
+            self.expire(session["session_id"])
+        return session["status"] == SessionStatus.EXPIRED
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Process every due deadline (up to max_batch); returns sessions expired"""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        expired = 0
+        processed = 0
+
+        heap = self._heap
+        while heap and heap[0][0] <= now and processed < self.max_batch:
+            deadline, session_id, action = heapq.heappop(heap)
+            processed += 1
+            if action == _EXPIRE:
+                session = self.store.get(session_id)
+                # Stale entry: session ended, was purged, or had its deadline moved
+                if session is None or _timestamp(session["expires_at"]) > deadline:
+                    continue
+                if self.expire(session_id, now):
+                    expired += 1
+            else:
+                session = self.store.get(session_id)
+                if session is not None and session["status"] == SessionStatus.EXPIRED:
+                    self.store.delete(session_id)
+                    self.total_purged += 1
+
+        self.sweeps += 1
+        self.last_sweep_expired = expired
+        self.last_sweep_seconds = time.perf_counter() - started
+        return expired
+
+    async def run(self) -> None:
+        """Sweep forever; cancel the task to stop"""
+        while True:
+            self.sweep()
+            heap = self._heap
+            if heap and heap[0][0] <= time.time():
+                # Batch limit reached; yield to request handlers, then continue
+                await asyncio.sleep(0)
+                continue
+            delay = self.sweep_interval
+            if heap:
+                delay = min(delay, max(0.0, heap[0][0] - time.time()))
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scheduled": len(self._heap),
+            "sweeps": self.sweeps,
+            "total_expired": self.total_expired,
+            "total_purged": self.total_purged,
+            "last_sweep_expired": self.last_sweep_expired,
+            "last_sweep_ms": round(self.last_sweep_seconds * 1000, 3),
+        }
+
+
+# Shared scheduler used by all routes
+EXPIRY_SCHEDULER = ExpiryScheduler(
+    SESSION_STORE,
+    AUDIO_STORAGE,
+    sweep_interval=float(os.getenv("EXPIRY_SWEEP_INTERVAL_SECONDS", "1")),
+    retention_seconds=float(os.getenv("EXPIRED_SESSION_RETENTION_SECONDS", "86400")),
+)
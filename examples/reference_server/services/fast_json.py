@@ -0,0 +1,55 @@
+"""
+Fast JSON encoding for hot response paths
+
+Session data held by the server is already trusted and typed, so hot
+endpoints such as status polling build plain dicts and encode them
+straight to bytes instead of constructing and re-validating Pydantic
+response models and then encoding their output a second time.
+
+Uses orjson when installed (pip install orjson) and falls back to the
+standard library otherwise, or for content orjson rejects (integers
+wider than 64 bits). Both encoders produce the same JSON as
+Pydantic's model_dump(mode="json") for the types stored in sessions:
+naive datetimes as ISO 8601 without offset, str enums as their value.
+"""
+
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # Optional: pip install orjson
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(content: Any) -> bytes:
+    """Encode trusted content to JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=_default)
+        except TypeError:
+            # orjson only encodes 64-bit integers; client-supplied
+            # additional_data can hold larger ones
+            pass
+    return _encoder.encode(content).encode()
+
+
+class FastJSONResponse(Response):
+    """JSONResponse replacement that skips validation and re-encoding"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
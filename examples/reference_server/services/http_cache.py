@@ -0,0 +1,58 @@
+"""
+HTTP caching helpers shared by routes that serve prepared response bytes
+
+- etag_for(): strong ETag derived from the response body
+- etag_matches(): If-None-Match evaluation
+- negotiate_encoding(): Accept-Encoding negotiation for precompressed bodies
+"""
+
+import hashlib
+from typing import Container, Dict, Optional
+
+
+def etag_for(body: bytes, suffix: str = "") -> str:
+    """Strong ETag for a response body; suffix distinguishes content-codings"""
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return f'"{digest}{suffix}"'
+
+
+def etag_matches(if_none_match: Optional[str], etags: Container[str]) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+def _accepted_codings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}"""
+    codings = {}
+    if not accept_encoding:
+        return codings
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Container[str]) -> Optional[str]:
+    """Pick the best available content-coding, preferring br over gzip"""
+    codings = _accepted_codings(accept_encoding)
+    for coding in ("br", "gzip"):
+        if coding in available and codings.get(coding, codings.get("*", 0.0)) > 0:
+            return coding
+    return None
@@ -0,0 +1,211 @@
+"""
+Pooled HTTP/1.1 client for outgoing webhook requests
+
+Webhook deliveries are small POSTs whose response body is ignored, sent
+at high rates to a limited set of receivers. General-purpose async HTTP
+clients spend far more CPU per request than that needs (httpx manages a
+few hundred requests/s on one core and slows down as concurrency grows),
+so deliveries go through this client instead:
+- Keep-alive connections are pooled per origin and reused. A reused
+  connection that the receiver closed while idle is retried once on a
+  fresh connection.
+- Each request is sent with a single write.
+- Responses are parsed only as far as needed to find their end
+  (Content-Length, chunked transfer encoding or connection close); large
+  bodies are not read, the connection is closed instead.
+- max_connections bounds the connections open across all origins.
+
+HTTPS uses the default SSL context (certificate and hostname checks).
+"""
+
+import asyncio
+import ssl
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# Responses with a larger body are not drained; the connection is closed
+MAX_RESPONSE_BYTES = 64 * 1024
+
+# Receivers commonly close idle connections after 5 s (uvicorn, nginx: 75 s)
+IDLE_TIMEOUT_SECONDS = 4.0
+
+Origin = Tuple[str, str, int]
+
+
+class HTTPError(Exception):
+    """Connection, protocol or timeout error"""
+
+
+class _Connection:
+    __slots__ = ("reader", "writer", "idle_since")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = 0.0
+
+
+class _Target:
+    """Parsed URL: origin and the request head shared by every request to it"""
+
+    __slots__ = ("origin", "head")
+
+    def __init__(self, url: str, user_agent: str):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise HTTPError(f"Unsupported URL '{url}'")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.origin: Origin = (parts.scheme, parts.hostname, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        self.head = (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {parts.netloc.rpartition('@')[2]}\r\n"
+            f"User-Agent: {user_agent}\r\n"
+        ).encode("latin-1")
+
+
+class ConnectionPool:
+    """Keep-alive connection pool; create and use it on one event loop"""
+
+    def __init__(self, max_connections: int = 100, timeout: float = 30.0, user_agent: str = "python"):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle: Dict[Origin, Deque[_Connection]] = {}
+        self._targets: Dict[str, _Target] = {}
+        self._ssl: Optional[ssl.SSLContext] = None
+        self.opened = 0
+        self.reused = 0
+
+    async def post(self, url: str, body: bytes, headers: Dict[str, str]) -> int:
+        """POST `body` and return the response status; raises HTTPError"""
+        target = self._targets.get(url)
+        if target is None:
+            target = self._targets[url] = _Target(url, self.user_agent)
+        request = bytearray(target.head)
+        for name, value in headers.items():
+            request += f"{name}: {value}\r\n".encode("latin-1")
+        request += b"Content-Length: %d\r\n\r\n" % len(body)
+        request += body
+
+        async with self._slots:
+            try:
+                return await asyncio.wait_for(self._request(target.origin, request), self.timeout)
+            except asyncio.TimeoutError:
+                raise HTTPError(f"No response within {self.timeout:g} seconds") from None
+
+    def close(self) -> None:
+        """Close idle connections"""
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.writer.close()
+        self._idle.clear()
+
+    def idle(self) -> int:
+        return sum(len(connections) for connections in self._idle.values())
+
+    async def _request(self, origin: Origin, request: bytes) -> int:
+        connection = self._checkout(origin)
+        if connection is not None:
+            self.reused += 1
+            try:
+                return await self._exchange(origin, connection, request)
+            except (OSError, asyncio.IncompleteReadError):
+                # Closed by the receiver while idle; try once more on a new connection
+                pass
+        connection = await self._connect(origin)
+        try:
+            return await self._exchange(origin, connection, request)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            raise HTTPError(f"Connection to {origin[1]}:{origin[2]} failed: {e!r}") from None
+
+    def _checkout(self, origin: Origin) -> Optional[_Connection]:
+        connections = self._idle.get(origin)
+        if not connections:
+            return None
+        now = asyncio.get_running_loop().time()
+        while connections:
+            connection = connections.pop()
+            if now - connection.idle_since < IDLE_TIMEOUT_SECONDS and not connection.reader.at_eof():
+                return connection
+            connection.writer.close()
+        return None
+
+    async def _connect(self, origin: Origin) -> _Connection:
+        scheme, host, port = origin
+        context = None
+        if scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+        try:
+            reader, writer = await asyncio.open_connection(host, port, ssl=context)
+        except OSError as e:
+            raise HTTPError(f"Connection to {host}:{port} failed: {e}") from None
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    async def _exchange(self, origin: Origin, connection: _Connection, request: bytes) -> int:
+        """Send one request and read its response; the connection is pooled again or closed"""
+        keep_alive = False
+        try:
+            connection.writer.write(request)
+            await connection.writer.drain()
+            status, keep_alive = await self._read_response(connection.reader)
+            return status
+        except (asyncio.LimitOverrunError, ValueError) as e:
+            raise HTTPError(f"Malformed response from {origin[1]}:{origin[2]}: {e}") from None
+        finally:
+            if keep_alive:
+                connection.idle_since = asyncio.get_running_loop().time()
+                self._idle.setdefault(origin, deque()).append(connection)
+            else:
+                connection.writer.close()
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+        """Read a response; returns (status, whether the connection can be reused)"""
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.split(b"\r\n")
+            version, code = lines[0].split(b" ", 2)[:2]
+            status = int(code)
+            # Interim responses (100 Continue, 103 Early Hints) precede the real one
+            if not 100 <= status < 200:
+                break
+
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip().lower()
+        keep_alive = version == b"HTTP/1.1" and headers.get(b"connection") != b"close"
+
+        if status in (204, 304):
+            return status, keep_alive
+        if b"chunked" in headers.get(b"transfer-encoding", b""):
+            received = 0
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                size = int(line.split(b";", 1)[0], 16)
+                if size == 0:
+                    # Trailers end with an empty line
+                    while await reader.readuntil(b"\r\n") != b"\r\n":
+                        pass
+                    return status, keep_alive
+                received += size
+                if received > MAX_RESPONSE_BYTES:
+                    return status, False
+                await reader.readexactly(size + 2)
+        if b"content-length" in headers:
+            length = int(headers[b"content-length"])
+            if length > MAX_RESPONSE_BYTES:
+                return status, False
+            await reader.readexactly(length)
+            return status, keep_alive
+        # Body delimited by the connection closing
+        return status, False
@@ -0,0 +1,228 @@
+"""
+Request metrics in Prometheus text format
+
+MetricsMiddleware records, per route template and method:
+- latency histogram, from the start of the request until the response body
+  has been sent
+- request and response body size histograms
+- responses by status code
+plus the number of requests in flight. Gauges of the wider service
+(sessions by status, queue depth, disk usage, ...) are read from
+collectors registered with add_collector(), only when /metrics is scraped.
+
+Recording takes no locks: every update happens on the event loop thread of
+the worker process, so each worker keeps its own registry. A request costs
+a dict lookup, a few additions and three bisections into fixed bucket
+lists. With multiple workers each one reports its own numbers; label them
+by instance in Prometheus or scrape each worker.
+
+Environment variables:
+- METRICS_ENABLED: "false" turns off the middleware and GET /metrics
+  (default: true)
+"""
+
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("false", "0", "no")
+
+# Starlette appends the charset
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; from a cached poll to a long-poll held for its full wait
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes; from JSON bodies to 20-second chunks and whole recordings
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# (name, type, help, [(labels, value), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+Collector = Callable[[], Iterable[Family]]
+
+
+def _value(value: float) -> str:
+    """Sample value without exponent rounding (byte counts exceed %g precision)"""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds observations <= buckets[i], the last one the rest"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{_value(bound)}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {_value(self.sum)}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class RouteMetrics:
+    """Everything recorded for one route and method"""
+
+    __slots__ = ("latency", "request_bytes", "response_bytes", "responses")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.request_bytes = Histogram(SIZE_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.responses: Dict[int, int] = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+
+
+class Metrics:
+    """Registry of route metrics and scrape-time collectors of one worker"""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+        self._collectors: List[Collector] = []
+
+    def route(self, method: str, route: str) -> RouteMetrics:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        return metrics
+
+    def add_collector(self, collector: Collector) -> None:
+        """Register collector() -> families of gauges/counters, called on every scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        lines = [
+            "# HELP http_requests_in_flight Requests being handled",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+        routes = sorted(self.routes.items())
+        for name, attribute, help_text in (
+            ("http_request_duration_seconds", "latency", "Time to handle a request"),
+            ("http_request_size_bytes", "request_bytes", "Request body size"),
+            ("http_response_size_bytes", "response_bytes", "Response body size"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), metrics in routes:
+                lines.extend(getattr(metrics, attribute).samples(name, _labels({"method": method, "route": route})))
+        lines.append("# HELP http_responses_total Responses by status code")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route), metrics in routes:
+            for code, count in sorted(metrics.responses.items()):
+                labels = _labels({"method": method, "route": route, "code": str(code)})
+                lines.append(f"http_responses_total{{{labels}}} {count}")
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{{{_labels(labels)}}} {_value(value)}" if labels else f"{name} {_value(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request metrics into a Metrics registry.
+
+    A plain ASGI wrapper rather than BaseHTTPMiddleware, so streamed bodies
+    (chunk uploads, SSE) pass through untouched. Requests are labelled with
+    the route template (/v1/sessions/{session_id}), not the raw path, to
+    keep the number of series bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, metrics: "Metrics"):
+        self.app = app
+        self.metrics = metrics
+        self._route_paths: Dict[Callable, str] = {}
+
+    def _route_path(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            path = "unmatched"
+            router = scope.get("router")
+            for route in getattr(router, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            self._route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        request_bytes = 0
+        response_bytes = 0
+        status_code = 500
+
+        async def receive_counted():
+            nonlocal request_bytes
+            message = await receive()
+            request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_counted(message):
+            nonlocal response_bytes, status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight -= 1
+            # The router filled in the matched endpoint on the shared scope
+            route = metrics.route(scope["method"], self._route_path(scope))
+            route.latency.observe(elapsed)
+            route.request_bytes.observe(request_bytes)
+            route.response_bytes.observe(response_bytes)
+            route.responses[status_code] = route.responses.get(status_code, 0) + 1
+
+
+def gauge(name: str, help_text: str, value: Optional[float], labels: Optional[Dict[str, str]] = None) -> Family:
+    """One-sample gauge family for collectors"""
+    return name, "gauge", help_text, [] if value is None else [(labels or {}, value)]
+
+
+def counter(name: str, help_text: str, value: float) -> Family:
+    """One-sample counter family for collectors"""
+    return name, "counter", help_text, [({}, value)]
+
+
+# Shared registry of this worker
+METRICS = Metrics()
@@ -0,0 +1,150 @@
+"""
+Signed upload URLs for the local object store (object_store.py)
+
+spec/07 lets upload_url point at cloud storage, so audio goes straight to
+the storage tier instead of through the API. This is the local stand-in
+for S3 pre-signed URLs:
+- The API issues a per-session upload URL, signed with HMAC-SHA256 over
+  the session ID and an expiry time (POST /sessions, and
+  GET /sessions/{id}/audio/credentials for a fresh one).
+- Clients PUT each file to {upload_url}/{file_name}. The object store
+  checks the signature and expiry by recomputing the HMAC, with no
+  session lookup, so it runs and scales apart from the API.
+- Each stored object is announced to the API with a signed
+  "object.created" notification (X-MSA-Signature, spec/10 §10.7), which
+  registers it with its session (POST /internal/object-events).
+
+Objects are stored below OBJECT_STORE_PATH as <session_id>/<key>, where
+the key is unique per PUT, and moved into AUDIO_STORAGE_PATH when they are
+registered; both must be on the same volume for the move to be a rename.
+
+Environment variables:
+- OBJECT_STORE_SECRET: HMAC key shared by the API and the object store;
+  unset disables signed uploads (GET /audio/credentials returns 501)
+- OBJECT_STORE_URL: Base URL of the object store (default: http://127.0.0.1:9400)
+- OBJECT_STORE_PATH: Directory for stored objects (default: ./data/objects)
+- OBJECT_STORE_URL_TTL_SECONDS: Lifetime of an upload URL (default: 900)
+- OBJECT_STORE_NOTIFY_URL: Where the object store sends notifications
+  (default: http://127.0.0.1:8000/internal/object-events)
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+
+DEFAULT_URL_TTL_SECONDS = 900
+
+# Notifications older than this are rejected as replays
+EVENT_TOLERANCE_SECONDS = 300
+
+
+class SignedURL(NamedTuple):
+    url: str
+    expires_at: int
+
+
+class SignedUploads:
+    """Issues and checks signed upload URLs; stateless apart from counters"""
+
+    def __init__(
+        self,
+        secret: Optional[str],
+        base_url: str,
+        root: str,
+        ttl: int = DEFAULT_URL_TTL_SECONDS,
+    ):
+        self.secret = secret
+        self.base_url = base_url.rstrip("/")
+        self.root = root
+        self.ttl = ttl
+        self.issued = 0
+        self.registered = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret)
+
+    def signature(self, session_id: str, expires_at: int) -> str:
+        digest = hmac.new(self.secret.encode(), f"{session_id}\n{expires_at}".encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def upload_url(self, session_id: str, not_after: Optional[float] = None, now: Optional[float] = None) -> SignedURL:
+        """
+        URL that accepts PUTs of a session's files for `ttl` seconds, or
+        until `not_after` (the session's expiry) if that is sooner
+        """
+        expires_at = int(now if now is not None else time.time()) + self.ttl
+        if not_after is not None:
+            expires_at = min(expires_at, int(not_after))
+        self.issued += 1
+        url = f"{self.base_url}/upload/{session_id}/{expires_at}/{self.signature(session_id, expires_at)}"
+        return SignedURL(url, expires_at)
+
+    def verify(self, session_id: str, expires_at: str, signature: str, now: Optional[float] = None) -> Optional[str]:
+        """None if an upload URL is valid, else why not: "expired" or "invalid_signature" """
+        try:
+            expires = int(expires_at)
+        except ValueError:
+            return "invalid_signature"
+        # Checked before expiry, so an expiry time can't be probed without a signature
+        if not hmac.compare_digest(self.signature(session_id, expires), signature):
+            return "invalid_signature"
+        if expires < (now if now is not None else time.time()):
+            return "expired"
+        return None
+
+    def object_path(self, session_id: str, key: str) -> str:
+        if not key or key in (".", "..") or os.path.basename(key) != key:
+            raise ValueError(f"Invalid object key '{key}'")
+        return os.path.join(self.root, session_id, key)
+
+    def sign_event(self, body: bytes, timestamp: Optional[int] = None) -> str:
+        """
+        X-MSA-Signature of a notification, as services/webhooks.py signs
+        deliveries; not imported from there so the object store doesn't
+        load the session store
+        """
+        if timestamp is None:
+            timestamp = int(time.time())
+        signature = hmac.new(self.secret.encode(), str(timestamp).encode() + b"." + body, hashlib.sha256).hexdigest()
+        return f"t={timestamp},v1={signature}"
+
+    def verify_event(self, body: bytes, header: Optional[str]) -> bool:
+        if not self.enabled or not header:
+            return False
+        try:
+            parts = dict(item.split("=", 1) for item in header.split(","))
+            timestamp = int(parts["t"])
+            signature = parts["v1"]
+        except (KeyError, ValueError):
+            return False
+        if abs(time.time() - timestamp) > EVENT_TOLERANCE_SECONDS:
+            return False
+        expected = self.sign_event(body, timestamp).split("v1=", 1)[1]
+        return hmac.compare_digest(expected, signature)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "issued": self.issued,
+            "registered": self.registered,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+        }
+
+
+# Shared by the API routes and the object store
+SIGNED_UPLOADS = SignedUploads(
+    secret=os.getenv("OBJECT_STORE_SECRET"),
+    base_url=os.getenv("OBJECT_STORE_URL", "http://127.0.0.1:9400"),
+    root=os.getenv("OBJECT_STORE_PATH", os.path.join("data", "objects")),
+    ttl=int(os.getenv("OBJECT_STORE_URL_TTL_SECONDS", str(DEFAULT_URL_TTL_SECONDS))),
+)
+
+NOTIFY_URL = os.getenv("OBJECT_STORE_NOTIFY_URL", "http://127.0.0.1:8000/internal/object-events")
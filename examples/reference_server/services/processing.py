@@ -0,0 +1,466 @@
+"""
+Asynchronous processing pipeline for MedScribe Alliance Protocol
+
+POST /sessions/{id}/end submits the session to a job queue and returns
+immediately; a pool of worker tasks runs each job through a Processor and
+moves the session to `completed`, `partial` or `failed` with its results.
+
+Backpressure:
+- The queue has a bounded depth. When it is full, submit() raises
+  QueueFull with a Retry-After estimate (from queue depth, worker count and
+  recent job durations) and the route answers 503 service_unavailable.
+- Each job has a timeout; a job that exceeds it fails the session instead
+  of holding a worker forever.
+
+Completion estimates:
+- Job durations are fitted online against the session's audio length
+  (DurationModel). estimate_seconds() adds the wait for the jobs queued
+  ahead of a session to its own predicted duration (minus the time it has
+  already been running); status polls answer with it as Retry-After and
+  estimated_completion, so clients back off while there is a backlog and
+  poll again promptly when the system is idle.
+
+Consolidation:
+- Before a job is handed to the processor, the session's chunks are
+  joined in sequence order into one file of stored audio
+  (AudioStorage.consolidate(), by kernel-side copies), which the
+  processor receives with the session. Sessions whose chunks can't be
+  joined (e.g. MP4) are processed without it.
+
+Persistence:
+- A queued job is just a session in `processing`. With a durable session
+  store (SESSION_STORE=wal), start() re-queues every such session, so jobs
+  pending or running at shutdown are picked up again after a restart.
+
+Processors:
+- Processor is the interface to the transcription/extraction backend.
+- StubProcessor returns mock results after a configurable delay and,
+  optionally, CPU work on a process pool, so throughput can be measured
+  without an external service.
+
+Environment variables:
+- PROCESSOR: Processing backend (default: stub)
+- PROCESSING_WORKERS: Concurrent jobs (default: 4)
+- PROCESSING_QUEUE_SIZE: Maximum queued jobs before 503 (default: 1000)
+- PROCESSING_JOB_TIMEOUT_SECONDS: Per-job timeout (default: 300)
+- PROCESSING_MAX_RETRY_AFTER_SECONDS: Upper bound of the Retry-After sent
+  to status polls (default: 30)
+- PROCESSING_STUB_DELAY_SECONDS: Simulated backend latency (default: 2)
+- PROCESSING_STUB_CPU_SECONDS: Simulated CPU work per job (default: 0)
+- PROCESSING_PROCESSES: Size of the process pool for CPU work; 0 runs it
+  in the default thread pool (default: 0)
+- PROCESSING_CONSOLIDATE_AUDIO: Join each session's chunks into one file
+  before processing (default: true)
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from models import SessionStatus
+from services.audio_storage import AUDIO_STORAGE, AudioStorage
+from services.consolidation import CannotConsolidate, ConsolidatedAudio
+from services.session_store import SESSION_STORE, SessionStore
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_AFTER_SECONDS = int(os.getenv("PROCESSING_MAX_RETRY_AFTER_SECONDS", "30"))
+
+# Audio length assumed per chunk whose container doesn't record its
+# duration (discovery: max_chunk_duration_seconds)
+CHUNK_SECONDS = 20.0
+
+
+# Mock extraction results returned by the stub processor
+# TODO: Replace with actual results from the processing backend
+MOCK_PROCESSING_TRANSCRIPT = "Doctor: Good morning...\nPatient: I've been having..."
+MOCK_COMPLETED_TRANSCRIPT = "Doctor: Good morning, how are you feeling?\nPatient: I've been having headaches..."
+MOCK_COMPLETED_TEMPLATES = {
+    "soap": {
+        "status": "success",
+        "data": {
+            "subjective": "Patient reports headache for 3 days",
+            "objective": "BP 120/80, Temp 98.6F",
+            "assessment": "Tension headache",
+            "plan": "Prescribed ibuprofen 400mg",
+        }
+    }
+}
+MOCK_PARTIAL_TEMPLATES = {
+    "soap": {
+        "status": "success",
+        "data": {"subjective": "...", "objective": "..."},
+    }
+}
+
+
+class ProcessingResult(NamedTuple):
+    """Outcome of processing one session"""
+    status: SessionStatus  # COMPLETED, PARTIAL or FAILED
+    transcript: Optional[str] = None
+    templates: Optional[Dict[str, Any]] = None
+    language_detected: Optional[str] = None
+    audio_files_processed: int = 0
+    processing_errors: Optional[List[Dict[str, Any]]] = None
+
+
+def _failed(error_type: str, message: str) -> ProcessingResult:
+    return ProcessingResult(
+        SessionStatus.FAILED,
+        processing_errors=[{"type": error_type, "message": message}],
+    )
+
+
+class Processor(ABC):
+    """Transcription and template extraction backend"""
+
+    @abstractmethod
+    async def process(self, session: Dict[str, Any], audio: Optional[ConsolidatedAudio] = None) -> ProcessingResult:
+        """
+        Process an ended session; must not modify `session`. `audio` is
+        its chunks joined into one file, or None if they weren't.
+        """
+
+
+def _burn_cpu(seconds: float) -> None:
+    """Busy work standing in for CPU-bound processing (runs in a pool)"""
+    deadline = time.process_time() + seconds
+    while time.process_time() < deadline:
+        pass
+
+
+class StubProcessor(Processor):
+    """Returns mock results, for development and benchmarks"""
+
+    def __init__(self, delay: float = 0.0, cpu_seconds: float = 0.0, executor: Optional[Executor] = None):
+        self.delay = delay
+        self.cpu_seconds = cpu_seconds
+        self.executor = executor
+
+    async def process(self, session: Dict[str, Any], audio: Optional[ConsolidatedAudio] = None) -> ProcessingResult:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.cpu_seconds:
+            await asyncio.get_running_loop().run_in_executor(self.executor, _burn_cpu, self.cpu_seconds)
+
+        chunks = session["audio_chunks"]
+        if not chunks:
+            return _failed("no_audio", "Session ended without any audio files")
+
+        # Chunks are processed in sequence order; gaps make the result partial
+        missing = chunks.missing(session.get("audio_files_sent") or 0)
+        if missing:
+            expected = len(chunks) + len(missing)
+            return ProcessingResult(
+                SessionStatus.PARTIAL,
+                transcript="Partial transcript...",
+                templates={t: MOCK_PARTIAL_TEMPLATES.get(t, {"status": "success", "data": {}}) for t in session["templates"]},
+                language_detected="en",
+                audio_files_processed=len(chunks),
+                processing_errors=[{
+                    "type": "audio_files_missing",
+                    "message": f"Received {len(chunks)} of {expected} audio files",
+                    "missing_sequence_numbers": missing,
+                }],
+            )
+
+        return ProcessingResult(
+            SessionStatus.COMPLETED,
+            transcript=MOCK_COMPLETED_TRANSCRIPT,
+            templates={t: MOCK_COMPLETED_TEMPLATES.get(t, {"status": "success", "data": {}}) for t in session["templates"]},
+            language_detected="en",
+            audio_files_processed=len(chunks),
+        )
+
+
+def audio_seconds(session: Dict[str, Any]) -> float:
+    """Audio length of a session, as far as the server knows it"""
+    chunks = session["audio_chunks"]
+    return chunks.seconds + (len(chunks) - chunks.timed) * CHUNK_SECONDS
+
+
+class DurationModel:
+    """
+    Online linear fit of job duration against audio length.
+    
+    Means, variance and covariance are exponentially weighted (`alpha`), so
+    the fit follows changes in backend speed. When every job has had the
+    same audio length, or duration doesn't grow with it, the prediction is
+    the average duration.
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.samples = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.var_x = 0.0
+        self.cov_xy = 0.0
+
+    def add(self, audio: float, duration: float) -> None:
+        if self.samples == 0:
+            self.mean_x, self.mean_y = audio, duration
+        else:
+            a = self.alpha
+            dx = audio - self.mean_x
+            dy = duration - self.mean_y
+            self.mean_x += a * dx
+            self.mean_y += a * dy
+            self.var_x = (1 - a) * (self.var_x + a * dx * dx)
+            self.cov_xy = (1 - a) * (self.cov_xy + a * dx * dy)
+        self.samples += 1
+
+    def predict(self, audio: float) -> Optional[float]:
+        """Expected duration in seconds, or None before the first sample"""
+        if self.samples == 0:
+            return None
+        slope = max(0.0, self.cov_xy / self.var_x) if self.var_x > 1e-9 else 0.0
+        return max(0.0, self.mean_y + slope * (audio - self.mean_x))
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is at its maximum depth"""
+
+    def __init__(self, depth: int, retry_after: int):
+        super().__init__(f"Processing queue is full ({depth} jobs)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+class ProcessingQueue:
+    """Bounded job queue drained by a pool of worker tasks"""
+
+    def __init__(
+        self,
+        store: SessionStore,
+        processor: Processor,
+        workers: int = 4,
+        max_depth: int = 1000,
+        job_timeout: float = 300.0,
+        storage: Optional[AudioStorage] = None,
+    ):
+        self.store = store
+        self.processor = processor
+        self.workers = workers
+        self.max_depth = max_depth
+        self.job_timeout = job_timeout
+        # Where chunks are consolidated before processing; None skips it
+        self.storage = storage
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.duration = DurationModel()
+        # Queue position of each waiting session and start time of each
+        # running one, for completion estimates
+        self._positions: Dict[str, int] = {}
+        self._enqueued = 0
+        self._dequeued = 0
+        self._started: Dict[str, float] = {}
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.partial = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.consolidated = 0
+        self.consolidated_bytes = 0
+        self.consolidation_seconds = 0.0
+
+    def start(self) -> None:
+        """Start the workers and re-queue sessions left in `processing`"""
+        # Created here so it binds to the server's event loop
+        self._queue = asyncio.Queue()
+        for session_id in self.store.owned():
+            session = self.store.get(session_id)
+            if session is not None and session["status"] == SessionStatus.PROCESSING:
+                self._enqueue(session_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers; unfinished jobs stay `processing` for the next start()"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def average_seconds(self) -> Optional[float]:
+        """Moving average of job durations, seeded by the first job"""
+        return self.duration.mean_y if self.duration.samples else None
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def retry_after(self) -> int:
+        """Seconds until a worker is likely to be free for a new job"""
+        average = self.average_seconds if self.average_seconds is not None else 1.0
+        return max(1, math.ceil(average * (self.depth() / self.workers + 1)))
+
+    def submit(self, session_id: str) -> None:
+        """Queue a session for processing; raises QueueFull when saturated"""
+        if self._queue is None:
+            raise RuntimeError("ProcessingQueue.start() has not been called")
+        depth = self._queue.qsize()
+        if depth >= self.max_depth:
+            self.rejected += 1
+            raise QueueFull(depth, self.retry_after())
+        self._enqueue(session_id)
+        self.submitted += 1
+
+    def estimate_seconds(self, session_id: str, session: Dict[str, Any]) -> Optional[float]:
+        """
+        Seconds until the session's results are likely ready, or None if it
+        is not queued or running here (e.g. ended on another instance).
+        """
+        own = self.duration.predict(audio_seconds(session))
+        average = self.average_seconds
+        if own is None:
+            own = average = 1.0
+        started = self._started.get(session_id)
+        if started is not None:
+            return max(0.0, own - (time.monotonic() - started))
+        position = self._positions.get(session_id)
+        if position is None:
+            return None
+        # A worker picks the session up after the jobs ahead of it and the
+        # running ones have gone through the pool, `workers` at a time
+        ahead = max(0, position - self._dequeued - 1)
+        rounds = (ahead + self.running) // self.workers
+        return rounds * average + own
+
+    def retry_after_for(self, session_id: str, session: Dict[str, Any]) -> Tuple[int, Optional[float]]:
+        """(Retry-After seconds, estimate_seconds()) for a status poll"""
+        estimate = self.estimate_seconds(session_id, session)
+        if estimate is None:
+            return min(self.retry_after(), MAX_RETRY_AFTER_SECONDS), None
+        return min(max(1, math.ceil(estimate)), MAX_RETRY_AFTER_SECONDS), estimate
+
+    async def join(self) -> None:
+        """Wait until every queued job has finished"""
+        await self._queue.join()
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        while True:
+            session_id = await queue.get()
+            self._dequeued += 1
+            self._positions.pop(session_id, None)
+            try:
+                await self._run(session_id)
+            finally:
+                queue.task_done()
+
+    def _enqueue(self, session_id: str) -> None:
+        self._enqueued += 1
+        self._positions[session_id] = self._enqueued
+        self._queue.put_nowait(session_id)
+
+    async def _run(self, session_id: str) -> None:
+        session = self.store.get(session_id)
+        # Purged, or no longer waiting to be processed
+        if session is None or session["status"] != SessionStatus.PROCESSING:
+            return
+
+        started = time.monotonic()
+        self._started[session_id] = started
+        self.running += 1
+        try:
+            result = await asyncio.wait_for(self._process(session_id, session), self.job_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            result = _failed("timeout", f"Processing did not finish within {self.job_timeout:g} seconds")
+        except Exception:
+            logger.exception("Processing failed for session %s", session_id)
+            result = _failed("processing_failed", "Unable to process audio due to internal error")
+        finally:
+            self.running -= 1
+            del self._started[session_id]
+        self.duration.add(audio_seconds(session), time.monotonic() - started)
+
+        if result.status == SessionStatus.COMPLETED:
+            self.completed += 1
+        elif result.status == SessionStatus.PARTIAL:
+            self.partial += 1
+        else:
+            self.failed += 1
+
+        self.store.update(
+            session_id,
+            status=result.status,
+            results={
+                "completed_at": datetime.utcnow(),
+                "transcript": result.transcript,
+                "templates": result.templates or {},
+                "language_detected": result.language_detected,
+                "audio_files_processed": result.audio_files_processed,
+                "processing_errors": result.processing_errors,
+            },
+        )
+
+    async def _process(self, session_id: str, session: Dict[str, Any]) -> ProcessingResult:
+        audio = None
+        chunks = session["audio_chunks"]
+        if self.storage is not None and chunks:
+            started = time.monotonic()
+            try:
+                # Blocking file I/O, though the audio itself is copied in the kernel
+                audio = await asyncio.get_running_loop().run_in_executor(
+                    None, self.storage.consolidate, session_id, list(chunks.filenames()))
+            except (CannotConsolidate, OSError) as e:
+                logger.info("Session %s processed without consolidated audio: %s", session_id, e)
+            else:
+                self.consolidated += 1
+                self.consolidated_bytes += audio.size
+                self.consolidation_seconds += time.monotonic() - started
+        return await self.processor.process(session, audio)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self.depth(),
+            "running": self.running,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "partial": self.partial,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "average_job_ms": round(self.average_seconds * 1000, 1) if self.average_seconds is not None else None,
+            "consolidated": self.consolidated,
+            "consolidated_bytes": self.consolidated_bytes,
+            "consolidation_ms": round(self.consolidation_seconds * 1000, 1),
+        }
+
+
+def create_processor() -> Processor:
+    """Build the processor selected by the PROCESSOR environment variable"""
+    backend = os.getenv("PROCESSOR", "stub").lower()
+    # TODO: Add a processor for the real transcription/extraction service
+    if backend == "stub":
+        processes = int(os.getenv("PROCESSING_PROCESSES", "0"))
+        return StubProcessor(
+            delay=float(os.getenv("PROCESSING_STUB_DELAY_SECONDS", "2")),
+            cpu_seconds=float(os.getenv("PROCESSING_STUB_CPU_SECONDS", "0")),
+            executor=ProcessPoolExecutor(processes) if processes > 0 else None,
+        )
+    raise ValueError(f"Unknown PROCESSOR '{backend}'")
+
+
+# Shared queue used by all routes; workers are started by the app lifespan
+PROCESSING_QUEUE = ProcessingQueue(
+    SESSION_STORE,
+    create_processor(),
+    workers=int(os.getenv("PROCESSING_WORKERS", "4")),
+    max_depth=int(os.getenv("PROCESSING_QUEUE_SIZE", "1000")),
+    job_timeout=float(os.getenv("PROCESSING_JOB_TIMEOUT_SECONDS", "300")),
+    storage=AUDIO_STORAGE if os.getenv("PROCESSING_CONSOLIDATE_AUDIO", "true").lower() not in ("false", "0", "no") else None,
+)
@@ -0,0 +1,386 @@
+"""
+Token-bucket rate limits per API key and per tenant (spec/12 §12.7)
+
+Each limit is a token bucket: `rate` tokens are added per second, up to
+`burst`. Creating a session or polling a session's status costs 1 token;
+uploading audio costs its size in bytes. Buckets are refilled lazily from
+the time since they were last used, so a check is O(1) and nothing runs
+in the background.
+
+A request is checked against the bucket of its API key and the bucket of
+its tenant, and only when both have the tokens are they taken from both.
+Callers that did not authenticate (AUTH_MODE=off) have both buckets keyed
+by client address: the API key and X-Tenant-ID they send are unverified.
+Clients behind one NAT or proxy therefore share one set of buckets.
+A rejected request gets 429 rate_limit_exceeded with the exact time until
+the buckets will have enough tokens as Retry-After.
+
+Requests costing more than a bucket's burst (an upload larger than the
+byte burst) are let through once the bucket is full and leave it in debt,
+which later requests wait out. Uploads without a Content-Length are
+checked for debt only, then charged their size once received.
+
+Backends:
+- memory: buckets in a dict of this process, so each worker enforces the
+  limits on its own share of the traffic. Buckets idle long enough to be
+  full are dropped once the dict grows past RATE_LIMIT_MAX_KEYS.
+- redis: buckets shared by all workers and hosts, checked and updated
+  atomically by a Lua script in one round trip (pip install redis). When
+  Redis cannot be reached, requests are let through.
+
+Environment variables:
+- RATE_LIMIT_ENABLED: "false" turns off all limits (default: true)
+- RATE_LIMIT_BACKEND: "memory" (default) or "redis"
+- RATE_LIMIT_REDIS_URL: Redis connection URL (default: redis://localhost:6379/0)
+- RATE_LIMIT_MAX_KEYS: Buckets kept by the memory backend before idle ones
+  are dropped (default: 100000)
+- RATE_LIMIT_SESSIONS / RATE_LIMIT_SESSIONS_TENANT: sessions created per
+  API key / tenant, as "<per second>/<burst>" (default: 20/100, 100/500)
+- RATE_LIMIT_UPLOAD_BYTES / RATE_LIMIT_UPLOAD_BYTES_TENANT: audio bytes
+  (default: 50 MB/s with 200 MB burst, 250 MB/s with 1 GB burst)
+- RATE_LIMIT_POLLS / RATE_LIMIT_POLLS_TENANT: status requests
+  (default: 50/200, 500/2000)
+A limit of "0" turns that limit off.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection
+
+from services.auth import principal_of
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None  # Optional: pip install redis
+
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("false", "0", "no")
+
+
+class Limit:
+    """Refill rate (tokens per second) and capacity of one kind of bucket"""
+
+    __slots__ = ("name", "rate", "burst")
+
+    def __init__(self, name: str, rate: float, burst: float):
+        if rate <= 0 or burst <= 0:
+            raise ValueError(f"Rate limit '{name}' needs a positive rate and burst")
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+
+    @classmethod
+    def from_env(cls, name: str, variable: str, default: str) -> Optional["Limit"]:
+        """Parse "<per second>/<burst>"; None if the limit is "0" """
+        value = os.getenv(variable, default).strip()
+        if value in ("", "0"):
+            return None
+        rate, _, burst = value.partition("/")
+        return cls(name, float(rate), float(burst or rate))
+
+
+class RateLimitResult:
+    """Outcome of a check, reported for the bucket with the fewest tokens left"""
+
+    __slots__ = ("allowed", "limit", "remaining", "retry_after", "reset_in")
+
+    def __init__(self, allowed: bool, limit: float, remaining: float, retry_after: float, reset_in: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        # Seconds until the request would be allowed (0 if it was)
+        self.retry_after = retry_after
+        # Seconds until the bucket is full again
+        self.reset_in = reset_in
+
+
+# (bucket key, limit)
+Bucket = Tuple[str, Limit]
+
+
+class MemoryBuckets:
+    """Buckets of this process: key -> [tokens, updated (monotonic), limit]"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, List] = {}
+        self._sweep_at = max_keys
+
+    async def take(self, buckets: Sequence[Bucket], cost: float, force: bool = False) -> RateLimitResult:
+        return self.take_now(buckets, cost, force, time.monotonic())
+
+    def take_now(self, buckets: Sequence[Bucket], cost: float, force: bool, now: float) -> RateLimitResult:
+        # Plain comparisons instead of min()/max(): this runs on every poll
+        states = self._buckets
+        retry_after = 0.0
+        found = []
+        for key, limit in buckets:
+            state = states.get(key)
+            if state is None:
+                available = limit.burst
+                state = states[key] = [available, now, limit]
+            else:
+                available = state[0] + (now - state[1]) * limit.rate
+                if available > limit.burst:
+                    available = limit.burst
+            needed = cost if cost < limit.burst else limit.burst
+            if available < needed:
+                wait = (needed - available) / limit.rate
+                if wait > retry_after:
+                    retry_after = wait
+            found.append((state, available))
+
+        allowed = force or not retry_after
+        if allowed:
+            retry_after = 0.0
+        # Report the bucket closest to empty
+        lowest_state, lowest = found[0]
+        for state, available in found:
+            if available < lowest:
+                lowest_state, lowest = state, available
+            if allowed:
+                state[0] = available - cost
+                state[1] = now
+                if force and state[0] < 0:
+                    # Charged regardless: report how long the debt takes to clear
+                    wait = -state[0] / state[2].rate
+                    if wait > retry_after:
+                        retry_after = wait
+        if len(states) > self._sweep_at:
+            self._sweep(now)
+
+        limit = lowest_state[2]
+        remaining = lowest - cost if allowed else lowest
+        return RateLimitResult(
+            allowed, limit.burst, remaining if remaining > 0 else 0.0, retry_after,
+            (limit.burst - remaining) / limit.rate,
+        )
+
+    def _sweep(self, now: float) -> None:
+        """Drop buckets that have refilled completely: forgetting them changes nothing"""
+        self._buckets = {
+            key: state for key, state in self._buckets.items()
+            if state[0] + (now - state[1]) * state[2].rate < state[2].burst
+        }
+        # Amortized O(1) per check even when most buckets are busy
+        self._sweep_at = max(self.max_keys, 2 * len(self._buckets))
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# KEYS: bucket keys. ARGV: cost, force, then rate and burst of each bucket.
+# Returns {allowed, retry_after, remaining, limit, reset_in} of the bucket
+# closest to empty; numbers as strings since Lua numbers would be truncated.
+TOKEN_BUCKET_SCRIPT = """
+-- TIME before writes needs effects replication on Redis < 7
+redis.replicate_commands()
+local cost = tonumber(ARGV[1])
+local force = ARGV[2] == "1"
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + 2 * i])
+    local burst = tonumber(ARGV[2 + 2 * i])
+    local state = redis.call("HMGET", key, "t", "u")
+    local available = burst
+    if state[1] then
+        available = math.min(burst, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+    end
+    local needed = math.min(cost, burst)
+    if available < needed then
+        retry_after = math.max(retry_after, (needed - available) / rate)
+    end
+    tokens[i] = available
+end
+local allowed = force or retry_after == 0
+local spent = 0
+if allowed then
+    spent = cost
+    retry_after = 0
+end
+local lowest, lowest_burst, lowest_rate = nil, 0, 1
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + 2 * i])
+    local burst = tonumber(ARGV[2 + 2 * i])
+    local left = tokens[i] - spent
+    if allowed then
+        redis.call("HSET", key, "t", tostring(left), "u", tostring(now))
+        redis.call("PEXPIRE", key, math.ceil((burst - left) / rate * 1000) + 1000)
+        if force and left < 0 then
+            retry_after = math.max(retry_after, -left / rate)
+        end
+    end
+    if lowest == nil or left < lowest then
+        lowest, lowest_burst, lowest_rate = left, burst, rate
+    end
+end
+return {allowed and "1" or "0", tostring(retry_after), tostring(lowest), tostring(lowest_burst),
+        tostring((lowest_burst - lowest) / lowest_rate)}
+"""
+
+
+class RedisBuckets:
+    """Buckets shared through Redis; one script call per check"""
+
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package (pip install redis)")
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.errors = 0
+
+    async def take(self, buckets: Sequence[Bucket], cost: float, force: bool = False) -> RateLimitResult:
+        keys = []
+        args: List = [cost, "1" if force else "0"]
+        for key, limit in buckets:
+            # Don't store API keys in Redis
+            digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+            keys.append(f"ratelimit:{limit.name}:{digest}")
+            args.extend((limit.rate, limit.burst))
+        try:
+            allowed, retry_after, remaining, limit, reset_in = await self._script(keys=keys, args=args)
+        except Exception as e:
+            # Fail open: an outage of the limiter must not take the API down
+            self.errors += 1
+            logger.warning("Rate limit check failed, allowing request: %s", e)
+            return RateLimitResult(True, 0, 0, 0.0, 0.0)
+        return RateLimitResult(
+            allowed == b"1", float(limit), max(0.0, float(remaining)), float(retry_after), float(reset_in),
+        )
+
+    def __len__(self) -> int:
+        return 0
+
+
+class RateLimiter:
+    """One kind of rate limit, enforced per API key and per tenant"""
+
+    def __init__(self, per_key: Optional[Limit], per_tenant: Optional[Limit], backend):
+        self.per_key = per_key
+        self.per_tenant = per_tenant
+        self.backend = backend
+        self.allowed = 0
+        self.rejected = 0
+
+    def _buckets(self, client_key: str, tenant_id: Optional[str]) -> List[Bucket]:
+        buckets = []
+        if self.per_key is not None:
+            buckets.append((f"{self.per_key.name}:{client_key}", self.per_key))
+        if self.per_tenant is not None and tenant_id:
+            buckets.append((f"{self.per_tenant.name}:{tenant_id}", self.per_tenant))
+        return buckets
+
+    async def check(self, client_key: str, tenant_id: Optional[str], cost: float = 1) -> Optional[RateLimitResult]:
+        """Take `cost` tokens if every bucket has them; None if no limit applies"""
+        buckets = self._buckets(client_key, tenant_id)
+        if not buckets:
+            return None
+        result = await self.backend.take(buckets, cost)
+        if result.allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return result
+
+    async def charge(self, client_key: str, tenant_id: Optional[str], cost: float) -> Optional[RateLimitResult]:
+        """Take `cost` tokens even if that leaves the buckets in debt; retry_after is the time to clear it"""
+        buckets = self._buckets(client_key, tenant_id)
+        if not buckets:
+            return None
+        return await self.backend.take(buckets, cost, force=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {"allowed": self.allowed, "rejected": self.rejected}
+
+
+def client_key(connection: HTTPConnection) -> str:
+    """
+    Identify the caller by the key or subject ID it authenticated as
+    (services/auth.py), else by client address. Unverified X-API-Key and
+    bearer values are not used: a new one per request would get a new
+    bucket each time.
+    """
+    principal = principal_of(connection)
+    if principal is not None:
+        return f"{principal.method}:{principal.subject}"
+    client = connection.client
+    return f"ip:{client.host if client else 'unknown'}"
+
+
+def tenant_key(connection: HTTPConnection) -> Optional[str]:
+    """
+    Tenant bucket of the caller: the tenant its credentials belong to, else
+    its client address, since X-Tenant-ID is not verified. None (no tenant
+    bucket) for credentials without a tenant.
+    """
+    principal = principal_of(connection)
+    if principal is None:
+        return client_key(connection)
+    return principal.tenant_id
+
+
+def rate_limit_response(result: RateLimitResult) -> JSONResponse:
+    """429 rate_limit_exceeded with spec/12 rate limit headers"""
+    # Rounded up so a client that waits exactly Retry-After is let through
+    retry_after = max(1, math.ceil(result.retry_after))
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={
+            "Retry-After": str(retry_after),
+            "X-RateLimit-Limit": str(int(result.limit)),
+            "X-RateLimit-Remaining": str(int(result.remaining)),
+            "X-RateLimit-Reset": str(math.ceil(time.time() + result.reset_in)),
+        },
+        content={
+            "error": {
+                "code": "rate_limit_exceeded",
+                "message": f"Rate limit exceeded. Please retry after {retry_after} seconds.",
+                "details": {
+                    "limit": result.limit,
+                    "retry_after_seconds": retry_after,
+                },
+            }
+        },
+    )
+
+
+def create_backend():
+    backend = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend == "memory":
+        return MemoryBuckets(max_keys=int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000")))
+    if backend == "redis":
+        return RedisBuckets(os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0"))
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{backend}'")
+
+
+def _limiter(name: str, variable: str, per_key: str, per_tenant: str, backend) -> RateLimiter:
+    if not RATE_LIMIT_ENABLED:
+        return RateLimiter(None, None, backend)
+    return RateLimiter(
+        Limit.from_env(name, variable, per_key),
+        Limit.from_env(f"{name}_tenant", f"{variable}_TENANT", per_tenant),
+        backend,
+    )
+
+
+# Shared limiters used by the routes
+RATE_LIMIT_BACKEND = create_backend()
+SESSION_LIMITER = _limiter("sessions", "RATE_LIMIT_SESSIONS", "20/100", "100/500", RATE_LIMIT_BACKEND)
+UPLOAD_LIMITER = _limiter(
+    "upload_bytes", "RATE_LIMIT_UPLOAD_BYTES",
+    f"{50 * 2**20}/{200 * 2**20}", f"{250 * 2**20}/{2**30}", RATE_LIMIT_BACKEND,
+)
+POLL_LIMITER = _limiter("polls", "RATE_LIMIT_POLLS", "50/200", "500/2000", RATE_LIMIT_BACKEND)
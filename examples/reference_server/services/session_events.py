@@ -0,0 +1,232 @@
+"""
+Session change notifications for MedScribe Alliance Protocol
+
+In-process pub/sub for session changes, used by:
+- Long-poll requests (GET /sessions/{id}?wait=...), which park on a
+  per-session future until the session's status changes.
+- Push channels (GET /sessions/{id}/events over SSE or WebSocket), which
+  subscribe and receive every event published for the session.
+
+Notifications come from the store's update() listener hook, so every
+status transition is seen regardless of which route or background task
+made it. Status transitions are published under the webhook event names
+of spec/10 (session.started, session.completed, ...); other producers
+such as the processing pipeline can publish extra events (e.g. transcript
+updates) with publish_event().
+
+Each subscriber has its own bounded queue. When a subscriber falls behind,
+its oldest events are dropped and counted, so one slow client never
+blocks publishers or other subscribers. Idle subscribers cost one small
+object and no CPU.
+
+Publishing may happen from another thread; futures and queues are always
+touched on their own event loop.
+
+Environment variables:
+- SESSION_EVENTS_QUEUE_SIZE: Events buffered per subscriber (default: 64)
+"""
+
+import asyncio
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Set
+
+from models import SessionStatus
+from services.session_store import SESSION_STORE, SessionStore
+
+
+# Status transition -> event name (spec/10 §10.5)
+STATUS_EVENTS = {
+    SessionStatus.RECORDING: "session.started",
+    SessionStatus.PROCESSING: "session.ended",
+    SessionStatus.COMPLETED: "session.completed",
+    SessionStatus.PARTIAL: "session.partial",
+    SessionStatus.FAILED: "session.failed",
+    SessionStatus.EXPIRED: "session.expired",
+}
+
+# No further events are published for a session in these states
+TERMINAL_STATUSES = (
+    SessionStatus.COMPLETED,
+    SessionStatus.PARTIAL,
+    SessionStatus.FAILED,
+    SessionStatus.EXPIRED,
+)
+
+
+def _resolve(future: asyncio.Future, value: Any) -> None:
+    if not future.done():
+        future.set_result(value)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class Subscription:
+    """Bounded event queue of one push-channel client"""
+
+    __slots__ = ("session_id", "loop", "dropped", "closed", "_events", "_waiter")
+
+    def __init__(self, session_id: str, max_events: int, loop: asyncio.AbstractEventLoop):
+        self.session_id = session_id
+        self.loop = loop
+        self.dropped = 0
+        self.closed = False
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max_events)
+        self._waiter: Optional[asyncio.Future] = None
+
+    def put(self, event: Dict[str, Any]) -> None:
+        """Queue an event, dropping the oldest one if the queue is full; loop thread only"""
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+        if self._waiter is not None:
+            _resolve(self._waiter, None)
+
+    def close(self) -> None:
+        """Wake a pending get(), which then returns None; loop thread only"""
+        self.closed = True
+        if self._waiter is not None:
+            _resolve(self._waiter, None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next event, or None on timeout or once the subscription is closed"""
+        if not self._events and not self.closed:
+            # A bare future plus timer is much lighter than asyncio.wait_for
+            self._waiter = waiter = self.loop.create_future()
+            timer = None
+            if timeout is not None:
+                timer = self.loop.call_later(timeout, _resolve, waiter, None)
+            try:
+                await waiter
+            finally:
+                self._waiter = None
+                if timer is not None:
+                    timer.cancel()
+        if not self._events:
+            return None
+        return self._events.popleft()
+
+
+class SessionEvents:
+    """Per-session wake-ups and event fan-out"""
+
+    def __init__(self, max_events: int = 64):
+        self.max_events = max_events
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    def attach(self, store: SessionStore) -> None:
+        """Publish status changes recorded by the store"""
+        store.add_listener(self._on_update)
+
+    def _on_update(self, session_id: str, session: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        if "status" not in fields:
+            return
+        new_status = SessionStatus(fields["status"])
+        self.publish(session_id, new_status)
+        event = STATUS_EVENTS.get(new_status)
+        if event is not None and session_id in self._subscribers:
+            self.publish_event(session_id, event, {"status": new_status})
+
+    # ------------------------------------------------------------------
+    # Long-poll waiters
+    # ------------------------------------------------------------------
+
+    def publish(self, session_id: str, new_status: Any) -> None:
+        """Wake every handler waiting on the session"""
+        waiters = self._waiters.pop(session_id, None)
+        if not waiters:
+            return
+        running = _running_loop()
+        for future in waiters:
+            loop = future.get_loop()
+            if loop is running:
+                _resolve(future, new_status)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, new_status)
+
+    async def wait(self, session_id: str, timeout: float) -> Optional[Any]:
+        """
+        Wait up to `timeout` seconds for the session's next status change.
+
+        Returns the new status, or None on timeout. Callers must re-read
+        the session afterwards; the status may have moved on again.
+        """
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.setdefault(session_id, set())
+        waiters.add(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters.discard(future)
+            if not waiters and self._waiters.get(session_id) is waiters:
+                del self._waiters[session_id]
+
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    # ------------------------------------------------------------------
+    # Push-channel subscribers
+    # ------------------------------------------------------------------
+
+    def subscribe(self, session_id: str) -> Subscription:
+        """Start receiving the session's events; pair with unsubscribe()"""
+        subscription = Subscription(session_id, self.max_events, asyncio.get_running_loop())
+        self._subscribers.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.session_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.session_id]
+
+    def publish_event(self, session_id: str, event: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Send an event to every subscriber of the session"""
+        subscribers = self._subscribers.get(session_id)
+        if not subscribers:
+            return
+        message = {
+            "event": event,
+            "timestamp": datetime.utcnow(),
+            "session_id": session_id,
+        }
+        if data:
+            message.update(data)
+        self.published += 1
+
+        running = _running_loop()
+        # Copy: a subscriber may unsubscribe while we iterate from another thread
+        for subscription in tuple(subscribers):
+            if subscription.loop is running:
+                subscription.put(message)
+            else:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+
+    def subscribers(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self.subscribers(),
+            "long_polls": self.waiting(),
+            "events_published": self.published,
+        }
+
+
+# Shared event bus used by all routes
+SESSION_EVENTS = SessionEvents(
+    max_events=int(os.getenv("SESSION_EVENTS_QUEUE_SIZE", "64")),
+)
+SESSION_EVENTS.attach(SESSION_STORE)
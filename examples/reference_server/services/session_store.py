@@ -0,0 +1,847 @@
+"""
+Session storage backends for MedScribe Alliance Protocol
+
+Backends:
+- InMemorySessionStore - Plain dict, lost on restart
+- WALSessionStore - In-memory dict made durable by an append-only
+  write-ahead log (group-commit fsync) and periodic compacted snapshots
+- SQLiteSessionStore - SQLite database in WAL mode, shared by every worker
+  process on a host (uvicorn --workers N, or one server per core)
+
+The memory and WAL stores belong to one process: with several workers, a
+request for a session created by another worker gets session_not_found.
+
+Session IDs carry the shard of the process that created them (shard_of()),
+so a proxy can route every request of a session to that process.
+
+The backend is selected with environment variables:
+- SESSION_STORE: "memory" (default), "wal" or "sqlite"
+- SESSION_STORE_PATH: WAL/snapshot directory, or directory of sessions.db
+  for "sqlite" (default: ./data/sessions)
+- SESSION_SHARD: Shard of this process, 0-65535, for "sqlite" (default:
+  the lowest one not held by a live process on this host)
+- SESSION_STORE_FSYNC_INTERVAL_MS: group-commit window (default: 5)
+- SESSION_STORE_SNAPSHOT_RECORDS: WAL records between snapshots (default: 50000)
+
+Sessions are plain dicts. Routes read them with get() and MUST write them
+through create(), update(), append(), add_chunk() or delete() so that
+every change is recorded by durable backends. Received audio chunks are
+kept in session["audio_chunks"], a ChunkMap (services/chunk_map.py). Callbacks registered with add_listener() are
+invoked after every update(), e.g. to publish status transitions.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.chunk_map import ChunkMap
+
+
+logger = logging.getLogger(__name__)
+
+
+UpdateListener = Callable[[str, Dict[str, Any], Dict[str, Any]], None]
+
+
+# Session IDs are "ses_" + the shard of the process that created them, in
+# SHARD_DIGITS hex digits, + 32 random hex digits
+SHARD_DIGITS = 4
+MAX_SHARD = 16 ** SHARD_DIGITS - 1
+_SHARDED_ID_LENGTH = len("ses_") + SHARD_DIGITS + 32
+
+
+def shard_of(session_id: str) -> Optional[int]:
+    """Shard encoded in a session ID, or None for an ID without one"""
+    if len(session_id) != _SHARDED_ID_LENGTH or not session_id.startswith("ses_"):
+        return None
+    try:
+        return int(session_id[4:4 + SHARD_DIGITS], 16)
+    except ValueError:
+        return None
+
+
+class SessionStore(ABC):
+    """Interface implemented by all session storage backends"""
+
+    # Encoded in the IDs of sessions created by this process
+    shard = 0
+
+    def __init__(self):
+        self._listeners: List[UpdateListener] = []
+
+    def add_listener(self, callback: UpdateListener) -> None:
+        """Register callback(session_id, session, fields), called after every update()"""
+        self._listeners.append(callback)
+
+    def _notify(self, session_id: str, session: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            listener(session_id, session, fields)
+
+    @abstractmethod
+    def create(self, session: Dict[str, Any]) -> None:
+        """Store a new session keyed by session["session_id"]"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the session dict, or None if it does not exist"""
+
+    @abstractmethod
+    def update(self, session_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Set one or more top-level fields of a session"""
+
+    @abstractmethod
+    def append(self, session_id: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Append a value to a list field of a session"""
+
+    @abstractmethod
+    async def add_chunk(self, session_id: str, sequence: int, filename: str, seconds: Optional[float] = None) -> Optional[bool]:
+        """
+        Record an audio chunk and its duration if known; False if the
+        sequence was already present, None if no session. Awaited, so a
+        shared store can wait for its database off the event loop; the
+        others return without suspending.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a session and return it"""
+
+    @abstractmethod
+    def __contains__(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[str]:
+        ...
+
+    def owned(self) -> Iterator[str]:
+        """
+        Sessions whose background work (expiry, resuming processing after a
+        restart) falls to this process: all of them, unless the store is
+        shared with other processes
+        """
+        return iter(self)
+
+    def flush(self) -> None:
+        """Block until all accepted writes are durable (no-op for volatile stores)"""
+
+    def close(self) -> None:
+        """Flush and release any resources held by the store"""
+
+
+class InMemorySessionStore(SessionStore):
+    """Volatile session store backed by a dict"""
+
+    def __init__(self):
+        super().__init__()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, session: Dict[str, Any]) -> None:
+        self._sessions[session["session_id"]] = session
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._sessions.get(session_id)
+
+    def update(self, session_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.update(fields)
+            if self._listeners:
+                self._notify(session_id, session, fields)
+        return session
+
+    def append(self, session_id: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session[field].append(value)
+        return session
+
+    async def add_chunk(self, session_id: str, sequence: int, filename: str, seconds: Optional[float] = None) -> Optional[bool]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        return session["audio_chunks"].add(sequence, filename, seconds)
+
+    def delete(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return self._sessions.pop(session_id, None)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+
+# ============================================================================
+# Write-ahead log backend
+# ============================================================================
+
+def _encode_value(value: Any) -> Any:
+    """JSON fallback encoder: datetimes and chunk maps are tagged so they round-trip"""
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, ChunkMap):
+        return {"$chunks": value.to_list()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    if len(obj) == 1 and "$chunks" in obj:
+        return ChunkMap.from_list(obj["$chunks"])
+    return obj
+
+
+# Built once: json.dumps()/json.loads() with custom hooks construct a new
+# encoder/decoder on every call, which dominates WAL replay time
+_encoder = json.JSONEncoder(default=_encode_value, separators=(",", ":"))
+_decoder = json.JSONDecoder(object_hook=_decode_object)
+
+
+def _dumps(record: Dict[str, Any]) -> bytes:
+    return _encoder.encode(record).encode() + b"\n"
+
+
+def _loads(line: bytes) -> Dict[str, Any]:
+    return _decoder.decode(line.decode())
+
+
+def _copy_session(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a session deep enough that later append()/update() calls don't leak in"""
+    return {
+        key: list(value) if isinstance(value, list) else
+        dict(value) if isinstance(value, dict) else
+        value.copy() if isinstance(value, ChunkMap) else value
+        for key, value in session.items()
+    }
+
+
+class WALSessionStore(InMemorySessionStore):
+    """
+    Durable session store.
+
+    Every write is applied to the in-memory dict and queued as one JSON line
+    for the write-ahead log. A background thread writes the queue and fsyncs
+    it every `fsync_interval` seconds (group commit), so request handlers
+    never wait on the disk. Writes accepted in the last `fsync_interval`
+    can be lost on a crash; call flush() where that is not acceptable.
+
+    Once `snapshot_records` WAL records have accumulated, the live sessions
+    are written to a compacted snapshot and older WAL segments are removed,
+    keeping recovery time proportional to the number of live sessions.
+
+    Directory layout:
+        snapshot.json          {"wal_segment": N, "sessions": {...}}
+        wal.<segment>.log      JSON lines, replayed from segment N onwards
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fsync_interval: float = 0.005,
+        snapshot_records: int = 50000,
+    ):
+        super().__init__()
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.snapshot_records = snapshot_records
+
+        # _lock guards _sessions and _pending; _io_lock serializes disk writes
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._records_since_snapshot = 0
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._segment = self._recover()
+        self._wal = open(self._segment_path(self._segment), "ab")
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="session-wal-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    # ------------------------------------------------------------------
+    # SessionStore interface
+    # ------------------------------------------------------------------
+
+    def create(self, session: Dict[str, Any]) -> None:
+        record = _dumps({"op": "put", "id": session["session_id"], "session": session})
+        with self._lock:
+            self._sessions[session["session_id"]] = session
+            self._pending.append(record)
+
+    def update(self, session_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        record = _dumps({"op": "set", "id": session_id, "fields": fields})
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session.update(fields)
+            self._pending.append(record)
+        if self._listeners:
+            self._notify(session_id, session, fields)
+        return session
+
+    def append(self, session_id: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        record = _dumps({"op": "add", "id": session_id, "field": field, "value": value})
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session[field].append(value)
+            self._pending.append(record)
+        return session
+
+    async def add_chunk(self, session_id: str, sequence: int, filename: str, seconds: Optional[float] = None) -> Optional[bool]:
+        record = _dumps({"op": "chunk", "id": session_id, "seq": sequence, "file": filename, "sec": seconds})
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            added = session["audio_chunks"].add(sequence, filename, seconds)
+            if added:
+                self._pending.append(record)
+        return added
+
+    def delete(self, session_id: str) -> Optional[Dict[str, Any]]:
+        record = _dumps({"op": "del", "id": session_id})
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._pending.append(record)
+        return session
+
+    def flush(self) -> None:
+        self._commit()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._flusher.join()
+        self._commit()
+        self._wal.close()
+
+    # ------------------------------------------------------------------
+    # Group commit and snapshots
+    # ------------------------------------------------------------------
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            self._commit()
+            if self._records_since_snapshot >= self.snapshot_records:
+                self.snapshot()
+
+    def _commit(self) -> None:
+        """Write and fsync every queued record in a single batch"""
+        with self._io_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            self._wal.write(b"".join(batch))
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+            self._records_since_snapshot += len(batch)
+
+    def snapshot(self) -> None:
+        """Write a compacted snapshot and drop WAL segments it supersedes"""
+        with self._io_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                sessions = {sid: _copy_session(s) for sid, s in self._sessions.items()}
+            # Records queued before the copy belong to the old segment
+            if batch:
+                self._wal.write(b"".join(batch))
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+            self._wal.close()
+
+            old_segment = self._segment
+            self._segment += 1
+            self._wal = open(self._segment_path(self._segment), "ab")
+            self._records_since_snapshot = 0
+
+        snapshot_path = os.path.join(self.directory, "snapshot.json")
+        tmp_path = snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_dumps({"wal_segment": old_segment + 1, "sessions": sessions}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path)
+
+        for segment in self._segments():
+            if segment <= old_segment:
+                os.remove(self._segment_path(segment))
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"wal.{segment:08d}.log")
+
+    def _segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("wal.") and name.endswith(".log"):
+                segments.append(int(name[4:-4]))
+        return sorted(segments)
+
+    def _recover(self) -> int:
+        """Load the latest snapshot, replay newer WAL segments, return the active segment"""
+        first_segment = 0
+        snapshot_path = os.path.join(self.directory, "snapshot.json")
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as f:
+                snapshot = _loads(f.read())
+            self._sessions = snapshot["sessions"]
+            first_segment = snapshot["wal_segment"]
+
+        segments = [s for s in self._segments() if s >= first_segment]
+        for segment in segments:
+            self._replay(self._segment_path(segment))
+
+        return segments[-1] if segments else first_segment
+
+    def _replay(self, path: str) -> None:
+        good_offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    record = _loads(line)
+                except ValueError:
+                    # Torn write from a crash mid-append; everything after is lost
+                    break
+                self._apply(record)
+                good_offset += len(line)
+                self._records_since_snapshot += 1
+        if good_offset != os.path.getsize(path):
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record["op"]
+        session_id = record["id"]
+        if op == "put":
+            self._sessions[session_id] = record["session"]
+        elif op == "set":
+            if session_id in self._sessions:
+                self._sessions[session_id].update(record["fields"])
+        elif op == "add":
+            if session_id in self._sessions:
+                self._sessions[session_id][record["field"]].append(record["value"])
+        elif op == "chunk":
+            if session_id in self._sessions:
+                self._sessions[session_id]["audio_chunks"].add(record["seq"], record["file"], record.get("sec"))
+        elif op == "del":
+            self._sessions.pop(session_id, None)
+
+
+# ============================================================================
+# Shared SQLite backend
+# ============================================================================
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class _DatabaseLocked(Exception):
+    """Another process holds the write lock of the session database"""
+
+
+def _locked(error: sqlite3.OperationalError) -> bool:
+    return str(error).startswith("database is locked")
+
+
+class SQLiteSessionStore(InMemorySessionStore):
+    """
+    Session store shared by every worker process that opens the same file.
+
+    Sessions are rows of JSON in an SQLite database in WAL mode, so readers
+    in one process never block on a writer in another. Each row carries a
+    version, bumped on every write. Sessions read by this process are
+    cached, and get() only reloads one when its version has changed: with
+    requests routed by session affinity, a status poll reads two integers
+    rather than the session. Writes are read-modify-write transactions
+    (BEGIN IMMEDIATE), so concurrent add_chunk() calls from different
+    workers for the same sequence still record exactly one of them.
+
+    Writes never wait for the database on the event loop. Each one is
+    tried at once; if another process holds the write lock, it is applied
+    to the cached session and queued for a writer thread, which waits up
+    to `busy_timeout` for the lock. Later writes queue behind it until the
+    queue is empty, so they are committed in order, and sessions with
+    queued writes are served from the cache. add_chunk() must know whether
+    its sequence was recorded, so it awaits its turn in the queue instead.
+    Other processes see a queued write once it is committed.
+
+    Each process holds a shard number, encoded in the IDs of the sessions
+    it creates: `shard` if given, otherwise the lowest number not held by a
+    live process on this host. Listeners only see updates made by this
+    process; event streams and long polls need requests of a session
+    routed to the same process to see every change as it happens.
+    """
+
+    def __init__(self, path: str, shard: Optional[int] = None, busy_timeout: float = 5.0):
+        super().__init__()
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Connection of the writer thread, which may wait for the lock
+        self._writer_db = self._connect(busy_timeout)
+        self._writer_db.execute("PRAGMA journal_mode=WAL")
+        self._writer_db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions "
+            "(session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL)"
+        )
+        self._writer_db.execute(
+            "CREATE TABLE IF NOT EXISTS shards (shard INTEGER PRIMARY KEY, host TEXT NOT NULL, pid INTEGER NOT NULL)"
+        )
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        # Connection of the event loop, which never waits; serialized by
+        # _lock, which also guards the cache
+        self._lock = threading.Lock()
+        self._db = self._connect(0)
+        # session_id -> version of the cached copy in _sessions
+        self._versions: Dict[str, int] = {}
+        # session_id -> writes queued for the writer thread
+        self._queued: Dict[str, int] = {}
+        self._closed = False
+        self.shard = self._claim_shard(shard)
+
+    def _connect(self, busy_timeout: float) -> sqlite3.Connection:
+        # Autocommit, with explicit transactions around read-modify-write
+        db = sqlite3.connect(self.path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        # Durable against process crashes; the last commits before a power
+        # loss may be lost, as with the group commit of WALSessionStore
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _claim_shard(self, shard: Optional[int]) -> int:
+        host = socket.gethostname()
+        db = self._writer_db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            held = {}
+            for number, owner_host, pid in db.execute("SELECT shard, host, pid FROM shards"):
+                # Shards of processes that exited on this host are free again
+                if owner_host != host or _pid_alive(pid):
+                    held[number] = (owner_host, pid)
+            if shard is None:
+                shard = next(number for number in range(MAX_SHARD + 1) if number not in held)
+            elif shard in held and held[shard] != (host, os.getpid()):
+                raise ValueError(f"Session shard {shard} is held by process {held[shard][1]} on {held[shard][0]}")
+            db.execute("INSERT OR REPLACE INTO shards VALUES (?, ?, ?)", (shard, host, os.getpid()))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return shard
+
+    def _refresh(self, session_id: str, version: int, data: str) -> Dict[str, Any]:
+        """Update the cached copy in place, so sessions already handed out see it"""
+        fresh = _decoder.decode(data)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = fresh
+        else:
+            session.clear()
+            session.update(fresh)
+        self._versions[session_id] = version
+        return session
+
+    def _forget(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+        self._versions.pop(session_id, None)
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Current session, from the cache if its version is the latest; call with _lock held"""
+        if session_id in self._queued:
+            # The cache is ahead of the database; None if a delete is queued
+            return self._sessions.get(session_id)
+        row = self._db.execute(
+            "SELECT version, CASE WHEN version = ? THEN NULL ELSE data END FROM sessions WHERE session_id = ?",
+            (self._versions.get(session_id, 0), session_id),
+        ).fetchone()
+        if row is None:
+            self._forget(session_id)
+            return None
+        version, data = row
+        if data is None:
+            return self._sessions[session_id]
+        return self._refresh(session_id, version, data)
+
+    def _begin(self) -> None:
+        try:
+            self._db.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if _locked(e):
+                raise _DatabaseLocked() from None
+            raise
+
+    def _modify(self, session_id: str, change: Callable[[Dict[str, Any]], Any]) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """
+        Apply change(session) and write the session back, in one transaction;
+        call with _lock held. Raises _DatabaseLocked instead of waiting.
+        """
+        self._begin()
+        try:
+            session = self._load(session_id)
+            if session is None:
+                self._db.execute("COMMIT")
+                return None, None
+            result = change(session)
+            if result is not False:
+                self._db.execute(
+                    "UPDATE sessions SET version = version + 1, data = ? WHERE session_id = ?",
+                    (_encoder.encode(session), session_id),
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            # The cached copy may hold the change that was rolled back
+            self._forget(session_id)
+            raise
+        if result is not False:
+            self._versions[session_id] += 1
+        return session, result
+
+    def _write(self, session_id: str, change: Callable[[Dict[str, Any]], Any]) -> Optional[Dict[str, Any]]:
+        """Apply change(session) now, and write it now or in the writer thread"""
+        with self._lock:
+            if not self._queued:
+                try:
+                    return self._modify(session_id, change)[0]
+                except _DatabaseLocked:
+                    pass
+            session = self._load(session_id)
+            if session is not None:
+                change(session)
+                self._enqueue(session_id, self._write_queued, session_id, change, None)
+        return session
+
+    def _enqueue(self, session_id: str, write: Callable[..., Any], *args: Any) -> Future:
+        """Queue a write for the writer thread; call with _lock held"""
+        self._queued[session_id] = self._queued.get(session_id, 0) + 1
+        return self._writer.submit(self._run_queued, session_id, write, args)
+
+    def _run_queued(self, session_id: str, write: Callable[..., Any], args: Tuple[Any, ...]) -> Any:
+        committed = None
+        try:
+            committed, result = write(*args)
+            return result
+        except BaseException:
+            logger.exception("Queued write of session %s failed", session_id)
+            raise
+        finally:
+            with self._lock:
+                left = self._queued.pop(session_id) - 1
+                if left:
+                    self._queued[session_id] = left
+                elif committed is not None:
+                    # Includes whatever other processes wrote meanwhile
+                    version, data = committed
+                    if data is None:
+                        self._forget(session_id)
+                    else:
+                        self._refresh(session_id, version, data)
+                else:
+                    self._forget(session_id)
+
+    def _write_queued(
+        self,
+        session_id: str,
+        change: Callable[[Dict[str, Any]], Any],
+        apply_cached: Optional[Callable[[Dict[str, Any]], Any]],
+    ) -> Tuple[Tuple[int, Optional[str]], Any]:
+        """Writer thread: change(session) in one transaction; ((version, data), result)"""
+        db = self._writer_db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT version, data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return (0, None), None
+            version, data = row
+            session = _decoder.decode(data)
+            result = change(session)
+            if result is not False:
+                data = _encoder.encode(session)
+                version += 1
+                db.execute("UPDATE sessions SET version = ?, data = ? WHERE session_id = ?", (version, data, session_id))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if apply_cached is not None and result is not False:
+            # Not applied to the cache when queued; other queued writes
+            # keep the cache from being refreshed, so apply it there too
+            with self._lock:
+                cached = self._sessions.get(session_id)
+                if cached is not None and self._queued[session_id] > 1:
+                    apply_cached(cached)
+        return (version, data), result
+
+    def _insert_queued(self, session_id: str, data: str) -> Tuple[Tuple[int, Optional[str]], None]:
+        self._writer_db.execute("INSERT INTO sessions VALUES (?, 1, ?)", (session_id, data))
+        return (1, data), None
+
+    def _delete_queued(self, session_id: str) -> Tuple[Tuple[int, Optional[str]], None]:
+        self._writer_db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return (0, None), None
+
+    # ------------------------------------------------------------------
+    # SessionStore interface
+    # ------------------------------------------------------------------
+
+    def create(self, session: Dict[str, Any]) -> None:
+        session_id = session["session_id"]
+        data = _encoder.encode(session)
+        with self._lock:
+            self._sessions[session_id] = session
+            if not self._queued:
+                try:
+                    self._db.execute("INSERT INTO sessions VALUES (?, 1, ?)", (session_id, data))
+                    self._versions[session_id] = 1
+                    return
+                except sqlite3.OperationalError as e:
+                    if not _locked(e):
+                        self._forget(session_id)
+                        raise
+            self._enqueue(session_id, self._insert_queued, session_id, data)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load(session_id)
+
+    def update(self, session_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        session = self._write(session_id, lambda session: session.update(fields))
+        if session is not None and self._listeners:
+            self._notify(session_id, session, fields)
+        return session
+
+    def append(self, session_id: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        return self._write(session_id, lambda session: session[field].append(value))
+
+    async def add_chunk(self, session_id: str, sequence: int, filename: str, seconds: Optional[float] = None) -> Optional[bool]:
+        # Unchanged when the sequence is already present (add() returns False)
+        def change(session: Dict[str, Any]) -> bool:
+            return session["audio_chunks"].add(sequence, filename, seconds)
+
+        with self._lock:
+            if not self._queued:
+                try:
+                    return self._modify(session_id, change)[1]
+                except _DatabaseLocked:
+                    pass
+            queued = self._enqueue(session_id, self._write_queued, session_id, change, change)
+        return await asyncio.wrap_future(queued)
+
+    def delete(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._queued:
+                try:
+                    row = self._db.execute("DELETE FROM sessions WHERE session_id = ? RETURNING data", (session_id,)).fetchone()
+                except sqlite3.OperationalError as e:
+                    if not _locked(e):
+                        raise
+                else:
+                    cached = self._sessions.get(session_id)
+                    self._forget(session_id)
+                    if row is None:
+                        return None
+                    return cached if cached is not None else _decoder.decode(row[0])
+            session = self._load(session_id)
+            if session is not None:
+                self._forget(session_id)
+                self._enqueue(session_id, self._delete_queued, session_id)
+        return session
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id in self._queued:
+                return session_id in self._sessions
+            return self._db.execute("SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter([row[0] for row in self._db.execute("SELECT session_id FROM sessions")])
+
+    def owned(self) -> Iterator[str]:
+        # IDs without a shard predate sharding; shard 0 takes them
+        with self._lock:
+            session_ids = [row[0] for row in self._db.execute("SELECT session_id FROM sessions")]
+        return iter([
+            session_id for session_id in session_ids
+            if shard_of(session_id) == self.shard or (shard_of(session_id) is None and self.shard == 0)
+        ])
+
+    def flush(self) -> None:
+        """Block until the queued writes are committed"""
+        self._writer.submit(lambda: None).result()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
+        self._writer_db.execute("DELETE FROM shards WHERE shard = ? AND pid = ?", (self.shard, os.getpid()))
+        self._writer_db.close()
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store configured through environment variables"""
+    backend = os.getenv("SESSION_STORE", "memory")
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        shard = os.getenv("SESSION_SHARD")
+        return SQLiteSessionStore(
+            path=os.path.join(os.getenv("SESSION_STORE_PATH", os.path.join("data", "sessions")), "sessions.db"),
+            shard=int(shard) if shard else None,
+        )
+    if backend == "wal":
+        return WALSessionStore(
+            directory=os.getenv("SESSION_STORE_PATH", os.path.join("data", "sessions")),
+            fsync_interval=float(os.getenv("SESSION_STORE_FSYNC_INTERVAL_MS", "5")) / 1000,
+            snapshot_records=int(os.getenv("SESSION_STORE_SNAPSHOT_RECORDS", "50000")),
+        )
+    raise ValueError(f"Unknown SESSION_STORE backend '{backend}'")
+
+
+# Shared store used by all routes
+SESSION_STORE = create_session_store()
@@ -0,0 +1,247 @@
+"""
+Template registry for MedScribe Alliance Protocol
+
+Holds the standard templates available to everyone plus custom templates
+owned by individual tenants (EMRs, hospitals), and answers the filtered,
+paginated queries behind GET /templates.
+
+Indexing:
+- Templates are bucketed by (owner, category, tier); each bucket is a list
+  of template IDs kept sorted.
+- A query visits only the buckets of the standard owner and the requesting
+  tenant that match the filters, bisects each one to the cursor, and merges
+  them, so cost depends on the page size and bucket count, not on how many
+  templates exist across all tenants.
+
+Caching:
+- Serialized list responses are cached per (tenant, filters, page) with
+  a strong ETag. Each entry records the standard and tenant versions it was
+  built from; changing a tenant's templates bumps that tenant's version, so
+  only that tenant's cached pages go stale.
+"""
+
+import base64
+import bisect
+import heapq
+import itertools
+from collections import OrderedDict
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from models import TemplateInfo, TemplatesListResponse
+from services.http_cache import etag_for
+
+
+# Owner of templates available to every tenant
+STANDARD = ""
+
+# Subscription tiers, lowest first; a tenant sees templates up to its tier
+TEMPLATE_TIERS = ("basic", "professional", "enterprise")
+DEFAULT_TENANT_TIER = "professional"
+
+
+class TemplateEntry(NamedTuple):
+    """A template plus the attributes it is indexed by"""
+    owner: str
+    category: str
+    tier: str
+    info: TemplateInfo
+
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that was not issued by the registry"""
+
+
+def encode_cursor(template_id: str) -> str:
+    return base64.urlsafe_b64encode(template_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode()
+    except ValueError:
+        raise InvalidCursor(f"Invalid cursor '{cursor}'")
+
+
+class TemplateRegistry:
+    """Indexed store of standard and tenant-specific templates"""
+
+    def __init__(self, max_cached_responses: int = 10000):
+        self._entries: Dict[Tuple[str, str], TemplateEntry] = {}
+        # owner -> (category, tier) -> sorted template IDs
+        self._buckets: Dict[str, Dict[Tuple[str, str], List[str]]] = {}
+        self._tenant_tiers: Dict[str, str] = {}
+        self._versions: Dict[str, int] = {}
+
+        self._responses: "OrderedDict[tuple, Tuple[Tuple[int, int], bytes, str]]" = OrderedDict()
+        self.max_cached_responses = max_cached_responses
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def register(
+        self,
+        info: TemplateInfo,
+        owner: str = STANDARD,
+        category: str = "general",
+        tier: str = "basic",
+    ) -> None:
+        """Add or replace a template; owner is a tenant ID or STANDARD"""
+        if tier not in TEMPLATE_TIERS:
+            raise ValueError(f"Unknown template tier '{tier}'")
+        if owner != STANDARD and (STANDARD, info.id) in self._entries:
+            raise ValueError(f"Template ID '{info.id}' is reserved by a standard template")
+
+        self.remove(info.id, owner)
+        self._entries[(owner, info.id)] = TemplateEntry(owner, category, tier, info)
+        bucket = self._buckets.setdefault(owner, {}).setdefault((category, tier), [])
+        bisect.insort(bucket, info.id)
+        self._bump(owner)
+
+    def remove(self, template_id: str, owner: str = STANDARD) -> bool:
+        entry = self._entries.pop((owner, template_id), None)
+        if entry is None:
+            return False
+        bucket = self._buckets[owner][(entry.category, entry.tier)]
+        del bucket[bisect.bisect_left(bucket, template_id)]
+        if not bucket:
+            del self._buckets[owner][(entry.category, entry.tier)]
+        self._bump(owner)
+        return True
+
+    def set_tenant_tier(self, tenant_id: str, tier: str) -> None:
+        if tier not in TEMPLATE_TIERS:
+            raise ValueError(f"Unknown template tier '{tier}'")
+        self._tenant_tiers[tenant_id] = tier
+        self._bump(tenant_id)
+
+    def _bump(self, owner: str) -> None:
+        self._versions[owner] = self._versions.get(owner, 0) + 1
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def tenant_tier(self, tenant_id: Optional[str]) -> str:
+        return self._tenant_tiers.get(tenant_id or STANDARD, DEFAULT_TENANT_TIER)
+
+    def get(self, template_id: str, tenant_id: Optional[str] = None) -> Optional[TemplateInfo]:
+        """Look up a template visible to the tenant (standard or its own)"""
+        entry = self._entries.get((STANDARD, template_id))
+        if entry is None and tenant_id:
+            entry = self._entries.get((tenant_id, template_id))
+        if entry is None:
+            return None
+        if TEMPLATE_TIERS.index(entry.tier) > TEMPLATE_TIERS.index(self.tenant_tier(tenant_id)):
+            return None
+        return entry.info
+
+    def query(
+        self,
+        tenant_id: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[TemplateInfo], Optional[str]]:
+        """Return one page of templates sorted by ID, and the next cursor"""
+        after = decode_cursor(cursor) if cursor else None
+        allowed_tiers = TEMPLATE_TIERS[:TEMPLATE_TIERS.index(self.tenant_tier(tenant_id)) + 1]
+
+        owners = [STANDARD] if not tenant_id else [STANDARD, tenant_id]
+        streams: List[Iterator[Tuple[str, str]]] = []
+        for owner in owners:
+            for (bucket_category, tier), ids in self._buckets.get(owner, {}).items():
+                if tier not in allowed_tiers:
+                    continue
+                if category is not None and bucket_category != category:
+                    continue
+                start = bisect.bisect_right(ids, after) if after is not None else 0
+                streams.append(self._walk(ids, start, owner))
+
+        page = list(itertools.islice(heapq.merge(*streams), limit + 1))
+        next_cursor = encode_cursor(page[limit - 1][0]) if len(page) > limit else None
+        return [self._entries[(owner, template_id)].info for template_id, owner in page[:limit]], next_cursor
+
+    @staticmethod
+    def _walk(ids: List[str], start: int, owner: str) -> Iterator[Tuple[str, str]]:
+        # Index-based so a page deep into a bucket does not skip over its head
+        for index in range(start, len(ids)):
+            yield ids[index], owner
+
+    def list_response(
+        self,
+        tenant_id: Optional[str] = None,
+        category: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[bytes, str]:
+        """Serialized TemplatesListResponse and its ETag, cached per tenant"""
+        key = (tenant_id or STANDARD, category, limit, cursor)
+        versions = (self._versions.get(STANDARD, 0), self._versions.get(tenant_id or STANDARD, 0))
+
+        cached = self._responses.get(key)
+        if cached is not None and cached[0] == versions:
+            self._responses.move_to_end(key)
+            return cached[1], cached[2]
+
+        templates, next_cursor = self.query(tenant_id, category, limit, cursor)
+        body = TemplatesListResponse(templates=templates, next_cursor=next_cursor).model_dump_json().encode()
+        etag = etag_for(body)
+
+        self._responses[key] = (versions, body, etag)
+        self._responses.move_to_end(key)
+        if len(self._responses) > self.max_cached_responses:
+            self._responses.popitem(last=False)
+        return body, etag
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def load_standard_templates(registry: TemplateRegistry) -> None:
+    """Register the standard templates offered by this mock service"""
+    # TODO: Load templates from database
+    standard = [
+        ("soap", "SOAP Note",
+         "Standard Subjective, Objective, Assessment, Plan format for clinical documentation",
+         "clinical_note", "basic"),
+        ("medications", "Medications List",
+         "Structured list of prescribed medications with dosage, frequency, and duration",
+         "structured_data", "basic"),
+        ("discharge_summary", "Discharge Summary",
+         "Comprehensive discharge documentation including admission details, hospital course, and follow-up",
+         "clinical_note", "professional"),
+        ("progress_note", "Progress Note",
+         "Daily progress notes documenting patient condition and treatment plan updates",
+         "clinical_note", "basic"),
+        ("consultation_note", "Consultation Note",
+         "Specialist consultation documentation with recommendations and findings",
+         "clinical_note", "professional"),
+        ("operative_note", "Operative Note",
+         "Surgical procedure documentation including pre-op, intra-op, and post-op details",
+         "clinical_note", "professional"),
+        ("history_physical", "History & Physical",
+         "Comprehensive patient history and physical examination findings",
+         "clinical_note", "basic"),
+        ("lab_results", "Lab Results",
+         "Structured laboratory test results with values and reference ranges",
+         "structured_data", "basic"),
+        ("radiology_report", "Radiology Report",
+         "Imaging study findings and radiologist interpretations",
+         "report", "professional"),
+        ("vitals", "Vital Signs",
+         "Patient vital signs including blood pressure, heart rate, temperature, and oxygen saturation",
+         "structured_data", "basic"),
+    ]
+    for template_id, name, description, category, tier in standard:
+        registry.register(
+            TemplateInfo(id=template_id, name=name, description=description),
+            category=category,
+            tier=tier,
+        )
+
+
+# Shared registry used by all routes
+TEMPLATE_REGISTRY = TemplateRegistry()
+load_standard_templates(TEMPLATE_REGISTRY)
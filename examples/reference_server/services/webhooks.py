@@ -0,0 +1,649 @@
+"""
+Webhook delivery for MedScribe Alliance Protocol (spec/10)
+
+Registration:
+- Webhooks belong to a tenant and subscribe to a set of events. A fan-out
+  index maps (tenant, event) to the matching webhooks, so publishing an
+  event costs one dict lookup however many webhooks are registered.
+
+Events:
+- Session status transitions arrive through the session store's update()
+  listener and use the spec/10 event names. session.started is published
+  by POST /sessions (spec/10 §10.4), not on the first audio upload.
+- Payloads carry only event, timestamp and session_id, plus the session's
+  additional_data when it has any (spec/06 §6.9).
+
+Delivery:
+- publish() only writes each delivery to the outbox and schedules it, so
+  request handlers never wait on a receiver.
+- Deliveries are POSTed by asyncio tasks over pooled keep-alive
+  connections (services/http_pool.py). Each endpoint URL has a cap on
+  concurrent requests;
+  deliveries over the cap wait in that endpoint's backlog, so a slow or
+  dead receiver never holds up the others.
+- A failed attempt (non-2xx, connection error, timeout) is retried with
+  exponential backoff and jitter. After WEBHOOK_MAX_ATTEMPTS the delivery
+  moves to the webhook's dead-letter queue, from where it can be replayed.
+- If a secret was registered, requests are signed with X-MSA-Signature
+  (spec/10 §10.7).
+
+Durability:
+- With WEBHOOK_STORE=wal, registrations, pending deliveries and dead
+  letters are recorded in an append-only log (group-commit fsync) that is
+  compacted at startup and whenever it grows large. start() resumes the
+  deliveries that were pending at shutdown, so every event is delivered at
+  least once; receivers deduplicate by session_id and event.
+
+Environment variables:
+- WEBHOOK_STORE: "memory" (default) or "wal"
+- WEBHOOK_STORE_PATH: Log directory (default: ./data/webhooks)
+- WEBHOOK_MAX_CONNECTIONS: Pooled connections across all endpoints (default: 100)
+- WEBHOOK_ENDPOINT_CONCURRENCY: Concurrent requests per endpoint (default: 8)
+- WEBHOOK_TIMEOUT_SECONDS: Per-request timeout (default: 30)
+- WEBHOOK_MAX_ATTEMPTS: Attempts before a delivery is dead-lettered (default: 8)
+- WEBHOOK_RETRY_BASE_SECONDS: Delay before the first retry (default: 1)
+- WEBHOOK_RETRY_MAX_SECONDS: Maximum delay between retries (default: 600)
+- WEBHOOK_DEAD_LETTER_LIMIT: Dead letters kept per webhook (default: 1000)
+- WEBHOOK_ALLOW_HTTP: Accept plain http:// URLs for any host; http is
+  always accepted for localhost (default: false)
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from models import SessionStatus
+from services.fast_json import dumps
+from services.http_pool import ConnectionPool, HTTPError
+from services.session_events import STATUS_EVENTS
+from services.session_store import SESSION_STORE, SessionStore
+
+logger = logging.getLogger(__name__)
+
+
+SIGNATURE_HEADER = "X-MSA-Signature"
+USER_AGENT = "MedScribeAlliance-Webhooks/0.1"
+
+# Owner of webhooks registered without a tenant
+DEFAULT_TENANT = ""
+
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+def sign_payload(secret: str, body: bytes, timestamp: Optional[int] = None) -> str:
+    """X-MSA-Signature value for a request body (spec/10 §10.7)"""
+    if timestamp is None:
+        timestamp = int(time.time())
+    signed_payload = str(timestamp).encode() + b"." + body
+    signature = hmac.new(secret.encode(), signed_payload, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def verify_signature(body: bytes, header: str, secret: str, tolerance: Optional[float] = 300) -> bool:
+    """Check an X-MSA-Signature header; rejects timestamps older than `tolerance` seconds"""
+    try:
+        parts = dict(item.split("=", 1) for item in header.split(","))
+        timestamp = int(parts["t"])
+        signature = parts["v1"]
+    except (KeyError, ValueError):
+        return False
+    if tolerance is not None and abs(time.time() - timestamp) > tolerance:
+        return False
+    expected = sign_payload(secret, body, timestamp).split("v1=", 1)[1]
+    return hmac.compare_digest(expected, signature)
+
+
+def check_url(url: str, allow_http: bool = False) -> None:
+    """Validate a webhook URL; raises ValueError with the reason"""
+    parts = urlsplit(url)
+    if not parts.hostname:
+        raise ValueError("url must be an absolute URL")
+    if parts.scheme == "https":
+        return
+    if parts.scheme == "http" and (allow_http or parts.hostname in LOCAL_HOSTS):
+        return
+    raise ValueError("url must use HTTPS")
+
+
+# ============================================================================
+# Storage
+# ============================================================================
+
+class WebhookStore:
+    """
+    Volatile registrations, outbox and dead letters.
+
+    Every change is a record applied by _apply(), so the durable subclass
+    can log the same records and replay them on startup.
+    """
+
+    def __init__(self, dead_letter_limit: int = 1000):
+        self.dead_letter_limit = dead_letter_limit
+        self.webhooks: Dict[str, Dict[str, Any]] = {}
+        # Pending deliveries by delivery_id
+        self.deliveries: Dict[str, Dict[str, Any]] = {}
+        # webhook_id -> delivery_id -> delivery, oldest first
+        self.dead_letters: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def put_webhook(self, webhook: Dict[str, Any]) -> None:
+        self._write({"op": "hook", "webhook": webhook})
+
+    def delete_webhook(self, webhook_id: str) -> None:
+        """Remove a webhook with its pending deliveries and dead letters"""
+        self._write({"op": "unhook", "id": webhook_id})
+
+    def put_delivery(self, delivery: Dict[str, Any]) -> None:
+        """Add a delivery to the outbox (taking it out of the dead letters if it is there)"""
+        self._write({"op": "put", "delivery": delivery})
+
+    def update_delivery(self, delivery_id: str, **fields: Any) -> None:
+        self._write({"op": "set", "id": delivery_id, "fields": fields})
+
+    def complete_delivery(self, delivery_id: str) -> None:
+        self._write({"op": "done", "id": delivery_id})
+
+    def dead_letter(self, delivery: Dict[str, Any]) -> None:
+        """Move a delivery from the outbox to its webhook's dead letters"""
+        self._write({"op": "dead", "delivery": delivery})
+
+    def close(self) -> None:
+        """Flush and release any resources held by the store"""
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record["op"]
+        if op == "put":
+            delivery = record["delivery"]
+            self.dead_letters.get(delivery["webhook_id"], {}).pop(delivery["delivery_id"], None)
+            self.deliveries[delivery["delivery_id"]] = delivery
+        elif op == "set":
+            delivery = self.deliveries.get(record["id"])
+            if delivery is not None:
+                delivery.update(record["fields"])
+        elif op == "done":
+            self.deliveries.pop(record["id"], None)
+        elif op == "dead":
+            delivery = record["delivery"]
+            self.deliveries.pop(delivery["delivery_id"], None)
+            dead = self.dead_letters.setdefault(delivery["webhook_id"], {})
+            dead[delivery["delivery_id"]] = delivery
+            while len(dead) > self.dead_letter_limit:
+                del dead[next(iter(dead))]
+        elif op == "hook":
+            webhook = record["webhook"]
+            self.webhooks[webhook["webhook_id"]] = webhook
+        elif op == "unhook":
+            webhook_id = record["id"]
+            self.webhooks.pop(webhook_id, None)
+            self.dead_letters.pop(webhook_id, None)
+            for delivery_id in [d["delivery_id"] for d in self.deliveries.values() if d["webhook_id"] == webhook_id]:
+                del self.deliveries[delivery_id]
+
+    def _state(self) -> List[Dict[str, Any]]:
+        """Records that rebuild the current state from scratch"""
+        records: List[Dict[str, Any]] = [{"op": "hook", "webhook": w} for w in self.webhooks.values()]
+        records.extend({"op": "put", "delivery": d} for d in self.deliveries.values())
+        for dead in self.dead_letters.values():
+            records.extend({"op": "dead", "delivery": d} for d in dead.values())
+        return records
+
+
+class WALWebhookStore(WebhookStore):
+    """
+    Durable webhook store.
+
+    Records are applied in memory and queued as JSON lines; a background
+    thread appends and fsyncs them every `fsync_interval` seconds (group
+    commit). Delivered events are removed from the log by compaction, which
+    rewrites it with only the live state once `compact_records` records have
+    accumulated.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dead_letter_limit: int = 1000,
+        fsync_interval: float = 0.005,
+        compact_records: int = 100000,
+    ):
+        super().__init__(dead_letter_limit)
+        self.path = os.path.join(directory, "webhooks.log")
+        self.fsync_interval = fsync_interval
+        self.compact_records = compact_records
+
+        # _lock guards the state and _pending; _io_lock serializes disk writes
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._pending: List[bytes] = []
+        self._records = 0
+        self._closed = False
+        self._file = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self.compact()
+
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="webhook-wal-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = dumps(record) + b"\n"
+        with self._lock:
+            self._apply(record)
+            self._pending.append(line)
+
+    def flush(self) -> None:
+        """Block until all accepted records are durable"""
+        self._commit()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._flusher.join()
+        self._commit()
+        self._file.close()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            self._commit()
+            if self._records >= self.compact_records:
+                self.compact()
+
+    def _commit(self) -> None:
+        with self._io_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            self._file.write(b"".join(batch))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._records += len(batch)
+
+    def compact(self) -> None:
+        """Rewrite the log with only the live state"""
+        with self._io_lock:
+            with self._lock:
+                # Already applied, so the state below includes these records
+                self._pending = []
+                lines = [dumps(record) + b"\n" for record in self._state()]
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.path, "ab")
+            self._records = len(lines)
+
+    def _recover(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash mid-append; compact() drops it
+                    break
+                self._apply(record)
+
+
+# ============================================================================
+# Delivery
+# ============================================================================
+
+class _Endpoint:
+    """Concurrency bookkeeping for one receiver URL"""
+
+    __slots__ = ("in_flight", "backlog")
+
+    def __init__(self):
+        self.in_flight = 0
+        self.backlog: Deque[str] = deque()
+
+
+def _timestamp() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class WebhookDispatcher:
+    """Webhook registry, fan-out index and delivery engine"""
+
+    def __init__(
+        self,
+        store: WebhookStore,
+        max_connections: int = 100,
+        endpoint_concurrency: int = 8,
+        timeout: float = 30.0,
+        max_attempts: int = 8,
+        retry_base: float = 1.0,
+        retry_max: float = 600.0,
+        allow_http: bool = False,
+    ):
+        self.store = store
+        self.max_connections = max_connections
+        self.endpoint_concurrency = endpoint_concurrency
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.allow_http = allow_http
+
+        # (tenant_id, event) -> webhook_id -> webhook
+        self._index: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        for webhook in store.webhooks.values():
+            self._index_add(webhook)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool: Optional[ConnectionPool] = None
+        self._endpoints: Dict[str, _Endpoint] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.published = 0
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+
+    def _index_add(self, webhook: Dict[str, Any]) -> None:
+        for event in webhook["events"]:
+            self._index.setdefault((webhook["tenant_id"], event), {})[webhook["webhook_id"]] = webhook
+
+    def _index_remove(self, webhook: Dict[str, Any]) -> None:
+        for event in webhook["events"]:
+            key = (webhook["tenant_id"], event)
+            webhooks = self._index.get(key)
+            if webhooks is not None:
+                webhooks.pop(webhook["webhook_id"], None)
+                if not webhooks:
+                    del self._index[key]
+
+    def register(self, tenant_id: Optional[str], url: str, events: List[str], secret: Optional[str] = None) -> Dict[str, Any]:
+        """Register a webhook; raises ValueError if the URL is not acceptable"""
+        check_url(url, self.allow_http)
+        webhook = {
+            "webhook_id": f"wh_{secrets.token_hex(12)}",
+            "tenant_id": tenant_id or DEFAULT_TENANT,
+            "url": url,
+            "events": list(dict.fromkeys(events)),
+            "secret": secret,
+            "status": "active",
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        self.store.put_webhook(webhook)
+        self._index_add(webhook)
+        return webhook
+
+    def get(self, tenant_id: Optional[str], webhook_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a webhook owned by the tenant"""
+        webhook = self.store.webhooks.get(webhook_id)
+        if webhook is None or webhook["tenant_id"] != (tenant_id or DEFAULT_TENANT):
+            return None
+        return webhook
+
+    def list_webhooks(self, tenant_id: Optional[str]) -> List[Dict[str, Any]]:
+        tenant_id = tenant_id or DEFAULT_TENANT
+        return [w for w in self.store.webhooks.values() if w["tenant_id"] == tenant_id]
+
+    def unregister(self, tenant_id: Optional[str], webhook_id: str) -> bool:
+        """Delete a webhook and drop its pending deliveries"""
+        webhook = self.get(tenant_id, webhook_id)
+        if webhook is None:
+            return False
+        self._index_remove(webhook)
+        self.store.delete_webhook(webhook_id)
+        return True
+
+    def dead_letters(self, webhook_id: str) -> List[Dict[str, Any]]:
+        return list(self.store.dead_letters.get(webhook_id, {}).values())
+
+    def replay(self, webhook_id: str) -> int:
+        """Queue a webhook's dead letters for delivery again"""
+        dead = self.dead_letters(webhook_id)
+        now = time.time()
+        for delivery in dead:
+            delivery = dict(delivery, attempts=0, next_attempt_at=now, last_error=None)
+            delivery.pop("failed_at", None)
+            self.store.put_delivery(delivery)
+            self._wake(delivery["delivery_id"])
+        return len(dead)
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def attach(self, store: SessionStore) -> None:
+        """Publish status changes recorded by the session store"""
+        store.add_listener(self._on_update)
+
+    def _on_update(self, session_id: str, session: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        if not self._index or "status" not in fields:
+            return
+        new_status = SessionStatus(fields["status"])
+        # session.started is published when the session is created
+        if new_status == SessionStatus.RECORDING:
+            return
+        event = STATUS_EVENTS.get(new_status)
+        if event is not None:
+            self.publish(session.get("tenant_id"), session_id, event, session.get("additional_data"))
+
+    def publish(
+        self,
+        tenant_id: Optional[str],
+        session_id: str,
+        event: str,
+        additional_data: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Queue an event for every matching webhook; returns the number of deliveries"""
+        webhooks = self._index.get((tenant_id or DEFAULT_TENANT, event))
+        if not webhooks:
+            return 0
+        payload = {"event": event, "timestamp": _timestamp(), "session_id": session_id}
+        if additional_data:
+            payload["additional_data"] = additional_data
+        # Encoded once: every attempt sends the same bytes
+        body = dumps(payload).decode()
+        now = time.time()
+        for webhook_id in tuple(webhooks):
+            delivery_id = f"dlv_{secrets.token_hex(8)}"
+            self.store.put_delivery({
+                "delivery_id": delivery_id,
+                "webhook_id": webhook_id,
+                "event": event,
+                "session_id": session_id,
+                "body": body,
+                "attempts": 0,
+                "next_attempt_at": now,
+                "last_error": None,
+            })
+            self._wake(delivery_id)
+        self.published += 1
+        return len(webhooks)
+
+    def _wake(self, delivery_id: str) -> None:
+        loop = self._loop
+        if loop is None:
+            # Not started: stays in the outbox until start()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._ready(delivery_id)
+        else:
+            loop.call_soon_threadsafe(self._ready, delivery_id)
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Open the connection pool and resume deliveries pending in the outbox"""
+        self._loop = asyncio.get_running_loop()
+        self._pool = ConnectionPool(self.max_connections, self.timeout, USER_AGENT)
+        now = time.time()
+        for delivery in list(self.store.deliveries.values()):
+            self._schedule(delivery["delivery_id"], max(0.0, delivery["next_attempt_at"] - now))
+
+    async def stop(self) -> None:
+        """Stop sending; interrupted deliveries stay in the outbox for the next start()"""
+        # Cancelled sends must not start the deliveries queued behind them
+        for endpoint in self._endpoints.values():
+            endpoint.backlog.clear()
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        tasks = tuple(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._endpoints.clear()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        self._loop = None
+
+    async def join(self) -> None:
+        """Wait until the outbox is empty (deliveries succeeded or were dead-lettered)"""
+        while self.store.deliveries:
+            await asyncio.sleep(0.01)
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt: exponential, with equal jitter"""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _schedule(self, delivery_id: str, delay: float) -> None:
+        self._timers[delivery_id] = self._loop.call_later(delay, self._ready, delivery_id)
+
+    def _ready(self, delivery_id: str) -> None:
+        """Send a delivery now, or queue it behind the endpoint's in-flight requests"""
+        self._timers.pop(delivery_id, None)
+        delivery = self.store.deliveries.get(delivery_id)
+        if delivery is None:
+            return
+        webhook = self.store.webhooks.get(delivery["webhook_id"])
+        if webhook is None:
+            self.store.complete_delivery(delivery_id)
+            return
+        endpoint = self._endpoints.get(webhook["url"])
+        if endpoint is None:
+            endpoint = self._endpoints[webhook["url"]] = _Endpoint()
+        if endpoint.in_flight >= self.endpoint_concurrency:
+            endpoint.backlog.append(delivery_id)
+            return
+        endpoint.in_flight += 1
+        task = self._loop.create_task(self._deliver(delivery, webhook, endpoint))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, delivery: Dict[str, Any], webhook: Dict[str, Any], endpoint: _Endpoint) -> None:
+        try:
+            error = await self._attempt(delivery, webhook)
+        finally:
+            endpoint.in_flight -= 1
+            while endpoint.backlog and endpoint.in_flight < self.endpoint_concurrency:
+                self._ready(endpoint.backlog.popleft())
+            if not endpoint.in_flight and self._endpoints.get(webhook["url"]) is endpoint:
+                del self._endpoints[webhook["url"]]
+
+        delivery_id = delivery["delivery_id"]
+        if error is None:
+            self.delivered += 1
+            self.store.complete_delivery(delivery_id)
+            return
+
+        attempts = delivery["attempts"] + 1
+        if attempts >= self.max_attempts:
+            self.dead_lettered += 1
+            logger.warning(
+                "Webhook %s: %s for %s dead-lettered after %d attempts (%s)",
+                webhook["webhook_id"], delivery["event"], delivery["session_id"], attempts, error,
+            )
+            self.store.dead_letter(dict(delivery, attempts=attempts, last_error=error, failed_at=datetime.utcnow().isoformat()))
+            return
+
+        self.retried += 1
+        delay = self.backoff(attempts)
+        self.store.update_delivery(delivery_id, attempts=attempts, next_attempt_at=time.time() + delay, last_error=error)
+        self._schedule(delivery_id, delay)
+
+    async def _attempt(self, delivery: Dict[str, Any], webhook: Dict[str, Any]) -> Optional[str]:
+        """POST the delivery once; returns None on success or the error"""
+        body = delivery["body"].encode()
+        headers = {"Content-Type": "application/json"}
+        if webhook.get("secret"):
+            headers[SIGNATURE_HEADER] = sign_payload(webhook["secret"], body)
+        try:
+            status_code = await self._pool.post(webhook["url"], body, headers)
+        except HTTPError as e:
+            return str(e)
+        if 200 <= status_code < 300:
+            return None
+        return f"HTTP {status_code}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "webhooks": len(self.store.webhooks),
+            "pending": len(self.store.deliveries),
+            "in_flight": len(self._tasks),
+            "connections_opened": self._pool.opened if self._pool is not None else 0,
+            "published": self.published,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+def create_webhook_store() -> WebhookStore:
+    """Build the webhook store configured through environment variables"""
+    backend = os.getenv("WEBHOOK_STORE", "memory")
+    dead_letter_limit = int(os.getenv("WEBHOOK_DEAD_LETTER_LIMIT", "1000"))
+    if backend == "memory":
+        return WebhookStore(dead_letter_limit)
+    if backend == "wal":
+        return WALWebhookStore(
+            directory=os.getenv("WEBHOOK_STORE_PATH", os.path.join("data", "webhooks")),
+            dead_letter_limit=dead_letter_limit,
+        )
+    raise ValueError(f"Unknown WEBHOOK_STORE backend '{backend}'")
+
+
+# Shared store and dispatcher used by all routes; sending is started by the app lifespan
+WEBHOOK_STORE = create_webhook_store()
+WEBHOOK_DISPATCHER = WebhookDispatcher(
+    WEBHOOK_STORE,
+    max_connections=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "100")),
+    endpoint_concurrency=int(os.getenv("WEBHOOK_ENDPOINT_CONCURRENCY", "8")),
+    timeout=float(os.getenv("WEBHOOK_TIMEOUT_SECONDS", "30")),
+    max_attempts=int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8")),
+    retry_base=float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "1")),
+    retry_max=float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", "600")),
+    allow_http=os.getenv("WEBHOOK_ALLOW_HTTP", "false").lower() == "true",
+)
+WEBHOOK_DISPATCHER.attach(SESSION_STORE)
@@ -8,10 +8,45 @@ Usage:
 """
 
 import requests
+import base64
+import hashlib
 import io
+import json
+import struct
+import threading
 import time
+import wave
+from urllib.parse import urlsplit
+
+from object_store import ObjectStore
+from services.object_store import SIGNED_UPLOADS
+from webhook_receiver import WebhookReceiver
 
 BASE_URL = "http://localhost:8000"
+# Local webhook receiver started by test_webhooks; must be reachable from the server
+RECEIVER_PORT = 9100
+
+
+def _ebml(element_id: bytes, body: bytes) -> bytes:
+    return element_id + b"\x01" + len(body).to_bytes(7, "big") + body
+
+
+def mock_webm(seconds: float = 5.0, payload: bytes = b"MOCK_AUDIO_DATA") -> bytes:
+    """WebM container with a Duration, holding `payload` instead of real audio"""
+    info = _ebml(b"\x2a\xd7\xb1", (1000000).to_bytes(3, "big")) + _ebml(b"\x44\x89", struct.pack(">d", seconds * 1000))
+    segment = _ebml(b"\x15\x49\xa9\x66", info) + _ebml(b"\x1f\x43\xb6\x75", payload)
+    return _ebml(b"\x1a\x45\xdf\xa3", _ebml(b"\x42\x82", b"webm")) + _ebml(b"\x18\x53\x80\x67", segment)
+
+
+def mock_wav(seconds: float, rate: int = 1000) -> bytes:
+    """Silent 8-bit mono WAV"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(1)
+        w.setframerate(rate)
+        w.writeframes(b"\x80" * int(seconds * rate))
+    return buffer.getvalue()
 
 
 def test_discovery():
@@ -25,6 +60,20 @@ def test_discovery():
     return data
 
 
+def test_discovery_conditional_request():
+    """Test discovery ETag / If-None-Match handling"""
+    print("\nTesting discovery conditional request...")
+    response = requests.get(f"{BASE_URL}/.well-known/medscribealliance")
+    etag = response.headers.get("ETag")
+    assert etag, "Expected an ETag header"
+    response = requests.get(
+        f"{BASE_URL}/.well-known/medscribealliance",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304, f"Expected 304, got {response.status_code}"
+    print("✓ Discovery returns 304 for a matching ETag")
+
+
 def test_templates():
     """Test templates listing"""
     print("\nTesting templates endpoint...")
@@ -36,6 +85,25 @@ def test_templates():
     return data
 
 
+def test_templates_pagination():
+    """Test cursor pagination of the templates list"""
+    print("\nTesting templates pagination...")
+    response = requests.get(f"{BASE_URL}/v1/templates", params={"limit": 3})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    first_page = response.json()
+    assert len(first_page["templates"]) == 3
+    assert first_page["next_cursor"], "Expected a next_cursor"
+    
+    response = requests.get(
+        f"{BASE_URL}/v1/templates",
+        params={"limit": 3, "cursor": first_page["next_cursor"]},
+    )
+    second_page = response.json()
+    first_ids = {t["id"] for t in first_page["templates"]}
+    assert not first_ids & {t["id"] for t in second_page["templates"]}
+    print("✓ Templates pagination works")
+
+
 def test_session_lifecycle():
     """Test complete session lifecycle"""
     print("\nTesting session lifecycle...")
@@ -64,7 +132,7 @@ def test_session_lifecycle():
     print("  Uploading audio files...")
     
     # Create mock audio data
-    mock_audio_data = b"MOCK_AUDIO_DATA_" * 100  # ~1.6KB of data
+    mock_audio_data = mock_webm(payload=b"MOCK_AUDIO_DATA_" * 100)  # ~1.6KB of data
     
     # Upload first chunk
     upload_response_1 = requests.post(
@@ -112,6 +180,614 @@ def test_session_lifecycle():
     return session_id
 
 
+def test_session_shard():
+    """Test that session IDs carry the shard of the worker that created them"""
+    print("\nTesting session shard...")
+    session_id = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    ).json()["session_id"]
+    shard = requests.get(f"{BASE_URL}/health").json()["session_shard"]
+    # ses_ + 4 hex digits of shard + 32 random hex digits
+    assert len(session_id) == 40 and int(session_id[4:8], 16) == shard, f"{session_id} not from shard {shard}"
+    print(f"  ✓ Session created by shard {shard}")
+    print("✓ Session shard works")
+
+
+def test_large_integers():
+    """Test that integers wider than 64 bits in additional_data survive encoding"""
+    print("\nTesting large integers...")
+    huge = 2 ** 70
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http",
+              "additional_data": {"record_number": huge}}
+    )
+    assert create_response.status_code == 201, f"Expected 201, got {create_response.status_code}"
+    session_id = create_response.json()["session_id"]
+    response = requests.get(f"{BASE_URL}/v1/sessions/{session_id}")
+    assert response.status_code == 202, f"Expected 202, got {response.status_code}"
+    assert response.json()["additional_data"]["record_number"] == huge
+    print("✓ Large integers work")
+
+
+def test_session_long_poll():
+    """Test that a long-poll returns as soon as the session status changes"""
+    print("\nTesting session status long-poll...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    
+    # Nothing changes: the request is held for `wait` and returns the current status
+    started = time.time()
+    response = requests.get(f"{BASE_URL}/v1/sessions/{session_id}", params={"wait": 1})
+    assert response.json()["status"] == "created"
+    assert time.time() - started >= 0.9, "Expected the request to be held"
+    print("  ✓ Long-poll times out with the current status")
+    
+    # An upload moves the session to recording and wakes the waiting request
+    upload = threading.Timer(0.5, lambda: requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_0.webm",
+        headers={"Content-Type": "audio/webm"},
+        data=mock_webm(),
+    ))
+    upload.start()
+    started = time.time()
+    response = requests.get(
+        f"{BASE_URL}/v1/sessions/{session_id}",
+        params={"wait": 10, "since_status": "created"},
+    )
+    upload.join()
+    assert response.json()["status"] == "recording", f"Got {response.json()['status']}"
+    assert time.time() - started < 5, "Expected the long-poll to return on the status change"
+    print("✓ Long-poll returns on status change")
+
+
+def test_session_events_stream():
+    """Test the Server-Sent Events push channel"""
+    print("\nTesting session events stream...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "websocket"}
+    )
+    session_id = create_response.json()["session_id"]
+    
+    stream = requests.get(f"{BASE_URL}/v1/sessions/{session_id}/events", stream=True, timeout=10)
+    assert stream.status_code == 200, f"Expected 200, got {stream.status_code}"
+    assert stream.headers["Content-Type"].startswith("text/event-stream")
+    lines = stream.iter_lines(decode_unicode=True)
+    
+    def next_event():
+        for line in lines:
+            if line.startswith("event: "):
+                return line[len("event: "):]
+    
+    assert next_event() == "session.status"
+    requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_0.webm",
+        headers={"Content-Type": "audio/webm"},
+        data=mock_webm(),
+    )
+    assert next_event() == "session.started"
+    requests.post(f"{BASE_URL}/v1/sessions/{session_id}/end", json={"audio_files_sent": 1})
+    assert next_event() == "session.ended"
+    stream.close()
+    print("✓ Session events stream pushes status transitions")
+
+
+def test_audio_stream():
+    """Test streaming audio over a WebSocket (upload_type=stream)"""
+    print("\nTesting audio stream upload...")
+    try:
+        from websockets.sync.client import connect
+    except ImportError:
+        print("  ℹ️  websockets not installed, skipping")
+        return
+    
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "stream", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    
+    ws_url = BASE_URL.replace("http", "ws", 1) + f"/v1/sessions/{session_id}/audio/stream"
+    # WebM header, then 1KB frames
+    frames = [mock_webm(30.0)] + [b"MOCK_AUDIO_FRAME" * 64] * 299
+    with connect(ws_url) as ws:
+        for frame in frames:
+            ws.send(frame)
+        ws.send(json.dumps({"type": "end"}))
+        messages = [json.loads(ws.recv()) for _ in range(2)]
+    assert messages[0]["type"] == "ack" and messages[0]["bytes_received"] >= 256 * 1024, messages[0]
+    assert messages[1]["type"] == "stored" and messages[1]["size_bytes"] == sum(map(len, frames))
+    assert messages[1]["duration_seconds"] == 30.0
+    print(f"  ✓ Streamed {messages[1]['size_bytes']} bytes as {messages[1]['filename']}")
+    
+    status_data = requests.get(f"{BASE_URL}/v1/sessions/{session_id}").json()
+    assert status_data["status"] == "recording"
+    assert status_data["audio_files"] == [messages[1]["filename"]]
+    print("✓ Audio stream upload works")
+
+
+def test_processing_pipeline():
+    """Test that ended sessions are processed to a final status"""
+    print("\nTesting processing pipeline...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_0.webm",
+        headers={"Content-Type": "audio/webm"},
+        data=mock_webm(),
+    )
+    consolidated = requests.get(f"{BASE_URL}/health").json()["processing"]["consolidated"]
+    end_response = requests.post(f"{BASE_URL}/v1/sessions/{session_id}/end", json={"audio_files_sent": 1})
+    assert end_response.status_code == 202, f"Expected 202, got {end_response.status_code}"
+    assert int(end_response.headers["Retry-After"]) >= 1
+    assert end_response.json()["estimated_completion"] is not None
+    
+    # Polls while processing say when to come back
+    status_response = requests.get(f"{BASE_URL}/v1/sessions/{session_id}")
+    if status_response.status_code == 202:
+        assert int(status_response.headers["Retry-After"]) >= 1
+        assert status_response.json()["estimated_completion"] is not None
+        print(f"  ✓ Retry-After: {status_response.headers['Retry-After']}s")
+    
+    # Ending again is answered without queueing the session twice
+    retry_response = requests.post(f"{BASE_URL}/v1/sessions/{session_id}/end", json={"audio_files_sent": 1})
+    assert retry_response.status_code == 202, f"Expected 202, got {retry_response.status_code}"
+    
+    response = requests.get(
+        f"{BASE_URL}/v1/sessions/{session_id}",
+        params={"wait": 30, "since_status": "processing"},
+    )
+    data = response.json()
+    assert response.status_code == 200 and data["status"] == "completed", f"Got {data['status']}"
+    assert "soap" in data["templates"]
+    print(f"  ✓ Session processed: {data['status']}")
+    # Chunks are joined into one file before processing
+    assert requests.get(f"{BASE_URL}/health").json()["processing"]["consolidated"] > consolidated
+    print("  ✓ Audio consolidated")
+    print("✓ Processing pipeline works")
+
+
+def test_out_of_order_chunks():
+    """Test that chunks are kept in sequence order and gaps are reported"""
+    print("\nTesting out-of-order chunk uploads...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    for file_name in ("audio_3.webm", "audio_0.webm", "audio_1.webm", "audio_0.webm"):
+        response = requests.post(
+            f"{BASE_URL}/v1/sessions/{session_id}/audio/{file_name}",
+            headers={"Content-Type": "audio/webm"},
+            data=mock_webm(),
+        )
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+
+    # Zero-padded sequence numbers don't follow spec/07
+    response = requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_02.webm",
+        headers={"Content-Type": "audio/webm"},
+        data=mock_webm(),
+    )
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+
+    # Missing chunks are listed one by one, so the count is bounded
+    response = requests.post(f"{BASE_URL}/v1/sessions/{session_id}/end", json={"audio_files_sent": 5_000_000})
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+
+    end_response = requests.post(f"{BASE_URL}/v1/sessions/{session_id}/end", json={"audio_files_sent": 5})
+    data = end_response.json()
+    assert data["audio_files"] == ["0.webm", "1.webm", "3.webm"], data["audio_files"]
+    assert data["missing_chunks"] == [2, 4], data["missing_chunks"]
+    print(f"  ✓ Files in sequence order, missing: {data['missing_chunks']}")
+
+    response = requests.get(
+        f"{BASE_URL}/v1/sessions/{session_id}",
+        params={"wait": 30, "since_status": "processing"},
+    )
+    assert response.json()["status"] == "partial", f"Got {response.json()['status']}"
+
+    # A processed session is not reopened by a late chunk
+    response = requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_2.webm",
+        headers={"Content-Type": "audio/webm"},
+        data=mock_webm(),
+    )
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    assert response.json()["error"]["code"] == "session_ended"
+    assert requests.get(f"{BASE_URL}/v1/sessions/{session_id}").json()["status"] == "partial"
+    print("  ✓ Upload to a partial session rejected")
+    print("✓ Out-of-order chunks work")
+
+
+def test_chunk_retries():
+    """Test that chunk retries are deduplicated and conflicting re-uploads rejected"""
+    print("\nTesting chunk retries and digests...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    url = f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_0.webm"
+    data = mock_webm(payload=b"MOCK_AUDIO_DATA" * 100)
+    sha256 = hashlib.sha256(data).digest()
+
+    response = requests.post(url, headers={"Content-Type": "audio/webm"}, data=data)
+    assert response.status_code == 200
+    assert response.json()["sha256"] == sha256.hex()
+    assert response.json()["duplicate"] is False
+    print("  ✓ Stored with its SHA-256")
+
+    response = requests.post(url, headers={"Content-Type": "audio/webm"}, data=data)
+    assert response.status_code == 200 and response.json()["duplicate"] is True
+    digest = f"sha-256=:{base64.b64encode(sha256).decode()}:"
+    response = requests.post(url, headers={"Content-Type": "audio/webm", "Content-Digest": digest}, data=data)
+    assert response.status_code == 200 and response.json()["duplicate"] is True
+    print("  ✓ Retries with and without Content-Digest are not stored again")
+
+    response = requests.post(url, headers={"Content-Type": "audio/webm"}, data=mock_webm(payload=b"OTHER_AUDIO_DATA"))
+    assert response.status_code == 409, f"Expected 409, got {response.status_code}"
+    assert response.json()["error"]["code"] == "chunk_conflict"
+    print("  ✓ Different content for a stored chunk returns 409")
+
+    # A retry's Content-Digest is trusted, but the body is still read and measured
+    response = requests.post(
+        url,
+        headers={"Content-Type": "audio/webm", "Content-Digest": digest},
+        data=iter([data, b"TRAILING"]),
+    )
+    assert response.status_code == 409, f"Expected 409, got {response.status_code}"
+    print("  ✓ Retry with the stored digest but a different size returns 409")
+
+    response = requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_1.webm",
+        headers={"Content-Type": "audio/webm", "Content-Digest": digest},
+        data=data + b"CORRUPTED",
+    )
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    md5 = base64.b64encode(hashlib.md5(data).digest()).decode()
+    response = requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_1.webm",
+        headers={"Content-Type": "audio/webm", "Content-MD5": md5},
+        data=data,
+    )
+    assert response.status_code == 200 and response.json()["duplicate"] is False
+    print("  ✓ Content-Digest mismatch returns 400, matching Content-MD5 is stored")
+
+    # Two uploads of one sequence in flight at once, with different content
+    url = f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_2.webm"
+    bodies = [mock_webm(seconds=2, payload=b"FIRST" * 200), mock_webm(seconds=3, payload=b"SECOND" * 200)]
+    both_sending = threading.Barrier(2)
+    responses = [None, None]
+
+    def upload(index):
+        def slow_body():
+            yield bodies[index][:64]
+            try:
+                both_sending.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass  # A client that sends whole bodies; they arrive in turn
+            time.sleep(0.2)
+            yield bodies[index][64:]
+        responses[index] = requests.post(url, headers={"Content-Type": "audio/webm"}, data=slow_body())
+
+    threads = [threading.Thread(target=upload, args=(index,)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200, 409], f"Expected one 200 and one 409, got {codes}"
+    winner = bodies[[response.status_code for response in responses].index(200)]
+    stored = requests.get(url)
+    assert stored.content == winner, "Stored file is not the recorded upload"
+    print("  ✓ Concurrent uploads with different content: one stored, the other 409")
+    print("✓ Chunk retries work")
+
+
+def test_upload_during_end():
+    """Test that an upload still being received when the session ends doesn't reopen it"""
+    print("\nTesting upload in flight during end...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    url = f"{BASE_URL}/v1/sessions/{session_id}/audio"
+    requests.post(f"{url}/audio_0.webm", headers={"Content-Type": "audio/webm"}, data=mock_webm())
+    body = mock_webm()
+    ended = threading.Event()
+    responses = []
+
+    def slow_body():
+        yield body[:64]
+        ended.wait(timeout=5)
+        yield body[64:]
+
+    thread = threading.Thread(target=lambda: responses.append(
+        requests.post(f"{url}/audio_1.webm", headers={"Content-Type": "audio/webm"}, data=slow_body())))
+    thread.start()
+    time.sleep(0.3)
+    end_response = requests.post(f"{BASE_URL}/v1/sessions/{session_id}/end", json={"audio_files_sent": 1})
+    assert end_response.status_code == 202, f"Expected 202, got {end_response.status_code}"
+    ended.set()
+    thread.join()
+    assert responses[0].status_code == 400, f"Expected 400, got {responses[0].status_code}"
+    assert responses[0].json()["error"]["code"] == "session_ended"
+    response = requests.get(f"{BASE_URL}/v1/sessions/{session_id}", params={"wait": 30, "since_status": "processing"})
+    assert response.json()["status"] == "completed", f"Got {response.json()['status']}"
+    print("  ✓ Upload finished after end rejected; session completed")
+    print("✓ Upload during end works")
+
+
+def test_audio_format():
+    """Test that uploads are sniffed and their durations limited"""
+    print("\nTesting audio format and duration checks...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    url = f"{BASE_URL}/v1/sessions/{session_id}/audio"
+
+    response = requests.post(f"{url}/audio_0.webm", headers={"Content-Type": "audio/webm"}, data=b"NOT_AUDIO" * 10)
+    assert response.status_code == 400 and response.json()["error"]["code"] == "invalid_audio_format"
+    response = requests.post(f"{url}/audio_0.webm", headers={"Content-Type": "audio/webm"}, data=mock_wav(5))
+    assert response.status_code == 400 and response.json()["error"]["details"]["detected_format"] == "wav"
+    print("  ✓ Bodies that are not audio of the declared format return 400")
+
+    response = requests.post(f"{url}/audio_0.wav", headers={"Content-Type": "audio/wav"}, data=mock_wav(5))
+    assert response.status_code == 200 and response.json()["duration_seconds"] == 5.0
+    response = requests.post(f"{url}/audio_1.webm", headers={"Content-Type": "audio/webm"}, data=mock_webm(12.5))
+    assert response.status_code == 200 and response.json()["duration_seconds"] == 12.5
+    response = requests.post(f"{url}/audio_2.wav", headers={"Content-Type": "audio/wav"}, data=mock_wav(25))
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    assert response.json()["error"]["code"] == "chunk_too_large"
+    print("  ✓ Durations read from WAV and WebM headers; a 25s chunk is rejected")
+
+    # The lite model allows 600 seconds per session
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "lite", "upload_type": "single", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    response = requests.post(
+        f"{BASE_URL}/v1/sessions/{session_id}/audio/consultation.wav",
+        headers={"Content-Type": "audio/wav"},
+        data=mock_wav(700),
+    )
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    assert response.json()["error"]["code"] == "session_duration_exceeded"
+    print("  ✓ Audio past max_session_duration_seconds is rejected")
+    print("✓ Audio format checks work")
+
+
+def test_audio_playback():
+    """Test that stored audio is played back with Range requests"""
+    print("\nTesting audio playback...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    url = f"{BASE_URL}/v1/sessions/{session_id}/audio"
+    chunks = [mock_wav(2), mock_wav(3)]
+    for sequence, chunk in enumerate(chunks):
+        requests.post(f"{url}/audio_{sequence}.wav", headers={"Content-Type": "audio/wav"}, data=chunk)
+
+    response = requests.get(url)
+    assert response.status_code == 200 and response.headers["Accept-Ranges"] == "bytes"
+    with wave.open(io.BytesIO(response.content)) as joined:
+        assert joined.getnframes() == 5000, f"Got {joined.getnframes()} frames"
+    print("  ✓ Chunks played back as one WAV file")
+
+    whole = response.content
+    response = requests.get(url, headers={"Range": "bytes=1990-2099"})
+    assert response.status_code == 206, f"Expected 206, got {response.status_code}"
+    assert response.headers["Content-Range"] == f"bytes 1990-2099/{len(whole)}"
+    assert response.content == whole[1990:2100]
+    response = requests.get(f"{url}/audio_1.wav", headers={"Range": "bytes=-100"})
+    assert response.status_code == 206 and response.content == chunks[1][-100:]
+    response = requests.get(url, headers={"Range": f"bytes={len(whole)}-"})
+    assert response.status_code == 416, f"Expected 416, got {response.status_code}"
+    print("  ✓ Range requests across chunks and within one file")
+    print("✓ Audio playback works")
+
+
+def test_signed_uploads():
+    """Test uploads PUT to the object store through a signed URL"""
+    print("\nTesting signed uploads...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    response = requests.get(f"{BASE_URL}/v1/sessions/{session_id}/audio/credentials")
+    if response.status_code == 501:
+        print("  - Skipped: server runs without OBJECT_STORE_SECRET")
+        return
+    if not SIGNED_UPLOADS.enabled:
+        print("  - Skipped: set OBJECT_STORE_SECRET for the tests too, to run the object store")
+        return
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    upload_url = response.json()["upload_url"]
+    print(f"  ✓ Signed upload URL issued, expires {response.json()['expires_at']}")
+
+    def files_received() -> int:
+        return requests.get(f"{BASE_URL}/v1/sessions/{session_id}").json()["audio_files_received"]
+
+    # Notifications go to the server under test, whatever OBJECT_STORE_NOTIFY_URL says
+    store = ObjectStore(notify_url=f"{BASE_URL}/internal/object-events")
+    store.start(port=urlsplit(upload_url).port)
+    try:
+        chunks = [mock_wav(2), mock_wav(3)]
+        for sequence, chunk in enumerate(chunks):
+            response = requests.put(f"{upload_url}/audio_{sequence}.wav", headers={"Content-Type": "audio/wav"}, data=chunk)
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+            assert response.headers["ETag"] == f'"{hashlib.sha256(chunk).hexdigest()}"'
+        # Registered asynchronously, after the PUT was answered
+        deadline = time.time() + 10
+        while files_received() < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        assert files_received() == 2, f"Got {files_received()} files"
+        print("  ✓ Files PUT to the object store are registered with the session")
+
+        tampered = upload_url[:-1] + ("A" if upload_url[-1] != "A" else "B")
+        response = requests.put(f"{tampered}/audio_2.wav", headers={"Content-Type": "audio/wav"}, data=mock_wav(1))
+        assert response.status_code == 403, f"Expected 403, got {response.status_code}"
+        assert b"<Code>SignatureDoesNotMatch</Code>" in response.content
+        print("  ✓ Tampered URL rejected by the object store")
+
+        # Stored by the object store, which doesn't know the session's limits
+        requests.put(f"{upload_url}/audio_0.wav", headers={"Content-Type": "audio/wav"}, data=chunks[0])
+        requests.put(f"{upload_url}/audio_2.wav", headers={"Content-Type": "audio/wav"}, data=mock_wav(30))
+        deadline = time.time() + 10
+        while store.notified + store.notify_rejected < 4 and time.time() < deadline:
+            time.sleep(0.05)
+        assert store.notify_rejected == 1, f"Expected the 30s chunk to be rejected, got {store.stats()}"
+        assert files_received() == 2
+        print("  ✓ Retried file deduplicated, over-long chunk rejected on registration")
+
+        response = requests.get(f"{BASE_URL}/v1/sessions/{session_id}/audio")
+        with wave.open(io.BytesIO(response.content)) as joined:
+            assert joined.getnframes() == 5000, f"Got {joined.getnframes()} frames"
+    finally:
+        store.stop()
+    print("✓ Signed uploads work")
+
+
+def test_webhooks():
+    """Test webhook registration and signed delivery with a retry"""
+    print("\nTesting webhooks...")
+    # The first delivery fails, so one event is only delivered by a retry
+    receiver = WebhookReceiver(secret="whsec_test", fail_first=1)
+    receiver.start(port=RECEIVER_PORT)
+    try:
+        response = requests.post(f"{BASE_URL}/v1/webhooks", json={
+            "url": f"http://localhost:{RECEIVER_PORT}/hook",
+            "events": ["session.started", "session.ended", "session.completed"],
+            "secret": "whsec_test",
+        })
+        assert response.status_code == 201, f"Expected 201, got {response.status_code}"
+        webhook = response.json()
+        assert "secret" not in webhook
+        print(f"  ✓ Webhook registered: {webhook['webhook_id']}")
+        
+        response = requests.post(f"{BASE_URL}/v1/webhooks", json={
+            "url": "http://emr.example.com/hook",
+            "events": ["session.completed"],
+        })
+        assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+        print("  ✓ Non-HTTPS URL rejected")
+        
+        create_response = requests.post(
+            f"{BASE_URL}/v1/sessions",
+            json={"templates": ["soap"], "upload_type": "chunked", "communication_protocol": "http"}
+        )
+        session_id = create_response.json()["session_id"]
+        requests.post(
+            f"{BASE_URL}/v1/sessions/{session_id}/audio/audio_0.webm",
+            headers={"Content-Type": "audio/webm"},
+            data=mock_webm(),
+        )
+        requests.post(f"{BASE_URL}/v1/sessions/{session_id}/end", json={"audio_files_sent": 1})
+        
+        expected = {"session.started", "session.ended", "session.completed"}
+        deadline = time.time() + 30
+        while set(receiver.events(session_id)) != expected and time.time() < deadline:
+            time.sleep(0.1)
+        assert set(receiver.events(session_id)) == expected, f"Got {receiver.events(session_id)}"
+        assert receiver.rejected == 0, "Signature verification failed"
+        print(f"  ✓ Signed events delivered after {receiver.attempts} attempts")
+        
+        listed = requests.get(f"{BASE_URL}/v1/webhooks").json()["webhooks"]
+        assert webhook["webhook_id"] in [w["webhook_id"] for w in listed]
+        response = requests.delete(f"{BASE_URL}/v1/webhooks/{webhook['webhook_id']}")
+        assert response.status_code == 204, f"Expected 204, got {response.status_code}"
+        response = requests.delete(f"{BASE_URL}/v1/webhooks/{webhook['webhook_id']}")
+        assert response.status_code == 404, f"Expected 404, got {response.status_code}"
+        assert response.json()["error"]["code"] == "webhook_not_found"
+        print("  ✓ Webhook deleted")
+    finally:
+        receiver.stop()
+    print("✓ Webhooks work")
+
+
+def test_metrics():
+    """Test the Prometheus metrics endpoint"""
+    print("\nTesting metrics...")
+    requests.get(f"{BASE_URL}/.well-known/medscribealliance")
+    response = requests.get(f"{BASE_URL}/metrics")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/.well-known/medscribealliance"}' in text
+    assert 'medscribe_sessions{status="completed"}' in text
+    assert "medscribe_audio_stored_bytes" in text
+    print("✓ Metrics work")
+
+
+def test_rate_limits():
+    """Test that status polls beyond the per-key limit get 429 with Retry-After"""
+    print("\nTesting rate limits...")
+    create_response = requests.post(
+        f"{BASE_URL}/v1/sessions",
+        json={"templates": ["soap"], "model": "pro", "upload_type": "chunked", "communication_protocol": "http"}
+    )
+    session_id = create_response.json()["session_id"]
+    if requests.get(f"{BASE_URL}/health").json()["auth"]["mode"] != "off":
+        print("  - Skipped: needs AUTH_MODE=off to poll with unregistered keys")
+        return
+    # Unverified keys and tenants don't get buckets of their own
+    for attempt in range(2000):
+        headers = {"X-API-Key": f"sk_test_ratelimit_{attempt}", "X-Tenant-ID": f"tenant_{attempt}"}
+        response = requests.get(f"{BASE_URL}/v1/sessions/{session_id}", headers=headers)
+        if response.status_code == 429:
+            break
+    assert response.status_code == 429, "Expected polls to be rate limited"
+    assert response.json()["error"]["code"] == "rate_limit_exceeded"
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.headers["X-RateLimit-Remaining"] == "0"
+    print(f"  ✓ Limited after {attempt} polls, Retry-After: {response.headers['Retry-After']}s")
+    print("✓ Rate limits work")
+
+
+def test_authentication():
+    """Test that invalid credentials get 401 while discovery stays public"""
+    print("\nTesting authentication...")
+    response = requests.get(f"{BASE_URL}/.well-known/medscribealliance")
+    assert response.status_code == 200
+    print("  ✓ Discovery needs no credentials")
+    mode = requests.get(f"{BASE_URL}/health").json()["auth"]["mode"]
+    if mode == "off":
+        print("  - Skipped credential checks: server runs with AUTH_MODE=off")
+        return
+
+    response = requests.get(f"{BASE_URL}/v1/templates", headers={"X-API-Key": "sk_test_not_issued"})
+    assert response.status_code == 401
+    assert response.json()["error"]["code"] == "authentication_failed"
+    assert response.json()["error"]["message"] == "Invalid API key"
+    print("  ✓ Unknown API key returns 401")
+
+    response = requests.get(f"{BASE_URL}/v1/templates", headers={"Authorization": "Bearer not.a.token"})
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+    print("  ✓ Malformed bearer token returns 401")
+
+    response = requests.get(f"{BASE_URL}/v1/templates")
+    assert response.status_code == (401 if mode == "required" else 200)
+    print(f"  ✓ Anonymous request handled as {mode}")
+    print("✓ Authentication works")
+
+
 def test_error_cases():
     """Test error handling"""
     print("\nTesting error cases...")
@@ -151,8 +827,26 @@ def main():
         
         # Run tests
         discovery_data = test_discovery()
+        test_discovery_conditional_request()
         templates_data = test_templates()
+        test_templates_pagination()
         session_id = test_session_lifecycle()
+        test_session_shard()
+        test_large_integers()
+        test_session_long_poll()
+        test_session_events_stream()
+        test_audio_stream()
+        test_processing_pipeline()
+        test_out_of_order_chunks()
+        test_chunk_retries()
+        test_upload_during_end()
+        test_audio_format()
+        test_audio_playback()
+        test_signed_uploads()
+        test_webhooks()
+        test_metrics()
+        test_rate_limits()
+        test_authentication()
         test_error_cases()
         
         print("\n" + "=" * 60)
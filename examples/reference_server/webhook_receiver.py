@@ -0,0 +1,162 @@
+"""
+Local stand-in for an EMR webhook receiver
+
+Accepts webhook deliveries from the reference server, verifies their
+X-MSA-Signature when a secret is given and keeps the events it received.
+It can also misbehave on purpose, to exercise retries and dead letters.
+
+Endpoints (any path accepts deliveries):
+- POST /<anything> - Receive a webhook delivery
+- GET /received - Events received so far, as JSON
+
+Run with:
+    python webhook_receiver.py --port 9000 --secret whsec_test
+
+then register it:
+    curl -X POST localhost:8000/v1/webhooks -H 'Content-Type: application/json' \\
+        -d '{"url": "http://localhost:9000/hook", "events": ["session.completed"], "secret": "whsec_test"}'
+
+Used in-process by test_server.py and benchmarks/bench_webhooks.py.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+
+
+def verify_webhook_signature(payload: bytes, signature_header: str, secret: str) -> bool:
+    """Signature check from spec/10 §10.7, as an EMR would implement it"""
+    try:
+        parts = dict(item.split("=", 1) for item in signature_header.split(","))
+    except ValueError:
+        return False
+    timestamp = parts.get("t")
+    signature = parts.get("v1")
+
+    if not timestamp or not signature:
+        return False
+
+    signed_payload = f"{timestamp}.{payload.decode('utf-8')}"
+    expected = hmac.new(
+        secret.encode("utf-8"),
+        signed_payload.encode("utf-8"),
+        hashlib.sha256
+    ).hexdigest()
+
+    return hmac.compare_digest(expected, signature)
+
+
+class WebhookReceiver:
+    """
+    Minimal ASGI webhook receiver.
+
+    - secret: verify signatures; bad or missing ones are answered with 401
+    - fail_first: answer the first N deliveries with 500
+    - fail_rate: answer this fraction of deliveries with 500
+    - delay: seconds to wait before answering
+    """
+
+    def __init__(
+        self,
+        secret: Optional[str] = None,
+        fail_first: int = 0,
+        fail_rate: float = 0.0,
+        delay: float = 0.0,
+        verbose: bool = False,
+    ):
+        self.secret = secret
+        self.fail_first = fail_first
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.verbose = verbose
+        self.received: List[Dict[str, Any]] = []
+        self.attempts = 0
+        self.rejected = 0
+        self._server: Optional[uvicorn.Server] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                await send({"type": message["type"] + ".complete"})
+                if message["type"] == "lifespan.shutdown":
+                    return
+        if scope["method"] == "GET" and scope["path"] == "/received":
+            await self._respond(send, 200, json.dumps(self.received).encode())
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        self.attempts += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.secret is not None:
+            headers = dict(scope["headers"])
+            signature = headers.get(b"x-msa-signature", b"").decode()
+            if not verify_webhook_signature(body, signature, self.secret):
+                self.rejected += 1
+                await self._respond(send, 401, b'{"error": "invalid signature"}')
+                return
+        if self.attempts <= self.fail_first or (self.fail_rate and random.random() < self.fail_rate):
+            await self._respond(send, 500, b'{"error": "simulated failure"}')
+            return
+
+        event = json.loads(body)
+        self.received.append(event)
+        if self.verbose:
+            print(f"{event['timestamp']}  {event['event']:<18} {event['session_id']}")
+        await self._respond(send, 200, b"{}")
+
+    @staticmethod
+    async def _respond(send, status_code: int, body: bytes) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def events(self, session_id: str) -> List[str]:
+        """Event names received for a session, in arrival order"""
+        return [e["event"] for e in self.received if e["session_id"] == session_id]
+
+    def start(self, host: str = "127.0.0.1", port: int = 9000) -> None:
+        """Serve in a background thread until stop()"""
+        self._server = uvicorn.Server(uvicorn.Config(self, host=host, port=port, log_level="warning"))
+        threading.Thread(target=self._server.run, daemon=True).start()
+        while not self._server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--secret", help="Verify X-MSA-Signature with this secret")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of deliveries answered with 500")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Delay before answering")
+    args = parser.parse_args()
+
+    receiver = WebhookReceiver(args.secret, fail_rate=args.fail_rate, delay=args.delay_ms / 1000, verbose=True)
+    uvicorn.run(receiver, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()